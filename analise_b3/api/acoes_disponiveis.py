@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_DADOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados')
+
+# Snapshot local da lista de ações, lido na inicialização sem esperar pela API
+CAMINHO_SNAPSHOT = os.path.join(DIRETORIO_DADOS, 'acoes_disponiveis.json')
+
+# Lista versionada usada enquanto o primeiro snapshot não é gravado
+CAMINHO_PADRAO = os.path.join(DIRETORIO_DADOS, 'acoes_disponiveis_padrao.json')
+
+def carregar_snapshot(caminho: str = CAMINHO_SNAPSHOT) -> dict:
+    """Retorna o dicionário símbolo -> nome salvo localmente"""
+    if not os.path.exists(caminho):
+        caminho = CAMINHO_PADRAO
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)['acoes']
+
+def salvar_snapshot(acoes: dict, caminho: str = CAMINHO_SNAPSHOT):
+    """Grava a lista de ações de forma atômica, para não expor um arquivo pela metade"""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({
+            'atualizado_em': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'acoes': acoes
+        }, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def snapshot_desatualizado(ttl: int, caminho: str = CAMINHO_SNAPSHOT) -> bool:
+    """Indica se o snapshot não existe ou é mais antigo que ttl segundos"""
+    try:
+        return time.time() - os.path.getmtime(caminho) > ttl
+    except OSError:
+        return True
+
+def atualizar_em_segundo_plano(buscar_acoes, ttl: int = 3600,
+                               caminho: str = CAMINHO_SNAPSHOT) -> threading.Thread:
+    """
+    Inicia uma thread que atualiza o snapshot sempre que ele passar de ttl segundos
+    buscar_acoes: função sem argumentos que retorna o dicionário símbolo -> nome
+    """
+    def atualizar():
+        while True:
+            if snapshot_desatualizado(ttl, caminho):
+                try:
+                    salvar_snapshot(buscar_acoes(), caminho)
+                except Exception as e:
+                    logger.warning("Não foi possível atualizar a lista de ações: %s", e)
+            time.sleep(min(ttl, 300))
+
+    thread = threading.Thread(target=atualizar, name='atualizacao-acoes', daemon=True)
+    thread.start()
+    return thread
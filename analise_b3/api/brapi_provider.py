@@ -1,13 +1,28 @@
-import streamlit as st
-import pandas as pd
-import requests
-from datetime import datetime
+import os
+from api.provider import DataProvider, LimiteRequisicoes
+from core.cache import cache_compartilhado
+from core.instrumentacao import medir
+
+class BrapiProvider(DataProvider):
+    periods = ['1d', '5d', '1mo', '3mo']  # Limite do plano gratuito
 
-class BrapiProvider:
     def __init__(self):
         """Inicializa o provedor de dados da BRAPI"""
         self.base_url = "https://brapi.dev/api/quote"
-        self.token = st.secrets["BRAPI_TOKEN"]
+        self._token = None
+    
+    @property
+    def token(self) -> str:
+        """Token da BRAPI, lido da variável de ambiente BRAPI_TOKEN ou dos secrets do Streamlit na primeira requisição"""
+        if self._token is None:
+            self._token = os.environ.get('BRAPI_TOKEN')
+        if self._token is None:
+            import streamlit as st
+            try:
+                self._token = st.secrets["BRAPI_TOKEN"]
+            except Exception:
+                raise Exception("Token da BRAPI não configurado (BRAPI_TOKEN nos secrets ou no ambiente).")
+        return self._token
         
     def _make_request(self, endpoint: str, params: dict = None) -> dict:
         """Faz uma requisição para a API da BRAPI"""
@@ -16,20 +31,27 @@ class BrapiProvider:
             
         params['token'] = self.token
         
+        # Importado aqui para não atrasar a primeira renderização das páginas
+        import requests
+        
         try:
-            response = requests.get(f"{self.base_url}{endpoint}", params=params)
-            response.raise_for_status()  # Levanta exceção para status codes de erro
-            return response.json()
+            with medir('brapi.requisicao'):
+                response = requests.get(f"{self.base_url}{endpoint}", params=params)
+                response.raise_for_status()  # Levanta exceção para status codes de erro
+                return response.json()
         except requests.exceptions.RequestException as e:
             if "429" in str(e):
-                raise Exception("Limite de requisições atingido. Tente novamente mais tarde.")
+                raise LimiteRequisicoes()
             raise Exception(f"Erro na requisição: {str(e)}")
     
-    def get_stock_data(self, symbol: str, range: str = "1d") -> pd.DataFrame:
+    @cache_compartilhado(ttl=1800)  # Cache por 30 minutos, compartilhado entre processos
+    def get_stock_data(self, symbol: str, range: str = "1d") -> "pd.DataFrame":
         """
         Obtém dados históricos de uma ação
         range: 1d, 5d, 1mo, 3mo (limite do plano gratuito)
         """
+        import pandas as pd
+        
         endpoint = f"/{symbol}"
         params = {'range': range, 'interval': '1d'}
         
@@ -64,9 +86,12 @@ class BrapiProvider:
             
             return df
             
+        except LimiteRequisicoes:
+            raise
         except Exception as e:
             raise Exception(f"Erro ao obter dados da ação {symbol}: {str(e)}")
             
+    @cache_compartilhado(ttl=3600)  # Cache por 1 hora, compartilhado entre processos
     def get_available_stocks(self) -> dict:
         """Retorna um dicionário com as ações disponíveis"""
         try:
@@ -86,5 +111,7 @@ class BrapiProvider:
                     
             return stocks_dict
             
+        except LimiteRequisicoes:
+            raise
         except Exception as e:
             raise Exception(f"Erro ao obter lista de ações: {str(e)}") 
\ No newline at end of file
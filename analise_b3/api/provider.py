@@ -0,0 +1,89 @@
+import os
+import threading
+
+PROVEDORES = ['brapi', 'yfinance', 'replay']
+
+# Número aproximado de pregões em cada período aceito por get_stock_data ('ytd' é tratado à parte)
+PREGOES_POR_PERIODO = {
+    '1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126,
+    '1y': 252, '2y': 504, '5y': 1260, '10y': 2520, 'max': 5040
+}
+
+
+class LimiteRequisicoes(Exception):
+    """Limite de requisições do provedor atingido (HTTP 429): a mesma requisição pode ser repetida mais tarde"""
+
+    def __init__(self, mensagem="Limite de requisições atingido. Tente novamente mais tarde."):
+        super().__init__(mensagem)
+
+
+class DataProvider:
+    """
+    Interface dos provedores de dados de mercado
+    get_stock_data retorna um DataFrame com índice de datas e colunas Open, High, Low, Close e Volume.
+    Erros são levantados como Exception com mensagem para o usuário, como no BrapiProvider;
+    o limite de requisições, como LimiteRequisicoes.
+    """
+    # Se get_stock_data_batch busca todos os símbolos em uma única requisição
+    native_batch = False
+    # Períodos aceitos por get_stock_data, do menor ao maior
+    periods = list(PREGOES_POR_PERIODO)
+
+    def get_stock_data(self, symbol: str, range: str = "1d") -> "pd.DataFrame":
+        raise NotImplementedError
+
+    def get_stock_data_batch(self, symbols: list, range: str = "1d") -> dict:
+        """
+        Históricos de vários símbolos: dicionário símbolo -> DataFrame ou a Exception da falha
+        daquele símbolo. O padrão faz uma requisição por símbolo; provedores com requisição
+        em lote sobrescrevem este método e definem native_batch = True.
+        """
+        resultados = {}
+        for symbol in symbols:
+            try:
+                resultados[symbol] = self.get_stock_data(symbol, range)
+            except Exception as e:
+                resultados[symbol] = e
+        return resultados
+
+    def get_available_stocks(self) -> dict:
+        """Retorna um dicionário símbolo -> nome"""
+        raise NotImplementedError
+
+    def get_corporate_actions(self, symbol: str) -> "pd.DataFrame":
+        """
+        Proventos da ação: DataFrame indexado pela data ex com as colunas Dividends (valor por
+        ação, ajustado pelos desdobramentos posteriores, como no yfinance) e Stock Splits
+        (ações novas por ação antiga; 0 nas datas sem desdobramento)
+        """
+        raise NotImplementedError
+
+
+_provedores = {}
+_provedores_lock = threading.Lock()
+
+def obter_provedor(padrao: str) -> DataProvider:
+    """
+    Provedor configurado pela variável de ambiente ANALISE_B3_PROVEDOR (brapi, yfinance
+    ou replay), ou o padrão de quem chama: a página principal usa a BRAPI e o backtest e
+    a otimização usam o yfinance. Uma instância por processo e por provedor.
+    """
+    nome = os.environ.get('ANALISE_B3_PROVEDOR', padrao).lower()
+    with _provedores_lock:
+        if nome not in _provedores:
+            _provedores[nome] = criar_provedor(nome)
+        return _provedores[nome]
+
+def criar_provedor(nome: str) -> DataProvider:
+    """Cria uma nova instância do provedor pelo nome, fora do cache de instâncias de obter_provedor"""
+    # Importados aqui para carregar só o provedor em uso
+    if nome == 'brapi':
+        from api.brapi_provider import BrapiProvider
+        return BrapiProvider()
+    if nome == 'yfinance':
+        from api.yfinance_provider import YFinanceProvider
+        return YFinanceProvider()
+    if nome == 'replay':
+        from api.replay_provider import ReplayProvider
+        return ReplayProvider.do_ambiente()
+    raise Exception(f"Provedor de dados desconhecido: {nome}. Use um de {', '.join(PROVEDORES)}.")
@@ -0,0 +1,161 @@
+import os
+import random
+import threading
+import time
+import zlib
+
+from api.provider import DataProvider, LimiteRequisicoes, PREGOES_POR_PERIODO
+from core.cache import cache_compartilhado
+from core.instrumentacao import medir
+
+DIRETORIO_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados', 'barras')
+
+# Data final fixa das séries sintéticas, para que sejam as mesmas em qualquer dia
+FIM_SINTETICO = '2024-12-30'
+
+
+class ReplayProvider(DataProvider):
+    """
+    Provedor local: serve históricos gravados em Parquet (um arquivo por ação) e, para
+    ações sem gravação, séries sintéticas determinísticas. Simula latência e falhas da
+    API (limite de requisições e timeout) para testes de carga e benchmarks sem rede.
+    """
+
+    def __init__(self, diretorio: str = DIRETORIO_PADRAO, sinteticos: bool = True,
+                 latencia: float = 0.0, variacao_latencia: float = 0.0,
+                 taxa_429: float = 0.0, taxa_timeout: float = 0.0, timeout: float = 10.0,
+                 seed: int = None):
+        """
+        latencia, variacao_latencia: segundos de espera por requisição (fixo + uniforme)
+        taxa_429, taxa_timeout: probabilidade de cada requisição falhar com limite de
+            requisições ou com timeout (que espera timeout segundos antes de falhar)
+        seed: fixa a sequência de latências e falhas
+        """
+        self.diretorio = diretorio
+        self.sinteticos = sinteticos
+        self.latencia = latencia
+        self.variacao_latencia = variacao_latencia
+        self.taxa_429 = taxa_429
+        self.taxa_timeout = taxa_timeout
+        self.timeout = timeout
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    @classmethod
+    def do_ambiente(cls) -> "ReplayProvider":
+        """
+        Instância configurada por variáveis de ambiente:
+        ANALISE_B3_REPLAY_DIR, ANALISE_B3_REPLAY_SINTETICOS (0 desativa), ANALISE_B3_REPLAY_LATENCIA_MS,
+        ANALISE_B3_REPLAY_VARIACAO_MS, ANALISE_B3_REPLAY_TAXA_429, ANALISE_B3_REPLAY_TAXA_TIMEOUT,
+        ANALISE_B3_REPLAY_TIMEOUT_S e ANALISE_B3_REPLAY_SEED
+        """
+        ambiente = os.environ.get
+        seed = ambiente('ANALISE_B3_REPLAY_SEED')
+        return cls(
+            diretorio=ambiente('ANALISE_B3_REPLAY_DIR', DIRETORIO_PADRAO),
+            sinteticos=ambiente('ANALISE_B3_REPLAY_SINTETICOS', '1') != '0',
+            latencia=float(ambiente('ANALISE_B3_REPLAY_LATENCIA_MS', 0)) / 1000,
+            variacao_latencia=float(ambiente('ANALISE_B3_REPLAY_VARIACAO_MS', 0)) / 1000,
+            taxa_429=float(ambiente('ANALISE_B3_REPLAY_TAXA_429', 0)),
+            taxa_timeout=float(ambiente('ANALISE_B3_REPLAY_TAXA_TIMEOUT', 0)),
+            timeout=float(ambiente('ANALISE_B3_REPLAY_TIMEOUT_S', 10)),
+            seed=int(seed) if seed is not None else None
+        )
+
+    def _simular_requisicao(self):
+        """Aplica a latência e as falhas configuradas, com as mesmas mensagens do BrapiProvider"""
+        with self._rng_lock:
+            sorteio = self._rng.random()
+            espera = self.latencia + self._rng.uniform(0, self.variacao_latencia)
+
+        if sorteio < self.taxa_timeout:
+            time.sleep(self.timeout)
+            raise Exception("Erro na requisição: tempo limite de resposta esgotado.")
+        time.sleep(espera)
+        if sorteio < self.taxa_timeout + self.taxa_429:
+            raise LimiteRequisicoes()
+
+    def caminho(self, symbol: str) -> str:
+        return os.path.join(self.diretorio, f"{symbol}.parquet")
+
+    def _arquivo(self, symbol: str):
+        """Arquivo gravado da ação, ou None"""
+        # A página principal usa os símbolos da BRAPI, sem o sufixo .SA dos arquivos importados
+        for candidato in [symbol] + ([f"{symbol}.SA"] if not symbol.endswith('.SA') else []):
+            if os.path.exists(self.caminho(candidato)):
+                return self.caminho(candidato)
+        return None
+
+    def historico_completo(self, symbol: str) -> "pd.DataFrame":
+        """Histórico inteiro gravado (ou sintético) da ação, como foi gravado: sem ajuste de proventos"""
+        import pandas as pd
+
+        arquivo = self._arquivo(symbol)
+        if arquivo is not None:
+            return pd.read_parquet(arquivo)
+        if not self.sinteticos:
+            raise Exception(f"Dados não encontrados para {symbol}")
+
+        from core.calendario import pregoes
+        from core.sinteticos import gerar_ohlcv
+
+        # Semente derivada do símbolo: a mesma ação gera sempre a mesma série, nos pregões da B3
+        n_barras = PREGOES_POR_PERIODO['max']
+        dados = gerar_ohlcv(n_barras, seed=zlib.crc32(symbol.encode()))
+        dados.index = pregoes('1986-01-01', FIM_SINTETICO)[-n_barras:].rename(dados.index.name)
+        return dados
+
+    @medir('replay.requisicao')
+    def get_stock_data(self, symbol: str, range: str = "1d") -> "pd.DataFrame":
+        """
+        Obtém o histórico gravado (ou sintético) da ação, cortado no período pedido ('max': inteiro),
+        com os proventos de core.proventos aplicados na leitura
+        """
+        from core.proventos import ajustar
+
+        # Latência e falhas a cada requisição, mesmo quando a leitura vem do cache
+        self._simular_requisicao()
+        # O ajuste fica fora do cache: um evento novo vale na próxima leitura
+        return ajustar(self._barras(symbol, range), symbol)
+
+    def _barras(self, symbol: str, range: str) -> "pd.DataFrame":
+        # A data de modificação do arquivo entra na chave: barras regravadas (gravar, importar)
+        # valem na próxima leitura, e a série sintética não é servida depois da gravação
+        arquivo = self._arquivo(symbol)
+        versao = os.stat(arquivo).st_mtime_ns if arquivo is not None else None
+        return _ler_barras(self.diretorio, self.sinteticos, symbol, range, arquivo, versao)
+
+    def get_available_stocks(self) -> dict:
+        """Ações gravadas no diretório, mais a lista local quando há séries sintéticas"""
+        self._simular_requisicao()
+
+        acoes = {}
+        if self.sinteticos:
+            from api import acoes_disponiveis
+            acoes.update(acoes_disponiveis.carregar_snapshot())
+        if os.path.isdir(self.diretorio):
+            for arquivo in sorted(os.listdir(self.diretorio)):
+                if arquivo.endswith('.parquet'):
+                    acoes.setdefault(arquivo[:-len('.parquet')], arquivo[:-len('.parquet')])
+        return acoes
+
+    def gravar(self, symbol: str, dados: "pd.DataFrame"):
+        """Grava o histórico da ação para ser servido nas próximas requisições"""
+        os.makedirs(self.diretorio, exist_ok=True)
+        temporario = f"{self.caminho(symbol)}.{os.getpid()}.tmp"
+        dados[['Open', 'High', 'Low', 'Close', 'Volume']].to_parquet(temporario)
+        os.replace(temporario, self.caminho(symbol))
+
+
+@cache_compartilhado(ttl=1800)  # Mesmo cache dos provedores reais, para testes de carga fiéis
+@medir('replay.leitura')
+def _ler_barras(diretorio, sinteticos, symbol, range, arquivo, versao):
+    """Barras do período pedido; diretorio, sinteticos, arquivo e versao identificam a origem na chave"""
+    dados = ReplayProvider(diretorio=diretorio, sinteticos=sinteticos).historico_completo(symbol)
+    if range == 'max':
+        return dados
+    if range == 'ytd':
+        return dados[dados.index >= dados.index[-1].replace(month=1, day=1)]
+    if range not in PREGOES_POR_PERIODO:
+        raise Exception(f"Período não suportado: {range}")
+    return dados.iloc[-PREGOES_POR_PERIODO[range]:]
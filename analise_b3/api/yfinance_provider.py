@@ -0,0 +1,100 @@
+import logging
+from contextlib import contextmanager
+
+from api.provider import DataProvider, LimiteRequisicoes
+from core.cache import cache_compartilhado
+from core.instrumentacao import medir
+
+
+def _limite_atingido(erro):
+    """Se o erro do yfinance é o de limite de requisições (YFRateLimitError, das versões 0.2.55 em diante)"""
+    # Pelo nome, para não depender da versão do yfinance que define a classe
+    return type(erro).__name__ == 'YFRateLimitError' or 'Rate limited' in str(erro)
+
+@contextmanager
+def _erros_registrados():
+    """
+    Mensagens de erro que o yfinance registra no log durante o bloco: o yf.download não
+    levanta as falhas de cada símbolo, só as registra (como "['PETR4.SA']: YFRateLimitError(...)")
+    """
+    mensagens = []
+
+    class Coletor(logging.Handler):
+        def emit(self, registro):
+            mensagens.append(registro.getMessage())
+
+    coletor = Coletor(logging.ERROR)
+    logger = logging.getLogger('yfinance')
+    logger.addHandler(coletor)
+    try:
+        yield mensagens
+    finally:
+        logger.removeHandler(coletor)
+
+class YFinanceProvider(DataProvider):
+    """Provedor de dados do Yahoo Finance (yfinance), sem token e com histórico longo"""
+
+    native_batch = True
+    
+    @cache_compartilhado(ttl=1800)  # Cache por 30 minutos, compartilhado entre processos
+    @medir('yfinance.requisicao')
+    def get_stock_data(self, symbol: str, range: str = "1d") -> "pd.DataFrame":
+        """Obtém dados históricos de uma ação (range no formato do yfinance: 1mo, 1y, 5y, max...)"""
+        # Importado aqui para não pesar o import da biblioteca
+        import yfinance as yf
+        
+        try:
+            hist = yf.Ticker(symbol).history(period=range)
+        except Exception as e:
+            if _limite_atingido(e):
+                raise LimiteRequisicoes()
+            raise Exception(f"Erro ao obter dados da ação {symbol}: {str(e)}")
+        
+        if len(hist) == 0:
+            raise Exception(f"Dados não encontrados para {symbol}")
+        return hist
+    
+    @medir('yfinance.requisicao_lote')
+    def get_stock_data_batch(self, symbols: list, range: str = "1d") -> dict:
+        """Históricos de vários símbolos em uma única chamada do yf.download, sem o cache compartilhado"""
+        import yfinance as yf
+
+        try:
+            with _erros_registrados() as erros:
+                tabela = yf.download(list(symbols), period=range, group_by='ticker', auto_adjust=True,
+                                     progress=False, threads=False)
+        except Exception as e:
+            if _limite_atingido(e):
+                raise LimiteRequisicoes()
+            raise Exception(f"Erro ao obter dados das ações {', '.join(symbols)}: {str(e)}")
+
+        limitados = [erro for erro in erros if _limite_atingido(erro)]
+        resultados = {}
+        for symbol in symbols:
+            hist = tabela[symbol].dropna(how='all') if symbol in tabela.columns.get_level_values(0) else None
+            if hist is None or len(hist) == 0:
+                if any(f"'{symbol.upper()}'" in erro for erro in limitados):
+                    resultados[symbol] = LimiteRequisicoes()
+                else:
+                    resultados[symbol] = Exception(f"Dados não encontrados para {symbol}")
+            else:
+                resultados[symbol] = hist
+        return resultados
+
+    @medir('yfinance.requisicao')
+    def get_corporate_actions(self, symbol: str) -> "pd.DataFrame":
+        """Dividendos (JCP incluídos) e desdobramentos da ação"""
+        import yfinance as yf
+
+        try:
+            acoes = yf.Ticker(symbol).actions
+        except Exception as e:
+            if _limite_atingido(e):
+                raise LimiteRequisicoes()
+            raise Exception(f"Erro ao obter os proventos da ação {symbol}: {str(e)}")
+        return acoes[[coluna for coluna in ['Dividends', 'Stock Splits'] if coluna in acoes.columns]]
+
+    def get_available_stocks(self) -> dict:
+        """O Yahoo Finance não lista as ações da B3; usa a lista local"""
+        from api import acoes_disponiveis
+        return acoes_disponiveis.carregar_snapshot()
@@ -1,12 +1,17 @@
+# Bibliotecas pesadas (pandas, numpy, ta, plotly) são importadas onde são usadas,
+# para que o título e a barra lateral apareçam antes de serem carregadas
+import time
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import numpy as np
-import ta  # Biblioteca para indicadores técnicos
-from plotly.subplots import make_subplots
-from api.brapi_provider import BrapiProvider
+from api.provider import obter_provedor
+from api import acoes_disponiveis
+from core import indicadores, instrumentacao, memoria, padroes, perfil_volume
+from core.cache import cache_compartilhado
+from core.dados import limpar_historico
+from core.dataset import identificar_dataset
+from ui.depuracao import painel_depuracao
+from ui.sessao import figura_da_sessao
+
+inicio_execucao = time.perf_counter()
 
 st.set_page_config(page_title="Análise B3", layout="wide")
 
@@ -15,14 +20,19 @@ st.title("📈 Análise de Ações B3")
 # Sidebar para seleção de ações
 st.sidebar.header("Filtros")
 
-# Inicializa o provedor de dados
-data_provider = BrapiProvider()
+# Inicializa o provedor de dados (BRAPI, ou o definido em ANALISE_B3_PROVEDOR)
+data_provider = obter_provedor('brapi')
+
+@st.cache_resource
+def iniciar_atualizacao_acoes(_provider):
+    """Atualiza a lista de ações em segundo plano, uma única vez por processo"""
+    return acoes_disponiveis.atualizar_em_segundo_plano(_provider.get_available_stocks, ttl=3600)
 
-# Atualiza a lista de ações disponíveis
-@st.cache_data(ttl=3600)  # Cache por 1 hora
+# A lista vem do snapshot local; a consulta à API acontece em segundo plano
 def get_available_stocks():
-    return data_provider.get_available_stocks()
+    return acoes_disponiveis.carregar_snapshot()
 
+iniciar_atualizacao_acoes(data_provider)
 acoes_populares = get_available_stocks()
 
 # Seleção da ação
@@ -41,8 +51,8 @@ intervalo_velas = st.sidebar.selectbox(
 
 # Definir períodos disponíveis baseado no intervalo
 def get_periodos_disponiveis(intervalo):
-    # Limitado a 3 meses devido ao plano gratuito
-    return ['1d', '5d', '1mo', '3mo']
+    # Limitado a 3 meses no plano gratuito da BRAPI; com o histórico local (provedor replay), todos
+    return data_provider.periods
 
 # Período de análise
 periodo = st.sidebar.selectbox(
@@ -52,7 +62,13 @@ periodo = st.sidebar.selectbox(
         '1d': '1 Dia',
         '5d': '5 Dias',
         '1mo': '1 Mês',
-        '3mo': '3 Meses'
+        '3mo': '3 Meses',
+        '6mo': '6 Meses',
+        '1y': '1 Ano',
+        '2y': '2 Anos',
+        '5y': '5 Anos',
+        '10y': '10 Anos',
+        'max': 'Máximo'
     }[x]
 )
 
@@ -78,397 +94,231 @@ with st.sidebar.expander("📊 Médias Móveis", expanded=False):
             )
 
 # Toggle para Momentum
-with st.sidebar.expander("📈 Momentum", expanded=False):
+# Os níveis de sobrecompra/sobrevenda ficam na seção dos osciladores, que reexecuta sozinha
+expander_momentum = st.sidebar.expander("📈 Momentum", expanded=False)
+with expander_momentum:
     show_rsi = st.checkbox("RSI", value=True)
     show_macd = st.checkbox("MACD", value=True)
     if show_rsi:
         rsi_period = st.slider("Período RSI", min_value=2, max_value=30, value=14)
-        rsi_overbought = st.slider("Sobrecompra", min_value=50, max_value=100, value=70)
-        rsi_oversold = st.slider("Sobrevenda", min_value=0, max_value=50, value=30)
     if show_macd:
         macd_fast = st.slider("MACD Rápido", min_value=5, max_value=20, value=12)
         macd_slow = st.slider("MACD Lento", min_value=20, max_value=40, value=26)
         macd_signal = st.slider("MACD Sinal", min_value=5, max_value=20, value=9)
 
 # Toggle para Análise de Padrões
-with st.sidebar.expander("🕯️ Padrões", expanded=False):
+# Suportes, resistências e Fibonacci ficam na seção de camadas do gráfico, que reexecuta sozinha
+expander_padroes = st.sidebar.expander("🕯️ Padrões", expanded=False)
+with expander_padroes:
     show_patterns = st.checkbox("Padrões de Candlestick", value=True)
-    show_sr = st.checkbox("Suportes e Resistências", value=True)
-    if show_sr:
-        sensitivity = st.slider(
-            "Sensibilidade da Detecção",
-            min_value=0.1,
-            max_value=2.0,
-            value=0.5,
-            step=0.1,
-            help="Ajusta a sensibilidade na detecção de níveis"
-        )
-        show_fibonacci = st.checkbox("Mostrar Níveis de Fibonacci", value=False)
-        if show_fibonacci:
-            fib_levels = st.multiselect(
-                "Níveis de Fibonacci",
-                options=[0, 0.236, 0.382, 0.5, 0.618, 0.786, 1],
-                default=[0.236, 0.382, 0.5, 0.618],
-                help="Selecione os níveis de Fibonacci para exibir"
-            )
 
 # Adicionar controles para ajuste do gráfico no sidebar
 candle_width = 0.20  # Valor fixo para largura das velas
 candle_spacing = 0.1  # Valor fixo para espaçamento entre velas
 
-@st.cache_data(ttl=1800)  # Cache por 30 minutos (1800 segundos)
+# Cache por 30 minutos (1800 segundos). O st.cache_resource devolve sempre o mesmo DataFrame,
+# sem a cópia que o st.cache_data faz a cada leitura; as etapas seguintes nunca alteram a entrada
+@st.cache_resource(ttl=1800)
 def carregar_dados(ticker, periodo, intervalo):
-    """Carrega dados usando o provedor brapi"""
-    try:
-        # Converte o período do Streamlit para o formato da brapi
-        periodo_map = {
-            '1d': '1d',
-            '5d': '5d',
-            '1mo': '1mo',
-            '3mo': '3mo'  # Máximo de 3 meses no plano gratuito
-        }
-        
-        brapi_range = periodo_map.get(periodo, '1mo')
-        hist = data_provider.get_stock_data(ticker, brapi_range)
-        
-        # Remove registros sem dados
-        hist = hist.dropna()
-        
-        if len(hist) == 0:
-            raise Exception("Não foi possível carregar dados para o período selecionado.")
-        
-        # Filtra apenas dias úteis
-        hist = hist[hist.index.dayofweek < 5]
-        
-        return hist, {}
-        
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {str(e)}")
-        return None, None
+    """
+    Carrega dados usando o provedor brapi (em float32 com ANALISE_B3_FLOAT32=1)
+    Erros são propagados (e exibidos pelo fluxo principal) para não ficarem no cache
+    """
+    # Converte o período do Streamlit para o formato da brapi
+    periodo_map = {
+        '1d': '1d',
+        '5d': '5d',
+        '1mo': '1mo',
+        '3mo': '3mo'  # Máximo de 3 meses no plano gratuito
+    }
+    
+    # Os demais períodos só são oferecidos por provedores que os aceitam (veja get_periodos_disponiveis)
+    brapi_range = periodo_map.get(periodo, periodo if periodo in data_provider.periods else '1mo')
+    hist = data_provider.get_stock_data(ticker, brapi_range)
+    
+    # Remove registros sem dados e fora do calendário da B3
+    hist = limpar_historico(hist, ticker)
+    
+    return hist, identificar_dataset(hist, ticker, intervalo)
+
+# Os caches de cálculo recebem os dados com prefixo "_" (não hasheados pelo Streamlit)
+# e usam a identidade do dataset como chave, então a consulta não depende do número de barras.
+# Abaixo do st.cache_data (por processo) fica o cache compartilhado entre os processos do servidor
 
 @st.cache_data
-def calcular_indicadores(dados, show_sma, show_ema, show_rsi, show_macd, 
+@cache_compartilhado(nome='app.calcular_indicadores')
+def calcular_indicadores(_dados, identidade, show_sma, show_ema, show_rsi, show_macd, 
                         sma_periods, ema_periods, rsi_period, 
                         macd_fast, macd_slow, macd_signal):
-    """Calcula os indicadores técnicos selecionados"""
-    df = dados.copy()
-    
-    # Médias Móveis Simples
-    if show_sma and sma_periods:
-        for period in sma_periods:
-            df[f'SMA_{period}'] = ta.trend.sma_indicator(df['Close'], window=period)
-    
-    # Médias Móveis Exponenciais
-    if show_ema and ema_periods:
-        for period in ema_periods:
-            df[f'EMA_{period}'] = ta.trend.ema_indicator(df['Close'], window=period)
-    
-    # RSI
+    """Calcula os indicadores técnicos selecionados; retorna apenas as colunas dos indicadores"""
+    params = {
+        'sma_periods': sma_periods if show_sma else [],
+        'ema_periods': ema_periods if show_ema else []
+    }
     if show_rsi:
-        df['RSI'] = ta.momentum.rsi(df['Close'], window=rsi_period)
-    
-    # MACD
+        params['rsi_period'] = rsi_period
     if show_macd:
-        macd = ta.trend.macd_diff(df['Close'], 
-                                 window_slow=macd_slow,
-                                 window_fast=macd_fast,
-                                 window_sign=macd_signal)
-        df['MACD'] = macd
-        df['MACD_Signal'] = ta.trend.macd_signal(df['Close'],
-                                                window_slow=macd_slow,
-                                                window_fast=macd_fast,
-                                                window_sign=macd_signal)
+        params.update(macd_fast=macd_fast, macd_slow=macd_slow, macd_signal=macd_signal)
     
-    return df
+    # Sem as colunas de preço, que o fluxo principal já tem
+    com_indicadores = indicadores.calcular_indicadores(_dados, params, identidade)
+    return com_indicadores[com_indicadores.columns.difference(_dados.columns, sort=False)]
 
 @st.cache_data
-def detectar_padroes_candlestick(dados):
-    """Detecta padrões de candlestick usando definições matemáticas rigorosas"""
-    df = dados.copy()
-    
-    # Calculando médias móveis para contexto de tendência
-    df['MM20'] = ta.trend.sma_indicator(df['Close'], window=20)
-    df['MM50'] = ta.trend.sma_indicator(df['Close'], window=50)
-    
-    # Tendências
-    df['tendencia_alta'] = df['MM20'] > df['MM50']
-    df['tendencia_baixa'] = df['MM20'] < df['MM50']
-    
-    # Cálculos básicos para cada candle
-    df['body'] = abs(df['Close'] - df['Open'])
-    df['upper_wick'] = df.apply(lambda x: x['High'] - max(x['Open'], x['Close']), axis=1)
-    df['lower_wick'] = df.apply(lambda x: min(x['Open'], x['Close']) - x['Low'], axis=1)
-    df['range_total'] = df['High'] - df['Low']
-    
-    # Calculando percentis para definição de corpos longos e curtos
-    corpo_70_percentil = df['body'].quantile(0.7)
-    corpo_30_percentil = df['body'].quantile(0.3)
-    
-    # Doji
-    df['doji'] = (
-        (df['body'] <= 0.05 * df['range_total']) &  # Corpo muito pequeno
-        (df['upper_wick'] >= 2 * df['body']) &      # Sombras significativas
-        (df['lower_wick'] >= 2 * df['body'])
-    )
-    
-    # Hammer (em tendência de baixa)
-    df['hammer'] = (
-        (df['lower_wick'] >= 2 * df['body']) &                          # Sombra inferior longa
-        (df['upper_wick'] <= 0.1 * df['range_total']) &                # Sombra superior pequena
-        (df.apply(lambda x: min(x['Open'], x['Close']) >               # Corpo na metade superior
-                 (x['High'] + x['Low'])/2 - 0.3*(x['High'] - x['Low']), axis=1)) &
-        df['tendencia_baixa'] &                                        # Confirmação de tendência
-        df['Close'].shift(1).gt(df['Close'].shift(2))                 # Candle anterior mais baixo
-    )
-    
-    # Shooting Star (em tendência de alta)
-    df['shooting_star'] = (
-        (df['upper_wick'] >= 2 * df['body']) &                         # Sombra superior longa
-        (df['lower_wick'] <= 0.1 * df['range_total']) &               # Sombra inferior pequena
-        (df.apply(lambda x: max(x['Open'], x['Close']) <              # Corpo na metade inferior
-                 (x['High'] + x['Low'])/2 + 0.3*(x['High'] - x['Low']), axis=1)) &
-        df['tendencia_alta']                                          # Em tendência de alta
-    )
-    
-    # Marubozu (velas sem sombras)
-    df['bullish_marubozu'] = (
-        (df['Close'] > df['Open']) &                                   # Vela de alta
-        (df['body'] > corpo_70_percentil) &                           # Corpo longo
-        (df['upper_wick'] <= 0.05 * df['range_total']) &             # Sem sombras superiores
-        (df['lower_wick'] <= 0.05 * df['range_total'])               # Sem sombras inferiores
-    )
-    
-    df['bearish_marubozu'] = (
-        (df['Close'] < df['Open']) &                                   # Vela de baixa
-        (df['body'] > corpo_70_percentil) &                           # Corpo longo
-        (df['upper_wick'] <= 0.05 * df['range_total']) &             # Sem sombras superiores
-        (df['lower_wick'] <= 0.05 * df['range_total'])               # Sem sombras inferiores
-    )
-    
-    # Spinning Top (removido pois era muito genérico)
-    
-    return df
+@cache_compartilhado(nome='app.detectar_padroes_candlestick')
+def detectar_padroes_candlestick(_dados, identidade):
+    """Detecta padrões de candlestick; retorna apenas as colunas dos padrões"""
+    # Só as colunas dos padrões, pois o resultado não depende dos indicadores já presentes
+    return padroes.detectar_padroes_candlestick(_dados, identidade)[padroes.COLUNAS_PADROES]
 
 @st.cache_data
-def detectar_suportes_resistencias(dados, sensitivity=0.5):
-    """Detecta níveis de suporte e resistência usando análise de pivots"""
-    df = dados.copy()
-    
-    # Identificar pivots (pontos de reversão)
-    df['pivot'] = False
-    for i in range(2, len(df)-2):
-        # Pivot de alta (resistência)
-        if (df['High'].iloc[i] > df['High'].iloc[i-1] and 
-            df['High'].iloc[i] > df['High'].iloc[i-2] and
-            df['High'].iloc[i] > df['High'].iloc[i+1] and 
-            df['High'].iloc[i] > df['High'].iloc[i+2]):
-            df.loc[df.index[i], 'pivot'] = True
-            df.loc[df.index[i], 'pivot_type'] = 'resistance'
-        
-        # Pivot de baixa (suporte)
-        if (df['Low'].iloc[i] < df['Low'].iloc[i-1] and 
-            df['Low'].iloc[i] < df['Low'].iloc[i-2] and
-            df['Low'].iloc[i] < df['Low'].iloc[i+1] and 
-            df['Low'].iloc[i] < df['Low'].iloc[i+2]):
-            df.loc[df.index[i], 'pivot'] = True
-            df.loc[df.index[i], 'pivot_type'] = 'support'
-    
-    # Agrupar níveis próximos
-    def group_levels(levels, tolerance):
-        if not levels:
-            return []
-        groups = []
-        current_group = [levels[0]]
-        
-        for level in levels[1:]:
-            if abs(level - current_group[0]) <= tolerance:
-                current_group.append(level)
-            else:
-                groups.append(sum(current_group) / len(current_group))
-                current_group = [level]
-        
-        groups.append(sum(current_group) / len(current_group))
-        return groups
-    
-    # Calcular tolerância baseada na volatilidade
-    volatility = df['Close'].pct_change().std()
-    tolerance = volatility * sensitivity
-    
-    # Agrupar níveis de suporte e resistência
-    resistance_levels = group_levels(
-        df[df['pivot_type'] == 'resistance']['High'].tolist(),
-        tolerance
-    )
-    support_levels = group_levels(
-        df[df['pivot_type'] == 'support']['Low'].tolist(),
-        tolerance
-    )
-    
-    # Obter preço atual
-    preco_atual = df['Close'].iloc[-1]
-    
-    # Filtrar níveis baseado na posição do preço atual
-    resistance_levels = [level for level in resistance_levels if level > preco_atual]
-    support_levels = [level for level in support_levels if level < preco_atual]
-    
-    # Ordenar níveis por distância do preço atual
-    def get_closest_levels(levels, preco, n=3):
-        if not levels:
-            return []
-        # Ordenar níveis por distância do preço atual
-        sorted_levels = sorted(levels, key=lambda x: abs(x - preco))
-        return sorted_levels[:n]
-    
-    # Retornar apenas os 3 níveis mais próximos
-    closest_resistance = get_closest_levels(resistance_levels, preco_atual)
-    closest_support = get_closest_levels(support_levels, preco_atual)
-    
-    return closest_resistance, closest_support
+@cache_compartilhado(nome='app.detectar_suportes_resistencias')
+def detectar_suportes_resistencias(_dados, identidade, sensitivity=0.5):
+    """Detecta os 3 níveis de suporte e resistência mais próximos do preço atual"""
+    resistance_levels, support_levels = padroes.detectar_suportes_resistencias(_dados, sensitivity, identidade)
+    return padroes.niveis_mais_proximos(resistance_levels, support_levels, _dados['Close'].iloc[-1])
 
 @st.cache_data
-def calcular_niveis_fibonacci(dados, fib_levels):
-    """Calcula níveis de Fibonacci baseados no range de preços"""
-    high = dados['High'].max()
-    low = dados['Low'].min()
-    diff = high - low
-    
-    fib_levels_dict = {}
-    for level in fib_levels:
-        if level == 0:
-            fib_levels_dict[level] = low
-        elif level == 1:
-            fib_levels_dict[level] = high
-        else:
-            fib_levels_dict[level] = high - (diff * level)
-    
-    return fib_levels_dict
+@cache_compartilhado(nome='app.perfil_volume')
+def calcular_perfil_volume(_dados, identidade, faixas):
+    """Volume negociado por faixa de preço"""
+    return perfil_volume.perfil_volume(_dados, faixas)
 
-def analisar_momentum(dados, rsi_compra, rsi_venda, macd_fast, macd_slow):
-    """Analisa sinais baseados em momentum"""
-    df = dados.copy()
-    
-    # Calcular indicadores
-    df['RSI'] = ta.momentum.rsi(df['Close'])
-    df['MACD'] = ta.trend.macd_diff(df['Close'], 
-                                   window_slow=macd_slow,
-                                   window_fast=macd_fast)
-    
-    # Gerar sinais
-    df['sinal_rsi'] = np.where(df['RSI'] < rsi_compra, 1,
-                              np.where(df['RSI'] > rsi_venda, -1, 0))
-    
-    df['sinal_macd'] = np.where(df['MACD'] > 0, 1,
-                               np.where(df['MACD'] < 0, -1, 0))
-    
-    return df
+@st.cache_data
+@cache_compartilhado(nome='app.calcular_niveis_fibonacci')
+def calcular_niveis_fibonacci(_dados, identidade, fib_levels):
+    """Calcula níveis de Fibonacci baseados no range de preços"""
+    return padroes.calcular_niveis_fibonacci(_dados, fib_levels)
 
-def analisar_price_action(dados):
-    """Analisa padrões de price action"""
-    df = dados.copy()
-    
-    # Detectar padrões
-    df['doji'] = (abs(df['Close'] - df['Open']) <= 0.1 * (df['High'] - df['Low']))
-    df['pin_bar'] = ((df['High'] - df['Low']) > 3 * abs(df['Close'] - df['Open']))
-    
-    return df
+def registrar_latencia(secao, inicio):
+    """Guarda a latência das últimas interações para o painel de desempenho"""
+    latencia = (time.perf_counter() - inicio) * 1000
+    latencias = st.session_state.setdefault('latencias', [])
+    latencias.append({'Seção': secao, 'Latência (ms)': round(latencia, 1)})
+    del latencias[:-20]
+    instrumentacao.registrar_duracao(f"interacao.{secao}", latencia / 1000)
+    return latencia
 
-def analisar_tendencias(dados, mm_curta, mm_longa, atr_period):
-    """Analisa tendências e volatilidade"""
-    df = dados.copy()
-    
-    # Médias móveis
-    df[f'MM{mm_curta}'] = ta.trend.sma_indicator(df['Close'], window=mm_curta)
-    df[f'MM{mm_longa}'] = ta.trend.sma_indicator(df['Close'], window=mm_longa)
-    
-    # ATR para volatilidade
-    df['ATR'] = ta.volatility.average_true_range(df['High'], df['Low'], df['Close'], 
-                                                window=atr_period)
-    
-    return df
-
-def calcular_score_operacao(dados):
-    """Calcula um score geral para operações"""
-    score = 0
-    
-    # Momentum
-    if dados['sinal_rsi'].iloc[-1] == 1 and dados['sinal_macd'].iloc[-1] == 1:
-        score += 2
-    elif dados['sinal_rsi'].iloc[-1] == -1 and dados['sinal_macd'].iloc[-1] == -1:
-        score -= 2
+@st.fragment
+def secao_camadas(dados, identidade, fig_base, area_grafico, config):
+    """Controles e camadas de suportes, resistências e Fibonacci do gráfico principal"""
+    inicio = time.perf_counter()
     
-    # Price Action
-    if dados['doji'].iloc[-1]:
-        score += 1 if dados['Close'].iloc[-1] > dados['Open'].iloc[-1] else -1
-    
-    # Tendência
-    if dados['MM20'].iloc[-1] > dados['MM50'].iloc[-1]:
-        score += 1
-    else:
-        score -= 1
+    show_sr = st.checkbox("Suportes e Resistências", value=True)
+    resistance_levels, support_levels, fib_levels_dict = [], [], {}
+    perfil, resumo_perfil = None, None
+    if show_sr:
+        fonte_niveis = st.radio(
+            "Fonte dos níveis",
+            options=['pivos', 'volume'],
+            format_func=lambda x: {'pivos': 'Pivôs', 'volume': 'Perfil de volume'}[x],
+            horizontal=True,
+            help="Pivôs de máximas e mínimas ou POC, área de valor e nós de alto volume do perfil de volume"
+        )
+        if fonte_niveis == 'pivos':
+            sensitivity = st.slider(
+                "Sensibilidade da Detecção",
+                min_value=0.1,
+                max_value=2.0,
+                value=0.5,
+                step=0.1,
+                help="Ajusta a sensibilidade na detecção de níveis"
+            )
+        else:
+            faixas = st.slider("Faixas de preço do perfil", min_value=20, max_value=120,
+                               value=perfil_volume.FAIXAS_PADRAO, step=10)
+            mostrar_perfil = st.checkbox("Mostrar perfil de volume", value=True)
+        show_fibonacci = st.checkbox("Mostrar Níveis de Fibonacci", value=False)
+        if show_fibonacci:
+            fib_levels = st.multiselect(
+                "Níveis de Fibonacci",
+                options=[0, 0.236, 0.382, 0.5, 0.618, 0.786, 1],
+                default=[0.236, 0.382, 0.5, 0.618],
+                help="Selecione os níveis de Fibonacci para exibir"
+            )
+        
+        try:
+            if fonte_niveis == 'pivos':
+                resistance_levels, support_levels = detectar_suportes_resistencias(dados, identidade, sensitivity)
+            else:
+                volume_por_faixa = calcular_perfil_volume(dados, identidade, faixas)
+                resumo_perfil = perfil_volume.resumir_perfil(volume_por_faixa)
+                niveis = perfil_volume.niveis_do_perfil(resumo_perfil)
+                resistance_levels, support_levels = padroes.niveis_mais_proximos(
+                    niveis, niveis, dados['Close'].iloc[-1]
+                )
+                if mostrar_perfil:
+                    perfil = volume_por_faixa
+            
+            # Adicionar níveis de Fibonacci apenas se explicitamente ativado
+            if show_fibonacci:
+                fib_levels_dict = calcular_niveis_fibonacci(dados, identidade, fib_levels)
+        except Exception as e:
+            st.warning(f"Não foi possível calcular suportes e resistências: {str(e)}")
     
-    return score
+    # Apenas as linhas de níveis são refeitas; velas, médias e padrões vêm da figura base
+    fig = graficos.aplicar_camadas(fig_base, resistance_levels, support_levels, fib_levels_dict,
+                                   perfil, resumo_perfil)
+    with area_grafico.container():
+        with instrumentacao.medir('grafico.envio'):
+            st.plotly_chart(fig, width='stretch', config=config)
+        latencia = registrar_latencia('Camadas do gráfico', inicio)
+        st.caption(f"Camadas atualizadas em {latencia:.0f} ms")
 
-def plotar_sinais(dados):
-    """Cria um gráfico com todos os sinais"""
-    # Verificar se há indicadores para mostrar
-    tem_rsi = 'RSI' in dados.columns
-    tem_macd = 'MACD' in dados.columns
+@st.fragment
+def secao_osciladores(dados, chave_dados, area_rsi, area_macd):
+    """Controles e gráficos de RSI e MACD"""
+    inicio = time.perf_counter()
     
-    # Criar subplots apenas se houver indicadores
-    if tem_rsi or tem_macd:
-        fig = make_subplots(rows=3, cols=1, 
-                           shared_xaxes=True,
-                           vertical_spacing=0.05,
-                           row_heights=[0.6, 0.2, 0.2])
-    else:
-        fig = go.Figure()
-    
-    # Gráfico principal
-    fig.add_trace(go.Candlestick(
-        x=dados.index,
-        open=dados['Open'],
-        high=dados['High'],
-        low=dados['Low'],
-        close=dados['Close'],
-        name='Preço'
-    ), row=1 if (tem_rsi or tem_macd) else None, col=1 if (tem_rsi or tem_macd) else None)
-    
-    # RSI
-    if tem_rsi:
-        fig.add_trace(go.Scatter(
-            x=dados.index,
-            y=dados['RSI'],
-            name='RSI'
-        ), row=2, col=1)
+    if 'RSI' in dados.columns:
+        rsi_overbought = st.slider("Sobrecompra", min_value=50, max_value=100, value=70)
+        rsi_oversold = st.slider("Sobrevenda", min_value=0, max_value=50, value=30)
+        fig_rsi = figura_da_sessao(
+            'rsi', (chave_dados, rsi_overbought, rsi_oversold),
+            lambda: graficos.construir_grafico_rsi(dados, rsi_overbought, rsi_oversold)
+        )
+        with instrumentacao.medir('grafico.envio'):
+            area_rsi.plotly_chart(fig_rsi, width='stretch')
     
-    # MACD
-    if tem_macd:
-        fig.add_trace(go.Scatter(
-            x=dados.index,
-            y=dados['MACD'],
-            name='MACD'
-        ), row=3, col=1)
+    if 'MACD' in dados.columns:
+        fig_macd = figura_da_sessao(
+            'macd', chave_dados, lambda: graficos.construir_grafico_macd(dados)
+        )
+        with instrumentacao.medir('grafico.envio'):
+            area_macd.plotly_chart(fig_macd, width='stretch')
     
-    return fig
+    registrar_latencia('Osciladores', inicio)
 
 try:
+    from ui import graficos
+    
     # Carregando dados
     with st.spinner('Carregando dados...'):
-        dados, info = carregar_dados(acao_selecionada, periodo, intervalo_velas)
+        dados, identidade = carregar_dados(acao_selecionada, periodo, intervalo_velas)
     
     # Inicializar variáveis para indicadores
     sma_periods = [] if not show_sma else sma_periods
     ema_periods = [] if not show_ema else ema_periods
+    rsi_period = None if not show_rsi else rsi_period
+    macd_fast, macd_slow, macd_signal = (None, None, None) if not show_macd else (macd_fast, macd_slow, macd_signal)
     
     # Calculando indicadores apenas se algum estiver selecionado
+    # As colunas calculadas são acrescentadas aos preços sem copiá-los
     if show_sma or show_ema or show_rsi or show_macd:
-        dados = calcular_indicadores(dados, show_sma, show_ema, show_rsi, show_macd,
-                                   sma_periods, ema_periods, rsi_period,
-                                   macd_fast, macd_slow, macd_signal)
+        dados = memoria.anexar_colunas(dados, calcular_indicadores(
+            dados, identidade, show_sma, show_ema, show_rsi, show_macd,
+            sma_periods, ema_periods, rsi_period,
+            macd_fast, macd_slow, macd_signal
+        ))
     
     # Detectar padrões se estiver ativado
     if show_patterns:
-        dados = detectar_padroes_candlestick(dados)
+        dados = memoria.anexar_colunas(dados, detectar_padroes_candlestick(dados, identidade))
+    memoria.registrar_dataset(f"app: {acao_selecionada} {periodo}", dados)
+    
+    # Identifica os dados exibidos, para reaproveitar figuras entre interações
+    chave_dados = (identidade, tuple(sma_periods), tuple(ema_periods), rsi_period,
+                   macd_fast, macd_slow, macd_signal, show_patterns)
     
     # Métricas principais
     col1, col2, col3, col4 = st.columns(4)
@@ -498,191 +348,18 @@ try:
             f"R$ {dados['Low'].min():.2f}"
         )
 
-    # Criar gráfico principal
-    fig = go.Figure()
-    
-    # Adicionar candlestick
-    fig.add_trace(go.Candlestick(
-        x=dados.index,
-        open=dados['Open'],
-        high=dados['High'],
-        low=dados['Low'],
-        close=dados['Close'],
-        name='OHLC',
-        text=[f"Data: {index}<br>" +
-              f"Abertura: R$ {open:.2f}<br>" +
-              f"Máxima: R$ {high:.2f}<br>" +
-              f"Mínima: R$ {low:.2f}<br>" +
-              f"Fechamento: R$ {close:.2f}"
-              for index, open, high, low, close in zip(
-                  dados.index,
-                  dados['Open'],
-                  dados['High'],
-                  dados['Low'],
-                  dados['Close']
-              )],
-        hoverinfo='text',
-        increasing_line_color='#26a69a',
-        decreasing_line_color='#ef5350',
-        increasing_fillcolor='#26a69a',
-        decreasing_fillcolor='#ef5350',
-        line=dict(width=1),
-        whiskerwidth=candle_width,
-        xperiodalignment="middle",
-        xperiod=candle_spacing
-    ))
-    
-    # Adicionando médias móveis apenas se estiverem disponíveis
-    if show_sma and sma_periods:
-        for period in sma_periods:
-            if f'SMA_{period}' in dados.columns:
-                fig.add_trace(go.Scatter(
-                    x=dados.index,
-                    y=dados[f'SMA_{period}'],
-                    name=f'SMA {period}',
-                    line=dict(width=1),
-                    opacity=0.7
-                ))
-    
-    if show_ema and ema_periods:
-        for period in ema_periods:
-            if f'EMA_{period}' in dados.columns:
-                fig.add_trace(go.Scatter(
-                    x=dados.index,
-                    y=dados[f'EMA_{period}'],
-                    name=f'EMA {period}',
-                    line=dict(width=1, dash='dash'),
-                    opacity=0.7
-                ))
-
-    # Adicionar suportes e resistências ao gráfico apenas se estiverem disponíveis
-    if show_sr:
-        try:
-            resistance_levels, support_levels = detectar_suportes_resistencias(dados, sensitivity)
-            
-            # Plotar níveis de resistência
-            for level in resistance_levels:
-                fig.add_hline(
-                    y=level,
-                    line_dash="dash",
-                    line_color="red",
-                    annotation_text=f"R: {level:.2f}",
-                    annotation_position="right",
-                    annotation_font_color="red"
-                )
-            
-            # Plotar níveis de suporte
-            for level in support_levels:
-                fig.add_hline(
-                    y=level,
-                    line_dash="dash",
-                    line_color="green",
-                    annotation_text=f"S: {level:.2f}",
-                    annotation_position="right",
-                    annotation_font_color="green"
-                )
-            
-            # Adicionar níveis de Fibonacci apenas se explicitamente ativado
-            if show_fibonacci and 'fib_levels' in locals():
-                fib_levels_dict = calcular_niveis_fibonacci(dados, fib_levels)
-                
-                for level, price in fib_levels_dict.items():
-                    fig.add_hline(
-                        y=price,
-                        line_dash="dot",
-                        line_color="yellow",
-                        annotation_text=f"Fib {level:.3f}: {price:.2f}",
-                        annotation_position="right",
-                        annotation_font_color="yellow"
-                    )
-        except Exception as e:
-            st.warning(f"Não foi possível calcular suportes e resistências: {str(e)}")
+    # Gráfico principal: a figura base é montada só quando os dados mudam,
+    # e a seção de camadas redesenha apenas suportes, resistências e Fibonacci
+    area_grafico = st.empty()
+    fig_base = figura_da_sessao(
+        'principal', chave_dados,
+        lambda: graficos.construir_grafico_principal(dados, sma_periods, ema_periods, show_patterns,
+                                                     candle_width, candle_spacing)
+    )
+    with expander_padroes:
+        secao_camadas(dados, identidade, fig_base, area_grafico, graficos.configuracao_grafico(acao_selecionada))
     
-    # Detectar padrões se estiver ativado
     if show_patterns:
-        # Adicionar marcadores para os padrões
-        for idx in dados.index:
-            if dados.loc[idx, 'doji']:
-                fig.add_trace(go.Scatter(
-                    x=[idx],
-                    y=[dados.loc[idx, 'High']],
-                    mode='markers+text',
-                    marker=dict(
-                        symbol='diamond',
-                        size=10,
-                        color='yellow',
-                        line=dict(color='black', width=1)
-                    ),
-                    text='D',
-                    textposition='top center',
-                    name='Doji',
-                    showlegend=False
-                ))
-            if dados.loc[idx, 'hammer']:
-                fig.add_trace(go.Scatter(
-                    x=[idx],
-                    y=[dados.loc[idx, 'Low']],
-                    mode='markers+text',
-                    marker=dict(
-                        symbol='triangle-up',
-                        size=10,
-                        color='green',
-                        line=dict(color='black', width=1)
-                    ),
-                    text='H',
-                    textposition='bottom center',
-                    name='Hammer',
-                    showlegend=False
-                ))
-            if dados.loc[idx, 'shooting_star']:
-                fig.add_trace(go.Scatter(
-                    x=[idx],
-                    y=[dados.loc[idx, 'High']],
-                    mode='markers+text',
-                    marker=dict(
-                        symbol='triangle-down',
-                        size=10,
-                        color='red',
-                        line=dict(color='black', width=1)
-                    ),
-                    text='SS',
-                    textposition='top center',
-                    name='Shooting Star',
-                    showlegend=False
-                ))
-            if dados.loc[idx, 'bullish_marubozu']:
-                fig.add_trace(go.Scatter(
-                    x=[idx],
-                    y=[dados.loc[idx, 'High']],
-                    mode='markers+text',
-                    marker=dict(
-                        symbol='circle',
-                        size=10,
-                        color='green',
-                        line=dict(color='black', width=1)
-                    ),
-                    text='BM',
-                    textposition='top center',
-                    name='Bullish Marubozu',
-                    showlegend=False
-                ))
-            if dados.loc[idx, 'bearish_marubozu']:
-                fig.add_trace(go.Scatter(
-                    x=[idx],
-                    y=[dados.loc[idx, 'Low']],
-                    mode='markers+text',
-                    marker=dict(
-                        symbol='circle',
-                        size=10,
-                        color='red',
-                        line=dict(color='black', width=1)
-                    ),
-                    text='BM',
-                    textposition='bottom center',
-                    name='Bearish Marubozu',
-                    showlegend=False
-                ))
-    
         # Adicionar legenda para os padrões
         st.subheader("Padrões de Candlestick Detectados")
         col1, col2, col3 = st.columns(3)
@@ -704,170 +381,31 @@ try:
             st.markdown("🔼 H - Hammer: Possível reversão de alta")
             st.markdown("🔽 SS - Shooting Star: Possível reversão de baixa")
     
-    # Layout do gráfico principal
-    fig.update_layout(
-        template='plotly_dark',
-        xaxis_rangeslider_visible=True,
-        height=600,
-        dragmode='pan',
-        xaxis=dict(
-            type='date',
-            rangeslider=dict(
-                visible=True,
-                thickness=0.05,
-                bgcolor="rgb(48, 48, 48)",
-                bordercolor="rgb(128, 128, 128)",
-                borderwidth=1,
-                range=[dados.index[-min(100, len(dados))].timestamp() * 1000, dados.index[-1].timestamp() * 1000]  # Zoom padrão do rangeslider
-            ),
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=1, label="1D", step="day", stepmode="backward"),
-                    dict(count=7, label="7D", step="day", stepmode="backward"),
-                    dict(count=1, label="1M", step="month", stepmode="backward"),
-                    dict(count=3, label="3M", step="month", stepmode="backward"),
-                    dict(count=6, label="6M", step="month", stepmode="backward"),
-                    dict(count=1, label="1A", step="year", stepmode="backward"),
-                    dict(step="all", label="Tudo")
-                ]),
-                font=dict(color="white"),
-                bgcolor="rgb(48, 48, 48)",
-                activecolor="rgb(65, 65, 65)"
-            )
-        ),
-        yaxis=dict(
-            title="Preço (R$)",
-            tickformat='.2f',
-            tickprefix='R$ ',
-            fixedrange=False,
-            side='right'
-        ),
-        xaxis_gridcolor='rgba(128, 128, 128, 0.1)',
-        yaxis_gridcolor='rgba(128, 128, 128, 0.1)',
-        plot_bgcolor='rgba(0, 0, 0, 0)',
-        paper_bgcolor='rgba(0, 0, 0, 0)',
-        margin=dict(l=50, r=50, t=50, b=50),
-        showlegend=True,
-        legend=dict(
-            yanchor="top",
-            y=0.99,
-            xanchor="left",
-            x=0.01,
-            bgcolor="rgba(0, 0, 0, 0.5)",
-            bordercolor="rgba(128, 128, 128, 0.5)",
-            borderwidth=1
-        ),
-        bargap=0.15,
-        bargroupgap=0.1
-    )
-    
-    # Configurações do gráfico
-    config = {
-        'modeBarButtonsToAdd': [
-            'drawline',
-            'drawopenpath',
-            'drawclosedpath',
-            'drawcircle',
-            'drawrect',
-            'eraseshape'
-        ],
-        'modeBarButtons': [
-            ['zoom2d', 'pan2d', 'zoomIn2d', 'zoomOut2d', 'autoScale2d', 'resetScale2d'],
-            ['toImage'],
-            ['zoom3d', 'pan3d', 'resetCameraDefault3d', 'resetCameraLastSave3d'],
-            ['hoverClosestCartesian', 'hoverCompareCartesian']
-        ],
-        'scrollZoom': True,
-        'displaylogo': False,
-        'toImageButtonOptions': {
-            'format': 'png',
-            'filename': f'{acao_selecionada}_chart',
-            'height': 600,
-            'width': 1200,
-            'scale': 2
-        },
-        'displayModeBar': True,
-        'doubleClick': 'reset+autosize'
-    }
-    
-    st.plotly_chart(fig, use_container_width=True, config=config)
-    
     # Gráficos adicionais para RSI e MACD
     if show_rsi or show_macd:
         col1, col2 = st.columns(2)
-        
-        if show_rsi and 'RSI' in dados.columns:
-            with col1:
-                fig_rsi = go.Figure()
-                fig_rsi.add_trace(go.Scatter(
-                    x=dados.index,
-                    y=dados['RSI'],
-                    name='RSI',
-                    line=dict(color='blue')
-                ))
-                fig_rsi.add_hline(y=rsi_overbought, line_dash="dash", line_color="red")
-                fig_rsi.add_hline(y=rsi_oversold, line_dash="dash", line_color="green")
-                fig_rsi.update_layout(
-                    title='RSI',
-                    height=300,
-                    template='plotly_dark',
-                    yaxis=dict(range=[0, 100])
-                )
-                st.plotly_chart(fig_rsi, use_container_width=True)
-        
-        if show_macd and 'MACD' in dados.columns:
-            with col2:
-                fig_macd = go.Figure()
-                fig_macd.add_trace(go.Scatter(
-                    x=dados.index,
-                    y=dados['MACD'],
-                    name='MACD',
-                    line=dict(color='blue')
-                ))
-                fig_macd.add_trace(go.Scatter(
-                    x=dados.index,
-                    y=dados['MACD_Signal'],
-                    name='Sinal',
-                    line=dict(color='orange')
-                ))
-                fig_macd.update_layout(
-                    title='MACD',
-                    height=300,
-                    template='plotly_dark'
-                )
-                st.plotly_chart(fig_macd, use_container_width=True)
+        area_rsi = col1.empty()
+        area_macd = col2.empty()
+        with expander_momentum:
+            secao_osciladores(dados, chave_dados, area_rsi, area_macd)
 
     # Volume
     st.subheader("Volume de Negociação")
-    fig_volume = go.Figure(data=[
-        go.Bar(
-            x=dados.index, 
-            y=dados['Volume'],
-            name='Volume',
-            hovertemplate=
-            "<b>Data</b>: %{x}<br>" +
-            "<b>Volume</b>: %{y:,.0f}<br>" +
-            "<extra></extra>"
-        )
-    ])
-    
-    fig_volume.update_layout(
-        template='plotly_dark',
-        height=250,
-        xaxis_rangeslider_visible=False,
-        yaxis=dict(title="Volume"),
-        xaxis_gridcolor='rgba(128, 128, 128, 0.1)',
-        yaxis_gridcolor='rgba(128, 128, 128, 0.1)',
-        plot_bgcolor='rgba(0, 0, 0, 0)',
-        paper_bgcolor='rgba(0, 0, 0, 0)',
-        margin=dict(l=50, r=50, t=50, b=50),
+    fig_volume = figura_da_sessao(
+        'volume', chave_dados, lambda: graficos.construir_grafico_volume(dados)
     )
-    
-    st.plotly_chart(fig_volume, use_container_width=True, config={'displaylogo': False})
+    with instrumentacao.medir('grafico.envio'):
+        st.plotly_chart(fig_volume, width='stretch', config={'displaylogo': False})
 
 except Exception as e:
     st.error(f"Erro ao carregar dados: {str(e)}")
 
+# Painel com a latência das últimas interações (execuções completas e seções isoladas)
+registrar_latencia('Execução completa', inicio_execucao)
+with st.sidebar.expander("⏱️ Latência por interação", expanded=False):
+    st.dataframe(list(reversed(st.session_state['latencias'])), width='stretch')
+painel_depuracao()
+
 # Adiciona footer
 st.markdown("---")
 st.markdown("""
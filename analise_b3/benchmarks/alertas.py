@@ -0,0 +1,128 @@
+"""
+Ensaio do serviço de alertas contra o receptor local
+
+Roda ciclos do serviço com o provedor replay (séries sintéticas, sem rede) simulando o
+limite de requisições em parte das buscas, e entrega os alertas ao receptor HTTP local
+(core.alertas.iniciar_receptor) e a um arquivo. Confere que:
+- as ações com limite de requisições atingido são buscadas de novo (LimiteRequisicoes);
+- cada alerta chega uma única vez ao receptor e ao arquivo;
+- o ciclo seguinte não entrega de novo o que já foi entregue;
+- com o receptor fora do ar (HTTP 500) os alertas ficam pendentes e são entregues quando
+  ele volta.
+
+Uso:
+    python benchmarks/alertas.py --acoes 100 --taxa-429 0.3
+    python benchmarks/alertas.py --verificar       # falha se alguma conferência falhar
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def configurar_ambiente(taxa_429, seed):
+    """Provedor replay com falhas simuladas, sem o cache compartilhado e sem os proventos gravados"""
+    diretorio = tempfile.mkdtemp(prefix='alertas_')
+    os.environ.update({
+        'ANALISE_B3_PROVEDOR': 'replay',
+        'ANALISE_B3_REPLAY_DIR': os.path.join(diretorio, 'barras'),
+        'ANALISE_B3_REPLAY_TAXA_429': str(taxa_429),
+        'ANALISE_B3_REPLAY_SEED': str(seed),
+        'ANALISE_B3_CACHE': 'desativado',
+        'ANALISE_B3_PROVENTOS': os.path.join(diretorio, 'proventos.sqlite')
+    })
+    return diretorio
+
+def _chaves(alertas):
+    from core.alertas import chave_alerta
+
+    return [chave_alerta(alerta) for alerta in alertas]
+
+def main():
+    import json
+
+    parser = argparse.ArgumentParser(description="Ensaio do serviço de alertas contra o receptor local")
+    parser.add_argument('--acoes', type=int, default=100)
+    parser.add_argument('--taxa-429', type=float, default=0.3, help="Probabilidade de limite de requisições")
+    parser.add_argument('--tentativas', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verificar', action='store_true', help="Sai com erro se alguma conferência falhar")
+    args = parser.parse_args()
+
+    diretorio = configurar_ambiente(args.taxa_429, args.seed)
+    from core import alertas, instrumentacao
+
+    servidor, recebidos = alertas.iniciar_receptor()
+    config = {
+        **alertas.CONFIG_PADRAO,
+        'tickers': [f"SINT{i:03d}3.SA" for i in range(args.acoes)],
+        'provedor': 'replay',
+        'requisicoes_por_minuto': 600000,
+        'tentativas': args.tentativas,
+        'espera_limite': 0.05,
+        'limiar_score': 1,
+        'params': alertas.PARAMS_PADRAO,
+        'registro': os.path.join(diretorio, 'alertas.sqlite'),
+        'saidas': [
+            {'tipo': 'webhook', 'url': f"http://127.0.0.1:{servidor.server_port}/"},
+            {'tipo': 'arquivo', 'caminho': os.path.join(diretorio, 'alertas.jsonl')}
+        ]
+    }
+    conferencias = []
+
+    def conferir(descricao, ok):
+        conferencias.append(ok)
+        print(f"  {'ok   ' if ok else 'FALHA'} {descricao}")
+
+    def repeticoes():
+        return sum(total for nome, _, total in instrumentacao.contadores() if nome == 'alertas_limite_requisicoes')
+
+    inicio = time.perf_counter()
+    resumo = alertas.executar_servico(config, uma_vez=True)
+    print(f"Ciclo 1 em {time.perf_counter() - inicio:.2f} s: {resumo['avaliadas']} ações avaliadas, "
+          f"{len(resumo['falhas'])} falhas, {len(resumo['alertas'])} alertas, "
+          f"{repeticoes()} lotes buscados de novo pelo limite de requisições")
+    limitadas = [ticker for ticker, erro in resumo['falhas'].items() if 'Limite de requisições' in erro]
+    if args.taxa_429 > 0:
+        conferir("ações com limite de requisições buscadas de novo", repeticoes() > 0)
+    conferir(f"nenhuma ação falhou por limite após {args.tentativas} tentativas ({len(limitadas)})",
+             not limitadas)
+    conferir("nenhuma outra falha", len(resumo['falhas']) == len(limitadas))
+    conferir("ciclo com alertas para entregar", len(resumo['alertas']) > 0)
+    entregues = _chaves([alerta for corpo in recebidos for alerta in corpo['alertas']])
+    conferir("receptor recebeu cada alerta uma única vez",
+             sorted(entregues) == sorted(_chaves(resumo['alertas'])))
+    with open(config['saidas'][1]['caminho']) as f:
+        conferir("arquivo recebeu cada alerta uma única vez",
+                 sorted(_chaves([json.loads(linha) for linha in f])) == sorted(_chaves(resumo['alertas'])))
+
+    resumo = alertas.executar_servico(config, uma_vez=True)
+    conferir("ciclo 2 não entrega de novo os alertas já entregues",
+             sum(resumo['entregues'].values()) == 0 and len(recebidos) == 1)
+
+    # Receptor fora do ar: os alertas de um registro novo ficam pendentes até ele voltar
+    servidor.shutdown()
+    servidor.server_close()
+    fora_do_ar, recusados = alertas.iniciar_receptor(status=500)
+    config = {**config, 'registro': os.path.join(diretorio, 'alertas_2.sqlite'),
+              'saidas': [{'tipo': 'webhook', 'url': f"http://127.0.0.1:{fora_do_ar.server_port}/"}]}
+    resumo = alertas.executar_servico(config, uma_vez=True)
+    conferir("receptor fora do ar: nada registrado como entregue",
+             sum(resumo['entregues'].values()) == 0 and not recusados)
+    fora_do_ar.shutdown()
+    fora_do_ar.server_close()
+    servidor, recebidos = alertas.iniciar_receptor(porta=fora_do_ar.server_port)
+    resumo = alertas.executar_servico(config, uma_vez=True)
+    conferir("receptor de volta: pendentes entregues no ciclo seguinte",
+             sorted(_chaves([alerta for corpo in recebidos for alerta in corpo['alertas']]))
+             == sorted(_chaves(resumo['alertas'])))
+    servidor.shutdown()
+
+    if args.verificar and not all(conferencias):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Leitura e importação de arquivos COTAHIST da B3
+
+Gera um arquivo COTAHIST sintético com o leiaute da B3 (ações no mercado à vista e, como
+nos arquivos reais, muito mais linhas de opções e do fracionário), mede ler_cotahist e
+importar_cotahist para um diretório temporário e confere os preços decodificados com os
+gerados.
+
+Uso:
+    python benchmarks/cotahist.py --papeis 400 --pregoes 248 --opcoes 8
+    python benchmarks/cotahist.py --arquivo COTAHIST_A2023.ZIP   # mede um arquivo real
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.cotahist import CAMPOS, TAMANHO_REGISTRO, importar_cotahist, ler_cotahist
+from core.sinteticos import gerar_carteira
+
+
+def _preencher(linhas, nome, valores):
+    """Escreve os valores (inteiros ou bytes) no campo de todas as linhas"""
+    import numpy as np
+
+    inicio, fim = CAMPOS[nome]
+    largura = fim - inicio + 1
+    valores = np.broadcast_to(np.asarray(valores), len(linhas))
+    if valores.dtype.kind in 'iu':
+        # Dígito a dígito, da direita para a esquerda, com zeros à esquerda
+        for coluna in range(fim - 1, inicio - 2, -1):
+            linhas[:, coluna] = valores % 10 + ord('0')
+            valores = valores // 10
+    else:
+        linhas[:, inicio - 1:fim] = np.char.ljust(valores.astype(f'S{largura}'), largura) \
+            .astype(f'S{largura}').view(np.uint8).reshape(len(linhas), largura)
+
+def gerar_cotahist(caminho, n_papeis, n_pregoes, opcoes_por_papel, seed=0):
+    """
+    Grava um COTAHIST sintético e devolve as cotações à vista geradas (o formato de ler_cotahist)
+    Cada papel tem também opcoes_por_papel séries de opções e uma linha no fracionário por pregão
+    """
+    import numpy as np
+    import pandas as pd
+
+    papeis = [f"PAP{i:03d}{3 + i % 9}" for i in range(n_papeis)]
+    carteira = gerar_carteira(papeis, n_pregoes, seed=seed, correlacao=0.3)
+    datas = next(iter(carteira.values())).index
+    # Preços com duas casas, como no arquivo
+    esperadas = pd.concat([
+        pd.DataFrame({'ticker': f"{papel}.SA", **dados[['Open', 'High', 'Low', 'Close']].round(2),
+                      'Volume': dados['Volume']})
+        for papel, dados in carteira.items()
+    ]).rename_axis('Date')
+
+    # Linhas de um pregão: o papel à vista, no fracionário e as opções; os pregões em sequência
+    tipos = ['vista', 'fracionario'] + ['opcao'] * opcoes_por_papel
+    codigos, codbdi, tpmerc, origem, fator = [], [], [], [], []
+    rng = np.random.default_rng(seed)
+    for i, papel in enumerate(papeis):
+        for j, tipo in enumerate(tipos):
+            codigos.append(papel if tipo == 'vista' else f"{papel}F" if tipo == 'fracionario' else f"{papel}O{j}")
+            codbdi.append({'vista': b'02', 'fracionario': b'96', 'opcao': b'78'}[tipo])
+            tpmerc.append({'vista': b'010', 'fracionario': b'020', 'opcao': b'070'}[tipo])
+            origem.append(i)
+            fator.append(rng.uniform(0.01, 0.1) if tipo == 'opcao' else 1.0)
+    por_pregao = lambda valores: np.tile(np.asarray(valores), n_pregoes)
+
+    linhas = np.full((n_pregoes * len(codigos) + 2, TAMANHO_REGISTRO + 2), ord(' '), dtype=np.uint8)
+    linhas[:, -2:] = [ord('\r'), ord('\n')]
+    linhas[0, :10] = np.frombuffer(b'00COTAHIST', dtype=np.uint8)
+    linhas[-1, :2] = np.frombuffer(b'99', dtype=np.uint8)
+    corpo = linhas[1:-1]
+    _preencher(corpo, 'tipo', b'01')
+    _preencher(corpo, 'data', np.repeat((datas.year * 10000 + datas.month * 100 + datas.day).to_numpy(), len(codigos)))
+    _preencher(corpo, 'codbdi', por_pregao(codbdi))
+    _preencher(corpo, 'codneg', por_pregao([codigo.encode() for codigo in codigos]))
+    _preencher(corpo, 'tpmerc', por_pregao(tpmerc))
+    for nome, coluna in [('preabe', 'Open'), ('premax', 'High'), ('premin', 'Low'), ('preult', 'Close')]:
+        precos = np.column_stack([carteira[papel][coluna].to_numpy() for papel in papeis])  # pregões x papéis
+        _preencher(corpo, nome, np.round(precos[:, origem] * np.asarray(fator) * 100).astype(np.int64).ravel())
+    volumes = np.column_stack([carteira[papel]['Volume'].to_numpy() for papel in papeis])
+    _preencher(corpo, 'quatot', volumes[:, origem].astype(np.int64).ravel())
+    _preencher(corpo, 'fatcot', 1)
+
+    linhas.tofile(caminho)
+    return esperadas
+
+def cronometrar(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+def main():
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Leitura e importação de arquivos COTAHIST")
+    parser.add_argument('--papeis', type=int, default=400)
+    parser.add_argument('--pregoes', type=int, default=248)
+    parser.add_argument('--opcoes', type=int, default=8, help="Séries de opções por papel")
+    parser.add_argument('--arquivo', help="Arquivo COTAHIST real (.TXT ou .ZIP) em vez do sintético")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        esperadas = None
+        caminho = args.arquivo
+        if caminho is None:
+            caminho = os.path.join(diretorio, 'COTAHIST_SINTETICO.TXT')
+            esperadas, tempo = cronometrar(gerar_cotahist, caminho, args.papeis, args.pregoes, args.opcoes)
+            print(f"Arquivo sintético gerado em {tempo:.1f} s")
+
+        tamanho = os.path.getsize(caminho) / 2 ** 20
+        cotacoes, tempo_leitura = cronometrar(ler_cotahist, caminho)
+        print(f"{tamanho:.0f} MiB, {cotacoes['ticker'].nunique()} papéis e {len(cotacoes):,} cotações à vista")
+        print(f"  ler_cotahist       {tempo_leitura:7.3f} s  ({tamanho / tempo_leitura:.0f} MiB/s)")
+
+        if esperadas is not None:
+            precos = ['Open', 'High', 'Low', 'Close', 'Volume']
+            esperadas = esperadas.sort_values(['ticker', 'Date'], kind='stable')
+            diferenca = np.abs(cotacoes[precos].to_numpy() - esperadas[precos].to_numpy()).max()
+            iguais = (cotacoes['ticker'].astype(str).to_numpy() == esperadas['ticker'].to_numpy()).all() \
+                and (cotacoes.index == esperadas.index).all()
+            print(f"  conferência        diferença máxima {diferenca:.1e}, "
+                  f"{'papéis e datas iguais' if iguais else 'PAPÉIS OU DATAS DIFERENTES'}")
+
+        gravadas, tempo_importacao = cronometrar(importar_cotahist, [caminho], os.path.join(diretorio, 'barras'))
+        print(f"  importar_cotahist  {tempo_importacao:7.3f} s  ({len(gravadas)} arquivos Parquet)")
+
+if __name__ == '__main__':
+    main()
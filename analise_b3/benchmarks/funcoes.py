@@ -0,0 +1,188 @@
+"""
+Tempo das funções críticas da análise e do backtest em vários tamanhos de série
+
+Usa séries sintéticas (core.sinteticos) e mede calcular_indicadores, os indicadores
+semanais, detectar_padroes_candlestick, detectar_suportes_resistencias, perfil_volume,
+calcular_score, executar_backtest (cada estratégia de core.estrategias, com o cálculo das
+regras, e com os sinais do score prontos), calcular_metricas e o laço completo do otimizador. O resultado pode ser salvo como baseline e comparado em execuções futuras, para pegar regressões antes do deploy.
+
+Uso:
+    python benchmarks/funcoes.py                          # mostra o relatório
+    python benchmarks/funcoes.py --barras 250 1000 --tickers 3
+    python benchmarks/funcoes.py --salvar                 # atualiza o baseline
+    python benchmarks/funcoes.py --verificar              # falha se houver regressão
+    python benchmarks/funcoes.py --saida resultado.json   # grava o relatório desta execução
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import features
+from core.backtest import calcular_metricas, executar_backtest
+from core.dataset import identificar_dataset
+from core.estrategias import ESTRATEGIA_PADRAO, ESTRATEGIAS
+from core.indicadores import calcular_indicadores
+from core.multitemporal import calcular_indicadores_multitemporais
+from core.otimizador import FAIXAS_PADRAO, gerar_combinacoes, otimizar
+from core.padroes import detectar_padroes_candlestick, detectar_suportes_resistencias
+from core.perfil_volume import detectar_niveis_volume
+from core.score import calcular_score, sinais_do_score
+from core.sinteticos import gerar_carteira
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(RAIZ, 'benchmarks', 'resultados', 'funcoes.json')
+
+PARAMS = {
+    'sma_periods': [20, 50], 'ema_periods': [9, 21],
+    'rsi_period': 14, 'rsi_overbought': 70, 'rsi_oversold': 30,
+    'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9,
+    'stop_loss': 2.0, 'take_profit': 4.0
+}
+CAPITAL_INICIAL = 10000.0
+
+# Folga permitida sobre o baseline antes de considerar regressão (relativa e absoluta)
+TOLERANCIA = 0.30
+TOLERANCIA_MS = 2.0
+
+
+def cronometrar(funcao, repeticoes):
+    """
+    Mediana e mínimo, em ms, entre as repetições
+    As features em memória são descartadas antes de cada repetição: mede-se o cálculo, não o reaproveitamento
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        features.limpar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {'mediana_ms': statistics.median(tempos), 'min_ms': min(tempos)}
+
+def casos(dados, num_combinacoes):
+    """Funções medidas sobre uma série, cada uma com as entradas já preparadas"""
+    identidade = identificar_dataset(dados, '')
+    operacoes = executar_backtest(dados, PARAMS, CAPITAL_INICIAL, identidade=identidade)
+    sinais = sinais_do_score(calcular_score(dados))
+    combinacoes = gerar_combinacoes(FAIXAS_PADRAO, num_combinacoes, seed=0)
+    backtests = {
+        'executar_backtest' if nome == ESTRATEGIA_PADRAO else f'executar_backtest ({nome})':
+            lambda nome=nome: executar_backtest(dados, PARAMS, CAPITAL_INICIAL, estrategia=nome,
+                                                identidade=identidade)
+        for nome in ESTRATEGIAS
+    }
+    return {
+        'calcular_indicadores': lambda: calcular_indicadores(dados, PARAMS),
+        'detectar_padroes_candlestick': lambda: detectar_padroes_candlestick(dados),
+        'detectar_suportes_resistencias': lambda: detectar_suportes_resistencias(dados),
+        'perfil_volume (níveis)': lambda: detectar_niveis_volume(dados),
+        'indicadores semanais': lambda: calcular_indicadores_multitemporais(dados, PARAMS, 'semanal'),
+        'calcular_score': lambda: calcular_score(dados),
+        **backtests,
+        'executar_backtest (sinais prontos)': lambda: executar_backtest(dados, PARAMS, CAPITAL_INICIAL,
+                                                                        sinais=sinais),
+        'calcular_metricas': lambda: calcular_metricas(operacoes, CAPITAL_INICIAL),
+        f'otimizar ({num_combinacoes} combinações)': lambda: otimizar(dados, combinacoes, CAPITAL_INICIAL)
+    }
+
+def gerar_relatorio(args):
+    relatorio = {
+        'ambiente': {
+            'python': platform.python_version(),
+            'maquina': platform.machine(),
+            'processador': platform.processor() or platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'parametros': {
+            'barras': args.barras, 'tickers': args.tickers, 'volatilidade': args.volatilidade,
+            'prob_gap': args.prob_gap, 'combinacoes': args.combinacoes, 'repeticoes': args.repeticoes
+        },
+        'tempos': {}
+    }
+
+    for n_barras in args.barras:
+        carteira = gerar_carteira(args.tickers, n_barras, seed=n_barras,
+                                  volatilidade=args.volatilidade, prob_gap=args.prob_gap)
+        medicoes = {}
+        for dados in carteira.values():
+            for nome, funcao in casos(dados, args.combinacoes).items():
+                repeticoes = 1 if nome.startswith('otimizar') else args.repeticoes
+                medicoes.setdefault(nome, []).append(cronometrar(funcao, repeticoes))
+
+        # Com vários tickers, vale a mediana entre eles
+        relatorio['tempos'][str(n_barras)] = {
+            nome: {
+                'mediana_ms': round(statistics.median(m['mediana_ms'] for m in lista), 3),
+                'min_ms': round(min(m['min_ms'] for m in lista), 3)
+            }
+            for nome, lista in medicoes.items()
+        }
+    return relatorio
+
+def comparar(relatorio, baseline):
+    """Lista de regressões (tamanho, função, atual, baseline) acima da tolerância"""
+    regressoes = []
+    for n_barras, funcoes in relatorio['tempos'].items():
+        for nome, atual in funcoes.items():
+            anterior = baseline['tempos'].get(n_barras, {}).get(nome)
+            if anterior is None:
+                continue
+            if (atual['mediana_ms'] > anterior['mediana_ms'] * (1 + TOLERANCIA)
+                    and atual['mediana_ms'] - anterior['mediana_ms'] > TOLERANCIA_MS):
+                regressoes.append((n_barras, nome, atual['mediana_ms'], anterior['mediana_ms']))
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo das funções críticas em séries sintéticas")
+    parser.add_argument('--barras', type=int, nargs='+', default=[250, 1000, 5000])
+    parser.add_argument('--tickers', type=int, default=1, help="Séries geradas por tamanho")
+    parser.add_argument('--volatilidade', type=float, default=0.02)
+    parser.add_argument('--prob-gap', type=float, default=0.02)
+    parser.add_argument('--combinacoes', type=int, default=20, help="Combinações no laço do otimizador")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--salvar', action='store_true', help="Grava o relatório como baseline")
+    parser.add_argument('--verificar', action='store_true', help="Compara com o baseline salvo")
+    parser.add_argument('--saida', help="Arquivo JSON para o relatório desta execução")
+    args = parser.parse_args()
+
+    relatorio = gerar_relatorio(args)
+
+    baseline = None
+    if args.verificar:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+
+    for n_barras, funcoes in relatorio['tempos'].items():
+        print(f"{n_barras} barras")
+        for nome, tempo in funcoes.items():
+            linha = f"    {nome:<36} {tempo['mediana_ms']:10.2f} ms"
+            anterior = baseline and baseline['tempos'].get(n_barras, {}).get(nome)
+            if anterior:
+                linha += f"   (baseline {anterior['mediana_ms']:.2f} ms, {tempo['mediana_ms'] / anterior['mediana_ms']:.2f}x)"
+            print(linha)
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(relatorio, f, indent=4)
+
+    if args.salvar:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, 'w') as f:
+            json.dump(relatorio, f, indent=4)
+        print(f"Baseline salvo em {BASELINE}")
+
+    if args.verificar:
+        if baseline['parametros'] != relatorio['parametros']:
+            print("Aviso: parâmetros diferentes dos usados no baseline; só os tamanhos em comum são comparados")
+        regressoes = comparar(relatorio, baseline)
+        for n_barras, nome, atual, anterior in regressoes:
+            print(f"REGRESSÃO: {nome} com {n_barras} barras {atual:.2f} ms (baseline {anterior:.2f} ms)")
+        sys.exit(1 if regressoes else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Relatório de tempo de import (estilo `python -X importtime`) das páginas do app
+
+Executa, em um processo novo para cada script, apenas os imports de nível de
+módulo de app.py e das páginas, e compara o tempo total com o orçamento salvo.
+O que o servidor do Streamlit já carregou antes de rodar o script (PREAMBULO)
+não entra na conta, pois não atrasa a primeira renderização.
+
+Uso:
+    python benchmarks/importtime.py                # mostra o relatório
+    python benchmarks/importtime.py --salvar       # atualiza o baseline
+    python benchmarks/importtime.py --verificar    # falha se estourar o orçamento
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ['app.py', 'pages/backtesting.py', 'pages/otimizacao.py', 'pages/sinais_operacao.py',
+           'pages/correlacao.py', 'pages/forca_relativa.py']
+BASELINE = os.path.join(RAIZ, 'benchmarks', 'resultados', 'importtime.json')
+
+PREAMBULO = 'import streamlit.web.bootstrap'
+MARCA = '--fim-do-preambulo--'
+
+# Folga permitida sobre o baseline antes de considerar regressão (relativa e absoluta)
+TOLERANCIA = 0.25
+TOLERANCIA_US = 20000
+
+
+def imports_de_topo(caminho):
+    """Extrai as instruções de import de nível de módulo de um script"""
+    with open(os.path.join(RAIZ, caminho), encoding='utf-8') as f:
+        arvore = ast.parse(f.read())
+    return [ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom))]
+
+def medir_imports(instrucoes, repeticoes=3):
+    """Executa os imports com -X importtime e retorna o menor tempo total e os módulos mais caros"""
+    codigo = '\n'.join([
+        PREAMBULO,
+        f"import sys; sys.stderr.write('{MARCA}\\n'); sys.stderr.flush()",
+        *instrucoes
+    ])
+    melhor = None
+    for _ in range(repeticoes):
+        resultado = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', codigo],
+            cwd=RAIZ, capture_output=True, text=True
+        )
+        if resultado.returncode != 0:
+            raise Exception(f"Falha ao importar:\n{resultado.stderr[-2000:]}")
+
+        # Linhas no formato "import time: self [us] | cumulative | imported package"
+        modulos = {}
+        for linha in resultado.stderr.split(MARCA, 1)[1].splitlines():
+            if not linha.startswith('import time:') or 'self [us]' in linha:
+                continue
+            _, proprio, acumulado, nome = [p.strip() for p in linha.replace('import time:', '|').split('|')]
+            if not nome.startswith(' '):
+                modulos[nome.strip()] = int(acumulado)
+
+        total = sum(
+            tempo for nome, tempo in modulos.items() if '.' not in nome
+        )
+        if melhor is None or total < melhor['total_us']:
+            topo = sorted(((n, t) for n, t in modulos.items() if '.' not in n),
+                          key=lambda x: x[1], reverse=True)[:10]
+            melhor = {'total_us': total, 'mais_caros': dict(topo)}
+    return melhor
+
+def gerar_relatorio():
+    return {script: medir_imports(imports_de_topo(script)) for script in SCRIPTS}
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de tempo de import do app")
+    parser.add_argument('--salvar', action='store_true', help="Grava o relatório como baseline")
+    parser.add_argument('--verificar', action='store_true', help="Compara com o baseline salvo")
+    args = parser.parse_args()
+
+    relatorio = gerar_relatorio()
+    for script, dados in relatorio.items():
+        print(f"{script}: {dados['total_us'] / 1000:.1f} ms")
+        for nome, tempo in dados['mais_caros'].items():
+            print(f"    {nome:<30} {tempo / 1000:8.1f} ms")
+
+    if args.salvar:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, 'w') as f:
+            json.dump(relatorio, f, indent=4)
+        print(f"Baseline salvo em {BASELINE}")
+
+    if args.verificar:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+        regressoes = [
+            script for script, dados in relatorio.items()
+            if script in baseline
+            and dados['total_us'] > baseline[script]['total_us'] * (1 + TOLERANCIA)
+            and dados['total_us'] - baseline[script]['total_us'] > TOLERANCIA_US
+        ]
+        for script in regressoes:
+            print(f"REGRESSÃO: {script} {relatorio[script]['total_us'] / 1000:.1f} ms "
+                  f"(baseline {baseline[script]['total_us'] / 1000:.1f} ms)")
+        sys.exit(1 if regressoes else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Latência de uma interação na página principal, antes e depois das seções isoladas
+
+"antes": cada interação recalcula indicadores e níveis e remonta e serializa
+todas as figuras, como acontecia quando qualquer widget reexecutava o script todo.
+"depois": ao mudar uma camada (ex.: Fibonacci), só as linhas de níveis são
+refeitas sobre a figura base em cache e apenas o gráfico principal é reenviado.
+
+Uso:
+    python benchmarks/interacao.py --barras 250 1000 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plotly.io as pio
+
+from core.indicadores import calcular_indicadores
+from core.padroes import detectar_suportes_resistencias
+from core.sinteticos import gerar_ohlcv
+from ui import graficos
+
+PARAMS = {'sma_periods': [20, 50], 'rsi_period': 14, 'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9}
+FIB = {0.382: 1.0, 0.5: 1.0, 0.618: 1.0}
+
+
+def interacao_antes(dados):
+    df = calcular_indicadores(dados, PARAMS)
+    resistencias, suportes = detectar_suportes_resistencias(df)
+    fig = graficos.construir_grafico_principal(df, PARAMS['sma_periods'], [], False, 0.2, 0.1)
+    graficos.aplicar_camadas(fig, resistencias, suportes, FIB)
+    for figura in [fig, graficos.construir_grafico_rsi(df, 70, 30),
+                   graficos.construir_grafico_macd(df), graficos.construir_grafico_volume(df)]:
+        pio.to_json(figura)
+
+def interacao_depois(fig_base, resistencias, suportes):
+    graficos.aplicar_camadas(fig_base, resistencias, suportes, FIB)
+    pio.to_json(fig_base)
+
+def medir(funcao, *args, repeticoes=5):
+    """Menor tempo, em ms, entre as repetições"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return min(tempos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência por interação na página principal")
+    parser.add_argument('--barras', type=int, nargs='+', default=[250, 1000, 5000])
+    args = parser.parse_args()
+
+    print(f"{'barras':>8} {'antes (ms)':>12} {'depois (ms)':>12}")
+    for n_barras in args.barras:
+        dados = gerar_ohlcv(n_barras, seed=0)
+        df = calcular_indicadores(dados, PARAMS)
+        resistencias, suportes = detectar_suportes_resistencias(df)
+        fig_base = graficos.construir_grafico_principal(df, PARAMS['sma_periods'], [], False, 0.2, 0.1)
+        antes = medir(interacao_antes, dados)
+        depois = medir(interacao_depois, fig_base, resistencias, suportes)
+        print(f"{n_barras:>8} {antes:>12.1f} {depois:>12.1f}")
+
+if __name__ == '__main__':
+    main()
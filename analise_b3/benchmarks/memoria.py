@@ -0,0 +1,65 @@
+"""
+Memória do pipeline da página principal (preços, indicadores e padrões) em float64 e float32
+
+Para cada tamanho de série mede o pico de memória alocada durante o pipeline (tracemalloc)
+e o tamanho do DataFrame final. O DataFrame final compartilha as colunas de preço com os
+dados carregados; o pico vem dos temporários de cada etapa, não de cópias da entrada.
+
+Uso:
+    python benchmarks/memoria.py --barras 1000 5000 50000
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import features, memoria
+from core.indicadores import calcular_indicadores
+from core.padroes import COLUNAS_PADROES, detectar_padroes_candlestick
+from core.sinteticos import gerar_ohlcv
+
+PARAMS = {'sma_periods': [20, 50], 'ema_periods': [9, 21], 'rsi_period': 14,
+          'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9}
+
+
+def pipeline(dados):
+    """Mesmas etapas do fluxo principal de app.py, sem o Streamlit"""
+    com_indicadores = calcular_indicadores(dados, PARAMS)
+    padroes = detectar_padroes_candlestick(com_indicadores)[COLUNAS_PADROES]
+    return memoria.anexar_colunas(com_indicadores, padroes)
+
+def medir(dados, float32):
+    os.environ['ANALISE_B3_FLOAT32'] = '1' if float32 else '0'
+    dados = memoria.compactar(dados)
+    features.limpar()
+
+    tracemalloc.start()
+    resultado = pipeline(dados)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'entrada_kib': memoria.uso_memoria(dados)['bytes'] / 1024,
+        'final_kib': memoria.uso_memoria(resultado)['bytes'] / 1024,
+        'pico_kib': pico / 1024
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória do pipeline em float64 e float32")
+    parser.add_argument('--barras', type=int, nargs='+', default=[1000, 5000, 50000])
+    args = parser.parse_args()
+
+    for n_barras in args.barras:
+        dados = gerar_ohlcv(n_barras, seed=n_barras)
+        pipeline(dados)  # Aquece imports e caches internos do pandas e do ta
+
+        print(f"{n_barras} barras")
+        for float32 in (False, True):
+            m = medir(dados, float32)
+            print(f"    {'float32' if float32 else 'float64'}: entrada {m['entrada_kib']:9.1f} KiB"
+                  f"   final {m['final_kib']:9.1f} KiB   pico do pipeline {m['pico_kib']:9.1f} KiB")
+
+if __name__ == '__main__':
+    main()
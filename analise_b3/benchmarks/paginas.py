@@ -0,0 +1,81 @@
+"""
+Tempo de execução das páginas completas, offline, com o provedor replay
+
+Roda cada página com o AppTest do Streamlit usando históricos gravados ou sintéticos
+(ANALISE_B3_PROVEDOR=replay), sem rede nem token da BRAPI. A primeira execução de
+cada página é fria (caches vazios); as seguintes reaproveitam os caches da sessão.
+A latência e as falhas do provedor podem ser simuladas pelas variáveis
+ANALISE_B3_REPLAY_* (veja api/replay_provider.py).
+
+Uso:
+    python benchmarks/paginas.py --execucoes 5
+    ANALISE_B3_REPLAY_LATENCIA_MS=300 python benchmarks/paginas.py --saida paginas.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Página e seleção do período a medir (rótulo do selectbox e índice da opção)
+PAGINAS = {
+    'app.py': ("Selecione o período de análise:", 3),  # 3 meses
+    'pages/backtesting.py': ("Período de teste:", 3),  # 1 ano
+    'pages/sinais_operacao.py': ("Período:", 4),  # 5 anos
+    'pages/correlacao.py': ("Período:", 1),  # 2 anos
+    'pages/forca_relativa.py': ("Período:", 1),  # 2 anos
+}
+
+
+def medir_pagina(pagina, execucoes):
+    from streamlit.testing.v1 import AppTest
+
+    teste = AppTest.from_file(os.path.join(RAIZ, pagina), default_timeout=300)
+
+    # A primeira execução só cria os widgets; a medição começa com o período escolhido
+    teste.run()
+    rotulo, indice = PAGINAS[pagina]
+    next(caixa for caixa in teste.selectbox if caixa.label == rotulo).select_index(indice)
+
+    tempos = []
+    for _ in range(execucoes):
+        inicio = time.perf_counter()
+        teste.run()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        if teste.exception:
+            raise Exception(f"{pagina}: {teste.exception[0].value}")
+
+    return {
+        'fria_ms': round(tempos[0], 1),
+        'quente_mediana_ms': round(statistics.median(tempos[1:]), 1) if len(tempos) > 1 else None,
+        'erros_exibidos': [erro.value for erro in teste.error]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo das páginas completas com dados offline")
+    parser.add_argument('--execucoes', type=int, default=5, help="Execuções por página (a primeira é fria)")
+    parser.add_argument('--saida', help="Arquivo JSON para o relatório")
+    args = parser.parse_args()
+
+    # Provedor offline e cache compartilhado isolado, para que a execução fria seja de fato fria
+    os.environ['ANALISE_B3_PROVEDOR'] = 'replay'
+    os.environ.setdefault('ANALISE_B3_CACHE', os.path.join(tempfile.mkdtemp(), 'cache.sqlite'))
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+
+    relatorio = {pagina: medir_pagina(pagina, args.execucoes) for pagina in PAGINAS}
+    for pagina, tempos in relatorio.items():
+        print(f"{pagina}: fria {tempos['fria_ms']:.0f} ms, quente {tempos['quente_mediana_ms'] or 0:.0f} ms")
+        for erro in tempos['erros_exibidos']:
+            print(f"    erro exibido: {erro}")
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(relatorio, f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+"""
+Execução de backtests e otimizações sem a interface do Streamlit
+
+Uso:
+    python cli.py backtest config.json
+    python cli.py otimizar config.json --processos 4
+    python cli.py retomar <run_id> --processos 4
+    python cli.py melhores --ticker PETR4.SA --metrica sharpe_ratio -n 10
+    python cli.py gravar PETR4.SA VALE3.SA --periodo 5y
+    python cli.py importar COTAHIST_A2022.ZIP COTAHIST_A2023.ZIP
+    python cli.py proventos adicionar PETR4 2024-04-25 bonificacao 0.5
+    python cli.py alertas watchlist.json
+    python cli.py receptor --porta 8099
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from core.backtest import executar_backtest, calcular_metricas
+from core.dados import carregar_dados
+from core.estrategias import ESTRATEGIA_PADRAO, obter_estrategia
+from core.exportacao import FORMATOS, gravar
+from core.instrumentacao import iniciar_exportacao
+from core.multitemporal import tendencia_superior
+from core.pareto import GERACOES_PADRAO, POPULACAO_PADRAO, fronteira_pareto
+from core.padroes import detectar_niveis
+from core.proventos import TIPOS as TIPOS_PROVENTOS
+from core.resultados import METRICAS, ResultadosOtimizacao
+from core.tarefas import criar_tarefa, executar_tarefa
+
+
+def carregar_config(caminho):
+    """Lê o arquivo de configuração JSON"""
+    with open(caminho, 'r') as f:
+        config = json.load(f)
+
+    if not config.get('tickers'):
+        raise Exception("A configuração precisa definir ao menos um ticker em 'tickers'.")
+
+    config.setdefault('periodos', ['1y'])
+    config.setdefault('capital_inicial', 10000.0)
+    config.setdefault('saida', 'resultados')
+    # Formato das tabelas gravadas: csv, parquet ou arrow
+    config.setdefault('formato', 'csv')
+    # Nome da estratégia de core.estrategias; params e faixas usam os parâmetros dela
+    config['estrategia'] = obter_estrategia(config.get('estrategia', ESTRATEGIA_PADRAO)).nome
+    return config
+
+def salvar_json(caminho, conteudo):
+    with open(caminho, 'w') as f:
+        json.dump(conteudo, f, indent=4, default=str)
+
+def caminho_tabela(config, nome):
+    return os.path.join(config['saida'], nome + FORMATOS[config['formato']][0])
+
+def executar_backtests(config, args):
+    """Executa o backtest com parâmetros fixos (os ausentes valem o padrão da estratégia) para cada ticker e período"""
+    resumo = {}
+    for ticker in config['tickers']:
+        for periodo in config['periodos']:
+            chave = f"{ticker}_{periodo}"
+            print(f"Backtest {chave}...")
+            try:
+                dados = carregar_dados(ticker, periodo)
+            except Exception as e:
+                print(f"  Erro ao carregar dados: {str(e)}")
+                continue
+
+            niveis = None
+            if config.get('fonte_niveis'):
+                niveis = detectar_niveis(dados, config['fonte_niveis'])
+            tendencia = None
+            if config.get('confirmacao'):
+                tendencia = tendencia_superior(dados, **config['confirmacao'])
+            operacoes = executar_backtest(dados, config.get('params', {}), config['capital_inicial'], niveis,
+                                          tendencia=tendencia, estrategia=config['estrategia'])
+            gravar(operacoes, caminho_tabela(config, f"{chave}_operacoes"), indice=False)
+            resumo[chave] = calcular_metricas(operacoes, config['capital_inicial'])
+
+    salvar_json(os.path.join(config['saida'], 'resumo_backtest.json'), resumo)
+
+def executar_otimizacoes(config, args):
+    """Executa a otimização de parâmetros para cada ticker e período"""
+    faixas = {nome: config.get('faixas', {}).get(nome, faixa)
+              for nome, faixa in obter_estrategia(config['estrategia']).faixas.items()}
+    num_combinacoes = config.get('num_combinacoes', 100)
+    metrica = config.get('metrica', 'sharpe_ratio')
+    # modo 'pareto': NSGA-II com populacao combinações por geracoes gerações
+    modo = config.get('modo', 'aleatoria')
+    extras = {}
+    if modo == 'pareto':
+        extras = dict(populacao=config.get('populacao', POPULACAO_PADRAO),
+                      geracoes=config.get('geracoes', GERACOES_PADRAO))
+    armazenamento = ResultadosOtimizacao()
+    resumo = {}
+
+    for ticker in config['tickers']:
+        for periodo in config['periodos']:
+            chave = f"{ticker}_{periodo}"
+            if modo == 'pareto':
+                print(f"Otimização {chave} (Pareto, população {extras['populacao']}, "
+                      f"{extras['geracoes']} gerações)...")
+            else:
+                print(f"Otimização {chave} ({num_combinacoes} combinações)...")
+            try:
+                dados = carregar_dados(ticker, periodo)
+            except Exception as e:
+                print(f"  Erro ao carregar dados: {str(e)}")
+                continue
+
+            # Se for interrompida, a otimização continua com "python cli.py retomar <run_id>"
+            run_id = criar_tarefa(armazenamento, ticker, periodo, faixas, num_combinacoes,
+                                  config['capital_inicial'], config.get('seed'),
+                                  config.get('fonte_niveis', 'pivos'), modo=modo,
+                                  estrategia=config['estrategia'], confirmacao=config.get('confirmacao'),
+                                  **extras)
+            print(f"  Execução {run_id}")
+            executar_tarefa(armazenamento, run_id, processos=args.processos,
+                            carregar_dados=lambda *_: dados)
+            resultados = armazenamento.melhores(metrica, None, run_id=run_id)
+            if not resultados:
+                continue
+
+            gravar(pd.DataFrame([
+                {**r['metricas'], **r['params']} for r in resultados
+            ]), caminho_tabela(config, f"{chave}_otimizacao"), indice=False)
+            if modo == 'pareto':
+                gravar(pd.DataFrame([
+                    {**r['metricas'], **r['params']} for r in fronteira_pareto(resultados)
+                ]), caminho_tabela(config, f"{chave}_pareto"), indice=False)
+
+            resumo[chave] = {
+                'acao': ticker,
+                'periodo': periodo,
+                'run_id': run_id,
+                'params': resultados[0]['params'],
+                'metricas': resultados[0]['metricas'],
+                'data_otimizacao': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+
+    salvar_json(os.path.join(config['saida'], 'resumo_otimizacao.json'), resumo)
+
+def retomar_tarefa(args):
+    """Executa ou retoma uma otimização registrada, avaliando só as combinações que faltam"""
+    armazenamento = ResultadosOtimizacao()
+    execucao = armazenamento.obter_execucao(args.run_id)
+    if execucao is None:
+        raise Exception(f"Execução não encontrada: {args.run_id}")
+
+    # Encerrado com SIGTERM, o processo marca a execução como interrompida antes de sair
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
+    print(f"Otimização {execucao['ticker']}_{execucao['periodo']}: "
+          f"{execucao['avaliacoes']}/{execucao['total']} combinações já avaliadas")
+    executar_tarefa(armazenamento, args.run_id, processos=args.processos)
+
+def listar_melhores(args):
+    """Mostra as melhores combinações já avaliadas, somando todas as otimizações registradas"""
+    # Métricas só são comparáveis entre execuções com o mesmo capital e os mesmos níveis
+    configuracao = {nome: valor for nome, valor in [('capital_inicial', args.capital_inicial),
+                                                    ('fonte_niveis', args.fonte_niveis)]
+                    if valor is not None}
+    melhores = ResultadosOtimizacao().melhores(args.metrica, args.n, ticker=args.ticker,
+                                               periodo=args.periodo, estrategia=args.estrategia,
+                                               configuracao=configuracao or None)
+    if not melhores:
+        print("Nenhum resultado registrado para esses filtros.")
+        return
+
+    pd.set_option('display.width', None)
+    print(pd.DataFrame([
+        {'ticker': r['ticker'], 'periodo': r['periodo'], 'run_id': r['run_id'],
+         **r['configuracao'], **r['metricas'], **r['params']}
+        for r in melhores
+    ]).to_string(index=False))
+
+def gravar_historicos(args):
+    """Grava históricos de um provedor real para serem servidos offline pelo provedor replay"""
+    from api.provider import criar_provedor
+    from api.replay_provider import ReplayProvider
+
+    origem = criar_provedor(args.provedor)
+    destino = ReplayProvider(diretorio=args.diretorio) if args.diretorio else ReplayProvider()
+    for ticker in args.tickers:
+        try:
+            dados = origem.get_stock_data(ticker, args.periodo)
+        except Exception as e:
+            print(f"{ticker}: {str(e)}")
+            continue
+        destino.gravar(ticker, dados)
+        print(f"{ticker}: {len(dados)} barras gravadas em {destino.caminho(ticker)}")
+
+def importar_historicos(args):
+    """Importa arquivos COTAHIST da B3 para o diretório do provedor replay"""
+    import time
+
+    from core.cotahist import CODIGOS_BDI_PADRAO, importar_cotahist
+
+    inicio = time.perf_counter()
+
+    def mostrar(caminho, n_cotacoes):
+        print(f"{caminho}: {n_cotacoes} cotações lidas ({time.perf_counter() - inicio:.1f} s)")
+
+    codigos_bdi = None if args.todos_bdi else (args.bdi or CODIGOS_BDI_PADRAO)
+    try:
+        gravadas = importar_cotahist(args.arquivos, args.diretorio, codigos_bdi=codigos_bdi, callback=mostrar)
+    except Exception as e:
+        print(str(e))
+        sys.exit(1)
+    print(f"{len(gravadas)} ações gravadas ({sum(gravadas.values())} barras) "
+          f"em {time.perf_counter() - inicio:.1f} s")
+
+def gerenciar_proventos(args):
+    """Consulta e altera os proventos aplicados às barras gravadas"""
+    from core.proventos import eventos_do_provedor, obter_proventos
+
+    proventos = obter_proventos()
+    if args.acao == 'listar':
+        eventos = proventos.eventos(args.ticker)
+        print(eventos.to_string(index=False) if len(eventos) else "Nenhum provento registrado.")
+    elif args.acao == 'adicionar':
+        proventos.registrar(args.ticker, [{'data_ex': args.data_ex, 'tipo': args.tipo, 'valor': args.valor}])
+        print(f"{args.ticker}: {args.tipo} de {args.valor} em {args.data_ex} registrado")
+    elif args.acao == 'remover':
+        removidos = proventos.remover(args.ticker, args.data_ex, args.tipo)
+        print(f"{args.ticker}: {removidos} eventos removidos")
+    elif args.acao == 'importar':
+        eventos = pd.read_csv(args.arquivo, dtype={'ticker': str, 'data_ex': str, 'tipo': str})
+        for ticker, grupo in eventos.groupby('ticker'):
+            proventos.registrar(ticker, grupo.to_dict('records'))
+            print(f"{ticker}: {len(grupo)} eventos registrados")
+    elif args.acao == 'buscar':
+        from api.provider import criar_provedor
+
+        origem = criar_provedor(args.provedor)
+        for ticker in args.tickers:
+            try:
+                eventos = eventos_do_provedor(origem.get_corporate_actions(ticker))
+            except Exception as e:
+                print(f"{ticker}: {str(e)}")
+                continue
+            proventos.registrar(ticker, eventos)
+            print(f"{ticker}: {len(eventos)} eventos registrados")
+
+def executar_alertas(args):
+    """Serviço de alertas da watchlist: um ciclo a cada intervalo até ser encerrado"""
+    import threading
+    import time
+
+    from core import alertas
+
+    config = alertas.carregar_config(args.config)
+    if args.processos:
+        config['processos'] = args.processos
+
+    parar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+
+    def mostrar(resumo):
+        entregues = ', '.join(f"{saida}: {total}" for saida, total in resumo['entregues'].items())
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {resumo['avaliadas']} ações avaliadas, "
+              f"{len(resumo['falhas'])} falhas, {len(resumo['alertas'])} alertas"
+              + (f" (novos entregues: {entregues})" if entregues else ""))
+        for ticker, erro in resumo['falhas'].items():
+            print(f"  {ticker}: {erro}")
+
+    try:
+        alertas.executar_servico(config, uma_vez=args.uma_vez, parar=parar, callback=mostrar)
+    except KeyboardInterrupt:
+        pass
+
+def executar_receptor(args):
+    """Receptor HTTP local que mostra os alertas recebidos, para testar a saída webhook"""
+    import threading
+
+    from core.alertas import iniciar_receptor
+
+    def mostrar(corpo):
+        for alerta in corpo.get('alertas', []):
+            print(json.dumps(alerta, ensure_ascii=False))
+
+    servidor, _ = iniciar_receptor(args.porta, args.host, args.status, ao_receber=mostrar)
+    print(f"Recebendo alertas em http://{args.host}:{servidor.server_port}/ (Ctrl+C encerra)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtests e otimizações de estratégias da B3")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    for comando in ['backtest', 'otimizar']:
+        subparser = subparsers.add_parser(comando)
+        subparser.add_argument('config', help="Arquivo JSON com tickers, períodos e parâmetros")
+        subparser.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                               help="Número de processos usados na otimização")
+        subparser.add_argument('--saida', help="Diretório de saída (sobrepõe o da configuração)")
+        subparser.add_argument('--formato', choices=FORMATOS,
+                               help="Formato das tabelas gravadas (sobrepõe o da configuração; padrão csv)")
+
+    retomar = subparsers.add_parser('retomar', help="Executa ou retoma uma otimização registrada")
+    retomar.add_argument('run_id')
+    retomar.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                         help="Número de processos usados na otimização")
+
+    melhores = subparsers.add_parser('melhores', help="Consulta os resultados de otimizações anteriores")
+    melhores.add_argument('--ticker')
+    melhores.add_argument('--periodo')
+    melhores.add_argument('--estrategia')
+    melhores.add_argument('--capital-inicial', type=float, help="Só execuções com esse capital inicial")
+    melhores.add_argument('--fonte-niveis', choices=['pivos', 'volume'],
+                          help="Só execuções com esses suportes e resistências")
+    melhores.add_argument('--metrica', choices=METRICAS, default='sharpe_ratio')
+    melhores.add_argument('-n', type=int, default=10, help="Número de resultados")
+    gravar = subparsers.add_parser('gravar', help="Grava históricos para uso offline (ANALISE_B3_PROVEDOR=replay)")
+    gravar.add_argument('tickers', nargs='+')
+    gravar.add_argument('--periodo', default='max')
+    gravar.add_argument('--provedor', choices=['yfinance', 'brapi'], default='yfinance')
+    gravar.add_argument('--diretorio', help="Diretório de destino (padrão dados/barras)")
+    importar = subparsers.add_parser('importar', help="Importa arquivos COTAHIST da B3 (.TXT ou .ZIP) para uso offline")
+    importar.add_argument('arquivos', nargs='+')
+    importar.add_argument('--diretorio', help="Diretório de destino (padrão dados/barras)")
+    importar.add_argument('--bdi', nargs='+', help="Códigos BDI importados (padrão 02 05 08 12)")
+    importar.add_argument('--todos-bdi', action='store_true', help="Importa todos os códigos BDI do mercado à vista")
+    proventos = subparsers.add_parser('proventos', help="Proventos aplicados às barras gravadas (ANALISE_B3_PROVEDOR=replay)")
+    acoes_proventos = proventos.add_subparsers(dest='acao', required=True)
+    listar = acoes_proventos.add_parser('listar', help="Lista os eventos registrados")
+    listar.add_argument('ticker', nargs='?')
+    adicionar = acoes_proventos.add_parser('adicionar', help="Registra um evento")
+    adicionar.add_argument('ticker')
+    adicionar.add_argument('data_ex', help="Data ex (AAAA-MM-DD)")
+    adicionar.add_argument('tipo', choices=TIPOS_PROVENTOS)
+    adicionar.add_argument('valor', type=float, help="Razão do desdobramento/grupamento, fração da bonificação "
+                                                     "ou reais por ação")
+    remover = acoes_proventos.add_parser('remover', help="Remove os eventos de uma data ex")
+    remover.add_argument('ticker')
+    remover.add_argument('data_ex')
+    remover.add_argument('tipo', nargs='?', choices=TIPOS_PROVENTOS)
+    importar_proventos = acoes_proventos.add_parser('importar', help="Registra os eventos de um CSV "
+                                                                      "(ticker, data_ex, tipo, valor)")
+    importar_proventos.add_argument('arquivo')
+    buscar = acoes_proventos.add_parser('buscar', help="Registra os dividendos e desdobramentos de um provedor")
+    buscar.add_argument('tickers', nargs='+')
+    buscar.add_argument('--provedor', choices=['yfinance'], default='yfinance')
+    alertas = subparsers.add_parser('alertas', help="Serviço de alertas da watchlist")
+    alertas.add_argument('config', help="Arquivo JSON com a watchlist, as regras e as saídas")
+    alertas.add_argument('--processos', type=int, help="Processos da avaliação (sobrepõe o da configuração)")
+    alertas.add_argument('--uma-vez', action='store_true', help="Executa um único ciclo e sai")
+    receptor = subparsers.add_parser('receptor', help="Receptor HTTP local para testar a saída webhook")
+    receptor.add_argument('--porta', type=int, default=8099)
+    receptor.add_argument('--host', default='127.0.0.1')
+    receptor.add_argument('--status', type=int, default=200, help="Código de resposta (500 simula falhas)")
+    args = parser.parse_args()
+    iniciar_exportacao()
+
+    if args.comando == 'retomar':
+        retomar_tarefa(args)
+        return
+    if args.comando == 'melhores':
+        listar_melhores(args)
+        return
+    if args.comando == 'gravar':
+        gravar_historicos(args)
+        return
+    if args.comando == 'importar':
+        importar_historicos(args)
+        return
+    if args.comando == 'proventos':
+        gerenciar_proventos(args)
+        return
+    if args.comando == 'alertas':
+        executar_alertas(args)
+        return
+    if args.comando == 'receptor':
+        executar_receptor(args)
+        return
+
+    config = carregar_config(args.config)
+    if args.saida:
+        config['saida'] = args.saida
+    if args.formato:
+        config['formato'] = args.formato
+    os.makedirs(config['saida'], exist_ok=True)
+
+    if args.comando == 'backtest':
+        executar_backtests(config, args)
+    else:
+        executar_otimizacoes(config, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,409 @@
+"""
+Alertas da watchlist
+
+Serviço que, a cada intervalo, atualiza as barras de uma lista de ações e avalia na última
+barra de cada uma as regras de entrada das estratégias de core.estrategias, as mesmas do
+backtest (por exemplo rsi_macd: RSI abaixo de rsi_oversold com MACD acima do sinal, ou RSI
+acima de rsi_overbought com MACD abaixo do sinal; score: score de operação com módulo de
+pelo menos limiar_score)
+
+As barras são buscadas em lotes, respeitando um limite de requisições por minuto; ações que
+voltam com limite de requisições atingido são buscadas de novo com espera crescente. A
+avaliação roda em um pool de processos, como a otimização. Cada alerta é identificado por
+ação, regra, direção e data da barra, e é entregue uma única vez a cada saída (webhook ou
+arquivo JSON lines): as entregas ficam registradas em dados/alertas.sqlite, que sobrevive a
+reinícios do serviço. Uma saída que falha recebe os alertas pendentes no ciclo seguinte.
+
+Uso: python cli.py alertas watchlist.json (veja watchlist_exemplo.json)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from core.banco import conectar
+from core.estrategias import ESTRATEGIAS, sinais
+from core.instrumentacao import contar, medir
+
+logger = logging.getLogger(__name__)
+
+CAMINHO_REGISTRO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados', 'alertas.sqlite'
+)
+
+# Todas as estratégias podem ser regras de alerta; por padrão, RSI + MACD e o score
+REGRAS = list(ESTRATEGIAS)
+REGRAS_PADRAO = ['rsi_macd', 'score']
+
+CONFIG_PADRAO = {
+    'provedor': 'yfinance',
+    'periodo': '6mo',
+    'intervalo': 900,
+    'lote': 50,
+    'requisicoes_por_minuto': 30,
+    'tentativas': 3,
+    'espera_limite': 5.0,
+    'processos': 1,
+    'regras': REGRAS_PADRAO,
+    'limiar_score': 3,
+    'saidas': [],
+    'registro': CAMINHO_REGISTRO
+}
+
+# Parâmetros das regras; os mesmos nomes de core.estrategias (os ausentes valem o padrão da estratégia)
+PARAMS_PADRAO = {
+    'rsi_period': 14, 'rsi_oversold': 30, 'rsi_overbought': 70,
+    'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9,
+    'mm_curta': 20, 'mm_longa': 50
+}
+
+
+def carregar_config(caminho):
+    """Lê a configuração JSON da watchlist, completando-a com CONFIG_PADRAO"""
+    with open(caminho, 'r') as f:
+        config = json.load(f)
+
+    if not config.get('tickers'):
+        raise Exception("A configuração precisa definir ao menos um ticker em 'tickers'.")
+    for regra in config.get('regras', REGRAS_PADRAO):
+        if regra not in REGRAS:
+            raise Exception(f"Regra de alerta desconhecida: {regra}. Use uma de {', '.join(REGRAS)}.")
+
+    config = {**CONFIG_PADRAO, **config}
+    config['params'] = {**PARAMS_PADRAO, **config.get('params', {})}
+    return config
+
+
+class LimitadorTaxa:
+    """Balde de fichas: no máximo requisicoes_por_minuto requisições por minuto, com rajadas de até rajada"""
+
+    def __init__(self, requisicoes_por_minuto, rajada=1):
+        self.taxa = requisicoes_por_minuto / 60
+        self.rajada = rajada
+        self._fichas = rajada
+        self._ultimo = time.monotonic()
+
+    def aguardar(self):
+        """Espera até haver uma ficha para a próxima requisição; retorna os segundos esperados"""
+        agora = time.monotonic()
+        self._fichas = min(self.rajada, self._fichas + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+        espera = 0.0
+        if self._fichas < 1:
+            espera = (1 - self._fichas) / self.taxa
+            time.sleep(espera)
+            self._fichas = 1
+            self._ultimo = time.monotonic()
+        self._fichas -= 1
+        return espera
+
+def _limite_atingido(resultado):
+    from api.provider import LimiteRequisicoes
+
+    return isinstance(resultado, LimiteRequisicoes)
+
+def _buscar(provedor, tickers, periodo, limitador):
+    # Uma ficha por requisição: por lote nos provedores com lote nativo, por ação nos demais
+    if provedor.native_batch:
+        limitador.aguardar()
+        try:
+            return provedor.get_stock_data_batch(tickers, periodo)
+        except Exception as e:
+            return {ticker: e for ticker in tickers}
+
+    resultados = {}
+    for ticker in tickers:
+        limitador.aguardar()
+        resultados.update(provedor.get_stock_data_batch([ticker], periodo))
+    return resultados
+
+def buscar_historicos(provedor, tickers, periodo, lote, limitador, tentativas=3, espera_inicial=5.0):
+    """
+    Históricos de todas as ações, buscados em lotes de até lote ações
+    Ações com limite de requisições atingido são buscadas de novo após espera_inicial,
+    2 * espera_inicial... segundos, até tentativas vezes.
+    Retorna um dicionário ticker -> DataFrame limpo (core.dados.limpar_historico) ou Exception
+    """
+    from core.dados import limpar_historico
+
+    resultados = {}
+    for inicio in range(0, len(tickers), lote):
+        pendentes = tickers[inicio:inicio + lote]
+        for tentativa in range(tentativas):
+            obtidos = _buscar(provedor, pendentes, periodo, limitador)
+            resultados.update(obtidos)
+            pendentes = [ticker for ticker, resultado in obtidos.items() if _limite_atingido(resultado)]
+            if not pendentes or tentativa == tentativas - 1:
+                break
+            contar('alertas_limite_requisicoes')
+            time.sleep(espera_inicial * 2 ** tentativa)
+
+    for ticker, resultado in resultados.items():
+        if not isinstance(resultado, Exception):
+            try:
+                resultados[ticker] = limpar_historico(resultado, ticker)
+            except Exception as e:
+                resultados[ticker] = e
+    return resultados
+
+def avaliar_ticker(ticker, dados, params, regras=REGRAS_PADRAO, limiar_score=3):
+    """Alertas disparados pela última barra dos dados: lista de dicionários com ticker, regra, sinal e data"""
+    from core.dataset import identificar_dataset
+    from core.features import feature, materializar
+    from core.score import PESOS_PADRAO, calcular_score
+
+    params = {**PARAMS_PADRAO, **params}
+    macd = dict(fast=params['macd_fast'], slow=params['macd_slow'], sign=params['macd_signal'])
+    # As mesmas features das colunas RSI, MACD e MACD_Signal de calcular_indicadores
+    itens = {
+        'rsi': feature('rsi', window=params['rsi_period']),
+        'macd': feature('macd', **macd),
+        'macd_sinal': feature('macd_sinal', **macd)
+    }
+    identidade = identificar_dataset(dados, ticker)
+    series = materializar(dados, list(itens.values()), identidade)
+    ultima = {nome: float(series[item].iloc[-1]) for nome, item in itens.items()}
+    # Pesos do score opcionais em params, como peso_momentum
+    pesos = {regra: params.get(f'peso_{regra}', peso) for regra, peso in PESOS_PADRAO.items()}
+    ultima['score'] = calcular_score(dados, params, pesos, identidade).iloc[-1]
+
+    base = {
+        'ticker': ticker,
+        'data': dados.index[-1].strftime('%Y-%m-%d'),
+        'preco': round(float(dados['Close'].iloc[-1]), 2),
+        'rsi': round(ultima['rsi'], 2),
+        'macd': round(ultima['macd'], 4),
+        'macd_sinal': round(ultima['macd_sinal'], 4),
+        'score': int(ultima['score'])
+    }
+
+    alertas = []
+    for regra in regras:
+        # As regras avaliam a série inteira de uma vez; o alerta é o sinal da última barra
+        compras, vendas = sinais(dados, regra, {**params, 'limiar': limiar_score}, identidade)
+        if compras[-1]:
+            alertas.append({**base, 'regra': regra, 'sinal': 'compra'})
+        elif vendas[-1]:
+            alertas.append({**base, 'regra': regra, 'sinal': 'venda'})
+    return alertas
+
+def chave_alerta(alerta):
+    """Identificador do alerta usado para não repetir entregas"""
+    return f"{alerta['ticker']}|{alerta['regra']}|{alerta['sinal']}|{alerta['data']}"
+
+# Parâmetros das regras em cada processo do pool, para não serializá-los a cada ação
+_config_worker = {}
+
+def _inicializar_worker(params, regras, limiar_score):
+    _config_worker.update(params=params, regras=regras, limiar_score=limiar_score)
+
+def _avaliar_no_worker(ticker, dados):
+    try:
+        return avaliar_ticker(ticker, dados, _config_worker['params'],
+                              _config_worker['regras'], _config_worker['limiar_score'])
+    except Exception as e:
+        return e
+
+
+class RegistroAlertas:
+    """Alertas já entregues a cada saída, em SQLite"""
+
+    def __init__(self, caminho=CAMINHO_REGISTRO):
+        self.caminho = caminho
+        self._conexao = conectar(caminho)
+        with self._conexao as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS entregas (
+                    saida TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    alerta TEXT NOT NULL,
+                    entregue_em TEXT NOT NULL,
+                    PRIMARY KEY (saida, chave)
+                )
+            """)
+
+    def pendentes(self, saida, alertas):
+        """Alertas ainda não entregues à saída"""
+        entregues = {linha[0] for linha in self._conexao.execute(
+            "SELECT chave FROM entregas WHERE saida = ?", (saida,)
+        )}
+        return [alerta for alerta in alertas if chave_alerta(alerta) not in entregues]
+
+    def registrar(self, saida, alertas):
+        agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._conexao as conexao:
+            conexao.executemany(
+                "INSERT OR IGNORE INTO entregas (saida, chave, alerta, entregue_em) VALUES (?, ?, ?, ?)",
+                [(saida, chave_alerta(alerta), json.dumps(alerta), agora) for alerta in alertas]
+            )
+
+    def fechar(self):
+        self._conexao.close()
+
+
+class SaidaArquivo:
+    """Acrescenta cada alerta como uma linha JSON ao arquivo"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.nome = f"arquivo:{os.path.abspath(caminho)}"
+
+    def enviar(self, alertas):
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        with open(self.caminho, 'a', encoding='utf-8') as f:
+            for alerta in alertas:
+                f.write(json.dumps(alerta, ensure_ascii=False) + '\n')
+
+class SaidaWebhook:
+    """Envia os alertas do ciclo em um POST JSON {"alertas": [...]}"""
+
+    def __init__(self, url, timeout=10, cabecalhos=None):
+        self.url = url
+        self.timeout = timeout
+        self.cabecalhos = cabecalhos or {}
+        self.nome = f"webhook:{url}"
+
+    def enviar(self, alertas):
+        import requests
+
+        try:
+            resposta = requests.post(self.url, json={'alertas': alertas}, headers=self.cabecalhos,
+                                     timeout=self.timeout)
+            resposta.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Erro ao enviar alertas para {self.url}: {str(e)}")
+
+def criar_saida(config):
+    """Saída a partir da configuração, por exemplo {"tipo": "webhook", "url": "http://..."}"""
+    tipo = config.get('tipo')
+    if tipo == 'webhook':
+        return SaidaWebhook(config['url'], config.get('timeout', 10), config.get('cabecalhos'))
+    if tipo == 'arquivo':
+        return SaidaArquivo(config['caminho'])
+    raise Exception(f"Tipo de saída de alertas desconhecido: {tipo}. Use webhook ou arquivo.")
+
+
+@medir('alertas.ciclo')
+def executar_ciclo(config, provedor, limitador, registro, saidas, executor=None):
+    """
+    Atualiza as barras, avalia as regras em todas as ações e entrega os alertas novos
+    executor: ProcessPoolExecutor iniciado com _inicializar_worker, ou None para avaliar no processo atual
+    Retorna um resumo com as ações avaliadas, as falhas, os alertas disparados e os entregues por saída
+    """
+    with medir('alertas.busca'):
+        historicos = buscar_historicos(provedor, config['tickers'], config['periodo'], config['lote'],
+                                       limitador, config['tentativas'], config['espera_limite'])
+
+    falhas = {ticker: str(resultado) for ticker, resultado in historicos.items()
+              if isinstance(resultado, Exception)}
+    validos = {ticker: dados for ticker, dados in historicos.items() if ticker not in falhas}
+
+    with medir('alertas.avaliacao'):
+        if executor is None:
+            _inicializar_worker(config['params'], config['regras'], config['limiar_score'])
+            resultados = [_avaliar_no_worker(ticker, dados) for ticker, dados in validos.items()]
+        else:
+            resultados = list(executor.map(_avaliar_no_worker, validos.keys(), validos.values()))
+
+    alertas = []
+    avaliadas = 0
+    for ticker, resultado in zip(validos, resultados):
+        if isinstance(resultado, Exception):
+            falhas[ticker] = str(resultado)
+        else:
+            avaliadas += 1
+            alertas.extend(resultado)
+    for ticker in config['tickers']:
+        contar('alertas_acoes', resultado='falha' if ticker in falhas else 'avaliada')
+
+    entregues = {}
+    for saida in saidas:
+        pendentes = registro.pendentes(saida.nome, alertas)
+        entregues[saida.nome] = 0
+        if not pendentes:
+            continue
+        try:
+            saida.enviar(pendentes)
+        except Exception as e:
+            # Não registrados: os alertas voltam a ser enviados no próximo ciclo
+            logger.warning("Falha na saída %s: %s", saida.nome, e)
+            contar('alertas_entregas', resultado='falha')
+            continue
+        registro.registrar(saida.nome, pendentes)
+        entregues[saida.nome] = len(pendentes)
+        for _ in pendentes:
+            contar('alertas_entregas', resultado='entregue')
+
+    return {
+        'avaliadas': avaliadas,
+        'falhas': falhas,
+        'alertas': alertas,
+        'entregues': entregues
+    }
+
+def executar_servico(config, uma_vez=False, parar=None, callback=None):
+    """
+    Executa um ciclo a cada config['intervalo'] segundos até parar (threading.Event) ser acionado
+    uma_vez: executa um único ciclo e retorna seu resumo
+    callback: função chamada como callback(resumo) ao fim de cada ciclo
+    """
+    from api.provider import obter_provedor
+
+    parar = parar or threading.Event()
+    provedor = obter_provedor(config['provedor'])
+    limitador = LimitadorTaxa(config['requisicoes_por_minuto'])
+    registro = RegistroAlertas(config['registro'])
+    saidas = [criar_saida(saida) for saida in config['saidas']]
+    executor = None
+    if config['processos'] > 1:
+        executor = ProcessPoolExecutor(max_workers=config['processos'], initializer=_inicializar_worker,
+                                       initargs=(config['params'], config['regras'], config['limiar_score']))
+
+    try:
+        while True:
+            inicio = time.monotonic()
+            resumo = executar_ciclo(config, provedor, limitador, registro, saidas, executor)
+            if callback:
+                callback(resumo)
+            if uma_vez:
+                return resumo
+            if parar.wait(max(0.0, config['intervalo'] - (time.monotonic() - inicio))):
+                return resumo
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        registro.fechar()
+
+def iniciar_receptor(porta=0, host='127.0.0.1', status=200, ao_receber=None):
+    """
+    Servidor HTTP local que guarda os alertas recebidos por POST, para testar a saída webhook
+    status: código de resposta, por exemplo 500 para simular falhas do destino
+    ao_receber: função chamada com cada corpo JSON aceito
+    Retorna (servidor, recebidos): a URL é f"http://{host}:{servidor.server_port}/",
+    recebidos é a lista dos corpos JSON recebidos e servidor.shutdown() encerra o receptor
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    recebidos = []
+
+    class Receptor(BaseHTTPRequestHandler):
+        def do_POST(self):
+            corpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if status < 300:
+                recebidos.append(json.loads(corpo))
+                if ao_receber:
+                    ao_receber(recebidos[-1])
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, porta), Receptor)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, recebidos
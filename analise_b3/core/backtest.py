@@ -0,0 +1,146 @@
+from core import estrategias
+from core.instrumentacao import medir
+
+
+@medir('backtest')
+def executar_backtest(dados, params, capital_inicial, niveis=None, sinais=None, tendencia=None,
+                      estrategia=estrategias.ESTRATEGIA_PADRAO, identidade=None):
+    """
+    Executa o backtesting de uma estratégia (core.estrategias) com parâmetros específicos
+    niveis: tupla (resistências, suportes) usada para filtrar as entradas, ou None
+    sinais: Series alinhada aos dados com 1 (compra), -1 (venda) ou 0 em cada barra, que
+        substitui as regras da estratégia (por exemplo core.score.sinais_do_score)
+    tendencia: Series alinhada aos dados com 1 (alta), -1 (baixa) ou 0, que confirma as
+        entradas: compra só em alta e venda só em baixa (por exemplo a tendência semanal de
+        core.multitemporal.tendencia_superior)
+    identidade: IdentidadeDataset dos dados, se já calculada (chave das features das regras)
+    """
+    import numpy as np
+    import pandas as pd
+    
+    # Parâmetros ausentes, inclusive stop loss e take profit, valem o padrão da estratégia
+    params = {**estrategias.obter_estrategia(estrategia).padrao, **params}
+    
+    # Sinais de todas as barras calculados de uma vez; o laço só acompanha a posição
+    fechamento = dados['Close'].to_numpy()
+    if sinais is None:
+        compras, vendas = estrategias.sinais(dados, estrategia, params, identidade)
+    else:
+        compras = sinais.to_numpy() > 0
+        vendas = sinais.to_numpy() < 0
+    
+    if niveis is not None:
+        resistance_levels, support_levels = niveis
+        # Compra acima de algum suporte, venda abaixo de alguma resistência
+        compras = compras & (fechamento > min(support_levels, default=np.inf))
+        vendas = vendas & (fechamento < max(resistance_levels, default=-np.inf))
+    
+    if tendencia is not None:
+        compras = compras & (tendencia.to_numpy() > 0)
+        vendas = vendas & (tendencia.to_numpy() < 0)
+    
+    # Inicializar variáveis
+    capital = capital_inicial
+    posicao = 0  # 0: sem posição, 1: comprado, -1: vendido
+    preco_entrada = 0
+    operacoes = []
+    
+    # Listas do Python: o acesso por posição é muito mais rápido que .iloc a cada barra
+    datas = dados.index
+    precos = fechamento.tolist()
+    compras = compras.tolist()
+    vendas = vendas.tolist()
+    
+    for i in range(1, len(precos)):
+        preco_atual = precos[i]
+        sinal_compra = compras[i]
+        sinal_venda = vendas[i]
+        
+        # Verificar stop loss e take profit
+        if posicao != 0:
+            variacao = ((preco_atual - preco_entrada) / preco_entrada) * 100
+            
+            if (posicao == 1 and variacao <= -params['stop_loss']) or \
+               (posicao == 1 and variacao >= params['take_profit']) or \
+               (posicao == -1 and variacao >= params['stop_loss']) or \
+               (posicao == -1 and variacao <= -params['take_profit']):
+                
+                # Fechar posição
+                resultado = capital * (variacao / 100)
+                capital += resultado
+                operacoes.append({
+                    'data': datas[i],
+                    'tipo': 'Fechamento',
+                    'preco': preco_atual,
+                    'resultado': resultado,
+                    'capital': capital
+                })
+                posicao = 0
+                preco_entrada = 0
+        
+        # Executar operações
+        if posicao == 0:  # Sem posição
+            if sinal_compra:
+                posicao = 1
+                preco_entrada = preco_atual
+                operacoes.append({
+                    'data': datas[i],
+                    'tipo': 'Compra',
+                    'preco': preco_atual,
+                    'resultado': 0,
+                    'capital': capital
+                })
+            elif sinal_venda:
+                posicao = -1
+                preco_entrada = preco_atual
+                operacoes.append({
+                    'data': datas[i],
+                    'tipo': 'Venda',
+                    'preco': preco_atual,
+                    'resultado': 0,
+                    'capital': capital
+                })
+    
+    return pd.DataFrame(operacoes)
+
+@medir('metricas')
+def calcular_metricas(operacoes, capital_inicial):
+    """Calcula métricas de performance"""
+    import numpy as np
+    
+    if len(operacoes) == 0:
+        return {
+            'retorno_total': 0,
+            'num_operacoes': 0,
+            'taxa_acerto': 0,
+            'sharpe_ratio': 0,
+            'max_drawdown': 0
+        }
+    
+    resultado_total = operacoes['resultado'].sum()
+    retorno_total = (resultado_total / capital_inicial) * 100
+    num_operacoes = len(operacoes[operacoes['tipo'].isin(['Compra', 'Venda'])])
+    operacoes_lucrativas = len(operacoes[operacoes['resultado'] > 0])
+    taxa_acerto = (operacoes_lucrativas / num_operacoes * 100) if num_operacoes > 0 else 0
+    
+    # Sharpe dos retornos da curva de capital, que só muda nos fechamentos, anualizado pelo
+    # número de operações encerradas por ano; 0 sem ao menos dois retornos com dispersão
+    curva = np.concatenate([[capital_inicial],
+                            operacoes.loc[operacoes['tipo'] == 'Fechamento', 'capital'].to_numpy(dtype='float64')])
+    retornos = curva[1:] / curva[:-1] - 1
+    anos = (operacoes['data'].iloc[-1] - operacoes['data'].iloc[0]).days / 365.25
+    sharpe_ratio = 0
+    if len(retornos) > 1 and anos > 0 and retornos.std(ddof=1) > 0:
+        sharpe_ratio = np.sqrt(len(retornos) / anos) * retornos.mean() / retornos.std(ddof=1)
+    
+    # Drawdown máximo do capital após cada operação, em % (negativo: quanto maior, melhor)
+    capital = np.concatenate([[capital_inicial], operacoes['capital'].to_numpy(dtype='float64')])
+    max_drawdown = (capital / np.maximum.accumulate(capital) - 1).min() * 100
+    
+    return {
+        'retorno_total': float(retorno_total),
+        'num_operacoes': int(num_operacoes),
+        'taxa_acerto': float(taxa_acerto),
+        'sharpe_ratio': float(sharpe_ratio),
+        'max_drawdown': float(max_drawdown)
+    }
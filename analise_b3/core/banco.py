@@ -0,0 +1,11 @@
+import os
+import sqlite3
+
+
+def conectar(caminho):
+    """Abre uma conexão SQLite em modo WAL, que permite leituras durante as escritas de outros processos"""
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    conexao = sqlite3.connect(caminho, timeout=30)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.execute("PRAGMA synchronous=NORMAL")
+    return conexao
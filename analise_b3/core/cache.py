@@ -0,0 +1,221 @@
+"""
+Cache compartilhado entre processos
+
+O st.cache_data vale apenas para o processo do Streamlit que o criou. Com vários
+processos atrás de um balanceador, cada um buscaria e recalcularia os mesmos dados.
+Este módulo oferece um backend de cache em disco (SQLite) compartilhado por todos os
+processos da máquina, com expiração por TTL, tamanho limitado com descarte LRU e
+DataFrames serializados em Parquet.
+
+Configuração por variáveis de ambiente:
+    ANALISE_B3_CACHE         caminho do arquivo SQLite, ou "desativado"
+    ANALISE_B3_CACHE_MAX_MB  tamanho máximo do cache em MB (padrão 512)
+"""
+import functools
+import hashlib
+import inspect
+import io
+import os
+import pickle
+import threading
+import time
+
+from core.banco import conectar
+from core.instrumentacao import contar, medir
+
+CAMINHO_PADRAO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados', 'cache.sqlite'
+)
+
+
+def _ler_parquet(conteudo):
+    import pandas as pd
+    return pd.read_parquet(io.BytesIO(conteudo))
+
+class _Serializador(pickle.Pickler):
+    """Pickle que grava DataFrames em Parquet, inclusive dentro de tuplas, listas e dicts"""
+    def reducer_override(self, obj):
+        import pandas as pd
+        if isinstance(obj, pd.DataFrame):
+            try:
+                buffer = io.BytesIO()
+                obj.to_parquet(buffer)
+                return _ler_parquet, (buffer.getvalue(),)
+            except (ImportError, ValueError, TypeError):
+                # Sem pyarrow ou com colunas que o Parquet não aceita: usa o pickle padrão
+                return NotImplemented
+        return NotImplemented
+
+@medir('cache.serializacao')
+def serializar(valor):
+    buffer = io.BytesIO()
+    _Serializador(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(valor)
+    return buffer.getvalue()
+
+@medir('cache.desserializacao')
+def desserializar(conteudo):
+    return pickle.loads(conteudo)
+
+
+class BackendCache:
+    """
+    Interface dos backends de cache
+    Outros backends (ex.: um servidor chave-valor local) só precisam implementar estes métodos
+    """
+    def obter(self, chave):
+        """Retorna (encontrado, valor)"""
+        raise NotImplementedError
+
+    def gravar(self, chave, valor, ttl=None):
+        raise NotImplementedError
+
+    def limpar(self):
+        raise NotImplementedError
+
+
+class CacheSQLite(BackendCache):
+    """Cache em um arquivo SQLite (modo WAL), seguro para vários processos e threads"""
+
+    def __init__(self, caminho=CAMINHO_PADRAO, tamanho_maximo=512 * 1024 * 1024):
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self._local = threading.local()
+
+        with self._conexao() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS entradas (
+                    chave TEXT PRIMARY KEY,
+                    valor BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    expira_em REAL,
+                    ultimo_acesso REAL NOT NULL
+                )
+            """)
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entradas_ultimo_acesso ON entradas (ultimo_acesso)"
+            )
+
+    def _conexao(self):
+        # Conexões SQLite não podem ser compartilhadas entre threads
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = conectar(self.caminho)
+            self._local.conexao = conexao
+        return conexao
+
+    def obter(self, chave):
+        agora = time.time()
+        conexao = self._conexao()
+        linha = conexao.execute(
+            "SELECT valor, ultimo_acesso FROM entradas WHERE chave = ? AND (expira_em IS NULL OR expira_em > ?)",
+            (chave, agora)
+        ).fetchone()
+        if linha is None:
+            return False, None
+
+        # Para o LRU basta uma precisão de minutos, o que evita uma escrita a cada leitura
+        if agora - linha[1] > 60:
+            with conexao:
+                conexao.execute("UPDATE entradas SET ultimo_acesso = ? WHERE chave = ?", (agora, chave))
+        return True, desserializar(linha[0])
+
+    def gravar(self, chave, valor, ttl=None):
+        conteudo = serializar(valor)
+        if len(conteudo) > self.tamanho_maximo:
+            return
+
+        agora = time.time()
+        conexao = self._conexao()
+        with conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO entradas (chave, valor, tamanho, expira_em, ultimo_acesso) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (chave, conteudo, len(conteudo), agora + ttl if ttl else None, agora)
+            )
+            self._descartar(conexao, agora)
+
+    def _descartar(self, conexao, agora):
+        """Remove entradas expiradas e, se preciso, as menos usadas recentemente"""
+        conexao.execute("DELETE FROM entradas WHERE expira_em IS NOT NULL AND expira_em <= ?", (agora,))
+        excesso = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()[0] - self.tamanho_maximo
+        if excesso <= 0:
+            return
+
+        removidas = []
+        for chave, tamanho in conexao.execute("SELECT chave, tamanho FROM entradas ORDER BY ultimo_acesso"):
+            removidas.append((chave,))
+            excesso -= tamanho
+            if excesso <= 0:
+                break
+        conexao.executemany("DELETE FROM entradas WHERE chave = ?", removidas)
+
+    def limpar(self):
+        with self._conexao() as conexao:
+            conexao.execute("DELETE FROM entradas")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def obter_backend():
+    """Backend configurado para o processo, ou None se o cache compartilhado estiver desativado"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                caminho = os.environ.get('ANALISE_B3_CACHE', CAMINHO_PADRAO)
+                if caminho.lower() == 'desativado':
+                    _backend = False
+                else:
+                    tamanho_maximo = int(os.environ.get('ANALISE_B3_CACHE_MAX_MB', 512)) * 1024 * 1024
+                    _backend = CacheSQLite(caminho, tamanho_maximo)
+    return _backend or None
+
+def definir_backend(backend):
+    """Troca o backend do processo (None desativa o cache compartilhado)"""
+    global _backend
+    _backend = backend if backend is not None else False
+
+def cache_compartilhado(ttl=None, nome=None):
+    """
+    Decorador que guarda o resultado da função no backend compartilhado
+    Assim como no st.cache_data, parâmetros iniciados por "_" (e self) não entram na chave.
+    ttl: segundos até a entrada expirar (None = sem expiração, apenas LRU)
+    nome: prefixo da chave; necessário para funções definidas nas páginas, que rodam como __main__
+    """
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+        prefixo = nome or f"{funcao.__module__}.{funcao.__qualname__}"
+
+        @functools.wraps(funcao)
+        def wrapper(*args, **kwargs):
+            backend = obter_backend()
+            if backend is None:
+                return funcao(*args, **kwargs)
+
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            chaveados = tuple(
+                (parametro, valor) for parametro, valor in argumentos.arguments.items()
+                if parametro != 'self' and not parametro.startswith('_')
+            )
+            chave = f"{prefixo}:{hashlib.blake2b(pickle.dumps(chaveados, protocol=4), digest_size=16).hexdigest()}"
+
+            try:
+                encontrado, valor = backend.obter(chave)
+            except Exception:
+                encontrado = False
+            contar('cache', camada='compartilhado', resultado='acerto' if encontrado else 'falha')
+            if encontrado:
+                return valor
+
+            valor = funcao(*args, **kwargs)
+            try:
+                backend.gravar(chave, valor, ttl)
+            except Exception:
+                # Falhas do cache não devem impedir o uso do resultado
+                pass
+            return valor
+
+        return wrapper
+    return decorador
@@ -0,0 +1,227 @@
+"""
+Calendário de pregões da B3 e validação das séries diárias
+
+Os pregões são os dias úteis menos os feriados em que a B3 não abre:
+- nacionais: 1º de janeiro, 21 de abril, 1º de maio, 7 de setembro, 12 de outubro, 2 e 15
+  de novembro, 25 de dezembro e, a partir de 2024, 20 de novembro;
+- móveis, pela Páscoa: segunda e terça de Carnaval, Sexta-feira Santa e Corpus Christi;
+- 24 e 31 de dezembro, sem pregão;
+- de São Paulo até 2021 (25 de janeiro, 9 de julho e 20 de novembro), quando a B3 passou
+  a abrir nesses dias.
+As datas em que a B3 não seguiu as regras ficam em SESSOES_EXTRAS (abriu em um feriado) e
+FECHAMENTOS_EXTRAS (fechou em um dia útil).
+
+O calendário de 1986 (início dos arquivos COTAHIST) até o ano seguinte ao atual é montado
+uma única vez por processo. validar confere uma série com ele de uma vez, com busca binária:
+barras em fins de semana e datas repetidas são descartadas; barras em dias que o calendário
+tem como feriado são mantidas e apontadas no relatório (o provedor pode conhecer uma
+exceção que o calendário não conhece); os pregões ausentes são apontados e, se pedido,
+preenchidos, e o relatório resume a qualidade.
+"""
+import functools
+import threading
+from datetime import date
+
+ANO_INICIAL = 1986
+
+# (mês, dia)
+FERIADOS_FIXOS = [(1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (12, 24), (12, 25), (12, 31)]
+FERIADOS_SAO_PAULO = [(1, 25), (7, 9), (11, 20)]
+ULTIMO_ANO_SAO_PAULO = 2021
+PRIMEIRO_ANO_CONSCIENCIA_NEGRA = 2024
+
+# Dias em relação ao domingo de Páscoa: segunda e terça de Carnaval, Sexta-feira Santa, Corpus Christi
+FERIADOS_MOVEIS = [-48, -47, -2, 60]
+
+# Exceções às regras, como AAAA-MM-DD
+# Em 2020 São Paulo antecipou para maio, pela COVID, os feriados de 9 de julho e 20 de novembro,
+# e a B3 abriu nas datas originais
+SESSOES_EXTRAS = ['2020-07-09', '2020-11-20']
+FECHAMENTOS_EXTRAS = []
+
+# Datas ausentes guardadas no relatório (o total vem sempre inteiro)
+MAXIMO_DATAS_RELATORIO = 20
+
+
+def pascoa(anos):
+    """Domingo de Páscoa de cada ano (algoritmo de Meeus/Jones/Butcher), como datetime64[D]"""
+    import numpy as np
+
+    a = np.asarray(anos) % 19
+    b, c = np.divmod(np.asarray(anos), 100)
+    d, e = np.divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = np.divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    mes = (h + l - 7 * m + 90) // 25
+    dia = (h + l - 7 * m + 33 * mes + 19) % 32
+    return _datas(np.asarray(anos), mes, dia)
+
+def _datas(anos, meses, dias):
+    import numpy as np
+
+    inicio_mes = (np.asarray(anos) - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (np.asarray(meses) - 1)
+    return inicio_mes.astype('datetime64[D]') + (np.asarray(dias) - 1)
+
+def feriados(ano_inicial, ano_final):
+    """Feriados da B3 entre os anos (inclusive), em ordem, como datetime64[D]"""
+    import numpy as np
+
+    anos = np.arange(ano_inicial, ano_final + 1)
+    partes = [_datas(anos, mes, dia) for mes, dia in FERIADOS_FIXOS]
+    ate_2021 = anos[anos <= ULTIMO_ANO_SAO_PAULO]
+    partes += [_datas(ate_2021, mes, dia) for mes, dia in FERIADOS_SAO_PAULO]
+    desde_2024 = anos[anos >= PRIMEIRO_ANO_CONSCIENCIA_NEGRA]
+    partes.append(_datas(desde_2024, 11, 20))
+    domingos = pascoa(anos)
+    partes += [domingos + deslocamento for deslocamento in FERIADOS_MOVEIS]
+    partes.append(np.array(FECHAMENTOS_EXTRAS, dtype='datetime64[D]'))
+    datas = np.unique(np.concatenate(partes))
+    datas = datas[~np.isin(datas, np.array(SESSOES_EXTRAS, dtype='datetime64[D]'))]
+    return datas[(datas >= np.datetime64(f'{ano_inicial}-01-01')) & (datas < np.datetime64(f'{ano_final + 1}-01-01'))]
+
+@functools.lru_cache(maxsize=None)
+def _calendario(ano_final):
+    """Pregões de ANO_INICIAL até ano_final, como datetime64[ns]"""
+    import numpy as np
+
+    dias = np.arange(np.datetime64(f'{ANO_INICIAL}-01-01'), np.datetime64(f'{ano_final + 1}-01-01'))
+    uteis = dias[np.is_busday(dias)]
+    return uteis[~np.isin(uteis, feriados(ANO_INICIAL, ano_final))].astype('datetime64[ns]')
+
+_lock = threading.Lock()
+
+def calendario(ate=None):
+    """Todos os pregões desde ANO_INICIAL até o fim do ano seguinte ao atual (ou ao ano de ate)"""
+    ano_final = max(date.today().year + 1, ate.year if ate is not None else 0)
+    with _lock:
+        return _calendario(ano_final)
+
+def pregoes(inicio, fim):
+    """Pregões entre as datas (inclusive), como DatetimeIndex"""
+    import pandas as pd
+
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    todos = calendario(fim)
+    return pd.DatetimeIndex(todos[todos.searchsorted(inicio.to_datetime64()):
+                                  todos.searchsorted(fim.to_datetime64(), side='right')])
+
+def eh_pregao(datas):
+    """Máscara das datas (DatetimeIndex ou datetime64) que são pregões da B3"""
+    import numpy as np
+
+    valores = normalizar_datas(datas)
+    if len(valores) == 0:
+        return np.zeros(0, dtype=bool)
+    todos = calendario(valores.max().astype('datetime64[D]').item())
+    posicoes = np.minimum(np.searchsorted(todos, valores), len(todos) - 1)
+    return todos[posicoes] == valores
+
+def dia_util(datas):
+    """Máscara das datas (datetime64) que caem de segunda a sexta"""
+    import numpy as np
+
+    return np.is_busday(np.asarray(datas).astype('datetime64[D]'))
+
+def normalizar_datas(datas):
+    """
+    Dias das datas no horário local, sem fuso e sem hora (o yfinance devolve meia-noite de
+    São Paulo), como array datetime64[ns]
+    """
+    import numpy as np
+
+    if getattr(datas, 'tz', None) is not None:
+        datas = datas.tz_localize(None)
+    # Pelo numpy: DatetimeIndex.normalize tenta inferir a frequência, o que custa mais que o resto
+    return np.asarray(datas, dtype='datetime64[ns]').astype('datetime64[D]').astype('datetime64[ns]')
+
+def _texto(datas):
+    """Primeiras datas, como AAAA-MM-DD, para o relatório"""
+    return [str(data) for data in datas[:MAXIMO_DATAS_RELATORIO].astype('datetime64[D]')]
+
+def validar(dados, preencher=False):
+    """
+    Confere as barras diárias com o calendário da B3
+    Descarta barras em fins de semana e datas repetidas (fica a primeira); barras em feriados
+    do calendário são mantidas, contadas como pregões e apontadas em em_feriado. Com
+    preencher, acrescenta os pregões ausentes entre a primeira e a última barra: fechamento
+    repetido nos quatro preços e volume zero
+    Retorna (dados, relatório)
+    """
+    import numpy as np
+    import pandas as pd
+
+    datas = normalizar_datas(dados.index)
+    util = dia_util(datas)
+    repetidas = pd.Index(datas).duplicated()
+    em_feriado = util & ~repetidas & ~eh_pregao(datas)
+    validos = util & ~repetidas
+    relatorio = {
+        'barras': len(dados),
+        'fim_de_semana': int((~util).sum()),
+        'datas_fim_de_semana': _texto(datas[~util]),
+        'em_feriado': int(em_feriado.sum()),
+        'datas_em_feriado': _texto(datas[em_feriado]),
+        'repetidas': int((repetidas & util).sum())
+    }
+    if not validos.all():
+        dados, datas = dados[validos], datas[validos]
+    if len(dados) == 0:
+        return dados, {**relatorio, 'pregoes': 0, 'ausentes': 0, 'datas_ausentes': [],
+                       'maior_lacuna': 0, 'cobertura': 0.0, 'preenchidas': 0}
+
+    sessoes = pregoes(datas.min(), datas.max())
+    if relatorio['em_feriado']:
+        sessoes = pd.DatetimeIndex(np.union1d(sessoes.to_numpy(), datas))
+    presentes = np.zeros(len(sessoes), dtype=bool)
+    posicoes = np.searchsorted(sessoes.to_numpy(), datas)
+    presentes[posicoes] = True
+    ausentes = sessoes[~presentes]
+    # Maior sequência de pregões ausentes seguidos: distância entre pregões presentes consecutivos
+    maior_lacuna = int(np.diff(posicoes).max()) - 1 if len(posicoes) > 1 else 0
+    relatorio.update({
+        'pregoes': len(sessoes),
+        'ausentes': len(ausentes),
+        'datas_ausentes': _texto(ausentes.to_numpy()),
+        'maior_lacuna': maior_lacuna,
+        'cobertura': float(presentes.mean()),
+        'preenchidas': 0
+    })
+    if not preencher or len(ausentes) == 0:
+        return dados, relatorio
+
+    # Cada pregão recebe a última barra presente até ele; os ausentes viram barras sem negócios
+    origem = np.cumsum(presentes) - 1
+    completos = dados.iloc[origem]
+    fechamento = completos['Close'].to_numpy()
+    colunas = {}
+    for coluna in dados.columns:
+        valores = completos[coluna].to_numpy().copy()
+        if coluna in ('Open', 'High', 'Low'):
+            valores[~presentes] = fechamento[~presentes]
+        elif coluna == 'Volume':
+            valores[~presentes] = 0
+        colunas[coluna] = valores
+    indice = sessoes.tz_localize(dados.index.tz) if dados.index.tz is not None else sessoes
+    relatorio['preenchidas'] = len(ausentes)
+    return pd.DataFrame(colunas, index=indice.rename(dados.index.name)), relatorio
+
+
+_relatorios = {}
+_relatorios_lock = threading.Lock()
+
+def registrar_relatorio(nome, relatorio):
+    """Guarda o relatório mais recente da série, para o painel de depuração"""
+    with _relatorios_lock:
+        _relatorios[nome] = relatorio
+
+def relatorios():
+    """Lista de (nome, relatório de validar) das séries validadas neste processo"""
+    with _relatorios_lock:
+        return sorted(_relatorios.items())
+
+def limpar():
+    with _relatorios_lock:
+        _relatorios.clear()
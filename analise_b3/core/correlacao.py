@@ -0,0 +1,234 @@
+"""
+Correlação e cointegração entre todas as ações do universo
+
+Os preços de fechamento das ações formam uma matriz (datas x tickers), com NaN onde a ação
+não tem pregão (IPO recente, suspensão). Cada par usa só as datas em que as duas ações têm
+preço, como DataFrame.corr, e tudo é calculado em blocos de colunas: para cada par de
+blocos, as somas de que as estatísticas precisam (contagens, somas, somas de quadrados e de
+produtos) saem de produtos de matrizes. A memória temporária fica limitada ao tamanho do
+bloco, não ao número de pares.
+
+A triagem de cointegração é o teste de Engle-Granger: regressão do log-preço de uma ação
+sobre o da outra e teste de Dickey-Fuller no resíduo (spread). As somas das duas
+regressões se expandem em somas de produtos das séries de cada ação (log-preço defasado e
+log-retorno), então também saem dos produtos de matrizes dos blocos, sem laço por par e sem
+dependências além do numpy. A estatística é comparada ao valor crítico de 5% de MacKinnon
+para duas séries com constante (-3,34).
+"""
+from core.instrumentacao import medir
+
+TAMANHO_BLOCO = 128
+
+# Valor crítico de 5% do teste de Engle-Granger com duas séries e constante (MacKinnon)
+CRITICO_ENGLE_GRANGER = -3.34
+
+
+def matriz_precos(historicos, coluna='Close'):
+    """
+    Preços de todas as ações alinhados pelo calendário da B3: DataFrame datas x tickers
+    Cada série é posicionada nos pregões por busca binária, sem uma junção de índices por ação;
+    ficam os pregões com preço de ao menos uma ação. Barras em fins de semana são ignoradas, e
+    as de dias úteis que o calendário tem como feriado (como em validar) ganham uma linha
+    """
+    import numpy as np
+    import pandas as pd
+    from core.calendario import dia_util, normalizar_datas, pregoes
+
+    datas = [normalizar_datas(dados.index) for dados in historicos.values()]
+    if not any(len(d) for d in datas):
+        return pd.DataFrame(columns=list(historicos), dtype='float64')
+    sessoes = pregoes(min(d.min() for d in datas if len(d)), max(d.max() for d in datas if len(d))).to_numpy()
+
+    def posicionar(sessoes):
+        precos = np.full((len(sessoes), len(historicos)), np.nan)
+        extras = []
+        for coluna_matriz, (dados, datas_acao) in enumerate(zip(historicos.values(), datas)):
+            posicoes = np.minimum(np.searchsorted(sessoes, datas_acao), len(sessoes) - 1)
+            no_calendario = sessoes[posicoes] == datas_acao
+            precos[posicoes[no_calendario], coluna_matriz] = dados[coluna].to_numpy(dtype='float64')[no_calendario]
+            if not no_calendario.all():
+                fora = datas_acao[~no_calendario]
+                extras.append(fora[dia_util(fora)])
+        return precos, extras
+
+    precos, extras = posicionar(sessoes)
+    # Barras em feriados do calendário são raras: só então as sessões são estendidas e as séries reposicionadas
+    if any(len(e) for e in extras):
+        sessoes = np.union1d(sessoes, np.concatenate(extras))
+        precos, _ = posicionar(sessoes)
+    com_preco = ~np.isnan(precos).all(axis=1)
+    return pd.DataFrame(precos[com_preco], index=pd.DatetimeIndex(sessoes[com_preco]), columns=list(historicos))
+
+def matriz_retornos(precos):
+    """Log-retornos diários; NaN onde a ação não tem preço no dia ou no anterior"""
+    import numpy as np
+
+    return np.log(precos).diff().iloc[1:]
+
+def _series_por_ticker(precos):
+    """
+    Séries de cada ação usadas nas somas, com zero nas datas sem retorno:
+    retornos (log), máscara dos retornos, log-preço do dia anterior (centrado pela média
+    da ação, o que não muda as regressões e evita perda de precisão nas somas) e
+    log-preço e máscara de todas as datas
+    """
+    import numpy as np
+
+    log_precos = np.log(precos.to_numpy(dtype='float64'))
+    validos = np.isfinite(log_precos)
+    log_precos = log_precos - np.nanmean(np.where(validos, log_precos, np.nan), axis=0)
+    log_precos = np.where(validos, log_precos, 0.0)
+
+    retornos = log_precos[1:] - log_precos[:-1]
+    validos_retorno = validos[1:] & validos[:-1]
+    retornos = np.where(validos_retorno, retornos, 0.0)
+    anteriores = np.where(validos_retorno, log_precos[:-1], 0.0)
+    return retornos, validos_retorno.astype('float64'), anteriores, log_precos, validos.astype('float64')
+
+def _correlacao(r_a, m_a, r_b, m_b, n):
+    """Correlação dos retornos de cada par de colunas, nas datas em que os dois têm retorno"""
+    import numpy as np
+
+    soma_a, soma_b = r_a.T @ m_b, m_a.T @ r_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariancia = r_a.T @ r_b - soma_a * soma_b / n
+        variancia_a = (r_a * r_a).T @ m_b - soma_a ** 2 / n
+        variancia_b = m_a.T @ (r_b * r_b) - soma_b ** 2 / n
+        return covariancia / np.sqrt(variancia_a * variancia_b), soma_a, soma_b
+
+def _engle_granger(a, b, n, soma_ra, soma_rb):
+    """
+    Beta (hedge ratio de a contra b), estatística de Dickey-Fuller do spread e meia-vida
+    a, b: tuplas (retornos, máscara dos retornos, log-preço anterior, log-preço, máscara) de cada bloco
+    n, soma_ra, soma_rb: contagem e somas dos retornos nas datas em comum, já calculadas na correlação
+    """
+    import numpy as np
+
+    r_a, m_a, p_a, l_a, v_a = a
+    r_b, m_b, p_b, l_b, v_b = b
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Regressão do log-preço de a sobre o de b, nas datas em que os dois têm preço
+        n0 = v_a.T @ v_b
+        soma_la, soma_lb = l_a.T @ v_b, v_a.T @ l_b
+        beta = ((l_a.T @ l_b - soma_la * soma_lb / n0)
+                / (v_a.T @ (l_b * l_b) - soma_lb ** 2 / n0))
+        alfa = (soma_la - beta * soma_lb) / n0
+
+        # Dickey-Fuller: x = spread(t-1) = pa - alfa - beta * pb, y = Δspread = ra - beta * rb,
+        # com as somas expandidas em produtos das séries de cada ação
+        soma_pa, soma_pb = p_a.T @ m_b, m_a.T @ p_b
+        soma_x = soma_pa - n * alfa - beta * soma_pb
+        soma_y = soma_ra - beta * soma_rb
+        soma_xx = ((p_a * p_a).T @ m_b + beta ** 2 * (m_a.T @ (p_b * p_b)) + n * alfa ** 2
+                   - 2 * beta * (p_a.T @ p_b) - 2 * alfa * soma_pa + 2 * alfa * beta * soma_pb)
+        soma_yy = ((r_a * r_a).T @ m_b - 2 * beta * (r_a.T @ r_b) + beta ** 2 * (m_a.T @ (r_b * r_b)))
+        soma_xy = ((p_a * r_a).T @ m_b - beta * (p_a.T @ r_b) - alfa * soma_ra + alfa * beta * soma_rb
+                   - beta * (r_a.T @ p_b) + beta ** 2 * (m_a.T @ (p_b * r_b)))
+
+        sxx = soma_xx - soma_x ** 2 / n
+        sxy = soma_xy - soma_x * soma_y / n
+        syy = soma_yy - soma_y ** 2 / n
+        gama = sxy / sxx
+        residuo = np.maximum(syy - gama * sxy, 0.0)
+        estatistica = gama / np.sqrt(residuo / (n - 2) / sxx)
+        meia_vida = np.where(gama < 0, -np.log(2) / np.log1p(gama), np.nan)
+    return beta, estatistica, meia_vida
+
+def _blocos(series, bloco, min_observacoes, cointegracao):
+    """Gera (início da linha, início da coluna, estatísticas) de cada par de blocos i <= j"""
+    import numpy as np
+
+    n_tickers = series[0].shape[1]
+    for i in range(0, n_tickers, bloco):
+        a = tuple(serie[:, i:i + bloco] for serie in series)
+        for j in range(i, n_tickers, bloco):
+            b = tuple(serie[:, j:j + bloco] for serie in series)
+            n = a[1].T @ b[1]
+            correlacao, soma_ra, soma_rb = _correlacao(a[0], a[1], b[0], b[1], n)
+            poucas = n < min_observacoes
+            correlacao[poucas | ~np.isfinite(correlacao)] = np.nan
+            estatisticas = {'correlacao': np.clip(correlacao, -1.0, 1.0), 'observacoes': n}
+            if cointegracao:
+                beta, estatistica, meia_vida = _engle_granger(a, b, n, soma_ra, soma_rb)
+                estatistica[poucas | ~np.isfinite(estatistica)] = np.nan
+                estatisticas.update(beta=beta, estatistica_adf=estatistica, meia_vida=meia_vida)
+            yield i, j, estatisticas
+
+@medir('correlacao.matriz')
+def correlacao_em_blocos(precos, bloco=TAMANHO_BLOCO, min_observacoes=20):
+    """
+    Matriz de correlação dos log-retornos (tickers x tickers), par a par nas datas em comum
+    Pares com menos de min_observacoes retornos em comum ficam NaN
+    """
+    import numpy as np
+    import pandas as pd
+
+    n_tickers = precos.shape[1]
+    matriz = np.full((n_tickers, n_tickers), np.nan, dtype='float32')
+    for i, j, estatisticas in _blocos(_series_por_ticker(precos), bloco, min_observacoes, False):
+        correlacao = estatisticas['correlacao']
+        matriz[i:i + correlacao.shape[0], j:j + correlacao.shape[1]] = correlacao
+        matriz[j:j + correlacao.shape[1], i:i + correlacao.shape[0]] = correlacao.T
+    return pd.DataFrame(matriz, index=precos.columns, columns=precos.columns)
+
+@medir('correlacao.pares')
+def escanear_pares(precos, janela=60, correlacao_minima=0.5, apenas_cointegrados=False,
+                   bloco=TAMANHO_BLOCO, min_observacoes=60):
+    """
+    Todos os pares do universo com correlação dos retornos de pelo menos correlacao_minima
+    (e cointegrados, com apenas_cointegrados), sem montar as matrizes inteiras
+    Retorna um DataFrame ordenado pela estatística de Engle-Granger (mais negativa primeiro)
+    com acao_a, acao_b, correlacao, correlacao_janela (últimas janela datas), observacoes,
+    beta (log a = alfa + beta * log b), estatistica_adf, cointegrado e meia_vida (em pregões)
+    """
+    import numpy as np
+    import pandas as pd
+
+    partes = {'a': [], 'b': [], **{nome: [] for nome in ['correlacao', 'observacoes', 'beta',
+                                                          'estatistica_adf', 'meia_vida']}}
+    for i, j, estatisticas in _blocos(_series_por_ticker(precos), bloco, min_observacoes, True):
+        selecionados = estatisticas['correlacao'] >= correlacao_minima
+        if apenas_cointegrados:
+            selecionados &= estatisticas['estatistica_adf'] < CRITICO_ENGLE_GRANGER
+        if i == j:
+            # No bloco da diagonal, só os pares acima dela
+            selecionados &= np.triu(np.ones_like(selecionados), k=1)
+        linhas, colunas = np.nonzero(selecionados)
+        partes['a'].append(i + linhas)
+        partes['b'].append(j + colunas)
+        for nome, valores in estatisticas.items():
+            partes[nome].append(valores[linhas, colunas])
+    partes = {nome: np.concatenate(valores) for nome, valores in partes.items()}
+
+    # Correlação recente, só entre as ações que aparecem em algum par
+    envolvidos, posicoes = np.unique(np.concatenate([partes['a'], partes['b']]), return_inverse=True)
+    recente = correlacao_em_blocos(precos.iloc[-(janela + 1):, envolvidos], bloco,
+                                   min_observacoes=max(2, janela // 2)).to_numpy()
+    posicao_a, posicao_b = posicoes[:len(partes['a'])], posicoes[len(partes['a']):]
+
+    tickers = precos.columns.to_numpy()
+    pares = pd.DataFrame({
+        'acao_a': tickers[partes['a']],
+        'acao_b': tickers[partes['b']],
+        'correlacao': partes['correlacao'],
+        'correlacao_janela': recente[posicao_a, posicao_b].astype('float64'),
+        'observacoes': partes['observacoes'].astype('int64'),
+        'beta': partes['beta'],
+        'estatistica_adf': partes['estatistica_adf'],
+        'cointegrado': partes['estatistica_adf'] < CRITICO_ENGLE_GRANGER,
+        'meia_vida': partes['meia_vida']
+    })
+    return pares.sort_values('estatistica_adf', na_position='last', ignore_index=True)
+
+def correlacao_movel(precos, acao_a, acao_b, janela=60):
+    """Correlação móvel dos log-retornos de um par, em janelas de janela datas"""
+    retornos = matriz_retornos(precos[[acao_a, acao_b]])
+    return retornos[acao_a].rolling(janela, min_periods=max(2, janela // 2)).corr(retornos[acao_b])
+
+def spread_do_par(precos, acao_a, acao_b, beta):
+    """Spread log(a) - beta * log(b) e seu z-score (desvios da média do período)"""
+    import numpy as np
+
+    spread = np.log(precos[acao_a]) - beta * np.log(precos[acao_b])
+    return spread, (spread - spread.mean()) / spread.std()
@@ -0,0 +1,198 @@
+"""
+Importação das séries históricas da B3 (arquivos COTAHIST)
+
+A B3 publica o histórico diário de todos os papéis em arquivos texto de registros de
+tamanho fixo (COTAHIST_AAAA.TXT, um por ano, em geral dentro de um .ZIP), desde 1986.
+Cada linha tem 245 caracteres: o registro 00 é o cabeçalho, o 99 é o rodapé e os 01 são as
+cotações, um por papel, mercado e pregão.
+
+O arquivo não é lido linha a linha: os bytes são mapeados em memória (np.memmap) e vistos
+como uma matriz (linhas x tamanho da linha). O filtro do tipo de registro, do mercado e do
+código BDI é uma comparação de colunas dessa matriz, e cada campo numérico é decodificado
+de uma vez para todas as linhas selecionadas, dígito a dígito. Um ano inteiro, com todas as
+opções e termos, é filtrado e decodificado em menos de um segundo.
+
+Os preços são os negociados, sem ajuste de proventos, e anteriores a julho de 1994 estão
+na moeda da época. O volume é a quantidade de papéis negociados, como no yfinance.
+"""
+import os
+
+from core.instrumentacao import medir
+
+TAMANHO_REGISTRO = 245
+
+# Posições (início e fim, contadas a partir de 1) dos campos do registro 01, pelo leiaute da B3
+CAMPOS = {
+    'tipo': (1, 2),
+    'data': (3, 10),
+    'codbdi': (11, 12),
+    'codneg': (13, 24),
+    'tpmerc': (25, 27),
+    'preabe': (57, 69),
+    'premax': (70, 82),
+    'premin': (83, 95),
+    'preult': (109, 121),
+    'quatot': (153, 170),
+    'fatcot': (211, 217)
+}
+
+# Mercado à vista (lote padrão); o fracionário (020) repete os papéis com outro volume
+MERCADOS_PADRAO = ('010',)
+
+# Códigos BDI: 02 lote padrão, 05 sancionadas, 08 em recuperação judicial, 12 fundos imobiliários.
+# Ficam de fora direitos, recibos, bônus e os demais títulos negociados no mercado à vista.
+CODIGOS_BDI_PADRAO = ('02', '05', '08', '12')
+
+# Sufixo dos tickers gravados, o mesmo do yfinance e das páginas de backtest
+SUFIXO = '.SA'
+
+
+def _bytes(caminho):
+    """Bytes do arquivo: mapeados em memória, ou lidos do único .TXT de um .ZIP"""
+    import numpy as np
+
+    if not os.path.exists(caminho):
+        raise Exception(f"{caminho}: arquivo não encontrado.")
+    if caminho.lower().endswith('.zip'):
+        import zipfile
+
+        with zipfile.ZipFile(caminho) as arquivo:
+            nomes = [nome for nome in arquivo.namelist() if not nome.endswith('/')]
+            if len(nomes) != 1:
+                raise Exception(f"{caminho}: o ZIP deve conter um único arquivo COTAHIST.")
+            return np.frombuffer(arquivo.read(nomes[0]), dtype=np.uint8)
+    if os.path.getsize(caminho) == 0:
+        raise Exception(f"{caminho}: arquivo vazio.")
+    return np.memmap(caminho, dtype=np.uint8, mode='r')
+
+def _matriz(conteudo, caminho=''):
+    """Os registros como uma matriz de bytes (linhas x tamanho da linha, com a quebra)"""
+    import numpy as np
+
+    if bytes(conteudo[:10]) != b'00COTAHIST':
+        raise Exception(f"{caminho}: não é um arquivo COTAHIST da B3 (cabeçalho não encontrado).")
+    quebras = np.flatnonzero(conteudo[:TAMANHO_REGISTRO + 2] == ord('\n'))
+    if len(quebras) == 0 or quebras[0] < TAMANHO_REGISTRO:
+        raise Exception(f"{caminho}: registros com tamanho diferente de {TAMANHO_REGISTRO} caracteres.")
+    tamanho_linha = int(quebras[0]) + 1  # 246 com LF, 247 com CRLF
+    # Uma última linha sem quebra é o rodapé (99), que não é importado
+    n_linhas = len(conteudo) // tamanho_linha
+    return conteudo[:n_linhas * tamanho_linha].reshape(n_linhas, tamanho_linha)
+
+def _campo(linhas, nome):
+    inicio, fim = CAMPOS[nome]
+    return linhas[:, inicio - 1:fim]
+
+def _iguais(linhas, nome, valores):
+    """Máscara das linhas cujo campo é um dos valores dados"""
+    import numpy as np
+
+    campo = np.ascontiguousarray(_campo(linhas, nome)).view(f'S{CAMPOS[nome][1] - CAMPOS[nome][0] + 1}').ravel()
+    return np.isin(campo, [valor.encode('ascii') for valor in valores])
+
+def _inteiros(linhas, nome):
+    """Campo numérico (só dígitos) de todas as linhas, como int64"""
+    import numpy as np
+
+    campo = _campo(linhas, nome)
+    valores = np.zeros(len(linhas), dtype=np.int64)
+    for coluna in range(campo.shape[1]):
+        valores *= 10
+        valores += campo[:, coluna]
+        valores -= ord('0')
+    return valores
+
+def _datas(aaaammdd):
+    """Inteiros AAAAMMDD como datetime64[ns]"""
+    import numpy as np
+
+    anos = (aaaammdd // 10000 - 1970).astype('datetime64[Y]')
+    meses = anos.astype('datetime64[M]') + (aaaammdd // 100 % 100 - 1).astype('timedelta64[M]')
+    return (meses.astype('datetime64[D]') + (aaaammdd % 100 - 1).astype('timedelta64[D]')).astype('datetime64[ns]')
+
+@medir('cotahist.ler')
+def ler_cotahist(caminho, mercados=MERCADOS_PADRAO, codigos_bdi=CODIGOS_BDI_PADRAO):
+    """
+    Cotações de um arquivo COTAHIST (.TXT ou .ZIP)
+    mercados: códigos TPMERC aceitos; codigos_bdi: códigos BDI aceitos (None aceita todos)
+    Retorna um DataFrame com as colunas ticker, Open, High, Low, Close e Volume, indexado pela
+    data do pregão, em ordem de ticker e data
+    """
+    import numpy as np
+    import pandas as pd
+
+    linhas = _matriz(_bytes(caminho), caminho)
+    selecionadas = _iguais(linhas, 'tipo', ['01'])
+    if mercados is not None:
+        selecionadas &= _iguais(linhas, 'tpmerc', mercados)
+    if codigos_bdi is not None:
+        selecionadas &= _iguais(linhas, 'codbdi', codigos_bdi)
+    # Só as linhas selecionadas saem do arquivo mapeado
+    linhas = linhas[selecionadas]
+
+    codigos, tickers = np.unique(np.ascontiguousarray(_campo(linhas, 'codneg')).view('S12').ravel(),
+                                 return_inverse=True)
+    datas = _inteiros(linhas, 'data')
+    ordem = np.lexsort((datas, tickers))
+
+    # Preços com duas casas decimais, cotados por lote de fatcot papéis (1 ou 1000)
+    divisor = 100.0 * _inteiros(linhas, 'fatcot')[ordem]
+    dados = pd.DataFrame({
+        'ticker': pd.Categorical.from_codes(
+            tickers[ordem], [codigo.decode('latin-1').strip() + SUFIXO for codigo in codigos]),
+        'Open': _inteiros(linhas, 'preabe')[ordem] / divisor,
+        'High': _inteiros(linhas, 'premax')[ordem] / divisor,
+        'Low': _inteiros(linhas, 'premin')[ordem] / divisor,
+        'Close': _inteiros(linhas, 'preult')[ordem] / divisor,
+        'Volume': _inteiros(linhas, 'quatot')[ordem].astype('float64')
+    }, index=pd.DatetimeIndex(_datas(datas[ordem]), name='Date'))
+    return dados
+
+@medir('cotahist.importar')
+def importar_cotahist(caminhos, diretorio=None, mercados=MERCADOS_PADRAO, codigos_bdi=CODIGOS_BDI_PADRAO,
+                      callback=None):
+    """
+    Lê um ou mais arquivos COTAHIST e grava as barras de cada papel no diretório do provedor
+    replay (padrão dados/barras), juntando-as às já gravadas: nas datas repetidas vale a
+    cotação importada, e em um mesmo pregão presente em mais de um arquivo, a do último.
+    Os papéis com proventos registrados têm o índice de fatores recalculado (os dividendos
+    dependem dos fechamentos); as barras continuam gravadas sem ajuste
+    callback: função chamada como callback(caminho, n_cotacoes) após a leitura de cada arquivo
+    Retorna um dicionário ticker -> número de barras gravadas
+    """
+    import numpy as np
+    import pandas as pd
+    from api.replay_provider import ReplayProvider
+    from core.proventos import normalizar_ticker, obter_proventos
+
+    destino = ReplayProvider(diretorio=diretorio) if diretorio else ReplayProvider()
+    proventos = obter_proventos()
+    com_proventos = proventos.tickers()
+
+    partes = []
+    for caminho in caminhos:
+        partes.append(ler_cotahist(caminho, mercados, codigos_bdi))
+        if callback:
+            callback(caminho, len(partes[-1]))
+    if not partes:
+        return {}
+    # Ordena por ticker e data; nos empates (o mesmo pregão em dois arquivos) mantém a ordem dos arquivos
+    cotacoes = pd.concat(partes)
+    tickers = cotacoes['ticker'].astype(str).to_numpy()
+    ordem = np.lexsort((cotacoes.index.asi8, tickers))
+    cotacoes, tickers = cotacoes.iloc[ordem].drop(columns='ticker'), tickers[ordem]
+
+    gravadas = {}
+    inicios = np.flatnonzero(np.concatenate([[True], tickers[1:] != tickers[:-1]]))
+    fins = np.concatenate([inicios[1:], [len(tickers)]])
+    for inicio, fim in zip(inicios, fins):
+        ticker = str(tickers[inicio])
+        barras = cotacoes.iloc[inicio:fim]
+        if os.path.exists(destino.caminho(ticker)):
+            barras = pd.concat([pd.read_parquet(destino.caminho(ticker)), barras])
+        barras = barras[~barras.index.duplicated(keep='last')].sort_index()
+        destino.gravar(ticker, barras)
+        gravadas[ticker] = len(barras)
+        if normalizar_ticker(ticker) in com_proventos:
+            proventos.recalcular(ticker, barras['Close'])
+    return gravadas
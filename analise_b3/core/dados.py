@@ -0,0 +1,37 @@
+def carregar_dados(ticker, periodo):
+    """
+    Carrega dados históricos da ação pelo provedor configurado
+    (yfinance por padrão; veja api.provider.obter_provedor), em float32 com ANALISE_B3_FLOAT32=1
+    """
+    from api.provider import obter_provedor
+
+    return limpar_historico(obter_provedor('yfinance').get_stock_data(ticker, periodo), ticker)
+
+def limpar_historico(hist, ticker=None, preencher=False):
+    """
+    Remove barras sem dados, em fins de semana e em datas repetidas do histórico vindo de um
+    provedor; barras em feriados do calendário da B3 são mantidas e apontadas no relatório
+    ticker: registra o relatório de qualidade (core.calendario) para o painel de depuração
+    preencher: acrescenta os pregões ausentes, com o fechamento anterior e volume zero
+    """
+    from core.calendario import registrar_relatorio, validar
+    from core.memoria import compactar
+
+    # Remove registros sem dados (mercado fechado)
+    hist = hist.dropna()
+    
+    # Verifica se há dados após a limpeza
+    if len(hist) == 0:
+        raise Exception("Não foi possível carregar dados para o período selecionado.")
+    
+    # Descarta fins de semana e datas repetidas, aponta barras em feriados e pregões ausentes
+    hist, relatorio = validar(hist, preencher)
+    if ticker:
+        registrar_relatorio(ticker, relatorio)
+    hist = compactar(hist)
+    
+    # Verifica se ainda há dados após o processamento
+    if len(hist) == 0:
+        raise Exception("Não há dados disponíveis para o período selecionado.")
+    
+    return hist
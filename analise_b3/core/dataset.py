@@ -0,0 +1,34 @@
+import hashlib
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class IdentidadeDataset:
+    """
+    Identifica um conjunto de barras OHLCV sem precisar percorrer os dados
+    Calculada uma única vez no carregamento e usada como chave dos caches de cálculo
+    """
+    ticker: str
+    intervalo: str
+    inicio: str
+    fim: str
+    n_barras: int
+    digest: str
+
+def identificar_dataset(dados, ticker, intervalo='1d'):
+    """Calcula a identidade dos dados, incluindo um digest do conteúdo"""
+    import pandas as pd
+
+    digest = hashlib.blake2b(
+        pd.util.hash_pandas_object(dados, index=True).values.tobytes(),
+        digest_size=16
+    ).hexdigest()
+
+    return IdentidadeDataset(
+        ticker=ticker,
+        intervalo=intervalo,
+        inicio=str(dados.index[0]) if len(dados) else '',
+        fim=str(dados.index[-1]) if len(dados) else '',
+        n_barras=len(dados),
+        digest=digest
+    )
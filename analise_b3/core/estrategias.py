@@ -0,0 +1,239 @@
+"""
+Estratégias de entrada do backtest, do otimizador e dos alertas
+
+Cada estratégia declara:
+- os parâmetros, com os limites dos controles, o valor padrão e a faixa padrão da otimização
+  (inteiros quando o padrão é int);
+- as features de que as regras dependem (core.features), como função dos parâmetros;
+- as regras de compra e de venda, expressões sobre arrays numpy: recebem um dicionário
+  nome -> array, com as features declaradas e as colunas OHLCV, e os parâmetros, e devolvem
+  um array booleano de todas as barras.
+
+sinais resolve as features de uma estratégia em uma única passagem do resolvedor (que as
+reaproveita entre combinações e entre estratégias: o RSI da RSI + MACD é o mesmo do score) e
+avalia as duas regras de uma vez sobre a série inteira. O laço do backtest só acompanha a
+posição. Para acrescentar uma estratégia basta declará-la em ESTRATEGIAS: a página de
+backtesting, a de otimização, a CLI e os alertas a oferecem sem outras mudanças.
+"""
+from dataclasses import dataclass
+
+from core.features import COLUNAS_BASE, feature, materializar
+from core.score import LIMIAR_PADRAO, PARAMS_PADRAO as PARAMS_SCORE, PESOS_PADRAO, feature_score
+
+ESTRATEGIA_PADRAO = 'rsi_macd'
+
+
+@dataclass(frozen=True)
+class Parametro:
+    rotulo: str
+    minimo: float
+    maximo: float
+    padrao: float
+    faixa: tuple  # (min, max) padrão da otimização
+    passo: float = None
+
+    @property
+    def inteiro(self):
+        return isinstance(self.padrao, int)
+
+
+@dataclass(frozen=True)
+class Estrategia:
+    nome: str
+    rotulo: str
+    parametros: dict  # nome -> Parametro
+    indicadores: object  # função params -> dicionário nome -> Feature
+    compra: object  # função (valores, params) -> array booleano
+    venda: object
+    descricao: str = ''
+
+    @property
+    def padrao(self):
+        return {nome: parametro.padrao for nome, parametro in self.parametros.items()}
+
+    @property
+    def faixas(self):
+        return {nome: parametro.faixa for nome, parametro in self.parametros.items()}
+
+    @property
+    def inteiros(self):
+        return [nome for nome, parametro in self.parametros.items() if parametro.inteiro]
+
+
+# Funções para as regras
+
+def anterior(valores):
+    """Valor da barra anterior (NaN na primeira)"""
+    import numpy as np
+
+    return np.concatenate([[np.nan], valores[:-1].astype('float64')])
+
+def cruzou_acima(a, b):
+    """a passou a ficar acima de b nesta barra"""
+    import numpy as np
+
+    return (a > b) & np.concatenate([[False], (a <= b)[:-1]])
+
+def cruzou_abaixo(a, b):
+    """a passou a ficar abaixo de b nesta barra"""
+    import numpy as np
+
+    return (a < b) & np.concatenate([[False], (a >= b)[:-1]])
+
+
+# Parâmetros comuns
+
+_SAIDAS = {
+    'stop_loss': Parametro('Stop Loss (%)', 1.0, 10.0, 2.0, (1.5, 3.0), 0.5),
+    'take_profit': Parametro('Take Profit (%)', 1.0, 20.0, 4.0, (3.0, 6.0), 0.5)
+}
+
+_RSI = {
+    'rsi_period': Parametro('Período RSI', 2, 30, 14, (10, 20)),
+    'rsi_overbought': Parametro('Sobrecompra', 50, 100, 70, (60, 80)),
+    'rsi_oversold': Parametro('Sobrevenda', 0, 50, 30, (20, 40))
+}
+
+_MACD = {
+    'macd_fast': Parametro('MACD Rápido', 5, 20, 12, (8, 16)),
+    'macd_slow': Parametro('MACD Lento', 20, 40, 26, (20, 30)),
+    'macd_signal': Parametro('MACD Sinal', 5, 20, 9, (7, 12))
+}
+
+
+# Estratégias
+
+def _indicadores_rsi_macd(p):
+    macd = dict(fast=p['macd_fast'], slow=p['macd_slow'], sign=p['macd_signal'])
+    # As mesmas features das colunas RSI, MACD e MACD_Signal de calcular_indicadores
+    return {
+        'RSI': feature('rsi', window=p['rsi_period']),
+        'MACD': feature('macd', **macd),
+        'MACD_Signal': feature('macd_sinal', **macd)
+    }
+
+def _indicadores_medias(p):
+    return {
+        'rapida': feature('sma', window=p['mm_rapida']),
+        'lenta': feature('sma', window=p['mm_lenta'])
+    }
+
+def _indicadores_atr(p):
+    return {'ATR': feature('atr', window=p['atr_period'])}
+
+def _rompimento(v, p, direcao):
+    """Variação do fechamento na direção dada maior que o múltiplo do ATR da barra anterior"""
+    atr = anterior(v['ATR'])
+    # O ATR do ta é zero antes da primeira janela: sem ele não há rompimento
+    return (atr > 0) & (direcao * (v['Close'] - anterior(v['Close'])) > p['atr_multiplicador'] * atr)
+
+def _indicadores_bollinger(p):
+    return {
+        'media': feature('sma', window=p['bb_period']),
+        'desvio': feature('desvio', window=p['bb_period'])
+    }
+
+def _indicadores_score(p):
+    pesos = {regra: p[f'peso_{regra}'] for regra in PESOS_PADRAO}
+    return {'score': feature_score({nome: p[nome] for nome in PARAMS_SCORE}, pesos)}
+
+ESTRATEGIAS = {estrategia.nome: estrategia for estrategia in [
+    Estrategia(
+        'rsi_macd', 'RSI + MACD',
+        {**_RSI, **_MACD, **_SAIDAS},
+        _indicadores_rsi_macd,
+        compra=lambda v, p: (v['RSI'] < p['rsi_oversold']) & (v['MACD'] > v['MACD_Signal']),
+        venda=lambda v, p: (v['RSI'] > p['rsi_overbought']) & (v['MACD'] < v['MACD_Signal']),
+        descricao="Compra com RSI em sobrevenda e MACD acima do sinal; vende no inverso"
+    ),
+    Estrategia(
+        'cruzamento_medias', 'Cruzamento de médias',
+        {
+            'mm_rapida': Parametro('Média rápida', 3, 50, 9, (5, 20)),
+            'mm_lenta': Parametro('Média lenta', 10, 200, 21, (20, 60)),
+            **_SAIDAS
+        },
+        _indicadores_medias,
+        compra=lambda v, p: cruzou_acima(v['rapida'], v['lenta']),
+        venda=lambda v, p: cruzou_abaixo(v['rapida'], v['lenta']),
+        descricao="Compra quando a média rápida cruza a lenta para cima; vende no cruzamento para baixo"
+    ),
+    Estrategia(
+        'rompimento_atr', 'Rompimento por ATR',
+        {
+            'atr_period': Parametro('Período ATR', 5, 30, 14, (10, 20)),
+            'atr_multiplicador': Parametro('Múltiplo do ATR', 0.5, 3.0, 1.0, (0.5, 2.0), 0.1),
+            **_SAIDAS
+        },
+        _indicadores_atr,
+        compra=lambda v, p: _rompimento(v, p, 1),
+        venda=lambda v, p: _rompimento(v, p, -1),
+        descricao="Compra quando o fechamento sobe mais que um múltiplo do ATR da barra anterior; vende na queda"
+    ),
+    Estrategia(
+        'bollinger', 'Reversão às bandas de Bollinger',
+        {
+            'bb_period': Parametro('Período das bandas', 5, 50, 20, (10, 30)),
+            'bb_desvios': Parametro('Desvios padrão', 1.0, 3.5, 2.0, (1.5, 2.5), 0.1),
+            **_SAIDAS
+        },
+        _indicadores_bollinger,
+        compra=lambda v, p: v['Close'] < v['media'] - p['bb_desvios'] * v['desvio'],
+        venda=lambda v, p: v['Close'] > v['media'] + p['bb_desvios'] * v['desvio'],
+        descricao="Compra com o fechamento abaixo da banda inferior; vende acima da superior"
+    ),
+    Estrategia(
+        'score', 'Score de operação',
+        {
+            **_RSI, **_MACD,
+            'mm_curta': Parametro('Média curta do score', 5, 50, PARAMS_SCORE['mm_curta'], (10, 30)),
+            'mm_longa': Parametro('Média longa do score', 20, 200, PARAMS_SCORE['mm_longa'], (40, 100)),
+            'peso_momentum': Parametro('Peso momentum (RSI + MACD)', 0, 5, PESOS_PADRAO['momentum'], (0, 5)),
+            'peso_price_action': Parametro('Peso price action (doji)', 0, 5, PESOS_PADRAO['price_action'], (0, 5)),
+            'peso_tendencia': Parametro('Peso tendência (médias)', 0, 5, PESOS_PADRAO['tendencia'], (0, 5)),
+            'limiar': Parametro('Score mínimo para entrar', 1, 15, LIMIAR_PADRAO, (1, 5)),
+            **_SAIDAS
+        },
+        _indicadores_score,
+        compra=lambda v, p: v['score'] >= p['limiar'],
+        venda=lambda v, p: v['score'] <= -p['limiar'],
+        descricao="Soma momentum (RSI e MACD), doji e tendência das médias; entra com o score além do limiar"
+    )
+]}
+
+
+def obter_estrategia(estrategia):
+    """Estrategia pelo nome (ou a própria Estrategia)"""
+    if isinstance(estrategia, Estrategia):
+        return estrategia
+    if estrategia not in ESTRATEGIAS:
+        raise Exception(f"Estratégia desconhecida: {estrategia}. Use uma de {', '.join(ESTRATEGIAS)}.")
+    return ESTRATEGIAS[estrategia]
+
+def series_indicadores(dados, estrategia, params, identidade=None):
+    """
+    Features declaradas pela estratégia, calculadas sobre dados: dicionário nome -> Series
+    params: parâmetros da estratégia; os ausentes valem o padrão
+    identidade: IdentidadeDataset dos dados, se já calculada (chave das features em memória)
+    """
+    estrategia = obter_estrategia(estrategia)
+    indicadores = estrategia.indicadores({**estrategia.padrao, **params})
+    series = materializar(dados, list(dict.fromkeys(indicadores.values())), identidade)
+    return {nome: series[item] for nome, item in indicadores.items()}
+
+def sinais(dados, estrategia, params, identidade=None):
+    """
+    Compras e vendas da estratégia em todas as barras: dois arrays booleanos
+    params: parâmetros da estratégia; os ausentes valem o padrão
+    identidade: IdentidadeDataset dos dados, se já calculada (chave das features em memória)
+    """
+    import numpy as np
+
+    estrategia = obter_estrategia(estrategia)
+    params = {**estrategia.padrao, **params}
+    valores = {coluna: dados[coluna].to_numpy() for coluna in COLUNAS_BASE if coluna in dados.columns}
+    valores.update({nome: serie.to_numpy()
+                    for nome, serie in series_indicadores(dados, estrategia, params, identidade).items()})
+    with np.errstate(invalid='ignore'):
+        return (np.asarray(estrategia.compra(valores, params), dtype=bool),
+                np.asarray(estrategia.venda(valores, params), dtype=bool))
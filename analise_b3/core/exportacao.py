@@ -0,0 +1,89 @@
+"""
+Exportação dos resultados em Arrow
+
+As tabelas (barras com indicadores, operações do backtest, resultados das otimizações)
+são convertidas uma única vez para uma pyarrow.Table: as colunas numéricas passam ao Arrow
+sem cópia linha a linha. A mesma tabela vai para a grade do Streamlit e é gravada nos
+formatos de download:
+- parquet: colunar e comprimido (zstd), o menor arquivo; lido de volta com pd.read_parquet;
+- arrow: arquivo IPC (Feather v2), sem compressão, aberto sem conversão por pyarrow e polars;
+- csv: texto, para planilhas, escrito em blocos pelo próprio Arrow.
+"""
+import os
+
+# Formato -> (extensão, tipo MIME)
+FORMATOS = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+    'csv': ('.csv', 'text/csv')
+}
+
+COMPRESSAO_PARQUET = 'zstd'
+
+
+def tabela_arrow(dados, indice=True):
+    """
+    pyarrow.Table de um DataFrame (ou a própria Table)
+    indice: mantém o índice como coluna (as datas das barras); um RangeIndex nunca é mantido
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    if isinstance(dados, pa.Table):
+        return dados
+    if indice and isinstance(dados.index, pd.RangeIndex):
+        indice = False
+    if indice and dados.index.name is None:
+        dados = dados.rename_axis('indice')
+    # Colunas object com tipos misturados (parâmetros ausentes em parte das combinações) viram texto
+    try:
+        return pa.Table.from_pandas(dados, preserve_index=indice)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        mistas = {coluna: dados[coluna].astype(str) for coluna in dados.columns if dados[coluna].dtype == object}
+        return pa.Table.from_pandas(dados.assign(**mistas), preserve_index=indice)
+
+def _escrever(tabela, destino, formato):
+    import pyarrow as pa
+
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+
+        pq.write_table(tabela, destino, compression=COMPRESSAO_PARQUET)
+    elif formato == 'arrow':
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    elif formato == 'csv':
+        import pyarrow.csv as pcsv
+
+        pcsv.write_csv(_datas_sem_hora(tabela), destino)
+    else:
+        raise Exception(f"Formato de exportação desconhecido: {formato}. Use um de {', '.join(FORMATOS)}.")
+
+def _datas_sem_hora(tabela):
+    """Colunas de data e hora todas à meia-noite (as barras diárias) como datas, para o CSV"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for i, campo in enumerate(tabela.schema):
+        if pa.types.is_timestamp(campo.type) and campo.type.tz is None:
+            coluna = tabela.column(i)
+            if pc.all(pc.equal(pc.floor_temporal(coluna, unit='day'), coluna)).as_py() is not False:
+                tabela = tabela.set_column(i, campo.name, pc.cast(coluna, pa.date32()))
+    return tabela
+
+def serializar(dados, formato, indice=True):
+    """Bytes da tabela (DataFrame ou pyarrow.Table) no formato dado"""
+    import pyarrow as pa
+
+    destino = pa.BufferOutputStream()
+    _escrever(tabela_arrow(dados, indice), destino, formato)
+    return destino.getvalue().to_pybytes()
+
+def gravar(dados, caminho, indice=True):
+    """Grava a tabela no arquivo; o formato vem da extensão (.parquet, .arrow ou .csv)"""
+    extensao = os.path.splitext(caminho)[1].lower()
+    formatos = {extensao_formato: formato for formato, (extensao_formato, _) in FORMATOS.items()}
+    if extensao not in formatos:
+        raise Exception(f"{caminho}: extensão sem formato de exportação. "
+                        f"Use uma de {', '.join(formatos)}.")
+    _escrever(tabela_arrow(dados, indice), caminho, formatos[extensao])
@@ -0,0 +1,333 @@
+"""
+Registro de features (indicadores, medidas dos candles, padrões e sinais) e resolvedor
+
+Cada família de features declara as entradas de que depende: colunas OHLCV ou outras
+features. O resolvedor calcula as features pedidas e as dependências em ordem topológica,
+uma única vez por dataset e parâmetros, e guarda as séries em memória no processo. Assim
+indicadores, padrões, suportes e resistências, gráficos e backtest leem as mesmas séries:
+a MM20 dos padrões é a SMA_20 dos indicadores, e a EMA rápida do MACD é a EMA_12.
+
+Uso:
+    series = materializar(dados, [feature('rsi', window=14), feature('hammer')], identidade)
+    series[feature('rsi', window=14)]
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from core.instrumentacao import contar
+from core.memoria import modo_float32
+
+COLUNAS_BASE = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Séries mantidas em memória entre chamadas (as mais antigas são descartadas primeiro)
+MAXIMO_MATERIALIZADAS = 512
+
+
+@dataclass(frozen=True)
+class Feature:
+    """Uma família registrada com parâmetros fixos; usada como chave das séries calculadas"""
+    familia: str
+    params: tuple = ()  # pares (nome, valor) ordenados pelo nome
+
+    @property
+    def nome(self):
+        return '_'.join([self.familia] + [str(valor) for _, valor in self.params])
+
+
+@dataclass(frozen=True)
+class _Definicao:
+    calcular: object
+    entradas: object  # tupla fixa ou função dos parâmetros que devolve a tupla
+
+_registro = {}
+
+def registrar(familia, entradas):
+    """
+    Decorador que registra a função de cálculo de uma família de features
+    entradas: tupla de colunas OHLCV (str) e Features, ou função que recebe os parâmetros
+        e devolve essa tupla. A função decorada recebe as entradas (Series, na mesma ordem)
+        seguidas dos parâmetros nomeados e devolve uma Series com o índice dos dados.
+    """
+    def decorador(funcao):
+        _registro[familia] = _Definicao(funcao, entradas)
+        return funcao
+    return decorador
+
+def feature(familia, **params):
+    if familia not in _registro:
+        raise Exception(f"Feature desconhecida: {familia}")
+    return dependencia(familia, **params)
+
+def dependencia(familia, **params):
+    """Feature sem validar a família, para declarar entradas antes de a família ser registrada"""
+    return Feature(familia, tuple(sorted(params.items())))
+
+def entradas(item):
+    """Colunas e features de que a feature depende diretamente"""
+    declaradas = _registro[item.familia].entradas
+    return tuple(declaradas(**dict(item.params)) if callable(declaradas) else declaradas)
+
+def ordem_topologica(features):
+    """Features pedidas e suas dependências, sem repetição, cada uma depois das suas entradas"""
+    ordem, visitadas, em_visita = [], set(), set()
+
+    def visitar(item):
+        if item in visitadas:
+            return
+        if item in em_visita:
+            raise Exception(f"Dependência circular na feature {item.nome}")
+        em_visita.add(item)
+        for entrada in entradas(item):
+            if isinstance(entrada, Feature):
+                visitar(entrada)
+        em_visita.discard(item)
+        visitadas.add(item)
+        ordem.append(item)
+
+    for item in features:
+        visitar(item)
+    return ordem
+
+
+_lock = threading.Lock()
+_materializadas = OrderedDict()  # (digest do dataset, Feature) -> Series
+
+def _chave_dataset(dados, identidade):
+    if identidade is not None:
+        return identidade.digest
+    from core.dataset import identificar_dataset
+    return identificar_dataset(dados[[c for c in COLUNAS_BASE if c in dados.columns]], '').digest
+
+def materializar(dados, features, identidade=None):
+    """
+    Calcula as features pedidas e as dependências sobre dados
+    identidade: IdentidadeDataset dos dados, se já calculada; sem ela o digest das colunas
+        OHLCV é calculado aqui
+    Retorna um dicionário Feature -> Series. Uma feature já calculada para o mesmo dataset,
+    nesta ou em outra chamada, é reaproveitada.
+    """
+    chave = _chave_dataset(dados, identidade)
+    float32 = modo_float32()
+    series = {}
+
+    for item in ordem_topologica(features):
+        with _lock:
+            serie = _materializadas.get((chave, item))
+            if serie is not None:
+                _materializadas.move_to_end((chave, item))
+
+        if serie is None:
+            contar('features', resultado='calculada')
+            argumentos = [dados[entrada] if isinstance(entrada, str) else series[entrada]
+                          for entrada in entradas(item)]
+            serie = _registro[item.familia].calcular(*argumentos, **dict(item.params))
+            if float32 and serie.dtype == 'float64':
+                serie = serie.astype('float32')
+            with _lock:
+                _materializadas[(chave, item)] = serie
+                while len(_materializadas) > MAXIMO_MATERIALIZADAS:
+                    _materializadas.popitem(last=False)
+        else:
+            contar('features', resultado='reaproveitada')
+        series[item] = serie
+
+    return {item: series[item] for item in features}
+
+def limpar():
+    with _lock:
+        _materializadas.clear()
+
+
+# Indicadores
+
+@registrar('sma', entradas=('Close',))
+def _sma(close, window):
+    import ta
+    return ta.trend.sma_indicator(close, window=window)
+
+@registrar('ema', entradas=('Close',))
+def _ema(close, window):
+    import ta
+    return ta.trend.ema_indicator(close, window=window)
+
+@registrar('rsi', entradas=('Close',))
+def _rsi(close, window):
+    import ta
+    return ta.momentum.rsi(close, window=window)
+
+# MACD montado sobre as EMAs, com as mesmas contas do ta (ta.trend.MACD)
+@registrar('macd_linha', entradas=lambda fast, slow: (dependencia('ema', window=fast),
+                                                      dependencia('ema', window=slow)))
+def _macd_linha(ema_rapida, ema_lenta, fast, slow):
+    return ema_rapida - ema_lenta
+
+@registrar('macd_sinal', entradas=lambda fast, slow, sign: (
+    dependencia('macd_linha', fast=fast, slow=slow),))
+def _macd_sinal(linha, fast, slow, sign):
+    return linha.ewm(span=sign, min_periods=sign, adjust=False).mean()
+
+@registrar('macd', entradas=lambda fast, slow, sign: (
+    dependencia('macd_linha', fast=fast, slow=slow),
+    dependencia('macd_sinal', fast=fast, slow=slow, sign=sign)))
+def _macd(linha, sinal, fast, slow, sign):
+    """Histograma do MACD (linha menos sinal), como ta.trend.macd_diff"""
+    return linha - sinal
+
+@registrar('desvio', entradas=('Close',))
+def _desvio(close, window):
+    """Desvio padrão móvel do fechamento (populacional, como as bandas de Bollinger do ta)"""
+    return close.rolling(window, min_periods=window).std(ddof=0)
+
+@registrar('atr', entradas=('High', 'Low', 'Close'))
+def _atr(high, low, close, window):
+    """
+    ATR de Wilder com as mesmas contas de ta.volatility.average_true_range (zero antes da
+    primeira janela), com a recorrência sobre uma lista em vez de .iloc a cada barra
+    """
+    import numpy as np
+    import pandas as pd
+
+    anterior = close.shift(1)
+    true_range = pd.concat([high - low, (high - anterior).abs(), (low - anterior).abs()], axis=1).max(axis=1)
+    atr = [0.0] * len(close)
+    if window <= len(atr):
+        atr[window - 1] = float(true_range.iloc[:window].mean())
+        valores = true_range.tolist()
+        for i in range(window, len(atr)):
+            atr[i] = (atr[i - 1] * (window - 1) + valores[i]) / float(window)
+    return pd.Series(np.array(atr), index=close.index, name='atr')
+
+
+# Medidas dos candles
+
+@registrar('corpo', entradas=('Open', 'Close'))
+def _corpo(abertura, fechamento):
+    return (fechamento - abertura).abs()
+
+@registrar('sombra_superior', entradas=('Open', 'High', 'Close'))
+def _sombra_superior(abertura, maxima, fechamento):
+    import numpy as np
+    return maxima - np.maximum(abertura, fechamento)
+
+@registrar('sombra_inferior', entradas=('Open', 'Low', 'Close'))
+def _sombra_inferior(abertura, minima, fechamento):
+    import numpy as np
+    return np.minimum(abertura, fechamento) - minima
+
+@registrar('amplitude', entradas=('High', 'Low'))
+def _amplitude(maxima, minima):
+    return maxima - minima
+
+@registrar('corpo_longo', entradas=(dependencia('corpo'),))
+def _corpo_longo(corpo):
+    """Corpo acima do percentil 70 dos corpos do período"""
+    return corpo > corpo.quantile(0.7)
+
+_MEDIAS_TENDENCIA = (dependencia('sma', window=20), dependencia('sma', window=50))
+
+@registrar('tendencia_alta', entradas=_MEDIAS_TENDENCIA)
+def _tendencia_alta(mm20, mm50):
+    return mm20 > mm50
+
+@registrar('tendencia_baixa', entradas=_MEDIAS_TENDENCIA)
+def _tendencia_baixa(mm20, mm50):
+    return mm20 < mm50
+
+
+# Padrões de candlestick
+
+_MEDIDAS = (dependencia('corpo'), dependencia('sombra_superior'),
+            dependencia('sombra_inferior'), dependencia('amplitude'))
+
+@registrar('doji', entradas=_MEDIDAS)
+def _doji(corpo, superior, inferior, amplitude):
+    return (
+        (corpo <= 0.05 * amplitude) &  # Corpo muito pequeno
+        (superior >= 2 * corpo) &      # Sombras significativas
+        (inferior >= 2 * corpo)
+    )
+
+@registrar('hammer', entradas=('Open', 'High', 'Low', 'Close') + _MEDIDAS + (dependencia('tendencia_baixa'),))
+def _hammer(abertura, maxima, minima, fechamento, corpo, superior, inferior, amplitude, tendencia_baixa):
+    import numpy as np
+    return (
+        (inferior >= 2 * corpo) &                                            # Sombra inferior longa
+        (superior <= 0.1 * amplitude) &                                      # Sombra superior pequena
+        (np.minimum(abertura, fechamento) > (maxima + minima) / 2 - 0.3 * amplitude) &  # Corpo na metade superior
+        tendencia_baixa &                                                    # Confirmação de tendência
+        fechamento.shift(1).gt(fechamento.shift(2))                          # Candle anterior mais baixo
+    )
+
+@registrar('shooting_star', entradas=('Open', 'High', 'Low', 'Close') + _MEDIDAS + (dependencia('tendencia_alta'),))
+def _shooting_star(abertura, maxima, minima, fechamento, corpo, superior, inferior, amplitude, tendencia_alta):
+    import numpy as np
+    return (
+        (superior >= 2 * corpo) &                                            # Sombra superior longa
+        (inferior <= 0.1 * amplitude) &                                      # Sombra inferior pequena
+        (np.maximum(abertura, fechamento) < (maxima + minima) / 2 + 0.3 * amplitude) &  # Corpo na metade inferior
+        tendencia_alta                                                       # Em tendência de alta
+    )
+
+_MARUBOZU = ('Open', 'Close', dependencia('corpo_longo')) + _MEDIDAS[1:]
+
+@registrar('bullish_marubozu', entradas=_MARUBOZU)
+def _bullish_marubozu(abertura, fechamento, corpo_longo, superior, inferior, amplitude):
+    return (
+        (fechamento > abertura) &            # Vela de alta
+        corpo_longo &                        # Corpo longo
+        (superior <= 0.05 * amplitude) &     # Sem sombras superiores
+        (inferior <= 0.05 * amplitude)       # Sem sombras inferiores
+    )
+
+@registrar('bearish_marubozu', entradas=_MARUBOZU)
+def _bearish_marubozu(abertura, fechamento, corpo_longo, superior, inferior, amplitude):
+    return (
+        (fechamento < abertura) &            # Vela de baixa
+        corpo_longo &                        # Corpo longo
+        (superior <= 0.05 * amplitude) &     # Sem sombras superiores
+        (inferior <= 0.05 * amplitude)       # Sem sombras inferiores
+    )
+
+# Definições mais simples de price action (corpo até 10% da amplitude e pin bar)
+@registrar('doji_amplo', entradas=(dependencia('corpo'), dependencia('amplitude')))
+def _doji_amplo(corpo, amplitude):
+    return corpo <= 0.1 * amplitude
+
+@registrar('pin_bar', entradas=(dependencia('corpo'), dependencia('amplitude')))
+def _pin_bar(corpo, amplitude):
+    return amplitude > 3 * corpo
+
+
+# Pivots (máxima ou mínima maior/menor que as duas barras de cada lado)
+
+def _extremo_local(serie, comparar):
+    vizinhas = [serie.shift(deslocamento) for deslocamento in (1, 2, -1, -2)]
+    resultado = comparar(serie, vizinhas[0])
+    for vizinha in vizinhas[1:]:
+        resultado &= comparar(serie, vizinha)
+    return resultado
+
+@registrar('pivo_alta', entradas=('High',))
+def _pivo_alta(maxima):
+    return _extremo_local(maxima, lambda serie, vizinha: serie > vizinha)
+
+@registrar('pivo_baixa', entradas=('Low',))
+def _pivo_baixa(minima):
+    return _extremo_local(minima, lambda serie, vizinha: serie < vizinha)
+
+
+# Sinais (1 compra, -1 venda, 0 neutro)
+
+@registrar('sinal_rsi', entradas=lambda window, compra, venda: (dependencia('rsi', window=window),))
+def _sinal_rsi(rsi, window, compra, venda):
+    import numpy as np
+    import pandas as pd
+    return pd.Series(np.where(rsi < compra, 1, np.where(rsi > venda, -1, 0)), index=rsi.index)
+
+@registrar('sinal_macd', entradas=lambda fast, slow, sign: (
+    dependencia('macd', fast=fast, slow=slow, sign=sign),))
+def _sinal_macd(macd, fast, slow, sign):
+    import numpy as np
+    import pandas as pd
+    return pd.Series(np.where(macd > 0, 1, np.where(macd < 0, -1, 0)), index=macd.index)
@@ -0,0 +1,234 @@
+"""
+Força relativa, beta e alfa das ações contra o Ibovespa e contra cestas de setor
+
+As referências (o índice e uma cesta de pesos iguais por setor, definida pelo usuário em
+dados/setores.json) são alinhadas às datas do universo uma única vez, em retornos_referencias.
+Cada análise recebe então a matriz de retornos das ações (datas x tickers) e a matriz da
+referência de cada ação, do mesmo formato (referencia_por_acao), e calcula todas as ações
+de uma vez: somas móveis por somas acumuladas e rankings com DataFrame.rank por data.
+
+Os retornos são logarítmicos, então o excesso de retorno sobre a referência em um período é
+a soma dos excessos diários, e a linha de força relativa é a exponencial do excesso acumulado.
+Datas em que a ação ou a referência não têm retorno não entram nas somas.
+"""
+import json
+import os
+
+from core.instrumentacao import medir
+
+DIRETORIO_DADOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados')
+
+# Setores definidos pelo usuário; enquanto não existir, vale a lista versionada
+CAMINHO_SETORES = os.path.join(DIRETORIO_DADOS, 'setores.json')
+CAMINHO_SETORES_PADRAO = os.path.join(DIRETORIO_DADOS, 'setores_padrao.json')
+
+# Ibovespa no Yahoo Finance
+INDICE = '^BVSP'
+IBOV = 'IBOV'
+
+JANELA_BETA = 63
+PREGOES_POR_ANO = 252
+
+# Períodos (em pregões) do ranking e seus pesos, com mais peso nos 3 meses
+PERIODOS_RANKING = {'1m': 21, '3m': 63, '6m': 126, '12m': 252}
+PESOS_RANKING = {'1m': 0.2, '3m': 0.4, '6m': 0.2, '12m': 0.2}
+
+
+def carregar_setores(caminho=CAMINHO_SETORES):
+    """Dicionário setor -> lista de tickers"""
+    if not os.path.exists(caminho):
+        caminho = CAMINHO_SETORES_PADRAO
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return validar_setores(json.load(f))
+
+def validar_setores(setores):
+    if not isinstance(setores, dict) or not all(
+        isinstance(setor, str) and isinstance(tickers, list) and all(isinstance(t, str) for t in tickers)
+        for setor, tickers in setores.items()
+    ):
+        raise Exception("Os setores devem ser um objeto JSON de nome do setor -> lista de tickers.")
+    if IBOV in setores:
+        raise Exception(f"'{IBOV}' é reservado para o índice e não pode ser nome de setor.")
+    return setores
+
+def salvar_setores(setores, caminho=CAMINHO_SETORES):
+    """Grava os setores de forma atômica"""
+    validar_setores(setores)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(setores, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def setor_de(setores):
+    """Ticker -> setor (o primeiro, se a ação estiver em mais de um)"""
+    mapa = {}
+    for setor, tickers in setores.items():
+        for ticker in tickers:
+            mapa.setdefault(ticker, setor)
+    return mapa
+
+def retornos_log(precos):
+    """Log-retornos diários (datas x tickers), NaN na primeira data e onde falta preço"""
+    import numpy as np
+
+    return np.log(precos).diff()
+
+@medir('forca_relativa.referencias')
+def retornos_referencias(precos, indice=INDICE, setores=None):
+    """
+    Log-retornos do índice (coluna IBOV) e de cada setor, alinhados às datas de precos
+    precos: fechamentos (datas x tickers), com o índice em uma das colunas
+    A cesta do setor tem pesos iguais, rebalanceada a cada pregão entre as ações com retorno
+    """
+    import numpy as np
+    import pandas as pd
+
+    if indice not in precos.columns:
+        raise Exception(f"O índice {indice} não está entre os preços carregados.")
+
+    simples = precos.pct_change(fill_method=None)
+    referencias = {IBOV: np.log1p(simples[indice])}
+    for setor, tickers in (setores or {}).items():
+        membros = [ticker for ticker in tickers if ticker in precos.columns and ticker != indice]
+        if membros:
+            referencias[setor] = np.log1p(simples[membros].mean(axis=1, skipna=True))
+    return pd.DataFrame(referencias, index=precos.index)
+
+def referencia_por_acao(referencias, tickers, referencia=IBOV, setores=None):
+    """
+    Matriz (datas x tickers) com os retornos da referência de cada ação
+    referencia: IBOV (todas contra o índice) ou 'setor' (cada ação contra a cesta do seu
+    setor; NaN nas ações sem setor)
+    """
+    import numpy as np
+    import pandas as pd
+
+    if referencia == 'setor':
+        mapa = setor_de(setores or {})
+        colunas = [mapa.get(ticker) for ticker in tickers]
+    elif referencia in referencias.columns:
+        colunas = [referencia] * len(tickers)
+    else:
+        raise Exception(f"Referência desconhecida: {referencia}")
+
+    # Uma coluna de NaN no fim para as ações sem referência
+    valores = np.column_stack([referencias.to_numpy(dtype='float64'), np.full(len(referencias), np.nan)])
+    posicoes = {nome: i for i, nome in enumerate(referencias.columns)}
+    indices = [posicoes.get(coluna, len(posicoes)) for coluna in colunas]
+    return pd.DataFrame(valores[:, indices], index=referencias.index, columns=list(tickers))
+
+def _somas_moveis(valores, janela):
+    """Soma de cada coluna nas últimas janela linhas (menos nas primeiras), por somas acumuladas"""
+    import numpy as np
+
+    acumulado = np.concatenate([np.zeros((1, valores.shape[1])), np.cumsum(valores, axis=0)])
+    fim = np.arange(1, len(valores) + 1)
+    return acumulado[fim] - acumulado[np.maximum(fim - janela, 0)]
+
+def _alinhar(retornos, referencia):
+    """Retornos e referência com zero onde algum dos dois falta, e a máscara das datas válidas"""
+    import numpy as np
+
+    x = retornos.to_numpy(dtype='float64')
+    y = referencia.reindex(index=retornos.index, columns=retornos.columns).to_numpy(dtype='float64')
+    validos = np.isfinite(x) & np.isfinite(y)
+    return np.where(validos, x, 0.0), np.where(validos, y, 0.0), validos
+
+def linha_forca_relativa(retornos, referencia):
+    """Desempenho de cada ação dividido pelo da referência, começando em 1"""
+    import numpy as np
+    import pandas as pd
+
+    x, y, _ = _alinhar(retornos, referencia)
+    return pd.DataFrame(np.exp(np.cumsum(x - y, axis=0)), index=retornos.index, columns=retornos.columns)
+
+@medir('forca_relativa.beta_alfa')
+def beta_alfa_moveis(retornos, referencia, janela=JANELA_BETA, min_observacoes=None):
+    """
+    Beta e alfa anualizado de cada ação contra sua referência, em janelas móveis de janela pregões
+    Retorna (beta, alfa), DataFrames datas x tickers; NaN com menos de min_observacoes
+    retornos em comum (padrão: metade da janela)
+    """
+    import numpy as np
+    import pandas as pd
+
+    min_observacoes = min_observacoes or max(2, janela // 2)
+    x, y, validos = _alinhar(retornos, referencia)
+    n = _somas_moveis(validos.astype('float64'), janela)
+    soma_x, soma_y = _somas_moveis(x, janela), _somas_moveis(y, janela)
+    soma_xy, soma_yy = _somas_moveis(x * y, janela), _somas_moveis(y * y, janela)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variancia = soma_yy - soma_y ** 2 / n
+        beta = (soma_xy - soma_x * soma_y / n) / variancia
+        alfa = (soma_x - beta * soma_y) / n * PREGOES_POR_ANO
+    invalidos = (n < min_observacoes) | ~(variancia > 0)
+    beta[invalidos] = np.nan
+    alfa[invalidos] = np.nan
+    return (pd.DataFrame(beta, index=retornos.index, columns=retornos.columns),
+            pd.DataFrame(alfa, index=retornos.index, columns=retornos.columns))
+
+@medir('forca_relativa.ranking')
+def ranking_forca_relativa(retornos, referencia, periodos=PERIODOS_RANKING, pesos=PESOS_RANKING):
+    """
+    Força relativa de todas as ações em todas as datas
+    Retorna (excessos, composto, percentil):
+    - excessos: dicionário período -> excesso de log-retorno sobre a referência (datas x tickers),
+      NaN enquanto a ação não tem o período inteiro
+    - composto: média dos excessos ponderada por pesos, entre os períodos disponíveis
+    - percentil: posição do composto entre as ações na data, de 0 a 100
+    """
+    import numpy as np
+    import pandas as pd
+
+    x, y, validos = _alinhar(retornos, referencia)
+    excesso_diario = x - y
+    existentes = np.cumsum(validos, axis=0) >= 1
+
+    excessos = {}
+    soma = np.zeros(x.shape)
+    soma_pesos = np.zeros(x.shape)
+    for nome, pregoes in periodos.items():
+        excesso = _somas_moveis(excesso_diario, pregoes)
+        # O período conta desde o primeiro retorno da ação: sem histórico suficiente, NaN
+        completo = np.zeros(x.shape, dtype=bool)
+        if pregoes <= len(x):
+            completo[pregoes - 1:] = existentes[:len(x) - pregoes + 1]
+        excesso[~completo] = np.nan
+        excessos[nome] = pd.DataFrame(excesso, index=retornos.index, columns=retornos.columns)
+        soma += np.where(completo, pesos[nome] * excesso, 0.0)
+        soma_pesos += np.where(completo, pesos[nome], 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        composto = pd.DataFrame(soma / soma_pesos, index=retornos.index, columns=retornos.columns)
+    percentil = composto.rank(axis=1, pct=True) * 100
+    return excessos, composto, percentil
+
+@medir('forca_relativa.screener')
+def tabela_forca_relativa(precos, referencias, setores=None, janela=JANELA_BETA):
+    """
+    Última data de cada ação: setor, excessos por período e percentil contra o IBOV,
+    percentil contra o setor, beta e alfa contra o IBOV; ordenada pelo percentil contra o IBOV
+    precos: fechamentos das ações (sem o índice); referencias: saída de retornos_referencias
+    """
+    import pandas as pd
+
+    retornos = retornos_log(precos)
+    tickers = list(precos.columns)
+    contra_ibov = referencia_por_acao(referencias, tickers, IBOV)
+    excessos, composto, percentil = ranking_forca_relativa(retornos, contra_ibov)
+    _, _, percentil_setor = ranking_forca_relativa(retornos, referencia_por_acao(referencias, tickers, 'setor', setores))
+    beta, alfa = beta_alfa_moveis(retornos, contra_ibov, janela)
+
+    mapa = setor_de(setores or {})
+    tabela = pd.DataFrame({
+        'acao': tickers,
+        'setor': [mapa.get(ticker) for ticker in tickers],
+        **{f'excesso_{nome}': excesso.iloc[-1].to_numpy() for nome, excesso in excessos.items()},
+        'forca_composta': composto.iloc[-1].to_numpy(),
+        'percentil_ibov': percentil.iloc[-1].to_numpy(),
+        'percentil_setor': percentil_setor.iloc[-1].to_numpy(),
+        'beta': beta.iloc[-1].to_numpy(),
+        'alfa': alfa.iloc[-1].to_numpy()
+    })
+    return tabela.sort_values('percentil_ibov', ascending=False, na_position='last', ignore_index=True)
@@ -0,0 +1,36 @@
+from core.features import feature, materializar
+from core.instrumentacao import medir
+from core.memoria import anexar_colunas
+
+
+@medir('indicadores')
+def calcular_indicadores(dados, params, identidade=None):
+    """
+    Calcula os indicadores técnicos presentes em params
+    params: sma_periods, ema_periods, rsi_period, macd_fast, macd_slow, macd_signal
+    identidade: IdentidadeDataset dos dados, se já calculada (chave das features em memória)
+    Retorna um novo DataFrame que compartilha as colunas de dados e acrescenta os indicadores
+    """
+    colunas = {}
+    
+    # Médias Móveis Simples
+    for period in params.get('sma_periods', []):
+        colunas[f'SMA_{period}'] = feature('sma', window=period)
+    
+    # Médias Móveis Exponenciais
+    for period in params.get('ema_periods', []):
+        colunas[f'EMA_{period}'] = feature('ema', window=period)
+    
+    # RSI
+    if params.get('rsi_period'):
+        colunas['RSI'] = feature('rsi', window=params['rsi_period'])
+    
+    # MACD
+    if params.get('macd_fast') and params.get('macd_slow') and params.get('macd_signal'):
+        macd = dict(fast=params['macd_fast'], slow=params['macd_slow'], sign=params['macd_signal'])
+        colunas['MACD'] = feature('macd', **macd)
+        colunas['MACD_Signal'] = feature('macd_sinal', **macd)
+    
+    # Cada indicador é calculado uma vez por dataset e parâmetros (veja core.features)
+    series = materializar(dados, list(colunas.values()), identidade)
+    return anexar_colunas(dados, {nome: series[item] for nome, item in colunas.items()})
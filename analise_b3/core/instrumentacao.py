@@ -0,0 +1,181 @@
+"""
+Instrumentação dos trechos críticos
+
+Mede o tempo de cada etapa (busca de dados, indicadores, padrões, suportes e resistências,
+backtest, métricas, montagem e envio dos gráficos, serialização do cache) e conta acertos
+e falhas do cache compartilhado. As medições ficam em memória, por processo, e podem ser
+vistas no painel de depuração das páginas (?debug=1), em um endpoint no formato do
+Prometheus ou em linhas de log periódicas; o endpoint inclui a memória por dataset
+registrada em core.memoria.
+
+Configuração por variáveis de ambiente:
+    ANALISE_B3_METRICAS_PORTA  porta do endpoint /metrics (desativado por padrão)
+    ANALISE_B3_METRICAS_LOG    intervalo em segundos entre os resumos no log (desativado por padrão)
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from core import memoria
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de medições recentes usadas nos percentis de cada etapa
+JANELA_AMOSTRAS = 1000
+
+_lock = threading.Lock()
+_amostras = defaultdict(lambda: deque(maxlen=JANELA_AMOSTRAS))
+_acumulados = defaultdict(lambda: [0, 0.0])  # etapa -> [chamadas, segundos]
+_contadores = defaultdict(int)  # (nome, rótulos ordenados) -> total
+
+
+@contextmanager
+def medir(etapa):
+    """Mede o tempo do bloco; também pode ser usado como decorador (@medir('etapa'))"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_duracao(etapa, time.perf_counter() - inicio)
+
+def registrar_duracao(etapa, segundos):
+    with _lock:
+        _amostras[etapa].append(segundos)
+        acumulado = _acumulados[etapa]
+        acumulado[0] += 1
+        acumulado[1] += segundos
+
+def contar(nome, **rotulos):
+    """Incrementa um contador, por exemplo contar('cache', camada='compartilhado', resultado='acerto')"""
+    with _lock:
+        _contadores[(nome, tuple(sorted(rotulos.items())))] += 1
+
+def _percentil(ordenadas, fracao):
+    # Percentil pelo posto mais próximo, suficiente para acompanhar p50 e p95
+    return ordenadas[min(len(ordenadas) - 1, int(fracao * len(ordenadas)))]
+
+def resumo():
+    """Percentis (em ms) das medições recentes e totais acumulados de cada etapa"""
+    with _lock:
+        copias = {etapa: (sorted(amostras), list(_acumulados[etapa])) for etapa, amostras in _amostras.items()}
+
+    return [
+        {
+            'etapa': etapa,
+            'chamadas': chamadas,
+            'p50_ms': _percentil(ordenadas, 0.5) * 1000,
+            'p95_ms': _percentil(ordenadas, 0.95) * 1000,
+            'max_ms': ordenadas[-1] * 1000,
+            'total_s': total
+        }
+        for etapa, (ordenadas, (chamadas, total)) in sorted(copias.items())
+    ]
+
+def contadores():
+    """Lista de (nome, rótulos, total)"""
+    with _lock:
+        return [(nome, dict(rotulos), total) for (nome, rotulos), total in sorted(_contadores.items())]
+
+def limpar():
+    with _lock:
+        _amostras.clear()
+        _acumulados.clear()
+        _contadores.clear()
+
+def exportar_prometheus():
+    """Medições no formato texto do Prometheus (summary por etapa, contadores e memória por dataset)"""
+    linhas = [
+        "# HELP analise_b3_etapa_segundos Duração das etapas instrumentadas",
+        "# TYPE analise_b3_etapa_segundos summary"
+    ]
+    for item in resumo():
+        rotulo = f'etapa="{item["etapa"]}"'
+        linhas.append(f'analise_b3_etapa_segundos{{{rotulo},quantile="0.5"}} {item["p50_ms"] / 1000:.6f}')
+        linhas.append(f'analise_b3_etapa_segundos{{{rotulo},quantile="0.95"}} {item["p95_ms"] / 1000:.6f}')
+        linhas.append(f'analise_b3_etapa_segundos_count{{{rotulo}}} {item["chamadas"]}')
+        linhas.append(f'analise_b3_etapa_segundos_sum{{{rotulo}}} {item["total_s"]:.6f}')
+
+    nomes_declarados = set()
+    for nome, rotulos, total in contadores():
+        if nome not in nomes_declarados:
+            linhas.append(f"# TYPE analise_b3_{nome}_total counter")
+            nomes_declarados.add(nome)
+        texto_rotulos = ','.join(f'{chave}="{valor}"' for chave, valor in rotulos.items())
+        linhas.append(f"analise_b3_{nome}_total{{{texto_rotulos}}} {total}")
+
+    datasets = memoria.datasets()
+    if datasets:
+        linhas.append("# HELP analise_b3_dataset_bytes Memória ocupada pelo último DataFrame de cada dataset")
+        linhas.append("# TYPE analise_b3_dataset_bytes gauge")
+    for nome, relatorio in datasets:
+        linhas.append(f'analise_b3_dataset_bytes{{dataset="{nome}"}} {relatorio["bytes"]}')
+
+    return '\n'.join(linhas) + '\n'
+
+def linha_de_log():
+    """Resumo compacto das etapas em uma linha"""
+    return ' '.join(
+        f"{item['etapa']}=n:{item['chamadas']},p50:{item['p50_ms']:.1f}ms,p95:{item['p95_ms']:.1f}ms"
+        for item in resumo()
+    )
+
+
+_exportacao_iniciada = False
+
+def iniciar_exportacao():
+    """Inicia, uma vez por processo, o endpoint e o log configurados por variáveis de ambiente"""
+    global _exportacao_iniciada
+    with _lock:
+        if _exportacao_iniciada:
+            return
+        _exportacao_iniciada = True
+
+    porta = os.environ.get('ANALISE_B3_METRICAS_PORTA')
+    if porta:
+        _iniciar_servidor(int(porta))
+
+    intervalo = os.environ.get('ANALISE_B3_METRICAS_LOG')
+    if intervalo:
+        # O log foi pedido explicitamente: garante que as linhas apareçam mesmo sem
+        # configuração de logging no processo (o Streamlit só configura os próprios loggers)
+        if not logging.getLogger().handlers and not logger.handlers:
+            logger.addHandler(logging.StreamHandler())
+            logger.setLevel(logging.INFO)
+        threading.Thread(target=_registrar_no_log, args=(float(intervalo),), daemon=True).start()
+
+def _iniciar_servidor(porta):
+    # Importado aqui: o servidor só existe quando a porta é configurada
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Metricas(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            conteudo = exportar_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(conteudo)))
+            self.end_headers()
+            self.wfile.write(conteudo)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        servidor = ThreadingHTTPServer(('0.0.0.0', porta), Metricas)
+    except OSError as e:
+        # Com vários processos na mesma máquina, só o primeiro consegue a porta
+        logger.warning("Endpoint de métricas não iniciado na porta %s: %s", porta, e)
+        return
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+def _registrar_no_log(intervalo):
+    while True:
+        time.sleep(intervalo)
+        linha = linha_de_log()
+        if linha:
+            logger.info("etapas pid=%s %s", os.getpid(), linha)
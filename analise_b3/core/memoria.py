@@ -0,0 +1,81 @@
+"""
+Armazenamento das séries em memória
+
+As etapas da análise (indicadores, padrões, suportes e resistências, backtest) recebem o
+DataFrame de preços e devolvem um novo DataFrame que compartilha as colunas de entrada e
+acrescenta as suas, sem copiar os dados existentes. Nenhuma etapa altera a entrada.
+
+Com ANALISE_B3_FLOAT32=1, preços e indicadores passam a ser guardados em float32: metade
+da memória do float64, com cerca de 7 dígitos significativos (o volume continua como veio).
+"""
+import os
+import threading
+
+COLUNAS_PRECO = ['Open', 'High', 'Low', 'Close']
+
+
+def modo_float32():
+    """Se o modo compacto (float32) está ativo, pela variável ANALISE_B3_FLOAT32"""
+    return os.environ.get('ANALISE_B3_FLOAT32', '0') not in ('', '0')
+
+def anexar_colunas(dados, colunas, float32=None):
+    """
+    Novo DataFrame com as colunas de dados mais as colunas dadas, sem copiar as existentes
+    colunas: dicionário nome -> Series (ou um DataFrame); substitui colunas de mesmo nome
+    float32: converte as novas colunas float64; por padrão segue modo_float32()
+    """
+    if float32 is None:
+        float32 = modo_float32()
+
+    # Cópia rasa: o novo DataFrame aponta para os mesmos arrays, e colunas acrescentadas
+    # (ou substituídas) nele não aparecem na entrada
+    df = dados.copy(deep=False)
+    for nome, valores in colunas.items():
+        if float32 and valores.dtype == 'float64':
+            valores = valores.astype('float32')
+        df[nome] = valores
+    return df
+
+def compactar(dados, float32=None):
+    """Converte os preços para float32 quando o modo compacto está ativo"""
+    if float32 is None:
+        float32 = modo_float32()
+    if not float32:
+        return dados
+    return anexar_colunas(dados, {
+        coluna: dados[coluna] for coluna in COLUNAS_PRECO
+        if coluna in dados.columns and dados[coluna].dtype == 'float64'
+    }, float32=True)
+
+def uso_memoria(dados):
+    """Bytes ocupados pelo DataFrame (índice incluído), no total e por tipo de coluna"""
+    por_coluna = dados.memory_usage(index=True, deep=True)
+    por_tipo = {}
+    for coluna, tipo in dados.dtypes.items():
+        por_tipo[str(tipo)] = por_tipo.get(str(tipo), 0) + int(por_coluna[coluna])
+    return {
+        'linhas': len(dados),
+        'colunas': len(dados.columns),
+        'bytes': int(por_coluna.sum()),
+        'por_tipo': por_tipo
+    }
+
+
+_lock = threading.Lock()
+_datasets = {}
+
+def registrar_dataset(nome, dados):
+    """Guarda o uso de memória mais recente do dataset, para o painel de depuração e o /metrics"""
+    relatorio = uso_memoria(dados)
+    with _lock:
+        _datasets[nome] = relatorio
+    return relatorio
+
+def datasets():
+    """Lista de (nome, relatório de uso_memoria) dos datasets registrados neste processo"""
+    with _lock:
+        return sorted(_datasets.items())
+
+def limpar():
+    with _lock:
+        _datasets.clear()
@@ -0,0 +1,207 @@
+"""
+Indicadores semanais e mensais derivados das barras diárias
+
+As barras diárias são agregadas por semana (terminando na sexta) ou por mês, os indicadores
+do registro de features (core.features) são calculados sobre as barras agregadas e o
+resultado volta para as barras diárias sem olhar o futuro: em cada dia vale o valor do
+último período já encerrado, isto é, do período anterior ao do dia. Uma semana só passa a
+contar no primeiro pregão da semana seguinte, e a semana em andamento nunca é usada.
+
+As barras agregadas ficam em memória por ação (a ticker da identidade dos dados). Quando
+chegam barras diárias novas, só o último período guardado (que podia estar incompleto) e os
+seguintes são agregados de novo; os períodos já encerrados são reaproveitados. Os dias em comum
+com as barras guardadas são conferidos pelo hash de cada linha: se o histórico mudou (por
+exemplo, um ajuste de proventos que altera os preços antigos), a agregação é refeita inteira.
+"""
+import threading
+from collections import OrderedDict
+
+from core.features import feature, materializar
+from core.instrumentacao import contar, medir
+
+# Frequências dos períodos do pandas
+TEMPOS = {'semanal': 'W-FRI', 'mensal': 'M'}
+
+# Barras agregadas mantidas em memória entre chamadas
+MAXIMO_REAMOSTRADOS = 256
+
+
+def _periodos(indice, tempo):
+    if tempo not in TEMPOS:
+        raise Exception(f"Tempo gráfico desconhecido: {tempo}. Use um de {list(TEMPOS)}.")
+    return indice.to_period(TEMPOS[tempo])
+
+def reamostrar(dados, tempo):
+    """
+    Barras OHLCV de cada período (semanal ou mensal), indexadas pelo último pregão do período
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Os pregões estão em ordem: cada período é um trecho contínuo, agregado com reduceat
+    periodos = _periodos(dados.index, tempo).asi8
+    inicios = np.flatnonzero(np.concatenate([[True], periodos[1:] != periodos[:-1]]))
+    fins = np.concatenate([inicios[1:], [len(periodos)]]) - 1
+    return pd.DataFrame({
+        'Open': dados['Open'].to_numpy()[inicios],
+        'High': np.maximum.reduceat(dados['High'].to_numpy(), inicios),
+        'Low': np.minimum.reduceat(dados['Low'].to_numpy(), inicios),
+        'Close': dados['Close'].to_numpy()[fins],
+        'Volume': np.add.reduceat(dados['Volume'].to_numpy(), inicios)
+    }, index=dados.index[fins])
+
+class _Reamostrado:
+    """Barras agregadas de uma ação, o digest das barras diárias de que vieram e o hash de cada uma"""
+
+    def __init__(self, barras, digest, hashes):
+        self.barras = barras
+        self.digest = digest
+        self.hashes = hashes
+
+    @property
+    def inicio(self):
+        return self.hashes.index[0]
+
+    @property
+    def fim(self):
+        return self.hashes.index[-1]
+
+
+_lock = threading.Lock()
+_reamostrados = OrderedDict()  # (ticker, intervalo, tempo) -> _Reamostrado
+
+def _hashes(dados):
+    """Hash de cada barra diária (data e OHLCV)"""
+    import pandas as pd
+
+    return pd.util.hash_pandas_object(dados[['Open', 'High', 'Low', 'Close', 'Volume']], index=True)
+
+def _guardar(chave, digest, hashes, barras):
+    with _lock:
+        _reamostrados[chave] = _Reamostrado(barras, digest, hashes)
+        _reamostrados.move_to_end(chave)
+        while len(_reamostrados) > MAXIMO_REAMOSTRADOS:
+            _reamostrados.popitem(last=False)
+
+def _atualizar(anterior, dados, hashes, tempo):
+    """
+    Barras agregadas de dados reaproveitando os períodos encerrados de anterior,
+    ou None se anterior não serve (histórico diferente ou mais longo no início)
+    hashes: hash de cada barra de dados (_hashes)
+    """
+    import numpy as np
+    import pandas as pd
+
+    if dados.index[0] < anterior.inicio or dados.index[-1] < anterior.fim:
+        return None
+    # Todos os dias em comum precisam ser iguais, não só o último guardado
+    comuns = anterior.hashes.iloc[anterior.hashes.index.searchsorted(dados.index[0]):]
+    if len(comuns) > len(hashes) or not np.array_equal(comuns.to_numpy(), hashes.to_numpy()[:len(comuns)]):
+        return None
+
+    # Reaproveita os períodos entre o primeiro (que pode ter perdido dias no início) e o
+    # último guardado (que podia estar em andamento); agrega de novo só as pontas
+    periodos_guardados = _periodos(anterior.barras.index, tempo)
+    periodos = _periodos(dados.index, tempo)
+    primeiro, ultimo = periodos[0], periodos_guardados[-1]
+    partes = []
+    if primeiro < ultimo:
+        partes.append(reamostrar(dados[periodos == primeiro], tempo))
+        partes.append(anterior.barras[(periodos_guardados > primeiro) & (periodos_guardados < ultimo)])
+    partes.append(reamostrar(dados[periodos >= max(primeiro, ultimo)], tempo))
+    return pd.concat(partes)
+
+@medir('multitemporal.reamostrar')
+def reamostrar_incremental(dados, tempo, identidade=None):
+    """
+    Barras agregadas de dados, reaproveitando as da última chamada para a mesma ação
+    identidade: IdentidadeDataset dos dados; sem ela não há reaproveitamento
+    """
+    if identidade is None:
+        return reamostrar(dados, tempo)
+
+    chave = (identidade.ticker, identidade.intervalo, tempo)
+    with _lock:
+        anterior = _reamostrados.get(chave)
+
+    if anterior is not None and anterior.digest == identidade.digest:
+        contar('reamostragem', resultado='reaproveitada')
+        return anterior.barras
+
+    hashes = _hashes(dados)
+    barras = _atualizar(anterior, dados, hashes, tempo) if anterior is not None else None
+    if barras is None:
+        contar('reamostragem', resultado='completa')
+        barras = reamostrar(dados, tempo)
+    else:
+        contar('reamostragem', resultado='incremental')
+    _guardar(chave, identidade.digest, hashes, barras)
+    return barras
+
+def alinhar(serie, indice_diario, tempo):
+    """
+    Valores de uma série do tempo maior nos pregões diários, sem olhar o futuro: cada dia
+    recebe o valor do último período encerrado antes do período do dia (NaN antes dele)
+    """
+    import numpy as np
+    import pandas as pd
+
+    periodos_serie = _periodos(serie.index, tempo).asi8
+    periodos_dia = _periodos(indice_diario, tempo).asi8
+    anteriores = np.searchsorted(periodos_serie, periodos_dia, side='left') - 1
+    valores = serie.to_numpy()
+    if valores.dtype == bool:
+        valores = valores.astype('float64')
+    alinhados = np.where(anteriores >= 0, valores[np.maximum(anteriores, 0)], np.nan)
+    return pd.Series(alinhados, index=indice_diario, name=serie.name)
+
+def colunas_multitemporais(params, tempo):
+    """Colunas dos indicadores do tempo maior (mesmas chaves de params de calcular_indicadores, mais atr_period)"""
+    colunas = {}
+    for period in params.get('sma_periods', []):
+        colunas[f'SMA_{period}_{tempo}'] = feature('sma', window=period)
+    for period in params.get('ema_periods', []):
+        colunas[f'EMA_{period}_{tempo}'] = feature('ema', window=period)
+    if params.get('rsi_period'):
+        colunas[f'RSI_{tempo}'] = feature('rsi', window=params['rsi_period'])
+    if params.get('macd_fast') and params.get('macd_slow') and params.get('macd_signal'):
+        macd = dict(fast=params['macd_fast'], slow=params['macd_slow'], sign=params['macd_signal'])
+        colunas[f'MACD_{tempo}'] = feature('macd', **macd)
+        colunas[f'MACD_Signal_{tempo}'] = feature('macd_sinal', **macd)
+    if params.get('atr_period'):
+        colunas[f'ATR_{tempo}'] = feature('atr', window=params['atr_period'])
+    return colunas
+
+@medir('multitemporal.indicadores')
+def calcular_indicadores_multitemporais(dados, params, tempo, identidade=None):
+    """
+    Indicadores semanais ou mensais alinhados às barras diárias, sem olhar o futuro
+    params: sma_periods, ema_periods, rsi_period, macd_fast, macd_slow, macd_signal, atr_period
+    Retorna um DataFrame só com as colunas calculadas (RSI_semanal, SMA_20_mensal...)
+    """
+    import pandas as pd
+    from core.dataset import identificar_dataset
+
+    barras = reamostrar_incremental(dados, tempo, identidade)
+    colunas = colunas_multitemporais(params, tempo)
+    identidade_barras = identificar_dataset(barras, identidade.ticker if identidade else '', tempo)
+    series = materializar(barras, list(colunas.values()), identidade_barras)
+    return pd.DataFrame({nome: alinhar(series[item], dados.index, tempo) for nome, item in colunas.items()},
+                        index=dados.index)
+
+def tendencia_superior(dados, tempo='semanal', rapida=10, lenta=30, identidade=None):
+    """
+    Tendência do tempo maior em cada pregão: 1 com a média rápida acima da lenta no último
+    período encerrado, -1 abaixo e 0 enquanto não há períodos suficientes
+    Serve de filtro de confirmação para executar_backtest (parâmetro tendencia)
+    """
+    import numpy as np
+    import pandas as pd
+
+    colunas = calcular_indicadores_multitemporais(dados, {'sma_periods': [rapida, lenta]}, tempo, identidade)
+    media_rapida, media_lenta = colunas[f'SMA_{rapida}_{tempo}'], colunas[f'SMA_{lenta}_{tempo}']
+    return pd.Series(np.sign(media_rapida - media_lenta).fillna(0).astype('int64'), index=dados.index)
+
+def limpar():
+    with _lock:
+        _reamostrados.clear()
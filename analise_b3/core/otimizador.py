@@ -0,0 +1,139 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from core.backtest import executar_backtest, calcular_metricas
+from core.dataset import identificar_dataset
+from core.estrategias import ESTRATEGIA_PADRAO, ESTRATEGIAS, obter_estrategia
+from core.multitemporal import tendencia_superior
+from core.padroes import detectar_niveis
+
+# Espaço de parâmetros da estratégia padrão (RSI + MACD); o das demais está em core.estrategias
+PARAMETROS_INTEIROS = ESTRATEGIAS[ESTRATEGIA_PADRAO].inteiros
+
+FAIXAS_PADRAO = ESTRATEGIAS[ESTRATEGIA_PADRAO].faixas
+
+def gerar_combinacoes(faixas, num_combinacoes, seed=None, inteiros=PARAMETROS_INTEIROS):
+    """
+    Gera combinações aleatórias de parâmetros dentro das faixas (min, max)
+    inteiros: parâmetros sorteados como inteiros (Estrategia.inteiros)
+    """
+    import numpy as np
+    
+    rng = np.random.default_rng(seed)
+    combinacoes = []
+    for _ in range(num_combinacoes):
+        params = {}
+        for nome, (minimo, maximo) in faixas.items():
+            if nome in inteiros:
+                params[nome] = int(rng.integers(minimo, maximo + 1))
+            else:
+                params[nome] = float(rng.uniform(minimo, maximo))
+        combinacoes.append(params)
+    return combinacoes
+
+def avaliar_combinacao(dados, params, capital_inicial, niveis=None, identidade=None,
+                       estrategia=ESTRATEGIA_PADRAO, tendencia=None):
+    """
+    Executa o backtesting de uma combinação e retorna parâmetros e métricas
+    identidade: IdentidadeDataset dos dados; com ela, indicadores com os mesmos parâmetros
+        em combinações diferentes são calculados uma única vez
+    tendencia: filtro de confirmação das entradas (veja executar_backtest)
+    """
+    operacoes = executar_backtest(dados, params, capital_inicial, niveis, tendencia=tendencia,
+                                  estrategia=estrategia, identidade=identidade)
+    return {
+        'params': params,
+        'metricas': calcular_metricas(operacoes, capital_inicial)
+    }
+
+# Estado de cada processo do pool, para não serializar os dados a cada tarefa
+_dados_worker = {}
+
+def _inicializar_worker(dados, capital_inicial, niveis, identidade, estrategia, tendencia=None):
+    _dados_worker['dados'] = dados
+    _dados_worker['identidade'] = identidade
+    _dados_worker['capital_inicial'] = capital_inicial
+    _dados_worker['niveis'] = niveis
+    _dados_worker['estrategia'] = estrategia
+    _dados_worker['tendencia'] = tendencia
+
+def _avaliar_no_worker(params):
+    return avaliar_combinacao(_dados_worker['dados'], params,
+                              _dados_worker['capital_inicial'],
+                              _dados_worker['niveis'],
+                              _dados_worker['identidade'],
+                              _dados_worker['estrategia'],
+                              _dados_worker['tendencia'])
+
+def preparar(dados, fonte_niveis='pivos', confirmacao=None, ticker=''):
+    """
+    Identidade, suportes e resistências e tendência de confirmação dos dados, que só dependem
+    dos preços e valem para todas as combinações
+    confirmacao: argumentos de core.multitemporal.tendencia_superior, como
+        {"tempo": "semanal", "rapida": 10, "lenta": 30}, ou None (sem confirmação)
+    ticker: ação dos dados, que separa as barras agregadas guardadas de cada uma
+    """
+    identidade = identificar_dataset(dados, ticker)
+    tendencia = None
+    if confirmacao:
+        tendencia = tendencia_superior(dados, **confirmacao, identidade=identidade)
+    return identidade, detectar_niveis(dados, fonte_niveis, identidade), tendencia
+
+def criar_pool(dados, capital_inicial, processos, fonte_niveis='pivos', estrategia=ESTRATEGIA_PADRAO,
+               confirmacao=None, ticker=''):
+    """
+    Pool de processos com os dados já carregados em cada um, para avaliar vários lotes
+    de combinações (otimizar com executor) sem recriar os processos
+    """
+    identidade, niveis, tendencia = preparar(dados, fonte_niveis, confirmacao, ticker)
+    return ProcessPoolExecutor(max_workers=processos,
+                               initializer=_inicializar_worker,
+                               initargs=(dados, capital_inicial, niveis, identidade,
+                                         obter_estrategia(estrategia).nome, tendencia))
+
+def otimizar(dados, combinacoes, capital_inicial, processos=1, callback=None, registrar=None,
+             fonte_niveis='pivos', executor=None, estrategia=ESTRATEGIA_PADRAO, confirmacao=None,
+             ticker=''):
+    """
+    Avalia todas as combinações sobre os mesmos dados
+    processos: número de processos usados na avaliação (1 = sem paralelismo)
+    callback: função chamada como callback(concluidas, total) a cada combinação
+    registrar: função chamada como registrar(indice, resultado) no processo principal,
+        por exemplo GravadorLotes.adicionar, para gravar os resultados conforme chegam
+    fonte_niveis: suportes e resistências que filtram as entradas (veja core.padroes.detectar_niveis)
+    executor: pool criado por criar_pool com os mesmos dados, processos, estratégia e confirmação, usado no lugar de um pool novo
+    estrategia: nome da estratégia de core.estrategias
+    confirmacao: tendência do tempo maior que confirma as entradas (veja preparar), ou None
+    ticker: ação dos dados (veja preparar)
+    """
+    total = len(combinacoes)
+    resultados = []
+
+    def receber(resultado):
+        resultados.append(resultado)
+        if registrar:
+            registrar(len(resultados) - 1, resultado)
+        if callback:
+            callback(len(resultados), total)
+
+    if executor is None and processos <= 1:
+        identidade, niveis, tendencia = preparar(dados, fonte_niveis, confirmacao, ticker)
+        for params in combinacoes:
+            receber(avaliar_combinacao(dados, params, capital_inicial, niveis, identidade, estrategia, tendencia))
+        return resultados
+
+    proprio = executor is None
+    if proprio:
+        executor = criar_pool(dados, capital_inicial, processos, fonte_niveis, estrategia, confirmacao, ticker)
+    try:
+        chunksize = max(1, total // (processos * 4))
+        for resultado in executor.map(_avaliar_no_worker, combinacoes, chunksize=chunksize):
+            receber(resultado)
+    finally:
+        if proprio:
+            executor.shutdown()
+
+    return resultados
+
+def ordenar_resultados(resultados, metrica='sharpe_ratio'):
+    """Ordena os resultados pela métrica, do melhor para o pior"""
+    return sorted(resultados, key=lambda x: x['metricas'][metrica], reverse=True)
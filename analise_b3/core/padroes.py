@@ -0,0 +1,112 @@
+from core.features import feature, materializar
+from core.instrumentacao import medir
+from core.memoria import anexar_colunas
+
+# Fontes de suportes e resistências aceitas por detectar_niveis
+FONTES_NIVEIS = ['pivos', 'volume']
+
+# Colunas booleanas geradas por detectar_padroes_candlestick
+COLUNAS_PADROES = ['doji', 'hammer', 'shooting_star', 'bullish_marubozu', 'bearish_marubozu']
+
+# Colunas acrescentadas por detectar_padroes_candlestick e as features de onde vêm
+_COLUNAS_CANDLESTICK = {
+    'MM20': ('sma', {'window': 20}),
+    'MM50': ('sma', {'window': 50}),
+    'tendencia_alta': ('tendencia_alta', {}),
+    'tendencia_baixa': ('tendencia_baixa', {}),
+    'body': ('corpo', {}),
+    'upper_wick': ('sombra_superior', {}),
+    'lower_wick': ('sombra_inferior', {}),
+    'range_total': ('amplitude', {}),
+    **{padrao: (padrao, {}) for padrao in COLUNAS_PADROES}
+}
+
+@medir('padroes')
+def detectar_padroes_candlestick(dados, identidade=None):
+    """
+    Detecta padrões de candlestick usando definições matemáticas rigorosas
+    As definições de cada padrão estão em core.features; as médias e as medidas dos
+    candles são as mesmas séries usadas pelos indicadores e pelos gráficos.
+    identidade: IdentidadeDataset dos dados, se já calculada
+    """
+    colunas = {nome: feature(familia, **params) for nome, (familia, params) in _COLUNAS_CANDLESTICK.items()}
+    series = materializar(dados, list(colunas.values()), identidade)
+    return anexar_colunas(dados, {nome: series[item] for nome, item in colunas.items()})
+
+@medir('suportes_resistencias')
+def detectar_suportes_resistencias(dados, sensitivity=0.5, identidade=None):
+    """Detecta níveis de suporte e resistência usando análise de pivots"""
+    series = materializar(dados, [feature('pivo_alta'), feature('pivo_baixa')], identidade)
+    
+    # Uma barra que é pivot de alta e de baixa ao mesmo tempo conta como suporte
+    pivos_suporte = series[feature('pivo_baixa')]
+    pivos_resistencia = series[feature('pivo_alta')] & ~pivos_suporte
+    
+    # Agrupar níveis próximos
+    def group_levels(levels, tolerance):
+        if not levels:
+            return []
+        groups = []
+        current_group = [levels[0]]
+        
+        for level in levels[1:]:
+            if abs(level - current_group[0]) <= tolerance:
+                current_group.append(level)
+            else:
+                groups.append(sum(current_group) / len(current_group))
+                current_group = [level]
+        
+        groups.append(sum(current_group) / len(current_group))
+        return groups
+    
+    # Calcular tolerância baseada na volatilidade
+    volatility = dados['Close'].pct_change().std()
+    tolerance = volatility * sensitivity
+    
+    # Agrupar níveis
+    resistance_levels = group_levels(dados['High'][pivos_resistencia].tolist(), tolerance)
+    support_levels = group_levels(dados['Low'][pivos_suporte].tolist(), tolerance)
+    
+    return resistance_levels, support_levels
+
+def detectar_niveis(dados, fonte='pivos', identidade=None, sensitivity=0.5, faixas=None):
+    """
+    Suportes e resistências da fonte escolhida, como (resistências, suportes)
+    pivos: detectar_suportes_resistencias, com a sensitivity
+    volume: POC, área de valor e HVNs do perfil de volume (core.perfil_volume), com faixas faixas de preço
+    """
+    if fonte == 'pivos':
+        return detectar_suportes_resistencias(dados, sensitivity, identidade)
+    if fonte == 'volume':
+        from core.perfil_volume import FAIXAS_PADRAO, detectar_niveis_volume
+        return detectar_niveis_volume(dados, faixas or FAIXAS_PADRAO)
+    raise Exception(f"Fonte de suportes e resistências desconhecida: {fonte}. Use uma de {', '.join(FONTES_NIVEIS)}.")
+
+def niveis_mais_proximos(resistance_levels, support_levels, preco_atual, n=3):
+    """Filtra resistências acima e suportes abaixo do preço, mantendo os n mais próximos"""
+    resistance_levels = [level for level in resistance_levels if level > preco_atual]
+    support_levels = [level for level in support_levels if level < preco_atual]
+    
+    # Ordenar níveis por distância do preço atual
+    def get_closest_levels(levels, preco):
+        return sorted(levels, key=lambda x: abs(x - preco))[:n]
+    
+    return get_closest_levels(resistance_levels, preco_atual), get_closest_levels(support_levels, preco_atual)
+
+@medir('fibonacci')
+def calcular_niveis_fibonacci(dados, fib_levels):
+    """Calcula níveis de Fibonacci baseados no range de preços"""
+    high = dados['High'].max()
+    low = dados['Low'].min()
+    diff = high - low
+    
+    fib_levels_dict = {}
+    for level in fib_levels:
+        if level == 0:
+            fib_levels_dict[level] = low
+        elif level == 1:
+            fib_levels_dict[level] = high
+        else:
+            fib_levels_dict[level] = high - (diff * level)
+    
+    return fib_levels_dict
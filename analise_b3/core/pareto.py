@@ -0,0 +1,242 @@
+"""
+Otimização multiobjetivo (NSGA-II) dos parâmetros da estratégia
+
+Em vez de ordenar por uma métrica, busca as combinações que não são dominadas em um
+conjunto de objetivos (por padrão retorno total, drawdown máximo e número de operações,
+todos "quanto maior, melhor"; o drawdown é negativo). Uma combinação domina outra se é ao
+menos tão boa em todos os objetivos e melhor em algum; a fronteira de Pareto são as não
+dominadas.
+
+Cada geração:
+1. gera filhos da população por torneio binário, cruzamento SBX e mutação polinomial;
+2. avalia os filhos de uma vez, em paralelo nos processos de um pool criado uma só vez
+   (core.otimizador.criar_pool), pulando combinações já avaliadas;
+3. junta pais e filhos, ordena por frentes não dominadas e, dentro da última frente que
+   cabe, pela distância de aglomeração, e mantém o tamanho da população.
+
+Com a mesma seed e as mesmas avaliações o algoritmo refaz exatamente as mesmas gerações,
+o que permite retomar uma execução interrompida servindo as avaliações já gravadas.
+"""
+from core import otimizador
+from core.estrategias import ESTRATEGIA_PADRAO, obter_estrategia
+from core.instrumentacao import medir
+
+OBJETIVOS_PADRAO = ['retorno_total', 'max_drawdown', 'num_operacoes']
+
+POPULACAO_PADRAO = 40
+GERACOES_PADRAO = 10
+
+# Índices de distribuição do cruzamento SBX e da mutação polinomial (maiores: filhos mais perto dos pais)
+ETA_CRUZAMENTO = 15
+ETA_MUTACAO = 20
+PROB_CRUZAMENTO = 0.9
+
+
+def chave_params(params):
+    return tuple(sorted(params.items()))
+
+def valores_objetivos(resultados, objetivos=OBJETIVOS_PADRAO):
+    """Matriz (resultados x objetivos); métricas ausentes ou NaN valem -inf"""
+    import numpy as np
+
+    valores = np.array([[r['metricas'].get(objetivo) for objetivo in objetivos] for r in resultados],
+                       dtype='float64').reshape(len(resultados), len(objetivos))
+    return np.where(np.isfinite(valores), valores, -np.inf)
+
+def frentes_nao_dominadas(valores):
+    """
+    Ordenação não dominada rápida: a frente (0 = fronteira de Pareto) de cada linha
+    valores: matriz (n x objetivos), todos maximizados
+    """
+    import numpy as np
+
+    n = len(valores)
+    # domina[i, j]: i é ao menos tão bom quanto j em tudo e melhor em algum objetivo
+    maior_igual = (valores[:, None, :] >= valores[None, :, :]).all(axis=2)
+    maior = (valores[:, None, :] > valores[None, :, :]).any(axis=2)
+    domina = maior_igual & maior
+
+    dominado_por = domina.sum(axis=0)
+    frentes = np.full(n, -1)
+    atual = np.flatnonzero(dominado_por == 0)
+    frente = 0
+    while len(atual):
+        frentes[atual] = frente
+        dominado_por = dominado_por - domina[atual].sum(axis=0)
+        dominado_por[frentes >= 0] = -1
+        atual = np.flatnonzero(dominado_por == 0)
+        frente += 1
+    return frentes
+
+def distancia_aglomeracao(valores):
+    """Distância de aglomeração de cada linha dentro da sua frente (extremos: infinito)"""
+    import numpy as np
+
+    n, m = valores.shape
+    distancia = np.zeros(n)
+    if n <= 2:
+        return np.full(n, np.inf)
+    for objetivo in range(m):
+        ordem = np.argsort(valores[:, objetivo], kind='stable')
+        coluna = valores[ordem, objetivo]
+        distancia[ordem[[0, -1]]] = np.inf
+        amplitude = coluna[-1] - coluna[0]
+        if np.isfinite(amplitude) and amplitude > 0:
+            distancia[ordem[1:-1]] += (coluna[2:] - coluna[:-2]) / amplitude
+    return distancia
+
+def _selecionar(valores, tamanho):
+    """Índices dos tamanho melhores por frente e, na última frente, por aglomeração"""
+    import numpy as np
+
+    frentes = frentes_nao_dominadas(valores)
+    escolhidos = []
+    for frente in range(frentes.max() + 1):
+        membros = np.flatnonzero(frentes == frente)
+        if len(escolhidos) + len(membros) <= tamanho:
+            escolhidos.extend(membros)
+            continue
+        distancias = distancia_aglomeracao(valores[membros])
+        escolhidos.extend(membros[np.argsort(-distancias, kind='stable')[:tamanho - len(escolhidos)]])
+        break
+    return np.array(escolhidos)
+
+def _gerar_filhos(populacao, frentes, distancias, faixas, inteiros, rng):
+    """Filhos por torneio binário (frente, depois aglomeração), cruzamento SBX e mutação polinomial"""
+    import numpy as np
+
+    nomes = list(faixas)
+    minimos = np.array([faixas[nome][0] for nome in nomes], dtype='float64')
+    maximos = np.array([faixas[nome][1] for nome in nomes], dtype='float64')
+    amplitudes = np.where(maximos > minimos, maximos - minimos, 1.0)
+    genes = np.array([[params[nome] for nome in nomes] for params in populacao], dtype='float64')
+    n = len(populacao)
+
+    def torneio():
+        a, b = rng.integers(n, size=2)
+        if (frentes[a], -distancias[a]) <= (frentes[b], -distancias[b]):
+            return a
+        return b
+
+    filhos = []
+    while len(filhos) < n:
+        pai, mae = genes[torneio()], genes[torneio()]
+        filho_a, filho_b = pai.copy(), mae.copy()
+
+        # Cruzamento SBX, gene a gene com probabilidade 1/2
+        if rng.random() < PROB_CRUZAMENTO:
+            u = rng.random(len(nomes))
+            beta = np.where(u <= 0.5, (2 * u) ** (1 / (ETA_CRUZAMENTO + 1)),
+                            (1 / (2 * (1 - u))) ** (1 / (ETA_CRUZAMENTO + 1)))
+            troca = rng.random(len(nomes)) < 0.5
+            media, meia_diferenca = (pai + mae) / 2, np.abs(pai - mae) / 2
+            filho_a = np.where(troca, media - beta * meia_diferenca, filho_a)
+            filho_b = np.where(troca, media + beta * meia_diferenca, filho_b)
+
+        # Mutação polinomial, em média um gene por filho
+        for filho in (filho_a, filho_b):
+            mutar = rng.random(len(nomes)) < 1 / len(nomes)
+            u = rng.random(len(nomes))
+            delta = np.where(u < 0.5, (2 * u) ** (1 / (ETA_MUTACAO + 1)) - 1,
+                             1 - (2 * (1 - u)) ** (1 / (ETA_MUTACAO + 1)))
+            filho += np.where(mutar, delta * amplitudes, 0.0)
+            filhos.append(_params_de_genes(np.clip(filho, minimos, maximos), nomes, inteiros))
+    return filhos[:n]
+
+def _params_de_genes(genes, nomes, inteiros):
+    return {
+        nome: int(round(valor)) if nome in inteiros else round(float(valor), 4)
+        for nome, valor in zip(nomes, genes)
+    }
+
+def fronteira_pareto(resultados, objetivos=OBJETIVOS_PADRAO):
+    """Resultados não dominados (sem repetir parâmetros), do maior ao menor primeiro objetivo"""
+    import numpy as np
+
+    if not resultados:
+        return []
+    unicos = list({chave_params(r['params']): r for r in resultados}.values())
+    valores = valores_objetivos(unicos, objetivos)
+    frente = np.flatnonzero(frentes_nao_dominadas(valores) == 0)
+    return [unicos[i] for i in frente[np.argsort(-valores[frente, 0], kind='stable')]]
+
+@medir('otimizador.pareto')
+def otimizar_pareto(dados, faixas, capital_inicial, populacao=POPULACAO_PADRAO, geracoes=GERACOES_PADRAO,
+                    objetivos=OBJETIVOS_PADRAO, processos=1, seed=None, fonte_niveis='pivos',
+                    conhecidas=None, registrar=None, callback=None, estrategia=ESTRATEGIA_PADRAO,
+                    confirmacao=None, ticker=''):
+    """
+    NSGA-II sobre as faixas de parâmetros da estratégia (nome de core.estrategias)
+    conhecidas: dicionário chave_params -> resultado de avaliações já feitas (por exemplo,
+        gravadas antes de uma interrupção), que não são avaliadas de novo
+    registrar: função chamada como registrar(indice, resultado) a cada avaliação nova, com
+        indice sequencial entre todas as avaliações da execução (conhecidas ou não)
+    callback: função chamada como callback(geracao, geracoes, fronteira) ao fim de cada geração
+    confirmacao: tendência do tempo maior que confirma as entradas (veja core.otimizador.preparar)
+    ticker: ação dos dados (veja core.otimizador.preparar)
+    Retorna a fronteira de Pareto entre todas as combinações avaliadas
+    """
+    import numpy as np
+
+    if populacao < 4:
+        raise Exception("A população precisa ter pelo menos 4 combinações.")
+
+    inteiros = obter_estrategia(estrategia).inteiros
+    rng = np.random.default_rng(seed)
+    avaliadas = dict(conhecidas or {})
+    ordem = {}  # chave -> índice sequencial, na ordem em que o algoritmo pede cada combinação
+    executor = None
+    if processos > 1:
+        executor = otimizador.criar_pool(dados, capital_inicial, processos, fonte_niveis, estrategia,
+                                         confirmacao, ticker)
+
+    def avaliar(combinacoes):
+        novas = []
+        for params in combinacoes:
+            chave = chave_params(params)
+            if chave not in ordem:
+                ordem[chave] = len(ordem)
+                if chave not in avaliadas:
+                    novas.append(params)
+
+        def guardar(posicao, resultado):
+            chave = chave_params(novas[posicao])
+            avaliadas[chave] = resultado
+            if registrar:
+                registrar(ordem[chave], resultado)
+
+        if novas:
+            otimizador.otimizar(dados, novas, capital_inicial, processos=processos, registrar=guardar,
+                                fonte_niveis=fonte_niveis, executor=executor, estrategia=estrategia,
+                                confirmacao=confirmacao, ticker=ticker)
+        return [avaliadas[chave_params(params)] for params in combinacoes]
+
+    try:
+        pais = otimizador.gerar_combinacoes(faixas, populacao, int(rng.integers(2 ** 32)), inteiros)
+        resultados_pais = avaliar(pais)
+        for geracao in range(geracoes):
+            valores = valores_objetivos(resultados_pais, objetivos)
+            frentes = frentes_nao_dominadas(valores)
+            distancias = np.zeros(len(pais))
+            for frente in np.unique(frentes):
+                membros = frentes == frente
+                distancias[membros] = distancia_aglomeracao(valores[membros])
+
+            filhos = _gerar_filhos(pais, frentes, distancias, faixas, inteiros, rng)
+            resultados_filhos = avaliar(filhos)
+
+            # Pais e filhos sem repetição: cópias da mesma combinação não ocupam duas vagas
+            unicos = {chave_params(params): (params, resultado) for params, resultado
+                      in zip(pais + filhos, resultados_pais + resultados_filhos)}
+            todos = [params for params, _ in unicos.values()]
+            resultados_todos = [resultado for _, resultado in unicos.values()]
+            escolhidos = _selecionar(valores_objetivos(resultados_todos, objetivos), populacao)
+            pais = [todos[i] for i in escolhidos]
+            resultados_pais = [resultados_todos[i] for i in escolhidos]
+            if callback:
+                callback(geracao + 1, geracoes, fronteira_pareto(resultados_pais, objetivos))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return fronteira_pareto(list(avaliadas.values()), objetivos)
@@ -0,0 +1,133 @@
+"""
+Perfil de volume (volume por faixa de preço)
+
+O volume de cada barra é distribuído uniformemente entre sua mínima e sua máxima e somado
+em faixas de preço de mesma largura. Em vez de cruzar cada barra com cada faixa, usa-se o
+volume acumulado até cada borda, Σ densidade * (min(borda, máxima) - mínima) sobre as barras
+que começam abaixo da borda, obtido com as mínimas e máximas ordenadas e somas acumuladas:
+O((barras + faixas) log barras), o que permite recalcular o perfil de todas as ações.
+
+Do perfil saem:
+- POC (point of control): preço da faixa de maior volume
+- área de valor: faixas em torno do POC com area_valor (70%) do volume, entre VAL e VAH
+- HVN e LVN: picos e vales do perfil (nós de alto e de baixo volume)
+
+POC, VAH, VAL e HVNs servem como suportes e resistências (detectar_niveis_volume), com o
+mesmo formato de core.padroes.detectar_suportes_resistencias.
+"""
+from core.instrumentacao import medir
+
+FAIXAS_PADRAO = 50
+AREA_VALOR_PADRAO = 0.7
+
+
+def _volume_acumulado(bordas, inicios, densidades):
+    """Σ densidade * max(0, borda - início) de todas as barras, para cada borda"""
+    import numpy as np
+
+    ordem = np.argsort(inicios, kind='stable')
+    inicios = inicios[ordem]
+    densidades = densidades[ordem]
+    soma_densidades = np.concatenate([[0.0], np.cumsum(densidades)])
+    soma_ponderada = np.concatenate([[0.0], np.cumsum(densidades * inicios)])
+    anteriores = np.searchsorted(inicios, bordas, side='right')
+    return bordas * soma_densidades[anteriores] - soma_ponderada[anteriores]
+
+@medir('perfil_volume')
+def perfil_volume(dados, faixas=FAIXAS_PADRAO):
+    """
+    Volume negociado em cada uma de faixas faixas de preço, da menor mínima à maior máxima
+    Retorna um DataFrame com preco_min, preco_max, preco (centro da faixa) e volume
+    """
+    import numpy as np
+    import pandas as pd
+
+    minimas = dados['Low'].to_numpy(dtype='float64')
+    maximas = dados['High'].to_numpy(dtype='float64')
+    volumes = dados['Volume'].to_numpy(dtype='float64')
+    validas = np.isfinite(minimas) & np.isfinite(maximas) & np.isfinite(volumes)
+    minimas, maximas, volumes = minimas[validas], maximas[validas], volumes[validas]
+    if len(minimas) == 0:
+        raise Exception("Não há barras com preço e volume para o perfil de volume.")
+
+    inicio, fim = minimas.min(), maximas.max()
+    if fim <= inicio:
+        # Todas as barras no mesmo preço: uma faixa estreita em torno dele
+        inicio, fim = inicio * 0.999, fim * 1.001
+    bordas = np.linspace(inicio, fim, faixas + 1)
+
+    # Barras com amplitude: volume acumulado até cada borda, pela diferença entre as
+    # contribuições a partir da mínima e a partir da máxima
+    amplitudes = maximas - minimas
+    com_amplitude = amplitudes > 0
+    densidades = volumes[com_amplitude] / amplitudes[com_amplitude]
+    acumulado = (_volume_acumulado(bordas, minimas[com_amplitude], densidades)
+                 - _volume_acumulado(bordas, maximas[com_amplitude], densidades))
+    volume_por_faixa = np.maximum(np.diff(acumulado), 0.0)
+
+    # Barras sem amplitude: todo o volume na faixa do preço
+    volume_por_faixa += np.histogram(minimas[~com_amplitude], bins=bordas, weights=volumes[~com_amplitude])[0]
+
+    return pd.DataFrame({
+        'preco_min': bordas[:-1],
+        'preco_max': bordas[1:],
+        'preco': (bordas[:-1] + bordas[1:]) / 2,
+        'volume': volume_por_faixa
+    })
+
+def resumir_perfil(perfil, area_valor=AREA_VALOR_PADRAO):
+    """
+    POC, área de valor e nós do perfil
+    Retorna um dicionário com poc, val, vah (preços), faixas_area_valor (índices inicial e
+    final das faixas da área de valor), hvn e lvn (listas de preços)
+    """
+    import numpy as np
+
+    volumes = perfil['volume'].to_numpy()
+    precos = perfil['preco'].to_numpy()
+    n = len(volumes)
+    poc = int(np.argmax(volumes))
+
+    # Área de valor: a partir do POC, acrescenta a faixa vizinha de maior volume até atingir
+    # area_valor do volume total
+    inferior = superior = poc
+    acumulado, alvo = volumes[poc], area_valor * volumes.sum()
+    while acumulado < alvo and (inferior > 0 or superior < n - 1):
+        abaixo = volumes[inferior - 1] if inferior > 0 else -1.0
+        acima = volumes[superior + 1] if superior < n - 1 else -1.0
+        if acima >= abaixo:
+            superior += 1
+            acumulado += acima
+        else:
+            inferior -= 1
+            acumulado += abaixo
+
+    # Nós: picos e vales do perfil suavizado em 3 faixas, acima e abaixo do volume médio
+    suavizado = perfil['volume'].rolling(3, center=True, min_periods=1).mean().to_numpy()
+    anterior = np.concatenate([[-np.inf], suavizado[:-1]])
+    seguinte = np.concatenate([suavizado[1:], [-np.inf]])
+    picos = (suavizado > anterior) & (suavizado >= seguinte) & (suavizado > suavizado.mean())
+    vales = (suavizado < anterior) & (suavizado <= seguinte) & (suavizado < suavizado.mean())
+    vales[[0, -1]] = False
+
+    return {
+        'poc': float(precos[poc]),
+        'val': float(perfil['preco_min'].iloc[inferior]),
+        'vah': float(perfil['preco_max'].iloc[superior]),
+        'faixas_area_valor': (inferior, superior),
+        'hvn': precos[picos].tolist(),
+        'lvn': precos[vales].tolist()
+    }
+
+def niveis_do_perfil(resumo):
+    """POC, VAL, VAH e HVNs em ordem crescente"""
+    return sorted({resumo['poc'], resumo['val'], resumo['vah'], *resumo['hvn']})
+
+def detectar_niveis_volume(dados, faixas=FAIXAS_PADRAO, area_valor=AREA_VALOR_PADRAO):
+    """
+    Suportes e resistências do perfil de volume, como (resistências, suportes)
+    Os níveis de volume valem nos dois sentidos, então as duas listas são iguais; como nos
+    pivôs, niveis_mais_proximos separa os que estão acima e abaixo do preço
+    """
+    niveis = niveis_do_perfil(resumir_perfil(perfil_volume(dados, faixas), area_valor))
+    return niveis, list(niveis)
@@ -0,0 +1,290 @@
+"""
+Ajuste de proventos: desdobramentos, grupamentos, bonificações, dividendos e JCP
+
+As barras gravadas em dados/barras (por exemplo, importadas dos arquivos COTAHIST) são os
+preços negociados, sem ajuste. Os eventos de cada ação ficam em dados/proventos.sqlite e,
+a cada mudança, viram um índice de fatores acumulados: para cada data ex, o fator pelo qual
+são multiplicados os preços anteriores a ela. O ajuste é aplicado na leitura (veja
+ReplayProvider.get_stock_data): uma busca binária das datas das barras no índice e uma
+multiplicação vetorizada. Um evento novo só recalcula o índice da ação; as barras gravadas
+nunca são reescritas, e nada precisa ser baixado de novo.
+
+Fator de cada evento (sobre os preços anteriores à data ex):
+- desdobramento de 1 em valor ações: 1 / valor (o volume é multiplicado por valor)
+- grupamento de valor ações em 1: valor (o volume é dividido por valor)
+- bonificação de valor (fração, 0.1 = 10%): 1 / (1 + valor), como um desdobramento
+- dividendo e JCP de valor reais por ação: 1 - valor / fechamento do pregão anterior à data ex
+
+ANALISE_B3_AJUSTE escolhe o ajuste: total (padrão, como o yfinance), desdobramentos
+(só os eventos que mudam a quantidade de ações) ou nenhum.
+"""
+import os
+import threading
+
+from core.banco import conectar
+
+CAMINHO_PADRAO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados', 'proventos.sqlite'
+)
+
+# Eventos que mudam a quantidade de ações (ajustam também o volume)
+TIPOS_DESDOBRAMENTO = ['desdobramento', 'grupamento', 'bonificacao']
+TIPOS_DINHEIRO = ['dividendo', 'jcp']
+TIPOS = TIPOS_DESDOBRAMENTO + TIPOS_DINHEIRO
+
+AJUSTES = ['total', 'desdobramentos', 'nenhum']
+
+COLUNAS_PRECO = ['Open', 'High', 'Low', 'Close']
+
+
+def modo_ajuste():
+    """Ajuste aplicado na leitura, pela variável ANALISE_B3_AJUSTE"""
+    ajuste = os.environ.get('ANALISE_B3_AJUSTE', 'total').lower()
+    if ajuste not in AJUSTES:
+        raise Exception(f"Ajuste desconhecido: {ajuste}. Use um de {', '.join(AJUSTES)}.")
+    return ajuste
+
+def normalizar_ticker(ticker):
+    """Os eventos valem para o ticker com ou sem o sufixo .SA"""
+    ticker = ticker.upper()
+    return ticker[:-len('.SA')] if ticker.endswith('.SA') else ticker
+
+def fator_evento(tipo, valor, fechamento_anterior=None):
+    """Fator do evento sobre os preços anteriores à data ex (1 se não puder ser calculado)"""
+    if tipo not in TIPOS:
+        raise Exception(f"Tipo de provento desconhecido: {tipo}. Use um de {', '.join(TIPOS)}.")
+    if valor <= 0:
+        raise Exception(f"Valor inválido para {tipo}: {valor}")
+    if tipo == 'desdobramento':
+        return 1 / valor
+    if tipo == 'grupamento':
+        return valor
+    if tipo == 'bonificacao':
+        return 1 / (1 + valor)
+    # Sem o pregão anterior não há preço anterior a ajustar
+    if not fechamento_anterior or valor >= fechamento_anterior:
+        return 1.0
+    return 1 - valor / fechamento_anterior
+
+
+class IndiceFatores:
+    """
+    Fatores acumulados de uma ação: datas ex em ordem (datetime64[ns]) e, para cada
+    posição j, o fator das barras com exatamente j datas ex até a sua data (inclusive)
+    """
+
+    def __init__(self, datas, total, desdobramentos):
+        self.datas = datas
+        self.total = total  # len(datas) + 1 fatores; o último é 1
+        self.desdobramentos = desdobramentos
+
+    def __len__(self):
+        return len(self.datas)
+
+
+class Proventos:
+    """Eventos de proventos por ação e o índice de fatores acumulados derivado deles"""
+
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self._local = threading.local()
+
+        with self._conexao() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS eventos (
+                    ticker TEXT NOT NULL,
+                    data_ex TEXT NOT NULL,
+                    tipo TEXT NOT NULL,
+                    valor REAL NOT NULL,
+                    PRIMARY KEY (ticker, data_ex, tipo)
+                )
+            """)
+            # Índice precomputado: fator acumulado das barras anteriores a cada data ex
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS fatores (
+                    ticker TEXT NOT NULL,
+                    data_ex TEXT NOT NULL,
+                    fator_total REAL NOT NULL,
+                    fator_desdobramentos REAL NOT NULL,
+                    PRIMARY KEY (ticker, data_ex)
+                )
+            """)
+
+    def _conexao(self):
+        # Conexões SQLite não podem ser compartilhadas entre threads
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = conectar(self.caminho)
+            self._local.conexao = conexao
+        return conexao
+
+    def registrar(self, ticker, eventos, fechamentos=None):
+        """
+        Grava eventos da ação (substituindo os de mesma data ex e tipo) e recalcula seu índice
+        eventos: lista de dicionários com data_ex (AAAA-MM-DD), tipo e valor
+        fechamentos: fechamentos brutos da ação (Series por data), para os fatores dos dividendos
+        """
+        import pandas as pd
+
+        ticker = normalizar_ticker(ticker)
+        linhas = []
+        for evento in eventos:
+            fator_evento(evento['tipo'], float(evento['valor']))  # valida tipo e valor
+            linhas.append((ticker, pd.Timestamp(evento['data_ex']).strftime('%Y-%m-%d'),
+                           evento['tipo'], float(evento['valor'])))
+        with self._conexao() as conexao:
+            conexao.executemany(
+                "INSERT OR REPLACE INTO eventos (ticker, data_ex, tipo, valor) VALUES (?, ?, ?, ?)", linhas
+            )
+        self.recalcular(ticker, fechamentos)
+
+    def remover(self, ticker, data_ex, tipo=None, fechamentos=None):
+        """Remove os eventos da ação na data ex (de um tipo ou de todos) e recalcula seu índice"""
+        import pandas as pd
+
+        ticker = normalizar_ticker(ticker)
+        condicoes, valores = ['ticker = ?', 'data_ex = ?'], [ticker, pd.Timestamp(data_ex).strftime('%Y-%m-%d')]
+        if tipo:
+            condicoes.append('tipo = ?')
+            valores.append(tipo)
+        with self._conexao() as conexao:
+            removidos = conexao.execute(f"DELETE FROM eventos WHERE {' AND '.join(condicoes)}", valores).rowcount
+        self.recalcular(ticker, fechamentos)
+        return removidos
+
+    def eventos(self, ticker=None):
+        """Eventos gravados (de uma ação ou de todas), em ordem de ação e data ex"""
+        import pandas as pd
+
+        consulta = "SELECT ticker, data_ex, tipo, valor FROM eventos"
+        valores = []
+        if ticker:
+            consulta += " WHERE ticker = ?"
+            valores.append(normalizar_ticker(ticker))
+        return pd.DataFrame(self._conexao().execute(consulta + " ORDER BY ticker, data_ex, tipo", valores).fetchall(),
+                            columns=['ticker', 'data_ex', 'tipo', 'valor'])
+
+    def tickers(self):
+        """Ações com eventos gravados"""
+        return {linha[0] for linha in self._conexao().execute("SELECT DISTINCT ticker FROM eventos")}
+
+    def recalcular(self, ticker, fechamentos=None):
+        """
+        Recalcula o índice de fatores da ação a partir dos eventos gravados
+        fechamentos: fechamentos brutos (Series por data); por padrão os do diretório do provedor replay
+        """
+        import numpy as np
+        import pandas as pd
+
+        ticker = normalizar_ticker(ticker)
+        eventos = self.eventos(ticker)
+        if fechamentos is None and eventos['tipo'].isin(TIPOS_DINHEIRO).any():
+            fechamentos = fechamentos_brutos(ticker)
+
+        datas = sorted(eventos['data_ex'].unique())
+        fator_total, fator_desdobramentos = np.ones(len(datas)), np.ones(len(datas))
+        for posicao, data_ex in enumerate(datas):
+            for evento in eventos[eventos['data_ex'] == data_ex].itertuples():
+                fechamento_anterior = None
+                if evento.tipo in TIPOS_DINHEIRO and fechamentos is not None:
+                    anteriores = fechamentos[fechamentos.index < pd.Timestamp(data_ex)]
+                    fechamento_anterior = float(anteriores.iloc[-1]) if len(anteriores) else None
+                fator = fator_evento(evento.tipo, evento.valor, fechamento_anterior)
+                fator_total[posicao] *= fator
+                if evento.tipo in TIPOS_DESDOBRAMENTO:
+                    fator_desdobramentos[posicao] *= fator
+
+        # Acumulado do fim para o início: as barras antes da data ex i recebem os fatores de i em diante
+        acumulado_total = np.cumprod(fator_total[::-1])[::-1]
+        acumulado_desdobramentos = np.cumprod(fator_desdobramentos[::-1])[::-1]
+        with self._conexao() as conexao:
+            conexao.execute("DELETE FROM fatores WHERE ticker = ?", (ticker,))
+            conexao.executemany(
+                "INSERT INTO fatores (ticker, data_ex, fator_total, fator_desdobramentos) VALUES (?, ?, ?, ?)",
+                [(ticker, data_ex, float(total), float(desdobramentos)) for data_ex, total, desdobramentos
+                 in zip(datas, acumulado_total, acumulado_desdobramentos)]
+            )
+
+    def indice(self, ticker):
+        """Índice de fatores acumulados da ação (vazio se não há eventos)"""
+        import numpy as np
+
+        linhas = self._conexao().execute(
+            "SELECT data_ex, fator_total, fator_desdobramentos FROM fatores WHERE ticker = ? ORDER BY data_ex",
+            (normalizar_ticker(ticker),)
+        ).fetchall()
+        datas = np.array([linha[0] for linha in linhas], dtype='datetime64[ns]')
+        total = np.array([linha[1] for linha in linhas] + [1.0])
+        desdobramentos = np.array([linha[2] for linha in linhas] + [1.0])
+        return IndiceFatores(datas, total, desdobramentos)
+
+
+_proventos = None
+_proventos_lock = threading.Lock()
+
+def obter_proventos():
+    """Armazenamento dos proventos do processo (ANALISE_B3_PROVENTOS muda o arquivo SQLite)"""
+    global _proventos
+    with _proventos_lock:
+        if _proventos is None:
+            _proventos = Proventos(os.environ.get('ANALISE_B3_PROVENTOS', CAMINHO_PADRAO))
+        return _proventos
+
+def fechamentos_brutos(ticker):
+    """Fechamentos sem ajuste da ação no diretório do provedor replay, ou None se não estiver gravada"""
+    from api.replay_provider import ReplayProvider
+
+    try:
+        return ReplayProvider.do_ambiente().historico_completo(ticker)['Close']
+    except Exception:
+        return None
+
+def ajustar(dados, ticker, ajuste=None, indice=None):
+    """
+    Barras com os proventos aplicados, sem alterar a entrada
+    ajuste: total, desdobramentos ou nenhum (padrão: modo_ajuste())
+    indice: IndiceFatores da ação; por padrão o gravado
+    """
+    import numpy as np
+    from core.memoria import anexar_colunas
+
+    ajuste = ajuste or modo_ajuste()
+    if ajuste == 'nenhum' or len(dados) == 0:
+        return dados
+    if indice is None:
+        indice = obter_proventos().indice(ticker)
+    if len(indice) == 0:
+        return dados
+
+    datas = dados.index.tz_localize(None) if dados.index.tz is not None else dados.index
+    posicoes = np.searchsorted(indice.datas, datas.to_numpy(dtype='datetime64[ns]'), side='right')
+    fator = (indice.total if ajuste == 'total' else indice.desdobramentos)[posicoes]
+    if (fator == 1).all():
+        return dados
+    colunas = {coluna: dados[coluna] * fator for coluna in COLUNAS_PRECO if coluna in dados.columns}
+    if 'Volume' in dados.columns:
+        colunas['Volume'] = dados['Volume'] / indice.desdobramentos[posicoes]
+    return anexar_colunas(dados, colunas)
+
+def eventos_do_provedor(acoes):
+    """
+    Eventos no formato de Proventos.registrar a partir de get_corporate_actions de um provedor
+    Os dividendos do yfinance vêm divididos pelos desdobramentos posteriores: voltam aqui ao
+    valor por ação da data ex, o que se paga sobre as barras sem ajuste
+    """
+    import numpy as np
+
+    datas = acoes.index.tz_localize(None) if acoes.index.tz is not None else acoes.index
+    desdobramentos = acoes['Stock Splits'].to_numpy() if 'Stock Splits' in acoes.columns else np.zeros(len(acoes))
+    dividendos = acoes['Dividends'].to_numpy() if 'Dividends' in acoes.columns else np.zeros(len(acoes))
+    razoes = np.where(desdobramentos > 0, desdobramentos, 1.0)
+
+    eventos = []
+    for posicao, data_ex in enumerate(datas.strftime('%Y-%m-%d')):
+        if desdobramentos[posicao] > 0 and desdobramentos[posicao] != 1:
+            eventos.append({'data_ex': data_ex, 'tipo': 'desdobramento', 'valor': float(desdobramentos[posicao])})
+        if dividendos[posicao] > 0:
+            # Produto das razões dos desdobramentos depois desta data ex
+            posteriores = float(np.prod(razoes[datas > datas[posicao]]))
+            eventos.append({'data_ex': data_ex, 'tipo': 'dividendo', 'valor': float(dividendos[posicao]) * posteriores})
+    return eventos
@@ -0,0 +1,366 @@
+"""
+Registro das otimizações em SQLite
+
+Cada execução da otimização ganha um run_id, e cada combinação avaliada é gravada com
+seus parâmetros e métricas, indexada por ticker, período, estratégia e execução. As
+consultas de "melhores N por métrica" usam os índices e valem para todas as execuções;
+como o capital inicial, os suportes e resistências e a confirmação do tempo maior mudam as
+métricas, elas podem ser restritas às execuções com as mesmas configurações.
+A execução também guarda seu estado (status, total de combinações, heartbeat), o que
+permite acompanhar e retomar otimizações rodando em segundo plano (veja core.tarefas).
+"""
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from core.banco import conectar
+
+CAMINHO_PADRAO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados', 'resultados.sqlite'
+)
+
+# Métricas gravadas em colunas próprias, para poderem ser ordenadas pelos índices
+# (em todas, quanto maior, melhor: o drawdown máximo é negativo)
+METRICAS = ['retorno_total', 'num_operacoes', 'taxa_acerto', 'sharpe_ratio', 'max_drawdown']
+
+# Configurações da execução que mudam as métricas: só avaliações com as mesmas são comparáveis
+CONFIGURACOES_EXECUCAO = ['capital_inicial', 'fonte_niveis', 'confirmacao']
+
+# Valor das configurações em execuções de versões anteriores, que não as gravavam
+CONFIGURACOES_LEGADAS = {'fonte_niveis': 'pivos'}
+
+# Colunas de estado das execuções, acrescentadas a bancos criados por versões anteriores
+COLUNAS_ESTADO = {
+    'status': "TEXT NOT NULL DEFAULT 'concluida'",
+    'total': 'INTEGER',
+    'heartbeat': 'REAL',
+    'pid': 'INTEGER',
+    'erro': 'TEXT'
+}
+
+# O configuracoes.json só guardava otimizações da estratégia RSI + MACD
+ESTRATEGIA_LEGADA = 'rsi_macd'
+
+
+class ResultadosOtimizacao:
+    """Armazenamento das combinações avaliadas em todas as otimizações"""
+
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self._local = threading.local()
+
+        with self._conexao() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS execucoes (
+                    run_id TEXT PRIMARY KEY,
+                    ticker TEXT NOT NULL,
+                    periodo TEXT NOT NULL,
+                    estrategia TEXT NOT NULL,
+                    criada_em TEXT NOT NULL,
+                    configuracao TEXT
+                )
+            """)
+            existentes = {linha[1] for linha in conexao.execute("PRAGMA table_info(execucoes)")}
+            for coluna, tipo in COLUNAS_ESTADO.items():
+                if coluna not in existentes:
+                    conexao.execute(f"ALTER TABLE execucoes ADD COLUMN {coluna} {tipo}")
+            conexao.execute(f"""
+                CREATE TABLE IF NOT EXISTS avaliacoes (
+                    run_id TEXT NOT NULL REFERENCES execucoes (run_id),
+                    indice INTEGER NOT NULL,
+                    ticker TEXT NOT NULL,
+                    periodo TEXT NOT NULL,
+                    estrategia TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    {', '.join(f'{metrica} REAL' for metrica in METRICAS)},
+                    avaliada_em REAL NOT NULL,
+                    PRIMARY KEY (run_id, indice)
+                )
+            """)
+            # Métricas acrescentadas depois: as avaliações antigas ficam com NULL
+            existentes = {linha[1] for linha in conexao.execute("PRAGMA table_info(avaliacoes)")}
+            for metrica in METRICAS:
+                if metrica not in existentes:
+                    conexao.execute(f"ALTER TABLE avaliacoes ADD COLUMN {metrica} REAL")
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_execucoes_busca ON execucoes (ticker, periodo, estrategia)"
+            )
+            for metrica in METRICAS:
+                conexao.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_avaliacoes_{metrica} "
+                    f"ON avaliacoes (ticker, periodo, estrategia, {metrica})"
+                )
+
+    def _conexao(self):
+        # Conexões SQLite não podem ser compartilhadas entre threads
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = conectar(self.caminho)
+            self._local.conexao = conexao
+        return conexao
+
+    def criar_execucao(self, ticker, periodo, estrategia, configuracao=None, run_id=None,
+                       total=None, status='pendente'):
+        """Registra uma nova execução e retorna seu run_id"""
+        run_id = run_id or uuid.uuid4().hex
+        with self._conexao() as conexao:
+            conexao.execute(
+                "INSERT INTO execucoes (run_id, ticker, periodo, estrategia, criada_em, configuracao, total, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, ticker, periodo, estrategia, datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                 json.dumps(configuracao, default=str), total, status)
+            )
+        return run_id
+
+    def atualizar_execucao(self, run_id, **campos):
+        """Atualiza as colunas de estado da execução (status, heartbeat, pid, erro, total)"""
+        for coluna in campos:
+            if coluna not in COLUNAS_ESTADO:
+                raise Exception(f"Coluna de estado desconhecida: {coluna}")
+        with self._conexao() as conexao:
+            conexao.execute(
+                f"UPDATE execucoes SET {', '.join(f'{coluna} = ?' for coluna in campos)} WHERE run_id = ?",
+                (*campos.values(), run_id)
+            )
+
+    def obter_execucao(self, run_id):
+        """Retorna a execução com sua configuração e o número de avaliações gravadas, ou None"""
+        execucoes = self._listar_execucoes(['e.run_id = ?'], [run_id])
+        return execucoes[0] if execucoes else None
+
+    def indices_avaliados(self, run_id):
+        """Índices das combinações da execução que já foram avaliadas"""
+        return {
+            linha[0] for linha in
+            self._conexao().execute("SELECT indice FROM avaliacoes WHERE run_id = ?", (run_id,))
+        }
+
+    def registrar_avaliacoes(self, run_id, avaliacoes):
+        """
+        Grava um lote de avaliações em uma única transação
+        avaliacoes: lista de (indice, resultado), com resultado no formato {'params', 'metricas'}
+        """
+        if not avaliacoes:
+            return
+
+        conexao = self._conexao()
+        ticker, periodo, estrategia = conexao.execute(
+            "SELECT ticker, periodo, estrategia FROM execucoes WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        agora = time.time()
+
+        with conexao:
+            conexao.executemany(
+                f"INSERT OR REPLACE INTO avaliacoes "
+                f"(run_id, indice, ticker, periodo, estrategia, params, {', '.join(METRICAS)}, avaliada_em) "
+                f"VALUES ({', '.join('?' * (7 + len(METRICAS)))})",
+                [
+                    (run_id, indice, ticker, periodo, estrategia, json.dumps(resultado['params']),
+                     *[_valor_metrica(resultado['metricas'].get(metrica)) for metrica in METRICAS],
+                     agora)
+                    for indice, resultado in avaliacoes
+                ]
+            )
+
+    def melhores(self, metrica='sharpe_ratio', n=10, ticker=None, periodo=None,
+                 estrategia=None, run_id=None, configuracao=None):
+        """
+        Retorna as n melhores avaliações pela métrica, entre todas as execuções que atendem aos filtros,
+        cada uma com as configurações da sua execução (CONFIGURACOES_EXECUCAO)
+        n: None retorna todas
+        configuracao: valores de CONFIGURACOES_EXECUCAO que as execuções precisam ter, como
+            {'capital_inicial': 10000.0, 'fonte_niveis': 'pivos', 'confirmacao': None}
+        """
+        if metrica not in METRICAS:
+            raise Exception(f"Métrica desconhecida: {metrica}")
+
+        # Em ordem decrescente o SQLite deixa os NULL por último
+        configuracoes = self._configuracoes(ticker, periodo, estrategia)
+        filtros, valores = _filtros_avaliacoes(ticker, periodo, estrategia, run_id,
+                                               _execucoes_com(configuracoes, configuracao))
+        linhas = self._conexao().execute(
+            f"SELECT run_id, indice, ticker, periodo, estrategia, params, {', '.join(METRICAS)} "
+            f"FROM avaliacoes WHERE {' AND '.join(filtros)} ORDER BY {metrica} DESC LIMIT ?",
+            (*valores, -1 if n is None else n)
+        ).fetchall()
+
+        return [
+            {
+                'run_id': linha[0],
+                'indice': linha[1],
+                'ticker': linha[2],
+                'periodo': linha[3],
+                'estrategia': linha[4],
+                'params': json.loads(linha[5]),
+                'metricas': _metricas(linha[6:]),
+                'configuracao': configuracoes.get(linha[0], _configuracao(None))
+            }
+            for linha in linhas
+        ]
+
+    def tabela(self, parametros=(), metrica='sharpe_ratio', ticker=None, periodo=None,
+               estrategia=None, run_id=None, configuracao=None):
+        """
+        Todas as avaliações que atendem aos filtros, em ordem decrescente da métrica, como DataFrame:
+        run_id, indice, as métricas, uma coluna por nome em parametros e as configurações da
+        execução (a confirmação como texto JSON)
+        Os parâmetros saem do JSON pelo próprio SQLite, sem um dicionário por avaliação.
+        configuracao: como em melhores
+        """
+        import pandas as pd
+
+        if metrica not in METRICAS:
+            raise Exception(f"Métrica desconhecida: {metrica}")
+
+        configuracoes = self._configuracoes(ticker, periodo, estrategia)
+        filtros, valores = _filtros_avaliacoes(ticker, periodo, estrategia, run_id,
+                                               _execucoes_com(configuracoes, configuracao))
+        colunas = ['run_id', 'indice', *METRICAS, *parametros]
+        linhas = self._conexao().execute(
+            f"SELECT run_id, indice, {', '.join(METRICAS)}"
+            f"{''.join(', json_extract(params, ?)' for _ in parametros)} "
+            f"FROM avaliacoes WHERE {' AND '.join(filtros)} ORDER BY {metrica} DESC",
+            (*[f'$.{nome}' for nome in parametros], *valores)
+        ).fetchall()
+        tabela = pd.DataFrame(linhas, columns=colunas)
+        # NULL (métrica não finita ou ausente) vira NaN nas colunas numéricas; o run_id se repete
+        # em todas as avaliações da execução e vira uma coluna categórica (dicionário no Arrow)
+        tabela[METRICAS] = tabela[METRICAS].astype('float64')
+        tabela['run_id'] = tabela['run_id'].astype('category')
+        # As configurações são as da execução: uma consulta por categoria, não por avaliação
+        for nome in CONFIGURACOES_EXECUCAO:
+            tabela[nome] = tabela['run_id'].map({
+                run_id: _texto_configuracao(configuracoes.get(run_id, _configuracao(None))[nome])
+                for run_id in tabela['run_id'].cat.categories
+            })
+        return tabela
+
+    def execucoes(self, ticker=None, periodo=None, estrategia=None, status=None):
+        """Lista as execuções, da mais recente para a mais antiga, com o número de avaliações"""
+        filtros, valores = ['1 = 1'], []
+        for coluna, valor in [('e.ticker', ticker), ('e.periodo', periodo),
+                              ('e.estrategia', estrategia), ('e.status', status)]:
+            if valor is not None:
+                filtros.append(f"{coluna} = ?")
+                valores.append(valor)
+        return self._listar_execucoes(filtros, valores)
+
+    def _configuracoes(self, ticker=None, periodo=None, estrategia=None):
+        """run_id -> configurações (CONFIGURACOES_EXECUCAO) das execuções que atendem aos filtros"""
+        filtros, valores = ['1 = 1'], []
+        for coluna, valor in [('ticker', ticker), ('periodo', periodo), ('estrategia', estrategia)]:
+            if valor is not None:
+                filtros.append(f"{coluna} = ?")
+                valores.append(valor)
+        return {
+            run_id: _configuracao(json.loads(configuracao or 'null'))
+            for run_id, configuracao in self._conexao().execute(
+                f"SELECT run_id, configuracao FROM execucoes WHERE {' AND '.join(filtros)}", valores
+            )
+        }
+
+    def _listar_execucoes(self, filtros, valores):
+        colunas = ['run_id', 'ticker', 'periodo', 'estrategia', 'criada_em', 'configuracao', *COLUNAS_ESTADO]
+        linhas = self._conexao().execute(
+            f"SELECT {', '.join(f'e.{coluna}' for coluna in colunas)}, "
+            f"(SELECT COUNT(*) FROM avaliacoes a WHERE a.run_id = e.run_id) "
+            f"FROM execucoes e WHERE {' AND '.join(filtros)} ORDER BY e.criada_em DESC",
+            valores
+        ).fetchall()
+
+        execucoes = []
+        for linha in linhas:
+            execucao = dict(zip(colunas + ['avaliacoes'], linha))
+            execucao['configuracao'] = json.loads(execucao['configuracao'] or 'null')
+            execucoes.append(execucao)
+        return execucoes
+
+    def importar_configuracoes_json(self, caminho='configuracoes.json'):
+        """Importa as melhores configurações salvas no antigo configuracoes.json (uma única vez)"""
+        if not os.path.exists(caminho):
+            return
+
+        with open(caminho, 'r') as f:
+            configs = json.load(f)
+
+        conexao = self._conexao()
+        for chave, config in configs.items():
+            run_id = f"legado-{chave}"
+            if conexao.execute("SELECT 1 FROM execucoes WHERE run_id = ?", (run_id,)).fetchone():
+                continue
+            self.criar_execucao(config['acao'], config['periodo'], ESTRATEGIA_LEGADA,
+                                {'importado_de': caminho}, run_id=run_id, total=1, status='concluida')
+            self.registrar_avaliacoes(run_id, [(0, config)])
+
+
+class GravadorLotes:
+    """
+    Acumula avaliações e grava em lotes, para não abrir uma transação por combinação
+    Cada lote gravado é também o ponto de retomada da execução, caso ela seja interrompida.
+    """
+
+    def __init__(self, resultados, run_id, tamanho_lote=100):
+        self.resultados = resultados
+        self.run_id = run_id
+        self.tamanho_lote = tamanho_lote
+        self.pendentes = []
+
+    def adicionar(self, indice, resultado):
+        self.pendentes.append((indice, resultado))
+        if len(self.pendentes) >= self.tamanho_lote:
+            self.finalizar()
+
+    def finalizar(self):
+        """Grava o que estiver pendente"""
+        self.resultados.registrar_avaliacoes(self.run_id, self.pendentes)
+        self.pendentes = []
+
+
+def _filtros_avaliacoes(ticker, periodo, estrategia, run_id, run_ids=None):
+    """run_ids: execuções permitidas (lista), ou None para todas"""
+    filtros, valores = ['1 = 1'], []
+    for coluna, valor in [('ticker', ticker), ('periodo', periodo),
+                          ('estrategia', estrategia), ('run_id', run_id)]:
+        if valor is not None:
+            filtros.append(f"{coluna} = ?")
+            valores.append(valor)
+    if run_ids is not None:
+        # Um único parâmetro, qualquer que seja o número de execuções
+        filtros.append("run_id IN (SELECT value FROM json_each(?))")
+        valores.append(json.dumps(run_ids))
+    return filtros, valores
+
+def _configuracao(configuracao):
+    """Configurações de CONFIGURACOES_EXECUCAO no dicionário de configuração da execução"""
+    configuracao = configuracao or {}
+    return {nome: configuracao.get(nome, CONFIGURACOES_LEGADAS.get(nome)) for nome in CONFIGURACOES_EXECUCAO}
+
+def _execucoes_com(configuracoes, configuracao):
+    """run_ids de configuracoes com os valores de configuracao, ou None se configuracao é None"""
+    if configuracao is None:
+        return None
+    for nome in configuracao:
+        if nome not in CONFIGURACOES_EXECUCAO:
+            raise Exception(f"Configuração desconhecida: {nome}")
+    return [run_id for run_id, valores in configuracoes.items()
+            if all(valores[nome] == valor for nome, valor in configuracao.items())]
+
+def _texto_configuracao(valor):
+    # A confirmação (um dicionário) vira texto, para a coluna ter um único tipo
+    return json.dumps(valor, sort_keys=True) if isinstance(valor, dict) else valor
+
+def _metricas(valores):
+    metricas = dict(zip(METRICAS, valores))
+    if metricas['num_operacoes'] is not None:
+        metricas['num_operacoes'] = int(metricas['num_operacoes'])
+    return metricas
+
+def _valor_metrica(valor):
+    # NaN e infinito não são ordenáveis; ficam como NULL, no fim dos rankings
+    if valor is None or not math.isfinite(valor):
+        return None
+    return float(valor)
@@ -0,0 +1,81 @@
+"""
+Score de operação por barra
+
+Soma ponderada de três regras, calculada para todas as barras de uma vez:
+- momentum: +peso quando RSI e MACD indicam compra juntos, -peso quando indicam venda
+- price action: um doji (corpo até 10% da amplitude) soma +peso em vela de alta e -peso nas demais
+- tendência: +peso com a média curta acima da longa, -peso caso contrário
+
+Com os pesos e parâmetros padrão, o valor da última barra é o score que a página principal
+calculava em calcular_score_operacao. A série pode ser desenhada, usada como sinal no
+backtest (sinais_do_score) ou comparada entre ações.
+"""
+from core.features import dependencia, feature, materializar, registrar
+
+PESOS_PADRAO = {'momentum': 2, 'price_action': 1, 'tendencia': 1}
+
+PARAMS_PADRAO = {
+    'rsi_period': 14, 'rsi_oversold': 30, 'rsi_overbought': 70,
+    'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9,
+    'mm_curta': 20, 'mm_longa': 50
+}
+
+# Score mínimo (em módulo) para que sinais_do_score indique compra ou venda
+LIMIAR_PADRAO = 2
+
+
+def pontuar(sinal_rsi, sinal_macd, doji, abertura, fechamento, mm_curta, mm_longa, pesos=None):
+    """Score de cada barra a partir das séries de sinais, doji, preços e médias"""
+    import numpy as np
+    import pandas as pd
+
+    pesos = {**PESOS_PADRAO, **(pesos or {})}
+
+    momentum = np.where((sinal_rsi == 1) & (sinal_macd == 1), 1,
+                        np.where((sinal_rsi == -1) & (sinal_macd == -1), -1, 0))
+    price_action = np.where(doji, np.where(fechamento > abertura, 1, -1), 0)
+    tendencia = np.where(mm_curta > mm_longa, 1, -1)
+
+    return pd.Series(
+        pesos['momentum'] * momentum
+        + pesos['price_action'] * price_action
+        + pesos['tendencia'] * tendencia,
+        index=fechamento.index
+    )
+
+def _entradas_score(rsi_period, rsi_oversold, rsi_overbought, macd_fast, macd_slow, macd_signal,
+                    mm_curta, mm_longa, **pesos):
+    return (
+        dependencia('sinal_rsi', window=rsi_period, compra=rsi_oversold, venda=rsi_overbought),
+        dependencia('sinal_macd', fast=macd_fast, slow=macd_slow, sign=macd_signal),
+        dependencia('doji_amplo'), 'Open', 'Close',
+        dependencia('sma', window=mm_curta), dependencia('sma', window=mm_longa)
+    )
+
+@registrar('score', entradas=_entradas_score)
+def _score(sinal_rsi, sinal_macd, doji, abertura, fechamento, media_curta, media_longa, **params):
+    pesos = {nome[len('peso_'):]: valor for nome, valor in params.items() if nome.startswith('peso_')}
+    return pontuar(sinal_rsi, sinal_macd, doji, abertura, fechamento, media_curta, media_longa, pesos)
+
+def calcular_score(dados, params=None, pesos=None, identidade=None):
+    """
+    Série do score de operação de todas as barras
+    params: parâmetros das regras (veja PARAMS_PADRAO); pesos: peso de cada regra (PESOS_PADRAO)
+    identidade: IdentidadeDataset dos dados, se já calculada
+    """
+    item = feature_score(params, pesos)
+    return materializar(dados, [item], identidade)[item]
+
+def feature_score(params=None, pesos=None):
+    """Feature do score com os parâmetros e pesos dados (os ausentes com os valores padrão)"""
+    params = {chave: (params or {}).get(chave, padrao) for chave, padrao in PARAMS_PADRAO.items()}
+    pesos = {**PESOS_PADRAO, **(pesos or {})}
+    return feature('score', **params, **{f'peso_{regra}': peso for regra, peso in pesos.items()})
+
+def sinais_do_score(score, limiar_compra=LIMIAR_PADRAO, limiar_venda=-LIMIAR_PADRAO):
+    """Sinais para executar_backtest: 1 com score >= limiar_compra, -1 com score <= limiar_venda"""
+    import numpy as np
+    import pandas as pd
+
+    return pd.Series(np.where(score >= limiar_compra, 1, np.where(score <= limiar_venda, -1, 0)),
+                     index=score.index)
@@ -0,0 +1,106 @@
+"""
+Motor de sinais da página Sinais de Operação
+
+Três famílias de análise, cada uma um conjunto de colunas declaradas como features:
+- momentum: RSI, MACD e o sinal de cada um (1 compra, -1 venda, 0 neutro)
+- price_action: doji, pin bar e, opcionalmente, os demais padrões de candlestick
+- tendencias: médias móveis curta e longa e ATR
+
+calcular_familias resolve as colunas de todas as famílias pedidas em uma única passagem do
+resolvedor (core.features), de modo que dependências comuns, como o corpo e a amplitude dos
+candles, são calculadas uma vez. Cada família depende só dos próprios parâmetros: quem
+guarda os resultados por família recalcula apenas a família cujo controle mudou.
+"""
+from core.features import feature, materializar
+from core.memoria import anexar_colunas
+from core.score import pontuar
+
+FAMILIAS = ['momentum', 'price_action', 'tendencias']
+
+PARAMS_PADRAO = {
+    'momentum': {'rsi_compra': 30, 'rsi_venda': 70, 'macd_fast': 12, 'macd_slow': 26},
+    'price_action': {'padroes': True},
+    'tendencias': {'mm_curta': 20, 'mm_longa': 50, 'atr_period': 14}
+}
+
+
+def colunas_momentum(rsi_compra, rsi_venda, macd_fast, macd_slow):
+    """RSI de 14 períodos e sinal do MACD de 9, os padrões do ta"""
+    macd = dict(fast=macd_fast, slow=macd_slow, sign=9)
+    return {
+        'RSI': feature('rsi', window=14),
+        'MACD': feature('macd', **macd),
+        'MACD_Signal': feature('macd_sinal', **macd),
+        'sinal_rsi': feature('sinal_rsi', window=14, compra=rsi_compra, venda=rsi_venda),
+        'sinal_macd': feature('sinal_macd', **macd)
+    }
+
+def colunas_price_action(padroes=True):
+    """Doji (corpo até 10% da amplitude) e pin bar; com padroes, também hammer, shooting star e marubozus"""
+    colunas = {'doji': feature('doji_amplo'), 'pin_bar': feature('pin_bar')}
+    if padroes:
+        for padrao in ['hammer', 'shooting_star', 'bullish_marubozu', 'bearish_marubozu']:
+            colunas[padrao] = feature(padrao)
+    return colunas
+
+def colunas_tendencias(mm_curta, mm_longa, atr_period):
+    return {
+        f'MM{mm_curta}': feature('sma', window=mm_curta),
+        f'MM{mm_longa}': feature('sma', window=mm_longa),
+        'ATR': feature('atr', window=atr_period)
+    }
+
+_COLUNAS_POR_FAMILIA = {
+    'momentum': colunas_momentum,
+    'price_action': colunas_price_action,
+    'tendencias': colunas_tendencias
+}
+
+def calcular_familias(dados, familias, identidade=None):
+    """
+    Colunas das famílias pedidas, em uma única passagem do resolvedor
+    familias: dicionário família -> parâmetros (veja PARAMS_PADRAO)
+    Retorna um DataFrame só com as colunas calculadas, no índice dos dados
+    """
+    import pandas as pd
+
+    colunas = {}
+    for familia, params in familias.items():
+        if familia not in _COLUNAS_POR_FAMILIA:
+            raise Exception(f"Família de sinais desconhecida: {familia}")
+        colunas.update(_COLUNAS_POR_FAMILIA[familia](**params))
+
+    series = materializar(dados, list(colunas.values()), identidade)
+    return pd.DataFrame({nome: series[item] for nome, item in colunas.items()}, index=dados.index, copy=False)
+
+def analisar(dados, familias=None, identidade=None):
+    """Dados com as colunas de todas as famílias (parâmetros padrão, atualizados por familias)"""
+    familias = {familia: {**PARAMS_PADRAO[familia], **(familias or {}).get(familia, {})}
+                for familia in FAMILIAS}
+    return anexar_colunas(dados, calcular_familias(dados, familias, identidade))
+
+def analisar_momentum(dados, rsi_compra, rsi_venda, macd_fast, macd_slow, identidade=None):
+    """Analisa sinais baseados em momentum"""
+    params = dict(rsi_compra=rsi_compra, rsi_venda=rsi_venda, macd_fast=macd_fast, macd_slow=macd_slow)
+    return anexar_colunas(dados, calcular_familias(dados, {'momentum': params}, identidade))
+
+def analisar_price_action(dados, identidade=None):
+    """Analisa padrões de price action"""
+    return anexar_colunas(dados, calcular_familias(dados, {'price_action': {'padroes': False}}, identidade))
+
+def analisar_tendencias(dados, mm_curta, mm_longa, atr_period, identidade=None):
+    """Analisa tendências e volatilidade"""
+    params = dict(mm_curta=mm_curta, mm_longa=mm_longa, atr_period=atr_period)
+    return anexar_colunas(dados, calcular_familias(dados, {'tendencias': params}, identidade))
+
+def calcular_score_operacao(dados, mm_curta=20, mm_longa=50, pesos=None):
+    """
+    Score da última barra a partir das colunas das três famílias
+    A série de todas as barras é serie_score (ou core.score.calcular_score)
+    """
+    return int(serie_score(dados, mm_curta, mm_longa, pesos).iloc[-1])
+
+def serie_score(dados, mm_curta=20, mm_longa=50, pesos=None):
+    """Score de cada barra com os sinais de momentum, o doji e as médias já calculados em dados"""
+    return pontuar(dados['sinal_rsi'], dados['sinal_macd'], dados['doji'], dados['Open'],
+                   dados['Close'], dados[f'MM{mm_curta}'], dados[f'MM{mm_longa}'], pesos)
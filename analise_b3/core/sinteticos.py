@@ -0,0 +1,76 @@
+"""
+Séries OHLCV sintéticas, no mesmo formato do yfinance, para benchmarks e testes manuais
+
+Os preços seguem um passeio aleatório log-normal com fator de mercado comum entre os
+tickers, gaps de abertura e pregões ausentes opcionais.
+"""
+
+
+def gerar_ohlcv(n_barras, volatilidade=0.02, deriva=0.0, prob_gap=0.0, tamanho_gap=0.05,
+                prob_ausencia=0.0, preco_inicial=100.0, inicio='2000-01-03', seed=None,
+                fator_mercado=None, correlacao=0.0):
+    """
+    Gera uma série OHLCV em dias úteis
+    volatilidade: desvio padrão do retorno diário
+    deriva: retorno médio diário
+    prob_gap: probabilidade de a abertura saltar em relação ao fechamento anterior
+    tamanho_gap: tamanho médio do salto (fração do preço)
+    prob_ausencia: probabilidade de um pregão faltar na série (feriados, falhas da fonte)
+    fator_mercado, correlacao: choques diários comuns e a correlação da série com eles
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+
+    ruido = rng.normal(0, 1, n_barras)
+    if fator_mercado is not None:
+        ruido = correlacao * fator_mercado + np.sqrt(1 - correlacao ** 2) * ruido
+    retornos = deriva + volatilidade * ruido
+
+    # Gaps: parte do retorno do dia acontece entre o fechamento anterior e a abertura
+    gaps = np.where(rng.random(n_barras) < prob_gap,
+                    rng.choice([-1, 1], n_barras) * rng.exponential(tamanho_gap, n_barras), 0.0)
+    fechamento = preco_inicial * np.exp(np.cumsum(retornos + gaps))
+    fechamento_anterior = np.concatenate([[preco_inicial], fechamento[:-1]])
+    abertura = fechamento_anterior * np.exp(gaps + rng.normal(0, volatilidade / 4, n_barras))
+
+    amplitude = np.abs(rng.normal(0, volatilidade / 2, (2, n_barras)))
+    maxima = np.maximum(abertura, fechamento) * (1 + amplitude[0])
+    minima = np.minimum(abertura, fechamento) * (1 - amplitude[1])
+
+    # Volume maior nos dias de movimento forte
+    volume = rng.lognormal(13, 0.4, n_barras) * (1 + 10 * np.abs(retornos + gaps))
+
+    dados = pd.DataFrame({
+        'Open': abertura,
+        'High': maxima,
+        'Low': minima,
+        'Close': fechamento,
+        'Volume': np.round(volume)
+    }, index=pd.bdate_range(inicio, periods=n_barras, name='Date'))
+
+    if prob_ausencia:
+        dados = dados[rng.random(n_barras) >= prob_ausencia]
+    return dados
+
+def gerar_carteira(tickers, n_barras, correlacao=0.5, seed=None, **kwargs):
+    """
+    Gera uma série por ticker, com retornos correlacionados por um fator de mercado comum
+    tickers: lista de nomes ou quantidade (gera SINT1, SINT2, ...)
+    correlacao: correlação aproximada entre os retornos diários de dois tickers
+    kwargs: demais parâmetros de gerar_ohlcv
+    """
+    import numpy as np
+
+    if isinstance(tickers, int):
+        tickers = [f"SINT{i + 1}" for i in range(tickers)]
+
+    rng = np.random.default_rng(seed)
+    fator_mercado = rng.normal(0, 1, n_barras)
+    sementes = rng.integers(0, 2 ** 32, len(tickers))
+    return {
+        ticker: gerar_ohlcv(n_barras, seed=int(semente), fator_mercado=fator_mercado,
+                            correlacao=np.sqrt(correlacao), **kwargs)
+        for ticker, semente in zip(tickers, sementes)
+    }
@@ -0,0 +1,190 @@
+"""
+Otimizações em segundo plano, com retomada
+
+Uma tarefa é uma execução do armazenamento de resultados cuja configuração (faixas,
+número de combinações, seed e capital) basta para recriar as mesmas combinações. No modo
+pareto (core.pareto), a seed e as avaliações já gravadas refazem as mesmas gerações. O
+processo que executa a tarefa grava os resultados em lotes e atualiza um heartbeat;
+se ele for interrompido, a tarefa pode ser retomada avaliando apenas as combinações
+que ainda não têm resultado. Qualquer sessão acompanha o progresso lendo o banco.
+"""
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from core import otimizador, pareto
+from core.estrategias import ESTRATEGIA_PADRAO, obter_estrategia
+from core.resultados import GravadorLotes, ResultadosOtimizacao
+
+DIRETORIO_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Intervalo entre heartbeats, e tempo sem heartbeat para considerar o processo morto
+INTERVALO_HEARTBEAT = 5
+LIMITE_HEARTBEAT = 60
+
+# Tamanho dos lotes gravados: o máximo de combinações perdidas em uma interrupção
+TAMANHO_LOTE = 20
+
+
+# Modos da otimização: combinações sorteadas ou NSGA-II (core.pareto)
+MODOS = ['aleatoria', 'pareto']
+
+
+def criar_tarefa(armazenamento, ticker, periodo, faixas, num_combinacoes, capital_inicial, seed=None,
+                 fonte_niveis='pivos', modo='aleatoria', populacao=pareto.POPULACAO_PADRAO,
+                 geracoes=pareto.GERACOES_PADRAO, estrategia=ESTRATEGIA_PADRAO, confirmacao=None):
+    """
+    Registra uma otimização pendente e retorna seu run_id
+    estrategia: nome da estratégia de core.estrategias cujas faixas são otimizadas
+    confirmacao: tendência do tempo maior que confirma as entradas, como
+        {"tempo": "semanal", "rapida": 10, "lenta": 30} (veja core.otimizador.preparar), ou None
+    modo: 'aleatoria' avalia num_combinacoes sorteadas; 'pareto' evolui uma população de
+        populacao combinações por geracoes gerações (num_combinacoes é ignorado)
+    """
+    if modo not in MODOS:
+        raise Exception(f"Modo de otimização desconhecido: {modo}")
+    estrategia = obter_estrategia(estrategia).nome
+    if modo == 'pareto':
+        # No máximo a população inicial e uma geração de filhos por vez; repetidas não contam
+        num_combinacoes = populacao * (geracoes + 1)
+    configuracao = {
+        'modo': modo,
+        'faixas': {nome: list(faixa) for nome, faixa in faixas.items()},
+        'num_combinacoes': num_combinacoes,
+        'capital_inicial': capital_inicial,
+        'fonte_niveis': fonte_niveis,
+        'confirmacao': confirmacao,
+        # A seed fixa as combinações, para que a retomada avalie exatamente as mesmas
+        'seed': seed if seed is not None else random.randrange(2 ** 32)
+    }
+    if modo == 'pareto':
+        configuracao.update(populacao=populacao, geracoes=geracoes, objetivos=pareto.OBJETIVOS_PADRAO)
+    return armazenamento.criar_execucao(ticker, periodo, estrategia, configuracao,
+                                        total=num_combinacoes)
+
+def executar_tarefa(armazenamento, run_id, processos=1, carregar_dados=None):
+    """
+    Executa (ou retoma) a tarefa no processo atual, pulando as combinações já avaliadas
+    carregar_dados: função (ticker, periodo) -> DataFrame; por padrão core.dados.carregar_dados
+    """
+    execucao = armazenamento.obter_execucao(run_id)
+    if execucao is None:
+        raise Exception(f"Execução não encontrada: {run_id}")
+
+    if carregar_dados is None:
+        from core.dados import carregar_dados
+
+    configuracao = execucao['configuracao']
+    armazenamento.atualizar_execucao(run_id, status='executando', pid=os.getpid(),
+                                     heartbeat=time.time(), erro=None)
+    parar_heartbeat = _iniciar_heartbeat(armazenamento.caminho, run_id)
+
+    try:
+        if configuracao.get('modo') == 'pareto':
+            _executar_pareto(armazenamento, run_id, execucao, processos, carregar_dados)
+            return
+
+        combinacoes = otimizador.gerar_combinacoes(
+            {nome: tuple(faixa) for nome, faixa in configuracao['faixas'].items()},
+            configuracao['num_combinacoes'], configuracao['seed'],
+            obter_estrategia(execucao['estrategia']).inteiros
+        )
+        avaliados = armazenamento.indices_avaliados(run_id)
+        pendentes = [i for i in range(len(combinacoes)) if i not in avaliados]
+
+        if pendentes:
+            dados = carregar_dados(execucao['ticker'], execucao['periodo'])
+            gravador = GravadorLotes(armazenamento, run_id, TAMANHO_LOTE)
+
+            def registrar(posicao, resultado):
+                # otimizar numera as combinações pendentes; o banco guarda o índice original
+                gravador.adicionar(pendentes[posicao], resultado)
+
+            otimizador.otimizar(dados, [combinacoes[i] for i in pendentes],
+                                configuracao['capital_inicial'], processos=processos,
+                                registrar=registrar,
+                                # Tarefas de versões anteriores sempre usaram os pivôs
+                                fonte_niveis=configuracao.get('fonte_niveis', 'pivos'),
+                                estrategia=execucao['estrategia'],
+                                confirmacao=configuracao.get('confirmacao'),
+                                ticker=execucao['ticker'])
+            gravador.finalizar()
+
+        armazenamento.atualizar_execucao(run_id, status='concluida', pid=None)
+    except Exception as e:
+        armazenamento.atualizar_execucao(run_id, status='erro', pid=None, erro=str(e))
+        raise
+    except BaseException:
+        # Ctrl+C ou encerramento do processo: o que já foi gravado fica para a retomada
+        armazenamento.atualizar_execucao(run_id, status='interrompida', pid=None)
+        raise
+    finally:
+        parar_heartbeat.set()
+
+def _executar_pareto(armazenamento, run_id, execucao, processos, carregar_dados):
+    """Executa (ou retoma) uma tarefa do modo pareto, servindo as avaliações já gravadas"""
+    configuracao = execucao['configuracao']
+    conhecidas = {pareto.chave_params(r['params']): r
+                  for r in armazenamento.melhores(n=None, run_id=run_id)}
+    gravador = GravadorLotes(armazenamento, run_id, TAMANHO_LOTE)
+    pareto.otimizar_pareto(
+        carregar_dados(execucao['ticker'], execucao['periodo']),
+        {nome: tuple(faixa) for nome, faixa in configuracao['faixas'].items()},
+        configuracao['capital_inicial'],
+        populacao=configuracao['populacao'],
+        geracoes=configuracao['geracoes'],
+        objetivos=configuracao['objetivos'],
+        processos=processos,
+        seed=configuracao['seed'],
+        fonte_niveis=configuracao['fonte_niveis'],
+        conhecidas=conhecidas,
+        registrar=gravador.adicionar,
+        estrategia=execucao['estrategia'],
+        confirmacao=configuracao.get('confirmacao'),
+        ticker=execucao['ticker']
+    )
+    gravador.finalizar()
+    # Combinações repetidas entre gerações são avaliadas uma vez: o total real é o gravado
+    armazenamento.atualizar_execucao(run_id, status='concluida', pid=None,
+                                     total=len(armazenamento.indices_avaliados(run_id)))
+
+def _iniciar_heartbeat(caminho, run_id):
+    """Atualiza o heartbeat da execução em uma thread até o evento retornado ser acionado"""
+    parar = threading.Event()
+
+    def pulsar():
+        # Conexão própria da thread, via uma nova instância do armazenamento
+        armazenamento = ResultadosOtimizacao(caminho)
+        while not parar.wait(INTERVALO_HEARTBEAT):
+            armazenamento.atualizar_execucao(run_id, heartbeat=time.time())
+
+    threading.Thread(target=pulsar, daemon=True).start()
+    return parar
+
+def iniciar_em_segundo_plano(armazenamento, run_id, processos=1):
+    """Executa a tarefa em um processo separado, que sobrevive à sessão e ao script do Streamlit"""
+    # Marcada antes de o processo subir: se ele falhar ao iniciar, o heartbeat envelhece
+    # e a tarefa aparece como interrompida, pronta para ser retomada
+    armazenamento.atualizar_execucao(run_id, status='executando', heartbeat=time.time(), erro=None)
+    subprocess.Popen(
+        [sys.executable, os.path.join(DIRETORIO_APP, 'cli.py'), 'retomar', run_id,
+         '--processos', str(processos)],
+        cwd=DIRETORIO_APP,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+def situacao(execucao):
+    """
+    Estado da tarefa para a interface:
+    'pendente', 'executando', 'interrompida' (processo sem heartbeat), 'erro' ou 'concluida'
+    """
+    status = execucao['status']
+    if status == 'executando' and time.time() - (execucao['heartbeat'] or 0) > LIMITE_HEARTBEAT:
+        return 'interrompida'
+    return status
@@ -1,11 +1,11 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import ta
-from datetime import datetime, timedelta
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from core import dados as dados_historicos
+from core import estrategias, instrumentacao, memoria, multitemporal, padroes, score
+from core.backtest import executar_backtest
+from core.cache import cache_compartilhado
+from core.dataset import identificar_dataset
+from ui.depuracao import painel_depuracao
+from ui.exportacao import exibir_tabela
 
 st.set_page_config(page_title="Backtesting - Análise B3", layout="wide")
 
@@ -48,134 +48,66 @@ periodo = st.sidebar.selectbox(
 # Configurações da estratégia
 st.sidebar.header("Parâmetros da Estratégia")
 
-# RSI
-rsi_period = st.sidebar.slider("Período RSI", min_value=2, max_value=30, value=14)
-rsi_overbought = st.sidebar.slider("Sobrecompra", min_value=50, max_value=100, value=70)
-rsi_oversold = st.sidebar.slider("Sobrevenda", min_value=0, max_value=50, value=30)
-
-# MACD
-macd_fast = st.sidebar.slider("MACD Rápido", min_value=5, max_value=20, value=12)
-macd_slow = st.sidebar.slider("MACD Lento", min_value=20, max_value=40, value=26)
-macd_signal = st.sidebar.slider("MACD Sinal", min_value=5, max_value=20, value=9)
-
-# Stop Loss e Take Profit
-stop_loss = st.sidebar.slider("Stop Loss (%)", min_value=1.0, max_value=10.0, value=2.0, step=0.5)
-take_profit = st.sidebar.slider("Take Profit (%)", min_value=1.0, max_value=20.0, value=4.0, step=0.5)
+nome_estrategia = st.sidebar.selectbox(
+    "Estratégia:",
+    options=list(estrategias.ESTRATEGIAS),
+    format_func=lambda x: estrategias.ESTRATEGIAS[x].rotulo
+)
+estrategia = estrategias.ESTRATEGIAS[nome_estrategia]
+st.sidebar.caption(estrategia.descricao)
+
+# Um controle por parâmetro declarado; parâmetros com o mesmo nome mantêm o valor entre estratégias
+params = {
+    nome: st.sidebar.slider(parametro.rotulo, min_value=parametro.minimo, max_value=parametro.maximo,
+                            value=parametro.padrao, step=parametro.passo, key=f"parametro_{nome}")
+    for nome, parametro in estrategia.parametros.items()
+}
 
 # Capital inicial
 capital_inicial = st.sidebar.number_input("Capital Inicial (R$)", min_value=1000.0, value=10000.0, step=1000.0)
 
-@st.cache_data
+# Filtro de entradas por suportes e resistências
+fonte_niveis = st.sidebar.selectbox(
+    "Suportes e resistências:",
+    options=[None, 'pivos', 'volume'],
+    format_func=lambda x: {None: 'Sem filtro', 'pivos': 'Pivôs', 'volume': 'Perfil de volume'}[x],
+    help="Compra só acima de algum suporte e vende só abaixo de alguma resistência"
+)
+
+# Confirmação pela tendência de um tempo gráfico maior
+tempo_confirmacao = st.sidebar.selectbox(
+    "Confirmação de tendência:",
+    options=[None, 'semanal', 'mensal'],
+    format_func=lambda x: {None: 'Sem confirmação', 'semanal': 'Semanal', 'mensal': 'Mensal'}[x],
+    help="Compra só com a média rápida acima da lenta no último período encerrado e vende só abaixo"
+)
+if tempo_confirmacao:
+    media_rapida, media_lenta = st.sidebar.slider("Médias da confirmação (períodos)", 2, 60, (10, 30))
+
+# st.cache_resource: o mesmo DataFrame a cada execução, sem cópia (as etapas não alteram a entrada)
+@st.cache_resource
 def carregar_dados(ticker, periodo):
-    """Carrega dados históricos da ação"""
-    acao = yf.Ticker(ticker)
-    hist = acao.history(period=periodo)
-    
-    # Remove registros sem dados (mercado fechado)
-    hist = hist.dropna()
-    
-    # Verifica se há dados após a limpeza
-    if len(hist) == 0:
-        raise Exception("Não foi possível carregar dados para o período selecionado.")
-    
-    # Remove sábados e domingos
-    hist = hist[hist.index.dayofweek < 5]
-    
-    # Verifica se ainda há dados após o processamento
-    if len(hist) == 0:
-        raise Exception("Não há dados disponíveis para o período selecionado.")
-    
-    return hist.dropna()
+    """Carrega dados históricos da ação e sua identidade"""
+    dados = dados_historicos.carregar_dados(ticker, periodo)
+    return dados, identificar_dataset(dados, ticker)
 
 @st.cache_data
-def calcular_indicadores(dados):
-    """Calcula indicadores técnicos"""
-    df = dados.copy()
-    
-    # RSI
-    df['RSI'] = ta.momentum.rsi(df['Close'], window=rsi_period)
-    
-    # MACD
-    df['MACD'] = ta.trend.macd_diff(df['Close'], 
-                                   window_slow=macd_slow,
-                                   window_fast=macd_fast,
-                                   window_sign=macd_signal)
-    df['MACD_Signal'] = ta.trend.macd_signal(df['Close'],
-                                            window_slow=macd_slow,
-                                            window_fast=macd_fast,
-                                            window_sign=macd_signal)
-    
-    return df
+@cache_compartilhado(nome='backtesting.detectar_niveis')
+def detectar_niveis(_dados, identidade, fonte):
+    """Suportes e resistências usados no filtro das entradas"""
+    return padroes.detectar_niveis(_dados, fonte, identidade)
 
-def executar_backtest(dados, capital_inicial, stop_loss, take_profit):
-    """Executa o backtesting da estratégia"""
-    df = dados.copy()
-    
-    # Inicializar variáveis
-    capital = capital_inicial
-    posicao = 0  # 0: sem posição, 1: comprado, -1: vendido
-    preco_entrada = 0
-    operacoes = []
-    
-    for i in range(1, len(df)):
-        preco_atual = df['Close'].iloc[i]
-        
-        # Sinais de entrada
-        sinal_compra = (df['RSI'].iloc[i] < rsi_oversold and 
-                       df['MACD'].iloc[i] > df['MACD_Signal'].iloc[i])
-        
-        sinal_venda = (df['RSI'].iloc[i] > rsi_overbought and 
-                      df['MACD'].iloc[i] < df['MACD_Signal'].iloc[i])
-        
-        # Verificar stop loss e take profit
-        if posicao != 0:
-            variacao = ((preco_atual - preco_entrada) / preco_entrada) * 100
-            
-            if (posicao == 1 and variacao <= -stop_loss) or \
-               (posicao == 1 and variacao >= take_profit) or \
-               (posicao == -1 and variacao >= stop_loss) or \
-               (posicao == -1 and variacao <= -take_profit):
-                
-                # Fechar posição
-                resultado = capital * (variacao / 100)
-                capital += resultado
-                operacoes.append({
-                    'data': df.index[i],
-                    'tipo': 'Fechamento',
-                    'preco': preco_atual,
-                    'resultado': resultado,
-                    'capital': capital
-                })
-                posicao = 0
-                preco_entrada = 0
-        
-        # Executar operações
-        if posicao == 0:  # Sem posição
-            if sinal_compra:
-                posicao = 1
-                preco_entrada = preco_atual
-                operacoes.append({
-                    'data': df.index[i],
-                    'tipo': 'Compra',
-                    'preco': preco_atual,
-                    'resultado': 0,
-                    'capital': capital
-                })
-            elif sinal_venda:
-                posicao = -1
-                preco_entrada = preco_atual
-                operacoes.append({
-                    'data': df.index[i],
-                    'tipo': 'Venda',
-                    'preco': preco_atual,
-                    'resultado': 0,
-                    'capital': capital
-                })
-    
-    return pd.DataFrame(operacoes)
+@st.cache_data
+@cache_compartilhado(nome='backtesting.tendencia_superior')
+def tendencia_superior(_dados, identidade, tempo, rapida, lenta):
+    """Tendência semanal ou mensal alinhada aos pregões, sem olhar o futuro"""
+    return multitemporal.tendencia_superior(_dados, tempo, rapida, lenta, identidade)
 
 def plotar_resultados(dados, operacoes):
     """Plota os resultados do backtesting"""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    
     fig = make_subplots(rows=2, cols=1, 
                         shared_xaxes=True,
                         vertical_spacing=0.05,
@@ -227,11 +159,26 @@ def plotar_resultados(dados, operacoes):
 try:
     # Carregar dados
     with st.spinner('Carregando dados...'):
-        dados = carregar_dados(acao_selecionada, periodo)
-        dados = calcular_indicadores(dados)
-    
-    # Executar backtesting
-    operacoes = executar_backtest(dados, capital_inicial, stop_loss, take_profit)
+        dados, identidade = carregar_dados(acao_selecionada, periodo)
+        memoria.registrar_dataset(f"backtesting: {acao_selecionada} {periodo}", dados)
+    
+    # Executar backtesting: as regras da estratégia leem as features já calculadas para os dados
+    niveis = detectar_niveis(dados, identidade, fonte_niveis) if fonte_niveis else None
+    tendencia = None
+    if tempo_confirmacao:
+        tendencia = tendencia_superior(dados, identidade, tempo_confirmacao, media_rapida, media_lenta)
+    operacoes = executar_backtest(dados, params, capital_inicial, niveis, tendencia=tendencia,
+                                  estrategia=nome_estrategia, identidade=identidade)
+    
+    if nome_estrategia == 'score':
+        # A mesma série de que as regras do score partiram, já em memória
+        pesos = {regra: params[f'peso_{regra}'] for regra in score.PESOS_PADRAO}
+        st.subheader("Score de Operação")
+        st.line_chart(score.calcular_score(dados, params, pesos, identidade).rename('Score'), height=200)
+    
+    if tempo_confirmacao:
+        st.subheader(f"Tendência {tempo_confirmacao}")
+        st.line_chart(tendencia.rename('Tendência'), height=150)
     
     # Calcular métricas
     if len(operacoes) > 0:
@@ -270,14 +217,25 @@ try:
             )
         
         # Plotar resultados
-        fig = plotar_resultados(dados, operacoes)
-        st.plotly_chart(fig, use_container_width=True)
+        with instrumentacao.medir('grafico.backtest'):
+            fig = plotar_resultados(dados, operacoes)
+        with instrumentacao.medir('grafico.envio'):
+            st.plotly_chart(fig, width='stretch')
         
         # Tabela de operações
         st.subheader("Histórico de Operações")
-        st.dataframe(operacoes)
+        nome_arquivo = f"{acao_selecionada}_{periodo}_{nome_estrategia}"
+        exibir_tabela(operacoes, f"{nome_arquivo}_operacoes")
+        
+        # Barras com as features de que as regras partiram, já em memória
+        with st.expander("Barras e indicadores da estratégia"):
+            barras = memoria.anexar_colunas(
+                dados, estrategias.series_indicadores(dados, estrategia, params, identidade), float32=False)
+            exibir_tabela(barras, f"{nome_arquivo}_barras")
     else:
         st.warning("Nenhuma operação foi executada no período selecionado.")
 
 except Exception as e:
-    st.error(f"Erro ao executar backtesting: {str(e)}") 
\ No newline at end of file
+    st.error(f"Erro ao executar backtesting: {str(e)}")
+
+painel_depuracao()
@@ -0,0 +1,111 @@
+# pages/correlacao.py
+import streamlit as st
+from core import correlacao, instrumentacao
+from core.cache import cache_compartilhado
+from ui.depuracao import painel_depuracao
+from ui.exportacao import exibir_tabela
+from ui.universo import carregar_precos, tickers_do_universo
+
+st.set_page_config(page_title="Correlação e Pares - Análise B3", layout="wide")
+
+st.title("🔗 Correlação e Pares")
+
+universo = tickers_do_universo()
+
+st.sidebar.header("Universo")
+periodo = st.sidebar.selectbox(
+    "Período:",
+    options=['1y', '2y', '5y'],
+    index=1,
+    format_func=lambda x: {'1y': '1 Ano', '2y': '2 Anos', '5y': '5 Anos'}[x]
+)
+tickers = st.sidebar.multiselect("Ações:", options=universo, default=universo)
+
+st.sidebar.header("Triagem de pares")
+janela = st.sidebar.slider("Janela da correlação recente (pregões)", 20, 250, 60)
+correlacao_minima = st.sidebar.slider("Correlação mínima", 0.0, 1.0, 0.5, 0.05)
+apenas_cointegrados = st.sidebar.checkbox(
+    "Apenas pares cointegrados", value=False,
+    help=f"Estatística de Engle-Granger abaixo de {correlacao.CRITICO_ENGLE_GRANGER} (5%)"
+)
+
+# As chaves levam o período, as ações e a última data: os cálculos só refazem quando os preços mudam
+@st.cache_data
+@cache_compartilhado(nome='correlacao.matriz')
+def calcular_matriz(_precos, periodo, tickers, ultima_data):
+    return correlacao.correlacao_em_blocos(_precos)
+
+@st.cache_data
+@cache_compartilhado(nome='correlacao.pares')
+def calcular_pares(_precos, periodo, tickers, ultima_data, janela, correlacao_minima, apenas_cointegrados):
+    return correlacao.escanear_pares(_precos, janela, correlacao_minima, apenas_cointegrados)
+
+try:
+    from ui import graficos
+
+    if len(tickers) < 2:
+        raise Exception("Selecione pelo menos duas ações.")
+
+    with st.spinner('Carregando preços do universo...'):
+        precos, falhas = carregar_precos(tuple(tickers), periodo)
+    chave = (periodo, tuple(precos.columns), str(precos.index[-1]))
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Ações carregadas", f"{precos.shape[1]} de {len(tickers)}")
+    col2.metric("Pregões", len(precos))
+    col3.metric("Pares avaliados", f"{precos.shape[1] * (precos.shape[1] - 1) // 2:,}")
+    if falhas:
+        with st.expander(f"{len(falhas)} ações sem dados"):
+            st.write(falhas)
+
+    tab1, tab2 = st.tabs(["🌡️ Matriz de Correlação", "🔗 Pares"])
+
+    with tab1:
+        matriz = calcular_matriz(precos, *chave)
+        with instrumentacao.medir('grafico.envio'):
+            st.plotly_chart(graficos.construir_mapa_correlacao(matriz), width='stretch')
+
+    with tab2:
+        pares = calcular_pares(precos, *chave, janela, correlacao_minima, apenas_cointegrados)
+        st.caption(f"{len(pares):,} pares com correlação de pelo menos {correlacao_minima:.2f}"
+                   f"{', cointegrados' if apenas_cointegrados else ''}, "
+                   "ordenados pela estatística de Engle-Granger (mais negativa primeiro)")
+        exibir_tabela(
+            pares.rename(columns={
+                'acao_a': 'Ação A',
+                'acao_b': 'Ação B',
+                'correlacao': 'Correlação',
+                'correlacao_janela': f'Correlação ({janela} pregões)',
+                'observacoes': 'Observações',
+                'beta': 'Beta',
+                'estatistica_adf': 'Estatística ADF',
+                'cointegrado': 'Cointegrado',
+                'meia_vida': 'Meia-vida (pregões)'
+            }),
+            f"pares_{periodo}",
+            indice=False,
+            width='stretch'
+        )
+
+        if len(pares) > 0:
+            indice = st.selectbox(
+                "Par para detalhar:",
+                options=range(min(len(pares), 100)),
+                format_func=lambda i: f"{pares['acao_a'].iloc[i]} x {pares['acao_b'].iloc[i]}"
+            )
+            par = pares.iloc[indice]
+            correlacao_par = correlacao.correlacao_movel(precos, par['acao_a'], par['acao_b'], janela)
+            _, zscore = correlacao.spread_do_par(precos, par['acao_a'], par['acao_b'], par['beta'])
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Beta (hedge ratio)", f"{par['beta']:.3f}")
+            col2.metric("Z-score atual", f"{zscore.dropna().iloc[-1]:+.2f}")
+            col3.metric("Meia-vida", f"{par['meia_vida']:.1f} pregões")
+            with instrumentacao.medir('grafico.envio'):
+                st.plotly_chart(graficos.construir_grafico_par(
+                    correlacao_par, zscore, f"{par['acao_a']} x {par['acao_b']}"
+                ), width='stretch')
+
+except Exception as e:
+    st.error(f"Erro ao calcular as correlações: {str(e)}")
+
+painel_depuracao()
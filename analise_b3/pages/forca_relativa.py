@@ -0,0 +1,128 @@
+# pages/forca_relativa.py
+import json
+import streamlit as st
+from core import forca_relativa, instrumentacao
+from core.cache import cache_compartilhado
+from ui.depuracao import painel_depuracao
+from ui.exportacao import exibir_tabela
+from ui.universo import carregar_precos, tickers_do_universo
+
+st.set_page_config(page_title="Força Relativa - Análise B3", layout="wide")
+
+st.title("💪 Força Relativa")
+
+universo = tickers_do_universo()
+
+st.sidebar.header("Universo")
+periodo = st.sidebar.selectbox(
+    "Período:",
+    options=['1y', '2y', '5y'],
+    index=1,
+    format_func=lambda x: {'1y': '1 Ano', '2y': '2 Anos', '5y': '5 Anos'}[x]
+)
+tickers = st.sidebar.multiselect("Ações:", options=universo, default=universo)
+janela_beta = st.sidebar.slider("Janela do beta (pregões)", 20, 250, forca_relativa.JANELA_BETA)
+
+# Setores: cestas de pesos iguais definidas pelo usuário, gravadas em dados/setores.json
+setores = forca_relativa.carregar_setores()
+with st.sidebar.expander("Setores"):
+    texto_setores = st.text_area("Setor -> ações (JSON)", json.dumps(setores, indent=2, ensure_ascii=False),
+                                 height=300)
+    if st.button("Salvar setores"):
+        try:
+            setores = forca_relativa.validar_setores(json.loads(texto_setores))
+            forca_relativa.salvar_setores(setores)
+            st.success("Setores salvos.")
+        except json.JSONDecodeError as e:
+            st.error(f"JSON inválido: {e}")
+        except Exception as e:
+            st.error(str(e))
+
+# As referências são alinhadas uma vez por conjunto de preços e setores e servem a todas as ações
+@st.cache_data
+@cache_compartilhado(nome='forca_relativa.referencias')
+def calcular_referencias(_precos, periodo, tickers, ultima_data, setores_json):
+    return forca_relativa.retornos_referencias(_precos, setores=json.loads(setores_json))
+
+@st.cache_data
+@cache_compartilhado(nome='forca_relativa.tabela')
+def calcular_tabela(_acoes, _referencias, periodo, tickers, ultima_data, setores_json, janela_beta):
+    return forca_relativa.tabela_forca_relativa(_acoes, _referencias, json.loads(setores_json), janela_beta)
+
+@st.cache_data
+@cache_compartilhado(nome='forca_relativa.percentis')
+def calcular_percentis(_acoes, _referencias, periodo, tickers, ultima_data):
+    """Percentil de todas as ações contra o IBOV em todas as datas"""
+    retornos = forca_relativa.retornos_log(_acoes)
+    contra_ibov = forca_relativa.referencia_por_acao(_referencias, list(_acoes.columns))
+    return forca_relativa.ranking_forca_relativa(retornos, contra_ibov)[2]
+
+try:
+    import numpy as np
+    from ui import graficos
+
+    if not tickers:
+        raise Exception("Selecione pelo menos uma ação.")
+
+    with st.spinner('Carregando preços do universo e do Ibovespa...'):
+        precos, falhas = carregar_precos(tuple([forca_relativa.INDICE, *tickers]), periodo)
+    if forca_relativa.INDICE in falhas:
+        raise Exception(f"Não foi possível carregar o Ibovespa: {falhas[forca_relativa.INDICE]}")
+
+    chave = (periodo, tuple(precos.columns), str(precos.index[-1]))
+    setores_json = json.dumps(setores, sort_keys=True)
+    referencias = calcular_referencias(precos, *chave, setores_json)
+    acoes = precos.drop(columns=forca_relativa.INDICE)
+    tabela = calcular_tabela(acoes, referencias, *chave, setores_json, janela_beta)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Ações carregadas", f"{acoes.shape[1]} de {len(tickers)}")
+    col2.metric("Ibovespa no período", f"{np.expm1(referencias[forca_relativa.IBOV].sum()) * 100:+.1f}%")
+    col3.metric("Acima do Ibovespa em 3 meses", int((tabela['excesso_3m'] > 0).sum()))
+    if falhas:
+        with st.expander(f"{len(falhas)} ações sem dados"):
+            st.write(falhas)
+
+    # Excessos de log-retorno exibidos como diferença percentual de desempenho
+    exibicao = tabela.copy()
+    for nome in forca_relativa.PERIODOS_RANKING:
+        exibicao[f'excesso_{nome}'] = np.expm1(exibicao[f'excesso_{nome}']) * 100
+    exibicao['alfa'] = exibicao['alfa'] * 100
+    st.subheader("Ranking")
+    exibir_tabela(
+        exibicao.rename(columns={
+            'acao': 'Ação',
+            'setor': 'Setor',
+            **{f'excesso_{nome}': f'vs IBOV {nome} (%)' for nome in forca_relativa.PERIODOS_RANKING},
+            'forca_composta': 'Força composta',
+            'percentil_ibov': 'Percentil (IBOV)',
+            'percentil_setor': 'Percentil (setor)',
+            'beta': f'Beta ({janela_beta})',
+            'alfa': 'Alfa anual (%)'
+        }),
+        f"forca_relativa_{periodo}",
+        indice=False,
+        width='stretch'
+    )
+
+    st.subheader("Detalhe da ação")
+    acao = st.selectbox("Ação:", options=list(tabela['acao']))
+    retornos = forca_relativa.retornos_log(acoes[[acao]])
+    linhas = {forca_relativa.IBOV: forca_relativa.linha_forca_relativa(
+        retornos, forca_relativa.referencia_por_acao(referencias, [acao]))[acao]}
+    setor = forca_relativa.setor_de(setores).get(acao)
+    if setor in referencias.columns:
+        linhas[setor] = forca_relativa.linha_forca_relativa(
+            retornos, forca_relativa.referencia_por_acao(referencias, [acao], 'setor', setores))[acao]
+    beta, _ = forca_relativa.beta_alfa_moveis(retornos, forca_relativa.referencia_por_acao(referencias, [acao]),
+                                              janela_beta)
+    percentis = calcular_percentis(acoes, referencias, *chave)
+    with instrumentacao.medir('grafico.envio'):
+        st.plotly_chart(graficos.construir_grafico_forca_relativa(
+            linhas, percentis[acao], beta[acao], f"{acao}{f' ({setor})' if setor else ''}"
+        ), width='stretch')
+
+except Exception as e:
+    st.error(f"Erro ao calcular a força relativa: {str(e)}")
+
+painel_depuracao()
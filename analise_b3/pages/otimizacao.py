@@ -1,30 +1,26 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import ta
-from datetime import datetime, timedelta
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import json
 import os
-from itertools import product
+from core import dados as dados_historicos
+from core import estrategias
+from core import pareto
+from core import tarefas
+from core.resultados import METRICAS, ResultadosOtimizacao
+from ui.depuracao import painel_depuracao
+from ui.exportacao import exibir_tabela
 
 st.set_page_config(page_title="Otimização - Análise B3", layout="wide")
 
 st.title("⚙️ Otimização de Estratégias")
 
-# Função para carregar configurações salvas
-def carregar_configuracoes():
-    if os.path.exists('configuracoes.json'):
-        with open('configuracoes.json', 'r') as f:
-            return json.load(f)
-    return {}
+@st.cache_resource
+def abrir_resultados():
+    """Abre o armazenamento de resultados, importando o antigo configuracoes.json se existir"""
+    resultados = ResultadosOtimizacao()
+    resultados.importar_configuracoes_json('configuracoes.json')
+    return resultados
 
-# Função para salvar configurações
-def salvar_configuracoes(config):
-    with open('configuracoes.json', 'w') as f:
-        json.dump(config, f, indent=4)
+armazenamento = abrir_resultados()
 
 # Sidebar para configurações
 st.sidebar.header("Configurações da Otimização")
@@ -64,61 +60,21 @@ periodo = st.sidebar.selectbox(
 # Configurações de otimização
 st.sidebar.header("Parâmetros para Otimização")
 
-# RSI
-rsi_period_range = st.sidebar.slider(
-    "Período RSI (min-max)",
-    min_value=2,
-    max_value=30,
-    value=(10, 20)
-)
-rsi_overbought_range = st.sidebar.slider(
-    "Sobrecompra (min-max)",
-    min_value=50,
-    max_value=100,
-    value=(60, 80)
-)
-rsi_oversold_range = st.sidebar.slider(
-    "Sobrevenda (min-max)",
-    min_value=0,
-    max_value=50,
-    value=(20, 40)
+nome_estrategia = st.sidebar.selectbox(
+    "Estratégia:",
+    options=list(estrategias.ESTRATEGIAS),
+    format_func=lambda x: estrategias.ESTRATEGIAS[x].rotulo
 )
+estrategia = estrategias.ESTRATEGIAS[nome_estrategia]
+st.sidebar.caption(estrategia.descricao)
 
-# MACD
-macd_fast_range = st.sidebar.slider(
-    "MACD Rápido (min-max)",
-    min_value=5,
-    max_value=20,
-    value=(8, 16)
-)
-macd_slow_range = st.sidebar.slider(
-    "MACD Lento (min-max)",
-    min_value=20,
-    max_value=40,
-    value=(20, 30)
-)
-macd_signal_range = st.sidebar.slider(
-    "MACD Sinal (min-max)",
-    min_value=5,
-    max_value=20,
-    value=(7, 12)
-)
-
-# Stop Loss e Take Profit
-stop_loss_range = st.sidebar.slider(
-    "Stop Loss (min-max %)",
-    min_value=1.0,
-    max_value=10.0,
-    value=(1.5, 3.0),
-    step=0.5
-)
-take_profit_range = st.sidebar.slider(
-    "Take Profit (min-max %)",
-    min_value=1.0,
-    max_value=20.0,
-    value=(3.0, 6.0),
-    step=0.5
-)
+# Uma faixa (min-max) por parâmetro declarado pela estratégia
+faixas = {
+    nome: st.sidebar.slider(f"{parametro.rotulo} (min-max)", min_value=parametro.minimo,
+                            max_value=parametro.maximo, value=parametro.faixa, step=parametro.passo,
+                            key=f"faixa_{nome}")
+    for nome, parametro in estrategia.parametros.items()
+}
 
 # Capital inicial
 capital_inicial = st.sidebar.number_input(
@@ -128,303 +84,206 @@ capital_inicial = st.sidebar.number_input(
     step=1000.0
 )
 
-# Número de combinações para testar
-num_combinacoes = st.sidebar.number_input(
-    "Número de combinações para testar",
-    min_value=10,
-    max_value=1000,
-    value=100,
-    step=10
+# Suportes e resistências que filtram as entradas
+ROTULOS_NIVEIS = {'pivos': 'Pivôs', 'volume': 'Perfil de volume'}
+fonte_niveis = st.sidebar.selectbox(
+    "Suportes e resistências:",
+    options=['pivos', 'volume'],
+    format_func=lambda x: ROTULOS_NIVEIS[x],
+    help="Compra só acima de algum suporte e vende só abaixo de alguma resistência"
+)
+
+# Busca aleatória (ordena por uma métrica) ou NSGA-II (fronteira entre retorno, drawdown e operações)
+modo = st.sidebar.selectbox(
+    "Modo:",
+    options=tarefas.MODOS,
+    format_func=lambda x: {'aleatoria': 'Busca aleatória', 'pareto': 'Pareto (NSGA-II)'}[x]
 )
 
-@st.cache_data
+if modo == 'pareto':
+    populacao = st.sidebar.number_input("População", min_value=8, max_value=200,
+                                        value=pareto.POPULACAO_PADRAO, step=4)
+    geracoes = st.sidebar.number_input("Gerações", min_value=1, max_value=100,
+                                       value=pareto.GERACOES_PADRAO)
+    num_combinacoes = populacao * (geracoes + 1)
+else:
+    # Número de combinações para testar
+    num_combinacoes = st.sidebar.number_input(
+        "Número de combinações para testar",
+        min_value=10,
+        max_value=1000,
+        value=100,
+        step=10
+    )
+
+# st.cache_resource: o mesmo DataFrame a cada execução, sem cópia (as etapas não alteram a entrada)
+@st.cache_resource
 def carregar_dados(ticker, periodo):
     """Carrega dados históricos da ação"""
-    acao = yf.Ticker(ticker)
-    hist = acao.history(period=periodo)
-    return hist.dropna()
+    return dados_historicos.carregar_dados(ticker, periodo)
 
-@st.cache_data
-def calcular_indicadores(dados, params):
-    """Calcula indicadores técnicos com parâmetros específicos"""
-    df = dados.copy()
-    
-    # RSI
-    df['RSI'] = ta.momentum.rsi(df['Close'], window=params['rsi_period'])
-    
-    # MACD
-    df['MACD'] = ta.trend.macd_diff(df['Close'], 
-                                   window_slow=params['macd_slow'],
-                                   window_fast=params['macd_fast'],
-                                   window_sign=params['macd_signal'])
-    df['MACD_Signal'] = ta.trend.macd_signal(df['Close'],
-                                            window_slow=params['macd_slow'],
-                                            window_fast=params['macd_fast'],
-                                            window_sign=params['macd_signal'])
-    
-    return df
+ROTULOS = {
+    'retorno_total': 'Retorno Total (%)',
+    'num_operacoes': 'Número de Operações',
+    'taxa_acerto': 'Taxa de Acerto (%)',
+    'sharpe_ratio': 'Sharpe Ratio',
+    'max_drawdown': 'Drawdown Máximo (%)',
+    **{nome: parametro.rotulo for nome, parametro in estrategia.parametros.items()}
+}
 
-def detectar_suportes_resistencias(dados, sensitivity=0.5):
-    """Detecta níveis de suporte e resistência"""
-    df = dados.copy()
-    
-    # Identificar pivots
-    df['pivot'] = False
-    for i in range(2, len(df)-2):
-        # Pivot de alta (resistência)
-        if (df['High'].iloc[i] > df['High'].iloc[i-1] and 
-            df['High'].iloc[i] > df['High'].iloc[i-2] and
-            df['High'].iloc[i] > df['High'].iloc[i+1] and 
-            df['High'].iloc[i] > df['High'].iloc[i+2]):
-            df.loc[df.index[i], 'pivot'] = True
-            df.loc[df.index[i], 'pivot_type'] = 'resistance'
-        
-        # Pivot de baixa (suporte)
-        if (df['Low'].iloc[i] < df['Low'].iloc[i-1] and 
-            df['Low'].iloc[i] < df['Low'].iloc[i-2] and
-            df['Low'].iloc[i] < df['Low'].iloc[i+1] and 
-            df['Low'].iloc[i] < df['Low'].iloc[i+2]):
-            df.loc[df.index[i], 'pivot'] = True
-            df.loc[df.index[i], 'pivot_type'] = 'support'
-    
-    # Agrupar níveis próximos
-    def group_levels(levels, tolerance):
-        if not levels:
-            return []
-        groups = []
-        current_group = [levels[0]]
-        
-        for level in levels[1:]:
-            if abs(level - current_group[0]) <= tolerance:
-                current_group.append(level)
-            else:
-                groups.append(sum(current_group) / len(current_group))
-                current_group = [level]
-        
-        groups.append(sum(current_group) / len(current_group))
-        return groups
-    
-    # Calcular tolerância baseada na volatilidade
-    volatility = df['Close'].pct_change().std()
-    tolerance = volatility * sensitivity
-    
-    # Agrupar níveis
-    resistance_levels = group_levels(
-        df[df['pivot_type'] == 'resistance']['High'].tolist(),
-        tolerance
-    )
-    support_levels = group_levels(
-        df[df['pivot_type'] == 'support']['Low'].tolist(),
-        tolerance
-    )
-    
-    return resistance_levels, support_levels
+ROTULOS_SITUACAO = {
+    'pendente': '⏳ Aguardando',
+    'executando': '🔄 Executando',
+    'interrompida': '⚠️ Interrompida',
+    'erro': '❌ Erro'
+}
 
-def executar_backtest(dados, params, capital_inicial):
-    """Executa o backtesting da estratégia com parâmetros específicos"""
-    df = dados.copy()
-    
-    # Inicializar variáveis
-    capital = capital_inicial
-    posicao = 0
-    preco_entrada = 0
-    operacoes = []
-    
-    # Detectar suportes e resistências
-    resistance_levels, support_levels = detectar_suportes_resistencias(df)
-    
-    for i in range(1, len(df)):
-        preco_atual = df['Close'].iloc[i]
-        
-        # Sinais de entrada
-        sinal_compra = (
-            df['RSI'].iloc[i] < params['rsi_oversold'] and 
-            df['MACD'].iloc[i] > df['MACD_Signal'].iloc[i] and
-            any(preco_atual > level for level in support_levels)
-        )
-        
-        sinal_venda = (
-            df['RSI'].iloc[i] > params['rsi_overbought'] and 
-            df['MACD'].iloc[i] < df['MACD_Signal'].iloc[i] and
-            any(preco_atual < level for level in resistance_levels)
-        )
-        
-        # Verificar stop loss e take profit
-        if posicao != 0:
-            variacao = ((preco_atual - preco_entrada) / preco_entrada) * 100
-            
-            if (posicao == 1 and variacao <= -params['stop_loss']) or \
-               (posicao == 1 and variacao >= params['take_profit']) or \
-               (posicao == -1 and variacao >= params['stop_loss']) or \
-               (posicao == -1 and variacao <= -params['take_profit']):
-                
-                resultado = capital * (variacao / 100)
-                capital += resultado
-                operacoes.append({
-                    'data': df.index[i],
-                    'tipo': 'Fechamento',
-                    'preco': preco_atual,
-                    'resultado': resultado,
-                    'capital': capital
-                })
-                posicao = 0
-                preco_entrada = 0
-        
-        # Executar operações
-        if posicao == 0:
-            if sinal_compra:
-                posicao = 1
-                preco_entrada = preco_atual
-                operacoes.append({
-                    'data': df.index[i],
-                    'tipo': 'Compra',
-                    'preco': preco_atual,
-                    'resultado': 0,
-                    'capital': capital
-                })
-            elif sinal_venda:
-                posicao = -1
-                preco_entrada = preco_atual
-                operacoes.append({
-                    'data': df.index[i],
-                    'tipo': 'Venda',
-                    'preco': preco_atual,
-                    'resultado': 0,
-                    'capital': capital
-                })
-    
-    return pd.DataFrame(operacoes)
+def otimizacoes_em_aberto():
+    """Otimizações de qualquer sessão que ainda não terminaram"""
+    return [
+        execucao for execucao in armazenamento.execucoes()
+        if tarefas.situacao(execucao) != 'concluida'
+    ]
+
+def acompanhar_otimizacoes():
+    """Mostra o progresso das otimizações em aberto, atualizando enquanto alguma estiver rodando"""
+    em_aberto = otimizacoes_em_aberto()
+    rodando = any(tarefas.situacao(e) == 'executando' for e in em_aberto)
+    st.fragment(_progresso_otimizacoes, run_every=2 if rodando else None)()
 
-def calcular_metricas(operacoes, capital_inicial):
-    """Calcula métricas de performance"""
-    if len(operacoes) == 0:
-        return {
-            'retorno_total': 0,
-            'num_operacoes': 0,
-            'taxa_acerto': 0,
-            'sharpe_ratio': 0
-        }
+def _progresso_otimizacoes():
+    em_aberto = otimizacoes_em_aberto()
+    ids_em_aberto = {execucao['run_id'] for execucao in em_aberto}
     
-    resultado_total = operacoes['resultado'].sum()
-    retorno_total = (resultado_total / capital_inicial) * 100
-    num_operacoes = len(operacoes[operacoes['tipo'].isin(['Compra', 'Venda'])])
-    operacoes_lucrativas = len(operacoes[operacoes['resultado'] > 0])
-    taxa_acerto = (operacoes_lucrativas / num_operacoes * 100) if num_operacoes > 0 else 0
+    # Quando uma otimização acompanhada termina, a página toda é recarregada para
+    # atualizar a tabela de melhores resultados
+    if st.session_state.get('otimizacoes_em_aberto', set()) - ids_em_aberto:
+        st.session_state['otimizacoes_em_aberto'] = ids_em_aberto
+        st.rerun()
+    st.session_state['otimizacoes_em_aberto'] = ids_em_aberto
     
-    # Calcular Sharpe Ratio
-    retornos_diarios = operacoes['resultado'].pct_change().dropna()
-    sharpe_ratio = np.sqrt(252) * (retornos_diarios.mean() / retornos_diarios.std()) if len(retornos_diarios) > 0 else 0
+    if not em_aberto:
+        return
     
-    return {
-        'retorno_total': retorno_total,
-        'num_operacoes': num_operacoes,
-        'taxa_acerto': taxa_acerto,
-        'sharpe_ratio': sharpe_ratio
-    }
-
-def gerar_combinacoes():
-    """Gera combinações aleatórias de parâmetros"""
-    combinacoes = []
-    for _ in range(num_combinacoes):
-        params = {
-            'rsi_period': np.random.randint(rsi_period_range[0], rsi_period_range[1] + 1),
-            'rsi_overbought': np.random.randint(rsi_overbought_range[0], rsi_overbought_range[1] + 1),
-            'rsi_oversold': np.random.randint(rsi_oversold_range[0], rsi_oversold_range[1] + 1),
-            'macd_fast': np.random.randint(macd_fast_range[0], macd_fast_range[1] + 1),
-            'macd_slow': np.random.randint(macd_slow_range[0], macd_slow_range[1] + 1),
-            'macd_signal': np.random.randint(macd_signal_range[0], macd_signal_range[1] + 1),
-            'stop_loss': np.random.uniform(stop_loss_range[0], stop_loss_range[1]),
-            'take_profit': np.random.uniform(take_profit_range[0], take_profit_range[1])
-        }
-        combinacoes.append(params)
-    return combinacoes
+    st.subheader("Otimizações em Andamento")
+    for execucao in em_aberto:
+        situacao = tarefas.situacao(execucao)
+        total = execucao['total'] or 1
+        st.progress(
+            min(execucao['avaliacoes'] / total, 1.0),
+            text=f"{ROTULOS_SITUACAO[situacao]} · {execucao['ticker']} {execucao['periodo']} · "
+                 f"{estrategias.obter_estrategia(execucao['estrategia']).rotulo} · "
+                 f"{execucao['avaliacoes']}/{total} combinações · execução {execucao['run_id'][:8]}"
+        )
+        if situacao == 'erro' and execucao['erro']:
+            st.caption(f"Erro: {execucao['erro']}")
+        if situacao != 'executando':
+            if st.button("Retomar", key=f"retomar_{execucao['run_id']}"):
+                tarefas.iniciar_em_segundo_plano(armazenamento, execucao['run_id'],
+                                                 processos=os.cpu_count() or 1)
+                st.rerun()
 
 try:
     # Carregar dados
     with st.spinner('Carregando dados...'):
         dados = carregar_dados(acao_selecionada, periodo)
     
-    # Botão para iniciar otimização
+    # A otimização roda em um processo separado, que grava o progresso no banco: recarregar
+    # a página ou abrir outra sessão não a interrompe, e qualquer sessão pode acompanhá-la
     if st.button("Iniciar Otimização"):
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        # Gerar combinações
-        combinacoes = gerar_combinacoes()
-        resultados = []
-        
-        # Executar backtesting para cada combinação
-        for i, params in enumerate(combinacoes):
-            status_text.text(f"Testando combinação {i+1}/{len(combinacoes)}")
-            progress_bar.progress((i + 1) / len(combinacoes))
-            
-            # Calcular indicadores
-            dados_com_indicadores = calcular_indicadores(dados, params)
-            
-            # Executar backtesting
-            operacoes = executar_backtest(dados_com_indicadores, params, capital_inicial)
-            
-            # Calcular métricas
-            metricas = calcular_metricas(operacoes, capital_inicial)
-            
-            # Adicionar resultados
-            resultados.append({
-                'params': params,
-                'metricas': metricas
-            })
-        
-        # Ordenar resultados por Sharpe Ratio
-        resultados_ordenados = sorted(resultados, key=lambda x: x['metricas']['sharpe_ratio'], reverse=True)
-        
-        # Exibir melhores resultados
-        st.subheader("Melhores Configurações")
+        extras = dict(populacao=populacao, geracoes=geracoes) if modo == 'pareto' else {}
+        run_id = tarefas.criar_tarefa(armazenamento, acao_selecionada, periodo, faixas,
+                                      num_combinacoes, capital_inicial, fonte_niveis=fonte_niveis,
+                                      modo=modo, estrategia=nome_estrategia, **extras)
+        tarefas.iniciar_em_segundo_plano(armazenamento, run_id, processos=os.cpu_count() or 1)
+    
+    acompanhar_otimizacoes()
+    
+    # Melhores resultados de todas as otimizações já registradas para a ação e o período, só
+    # entre as execuções com as configurações da barra lateral: com outro capital ou outros
+    # níveis as métricas não são comparáveis. A página otimiza sem a confirmação do tempo maior.
+    st.subheader("Melhores Resultados Registrados")
+    configuracao = {'capital_inicial': capital_inicial, 'fonte_niveis': fonte_niveis, 'confirmacao': None}
+    st.caption(f"Execuções com capital inicial de R$ {capital_inicial:,.2f}, suportes e resistências "
+               f"por {ROTULOS_NIVEIS[fonte_niveis].lower()} e sem confirmação do tempo maior")
+    
+    metrica = st.selectbox(
+        "Ordenar por:",
+        options=METRICAS,
+        index=METRICAS.index('sharpe_ratio'),
+        format_func=lambda x: ROTULOS[x]
+    )
+    melhores = armazenamento.melhores(metrica, 10, ticker=acao_selecionada, periodo=periodo,
+                                      estrategia=nome_estrategia, configuracao=configuracao)
+    
+    if melhores:
+        import pandas as pd
         
-        # Criar DataFrame com resultados
         df_resultados = pd.DataFrame([
             {
-                'Retorno Total (%)': r['metricas']['retorno_total'],
-                'Número de Operações': r['metricas']['num_operacoes'],
-                'Taxa de Acerto (%)': r['metricas']['taxa_acerto'],
-                'Sharpe Ratio': r['metricas']['sharpe_ratio'],
-                'RSI Período': r['params']['rsi_period'],
-                'RSI Sobrecompra': r['params']['rsi_overbought'],
-                'RSI Sobrevenda': r['params']['rsi_oversold'],
-                'MACD Rápido': r['params']['macd_fast'],
-                'MACD Lento': r['params']['macd_slow'],
-                'MACD Sinal': r['params']['macd_signal'],
-                'Stop Loss (%)': r['params']['stop_loss'],
-                'Take Profit (%)': r['params']['take_profit']
+                **{ROTULOS[m]: r['metricas'][m] for m in METRICAS},
+                **{ROTULOS[p]: r['params'].get(p) for p in estrategia.parametros},
+                'Execução': r['run_id'][:8]
             }
-            for r in resultados_ordenados[:10]
+            for r in melhores
         ])
         
-        st.dataframe(df_resultados)
+        nome_arquivo = f"{acao_selecionada}_{periodo}_{nome_estrategia}"
+        exibir_tabela(df_resultados, f"{nome_arquivo}_melhores")
         
-        # Botão para salvar melhor configuração
-        if st.button("Salvar Melhor Configuração"):
-            melhor_config = {
-                'acao': acao_selecionada,
-                'periodo': periodo,
-                'params': resultados_ordenados[0]['params'],
-                'metricas': resultados_ordenados[0]['metricas'],
-                'data_otimizacao': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            configs = carregar_configuracoes()
-            configs[f"{acao_selecionada}_{periodo}"] = melhor_config
-            salvar_configuracoes(configs)
-            
-            st.success("Configuração salva com sucesso!")
+        # Nas chaves da configuração do cli.py, com as configurações da execução
+        with st.expander("Parâmetros da melhor configuração"):
+            melhor = {'params': melhores[0]['params'], **melhores[0]['configuracao']}
+            st.json(melhor)
+            st.download_button("⬇️ JSON", data=json.dumps(melhor, indent=4),
+                               file_name=f"{nome_arquivo}_parametros.json", mime='application/json',
+                               on_click='ignore')
+        
+        # Todas as avaliações registradas: podem ser centenas de milhares, lidas só quando pedidas
+        if st.toggle("Todas as combinações avaliadas"):
+            todas = armazenamento.tabela(list(estrategia.parametros), metrica, ticker=acao_selecionada,
+                                         periodo=periodo, estrategia=nome_estrategia,
+                                         configuracao=configuracao)
+            st.caption(f"{len(todas):,} combinações, de todas as execuções registradas")
+            exibir_tabela(todas.rename(columns={**ROTULOS, 'run_id': 'Execução', 'indice': 'Combinação',
+                                                'capital_inicial': 'Capital Inicial (R$)',
+                                                'fonte_niveis': 'Suportes e Resistências',
+                                                'confirmacao': 'Confirmação'}),
+                          f"{nome_arquivo}_avaliacoes")
+    else:
+        st.info("Nenhuma otimização registrada ainda para esta ação e período com essas configurações.")
+    
+    # Fronteira da otimização Pareto mais recente da ação e do período
+    execucoes_pareto = [
+        execucao for execucao in armazenamento.execucoes(ticker=acao_selecionada, periodo=periodo,
+                                                         estrategia=nome_estrategia)
+        if (execucao['configuracao'] or {}).get('modo') == 'pareto' and execucao['avaliacoes']
+    ]
+    if execucoes_pareto:
+        import pandas as pd
+        from ui import graficos
         
-        # Exibir configurações salvas
-        st.subheader("Configurações Salvas")
-        configs = carregar_configuracoes()
-        if configs:
-            for key, config in configs.items():
-                with st.expander(f"Configuração para {key}"):
-                    st.json(config)
-        else:
-            st.info("Nenhuma configuração salva ainda.")
+        st.subheader("Fronteira de Pareto")
+        execucao = execucoes_pareto[0]
+        avaliacoes = armazenamento.melhores(n=None, run_id=execucao['run_id'])
+        fronteira = pareto.fronteira_pareto(avaliacoes)
+        configuracao_pareto = avaliacoes[0]['configuracao']
+        st.caption(f"Execução {execucao['run_id'][:8]} · {len(avaliacoes)} combinações avaliadas · "
+                   f"{len(fronteira)} na fronteira · capital inicial de "
+                   f"R$ {configuracao_pareto['capital_inicial'] or 0:,.2f} · "
+                   f"{ROTULOS_NIVEIS.get(configuracao_pareto['fonte_niveis'], configuracao_pareto['fonte_niveis'])}"
+                   f"{' · com confirmação do tempo maior' if configuracao_pareto['confirmacao'] else ''}")
+        st.plotly_chart(graficos.construir_grafico_pareto(avaliacoes, fronteira, ROTULOS),
+                        width='stretch')
+        exibir_tabela(pd.DataFrame([
+            {
+                **{ROTULOS[m]: r['metricas'][m] for m in pareto.OBJETIVOS_PADRAO},
+                **{ROTULOS[p]: r['params'].get(p) for p in estrategia.parametros}
+            }
+            for r in fronteira
+        ]), f"{acao_selecionada}_{periodo}_{nome_estrategia}_pareto")
 
 except Exception as e:
-    st.error(f"Erro ao executar otimização: {str(e)}") 
\ No newline at end of file
+    st.error(f"Erro ao executar otimização: {str(e)}")
+
+painel_depuracao() 
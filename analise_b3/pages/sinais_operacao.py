@@ -1,16 +1,46 @@
 # pages/sinais_operacao.py
 import streamlit as st
-import pandas as pd
-import numpy as np
-import ta
-from datetime import datetime, timedelta
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from core import dados as dados_historicos
+from core import instrumentacao, memoria, padroes, sinais
+from core.cache import cache_compartilhado
+from core.dataset import identificar_dataset
+from ui.depuracao import painel_depuracao
+from ui.sessao import figura_da_sessao
 
 st.set_page_config(page_title="Sinais de Operação", layout="wide")
 
 st.title("🎯 Sinais de Operação")
 
+# Seleção da ação
+acoes_populares = {
+    'PETR4.SA': 'Petrobras PN',
+    'VALE3.SA': 'Vale ON',
+    'ITUB4.SA': 'Itaú PN',
+    'BBDC4.SA': 'Bradesco PN',
+    'ABEV3.SA': 'Ambev ON',
+    'MGLU3.SA': 'Magazine Luiza ON',
+    'WEGE3.SA': 'WEG ON',
+}
+
+acao_selecionada = st.sidebar.selectbox(
+    "Selecione uma ação:",
+    options=list(acoes_populares.keys()),
+    format_func=lambda x: f"{x} - {acoes_populares[x]}"
+)
+
+periodo = st.sidebar.selectbox(
+    "Período:",
+    options=['3mo', '6mo', '1y', '2y', '5y'],
+    index=2,
+    format_func=lambda x: {
+        '3mo': '3 Meses',
+        '6mo': '6 Meses',
+        '1y': '1 Ano',
+        '2y': '2 Anos',
+        '5y': '5 Anos'
+    }[x]
+)
+
 # Seções principais
 tab1, tab2, tab3 = st.tabs([
     "🔄 Momentum Trading",
@@ -20,43 +50,130 @@ tab1, tab2, tab3 = st.tabs([
 
 with tab1:
     st.subheader("Estratégias baseadas em Momentum")
-    
+
     # Configurações de Momentum
     col1, col2 = st.columns(2)
     with col1:
         rsi_compra = st.slider("RSI - Nível de Sobrevenda", 20, 40, 30)
         rsi_venda = st.slider("RSI - Nível de Sobrecompra", 60, 80, 70)
-    
+
     with col2:
         macd_fast = st.slider("MACD - Média Rápida", 5, 15, 12)
         macd_slow = st.slider("MACD - Média Lenta", 20, 30, 26)
 
 with tab2:
     st.subheader("Análise Price Action")
-    
+
     # Configurações de Price Action
     show_patterns = st.checkbox("Detectar Padrões de Candlestick", value=True)
     show_sr = st.checkbox("Mostrar Suportes e Resistências", value=True)
 
 with tab3:
     st.subheader("Análise de Tendências")
-    
+
     # Configurações de Tendências
     col1, col2 = st.columns(2)
     with col1:
         mm_curta = st.selectbox("Média Móvel Curta", [9, 20, 50], 1)
         mm_longa = st.selectbox("Média Móvel Longa", [20, 50, 200], 1)
-    
+
     with col2:
         atr_period = st.slider("Período ATR", 10, 30, 14)
 
-# Seleção da ação
-acoes_populares = {
-    'PETR4.SA': 'Petrobras PN',
-    'VALE3.SA': 'Vale ON',
-    'ITUB4.SA': 'Itaú PN',
-    'BBDC4.SA': 'Bradesco PN',
-    'ABEV3.SA': 'Ambev ON',
-    'MGLU3.SA': 'Magazine Luiza ON',
-    'WEGE3.SA': 'WEG ON',
-}
\ No newline at end of file
+# Os dados vêm do cache compartilhado do provedor; o st.cache_resource evita a cópia por execução
+@st.cache_resource(ttl=1800)
+def carregar_dados(ticker, periodo):
+    """Carrega dados históricos da ação e sua identidade"""
+    dados = dados_historicos.carregar_dados(ticker, periodo)
+    return dados, identificar_dataset(dados, ticker)
+
+# Uma entrada de cache por família: mexer nos controles de uma família não recalcula as outras
+@st.cache_data
+@cache_compartilhado(nome='sinais.calcular_familia')
+def calcular_familia(_dados, identidade, familia, params):
+    """Colunas de uma família de sinais (veja core.sinais)"""
+    return sinais.calcular_familias(_dados, {familia: params}, identidade)
+
+@st.cache_data
+@cache_compartilhado(nome='sinais.detectar_suportes_resistencias')
+def detectar_suportes_resistencias(_dados, identidade):
+    """Os 3 suportes e resistências mais próximos do preço atual"""
+    resistance_levels, support_levels = padroes.detectar_suportes_resistencias(_dados, identidade=identidade)
+    return padroes.niveis_mais_proximos(resistance_levels, support_levels, _dados['Close'].iloc[-1])
+
+def descrever_sinal(valor):
+    return {1: "🟢 Compra", -1: "🔴 Venda"}.get(int(valor), "⚪ Neutro")
+
+try:
+    from ui import graficos
+
+    with st.spinner('Carregando dados...'):
+        dados, identidade = carregar_dados(acao_selecionada, periodo)
+
+    params = {
+        'momentum': dict(rsi_compra=rsi_compra, rsi_venda=rsi_venda, macd_fast=macd_fast, macd_slow=macd_slow),
+        'price_action': dict(padroes=show_patterns),
+        'tendencias': dict(mm_curta=mm_curta, mm_longa=mm_longa, atr_period=atr_period)
+    }
+    colunas = {familia: calcular_familia(dados, identidade, familia, params[familia])
+               for familia in sinais.FAMILIAS}
+    dados = memoria.anexar_colunas(dados, {
+        nome: serie for familia in sinais.FAMILIAS for nome, serie in colunas[familia].items()
+    })
+    memoria.registrar_dataset(f"sinais: {acao_selecionada} {periodo}", dados)
+
+    # Resumo da última barra
+    score = sinais.serie_score(dados, mm_curta, mm_longa)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Preço Atual", f"R$ {dados['Close'].iloc[-1]:.2f}")
+    col2.metric("Score de Operação", f"{score.iloc[-1]:+d}",
+                help="Momentum (±2), doji (±1) e média curta acima ou abaixo da longa (±1)")
+    col3.metric("Momentum (RSI + MACD)", descrever_sinal(
+        dados['sinal_rsi'].iloc[-1] if dados['sinal_rsi'].iloc[-1] == dados['sinal_macd'].iloc[-1] else 0
+    ))
+    col4.metric("Tendência", "🟢 Alta" if dados[f'MM{mm_curta}'].iloc[-1] > dados[f'MM{mm_longa}'].iloc[-1]
+                else "🔴 Baixa")
+    st.line_chart(score.rename('Score'), height=160)
+
+    # As figuras só são remontadas quando os dados ou os parâmetros da família mudam
+    chave_momentum = (identidade, tuple(params['momentum'].items()))
+    with tab1:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("RSI (14)", f"{dados['RSI'].iloc[-1]:.1f}")
+        col2.metric("Sinal RSI", descrever_sinal(dados['sinal_rsi'].iloc[-1]))
+        col3.metric("Sinal MACD", descrever_sinal(dados['sinal_macd'].iloc[-1]))
+        fig_rsi = figura_da_sessao('sinais.rsi', chave_momentum,
+                                   lambda: graficos.construir_grafico_rsi(dados, rsi_venda, rsi_compra))
+        fig_macd = figura_da_sessao('sinais.macd', chave_momentum,
+                                    lambda: graficos.construir_grafico_macd(dados))
+        with instrumentacao.medir('grafico.envio'):
+            st.plotly_chart(fig_rsi, width='stretch')
+            st.plotly_chart(fig_macd, width='stretch')
+
+    with tab2:
+        col1, col2 = st.columns(2)
+        col1.metric("Dojis no período", int(dados['doji'].sum()))
+        col2.metric("Pin bars no período", int(dados['pin_bar'].sum()))
+        fig_pa = figura_da_sessao(
+            'sinais.price_action', (identidade, show_patterns),
+            lambda: graficos.construir_grafico_principal(dados, [], [], show_patterns, 0.20, 0.1)
+        )
+        resistance_levels, support_levels = detectar_suportes_resistencias(dados, identidade) if show_sr else ([], [])
+        fig_pa = graficos.aplicar_camadas(fig_pa, resistance_levels, support_levels, {})
+        with instrumentacao.medir('grafico.envio'):
+            st.plotly_chart(fig_pa, width='stretch')
+
+    with tab3:
+        colunas_medias = list(dict.fromkeys([f'MM{mm_curta}', f'MM{mm_longa}']))
+        chave_tendencias = (identidade, tuple(params['tendencias'].items()))
+        fig_tendencias = figura_da_sessao('sinais.tendencias', chave_tendencias,
+                                          lambda: graficos.construir_grafico_tendencias(dados, colunas_medias))
+        fig_atr = figura_da_sessao('sinais.atr', chave_tendencias, lambda: graficos.construir_grafico_atr(dados))
+        with instrumentacao.medir('grafico.envio'):
+            st.plotly_chart(fig_tendencias, width='stretch')
+            st.plotly_chart(fig_atr, width='stretch')
+
+except Exception as e:
+    st.error(f"Erro ao calcular os sinais: {str(e)}")
+
+painel_depuracao()
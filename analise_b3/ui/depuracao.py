@@ -0,0 +1,97 @@
+import os
+
+import streamlit as st
+
+from core import calendario, instrumentacao, memoria
+
+
+def painel_depuracao():
+    """
+    Painel na barra lateral com o tempo de cada etapa, os contadores do cache, a memória
+    ocupada por dataset e a qualidade das séries carregadas
+    Aparece com ?debug=1 na URL ou com a variável de ambiente ANALISE_B3_DEBUG definida.
+    """
+    instrumentacao.iniciar_exportacao()
+    if st.query_params.get('debug') != '1' and not os.environ.get('ANALISE_B3_DEBUG'):
+        return
+
+    with st.sidebar.expander("🛠️ Depuração: tempo por etapa", expanded=False):
+        st.caption(f"Medições deste processo (pid {os.getpid()}), somando todas as sessões")
+        st.dataframe(
+            [
+                {
+                    'Etapa': item['etapa'],
+                    'Chamadas': item['chamadas'],
+                    'p50 (ms)': round(item['p50_ms'], 1),
+                    'p95 (ms)': round(item['p95_ms'], 1),
+                    'Máx. (ms)': round(item['max_ms'], 1),
+                    'Total (s)': round(item['total_s'], 2)
+                }
+                for item in instrumentacao.resumo()
+            ],
+            width='stretch'
+        )
+
+        st.markdown("**Cache compartilhado**")
+        totais = {
+            rotulos['resultado']: total
+            for nome, rotulos, total in instrumentacao.contadores() if nome == 'cache'
+        }
+        consultas = sum(totais.values())
+        st.write(
+            f"Acertos: {totais.get('acerto', 0)} · Falhas: {totais.get('falha', 0)}"
+            + (f" · Taxa de acerto: {totais.get('acerto', 0) / consultas:.0%}" if consultas else "")
+        )
+
+        st.markdown("**Features (core.features)**")
+        features = {
+            rotulos['resultado']: total
+            for nome, rotulos, total in instrumentacao.contadores() if nome == 'features'
+        }
+        st.write(f"Calculadas: {features.get('calculada', 0)} · "
+                 f"Reaproveitadas: {features.get('reaproveitada', 0)}")
+
+        st.markdown("**Memória por dataset**")
+        st.caption("Preços e indicadores em " + ("float32" if memoria.modo_float32() else "float64")
+                   + "; colunas compartilhadas entre as etapas contam uma vez por dataset")
+        st.dataframe(
+            [
+                {
+                    'Dataset': nome,
+                    'Barras': relatorio['linhas'],
+                    'Colunas': relatorio['colunas'],
+                    'Memória (KiB)': round(relatorio['bytes'] / 1024, 1),
+                    'Por tipo (KiB)': ', '.join(f"{tipo}: {total / 1024:.1f}"
+                                                for tipo, total in relatorio['por_tipo'].items())
+                }
+                for nome, relatorio in memoria.datasets()
+            ],
+            width='stretch'
+        )
+
+        st.markdown("**Qualidade das séries (calendário da B3)**")
+        st.caption("Barras em fins de semana e repetidas são descartadas; barras em feriados do "
+                   "calendário são mantidas; ausentes são pregões sem barra entre a primeira e a última data")
+        st.dataframe(
+            [
+                {
+                    'Ação': nome,
+                    'Barras': relatorio['barras'],
+                    'Fim de semana': relatorio['fim_de_semana'],
+                    'Em feriado': ', '.join(relatorio['datas_em_feriado'][:5]) or '-',
+                    'Repetidas': relatorio['repetidas'],
+                    'Ausentes': relatorio['ausentes'],
+                    'Maior lacuna': relatorio['maior_lacuna'],
+                    'Cobertura': f"{relatorio['cobertura']:.1%}",
+                    'Primeiras ausentes': ', '.join(relatorio['datas_ausentes'][:5])
+                }
+                for nome, relatorio in calendario.relatorios()
+            ],
+            width='stretch'
+        )
+
+        if st.button("Zerar medições"):
+            instrumentacao.limpar()
+            memoria.limpar()
+            calendario.limpar()
+            st.rerun()
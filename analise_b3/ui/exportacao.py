@@ -0,0 +1,41 @@
+import streamlit as st
+
+from core import exportacao
+from core.instrumentacao import medir
+
+ROTULOS_FORMATOS = {'parquet': 'Parquet', 'arrow': 'Arrow', 'csv': 'CSV'}
+
+# Tamanho máximo da tabela enviada à grade; o download leva sempre a tabela inteira
+LIMITE_EXIBICAO_BYTES = 64 * 2 ** 20
+
+
+def exibir_tabela(dados, nome, indice=True, **kwargs):
+    """
+    Mostra a tabela e botões de download nos formatos de core.exportacao
+    A grade recebe a pyarrow.Table diretamente, sem outra conversão do DataFrame, e os
+    arquivos só são gerados quando o botão é clicado (fora da execução da página).
+    nome: nome dos arquivos baixados e chave dos botões (único na página)
+    kwargs: repassados a st.dataframe
+    """
+    with medir('exportacao.arrow'):
+        tabela = exportacao.tabela_arrow(dados, indice)
+
+    exibida = tabela
+    if tabela.nbytes > LIMITE_EXIBICAO_BYTES:
+        exibida = tabela.slice(0, int(tabela.num_rows * LIMITE_EXIBICAO_BYTES / tabela.nbytes))
+        st.caption(f"Exibindo {exibida.num_rows:,} de {tabela.num_rows:,} linhas; "
+                   "os downloads contêm a tabela inteira.")
+    with medir('exportacao.envio'):
+        st.dataframe(exibida, **kwargs)
+
+    for coluna, formato in zip(st.columns(len(exportacao.FORMATOS) + 2), exportacao.FORMATOS):
+        extensao, mime = exportacao.FORMATOS[formato]
+        coluna.download_button(
+            f"⬇️ {ROTULOS_FORMATOS[formato]}",
+            # A tabela já está em memória: o arquivo é escrito só no clique
+            data=lambda formato=formato: exportacao.serializar(tabela, formato),
+            file_name=f"{nome}{extensao}",
+            mime=mime,
+            on_click='ignore',
+            key=f"exportar_{nome}_{formato}"
+        )
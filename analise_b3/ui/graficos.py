@@ -0,0 +1,453 @@
+import plotly.graph_objects as go
+
+from core.instrumentacao import medir
+
+# Marcadores dos padrões de candlestick: coluna, preço de referência, símbolo, cor, texto e posição
+MARCADORES_PADROES = [
+    ('doji', 'High', 'diamond', 'yellow', 'D', 'top center', 'Doji'),
+    ('hammer', 'Low', 'triangle-up', 'green', 'H', 'bottom center', 'Hammer'),
+    ('shooting_star', 'High', 'triangle-down', 'red', 'SS', 'top center', 'Shooting Star'),
+    ('bullish_marubozu', 'High', 'circle', 'green', 'BM', 'top center', 'Bullish Marubozu'),
+    ('bearish_marubozu', 'Low', 'circle', 'red', 'BM', 'bottom center', 'Bearish Marubozu'),
+]
+
+@medir('grafico.principal')
+def construir_grafico_principal(dados, sma_periods, ema_periods, mostrar_padroes,
+                                candle_width, candle_spacing):
+    """Monta o gráfico de candlestick com médias móveis e padrões, sem as camadas de níveis"""
+    fig = go.Figure()
+    
+    # Adicionar candlestick
+    fig.add_trace(go.Candlestick(
+        x=dados.index,
+        open=dados['Open'],
+        high=dados['High'],
+        low=dados['Low'],
+        close=dados['Close'],
+        name='OHLC',
+        text=[f"Data: {index}<br>" +
+              f"Abertura: R$ {open:.2f}<br>" +
+              f"Máxima: R$ {high:.2f}<br>" +
+              f"Mínima: R$ {low:.2f}<br>" +
+              f"Fechamento: R$ {close:.2f}"
+              for index, open, high, low, close in zip(
+                  dados.index,
+                  dados['Open'],
+                  dados['High'],
+                  dados['Low'],
+                  dados['Close']
+              )],
+        hoverinfo='text',
+        increasing_line_color='#26a69a',
+        decreasing_line_color='#ef5350',
+        increasing_fillcolor='#26a69a',
+        decreasing_fillcolor='#ef5350',
+        line=dict(width=1),
+        whiskerwidth=candle_width,
+        xperiodalignment="middle",
+        xperiod=candle_spacing
+    ))
+    
+    # Adicionando médias móveis apenas se estiverem disponíveis
+    for period in sma_periods:
+        if f'SMA_{period}' in dados.columns:
+            fig.add_trace(go.Scatter(
+                x=dados.index,
+                y=dados[f'SMA_{period}'],
+                name=f'SMA {period}',
+                line=dict(width=1),
+                opacity=0.7
+            ))
+    
+    for period in ema_periods:
+        if f'EMA_{period}' in dados.columns:
+            fig.add_trace(go.Scatter(
+                x=dados.index,
+                y=dados[f'EMA_{period}'],
+                name=f'EMA {period}',
+                line=dict(width=1, dash='dash'),
+                opacity=0.7
+            ))
+    
+    # Um trace por padrão, com todas as ocorrências de uma vez
+    if mostrar_padroes:
+        for coluna, preco, simbolo, cor, texto, posicao, nome in MARCADORES_PADROES:
+            ocorrencias = dados[dados[coluna].fillna(False).astype(bool)]
+            if len(ocorrencias) == 0:
+                continue
+            fig.add_trace(go.Scatter(
+                x=ocorrencias.index,
+                y=ocorrencias[preco],
+                mode='markers+text',
+                marker=dict(
+                    symbol=simbolo,
+                    size=10,
+                    color=cor,
+                    line=dict(color='black', width=1)
+                ),
+                text=texto,
+                textposition=posicao,
+                name=nome,
+                showlegend=False
+            ))
+    
+    # Layout do gráfico principal
+    fig.update_layout(
+        template='plotly_dark',
+        xaxis_rangeslider_visible=True,
+        height=600,
+        dragmode='pan',
+        xaxis=dict(
+            type='date',
+            rangeslider=dict(
+                visible=True,
+                thickness=0.05,
+                bgcolor="rgb(48, 48, 48)",
+                bordercolor="rgb(128, 128, 128)",
+                borderwidth=1,
+                range=[dados.index[-min(100, len(dados))].timestamp() * 1000, dados.index[-1].timestamp() * 1000]  # Zoom padrão do rangeslider
+            ),
+            rangeselector=dict(
+                buttons=list([
+                    dict(count=1, label="1D", step="day", stepmode="backward"),
+                    dict(count=7, label="7D", step="day", stepmode="backward"),
+                    dict(count=1, label="1M", step="month", stepmode="backward"),
+                    dict(count=3, label="3M", step="month", stepmode="backward"),
+                    dict(count=6, label="6M", step="month", stepmode="backward"),
+                    dict(count=1, label="1A", step="year", stepmode="backward"),
+                    dict(step="all", label="Tudo")
+                ]),
+                font=dict(color="white"),
+                bgcolor="rgb(48, 48, 48)",
+                activecolor="rgb(65, 65, 65)"
+            )
+        ),
+        yaxis=dict(
+            title="Preço (R$)",
+            tickformat='.2f',
+            tickprefix='R$ ',
+            fixedrange=False,
+            side='right'
+        ),
+        xaxis_gridcolor='rgba(128, 128, 128, 0.1)',
+        yaxis_gridcolor='rgba(128, 128, 128, 0.1)',
+        plot_bgcolor='rgba(0, 0, 0, 0)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        margin=dict(l=50, r=50, t=50, b=50),
+        showlegend=True,
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01,
+            bgcolor="rgba(0, 0, 0, 0.5)",
+            bordercolor="rgba(128, 128, 128, 0.5)",
+            borderwidth=1
+        ),
+        bargap=0.15,
+        bargroupgap=0.1
+    )
+    
+    return fig
+
+def linha_horizontal(y, cor, tracejado, texto):
+    """Linha horizontal com rótulo à direita, equivalente a fig.add_hline"""
+    linha = dict(
+        type='line', xref='x domain', x0=0, x1=1, yref='y', y0=y, y1=y,
+        line=dict(color=cor, dash=tracejado)
+    )
+    rotulo = dict(
+        xref='x domain', x=1, xanchor='left', yref='y', y=y, yanchor='middle',
+        text=texto, showarrow=False, font=dict(color=cor)
+    )
+    return linha, rotulo
+
+def barras_perfil_volume(perfil, resumo, largura=0.25):
+    """
+    Retângulos do perfil de volume junto à borda direita do gráfico, o maior com largura
+    (fração da área do gráfico); as faixas da área de valor são mais fortes e o POC é destacado
+    """
+    inferior, superior = resumo['faixas_area_valor']
+    maximo = perfil['volume'].max() or 1
+    barras = []
+    for i, (preco_min, preco_max, volume) in enumerate(zip(perfil['preco_min'], perfil['preco_max'], perfil['volume'])):
+        cor = 'rgba(255, 165, 0, 0.6)' if preco_min <= resumo['poc'] <= preco_max else (
+            'rgba(100, 149, 237, 0.45)' if inferior <= i <= superior else 'rgba(128, 128, 128, 0.3)')
+        barras.append(dict(
+            type='rect', xref='x domain', x0=1 - largura * volume / maximo, x1=1,
+            yref='y', y0=preco_min, y1=preco_max, fillcolor=cor, line=dict(width=0), layer='below'
+        ))
+    return barras
+
+@medir('grafico.camadas')
+def aplicar_camadas(fig, resistance_levels, support_levels, fib_levels_dict, perfil=None, resumo_perfil=None):
+    """
+    Substitui as linhas de suporte, resistência e Fibonacci do gráfico principal
+    perfil, resumo_perfil: perfil de volume e seu resumo (core.perfil_volume), desenhados como barras
+    """
+    camadas = (
+        [linha_horizontal(level, "red", "dash", f"R: {level:.2f}") for level in resistance_levels] +
+        [linha_horizontal(level, "green", "dash", f"S: {level:.2f}") for level in support_levels] +
+        [linha_horizontal(price, "yellow", "dot", f"Fib {level:.3f}: {price:.2f}")
+         for level, price in fib_levels_dict.items()]
+    )
+    
+    # As camadas são as únicas shapes/anotações do gráfico, então são trocadas de uma vez;
+    # add_hline revalida todas as shapes a cada chamada e fica lento com muitos níveis
+    barras = barras_perfil_volume(perfil, resumo_perfil) if perfil is not None else []
+    fig.layout.shapes = barras + [linha for linha, _ in camadas]
+    fig.layout.annotations = [rotulo for _, rotulo in camadas]
+    
+    return fig
+
+def configuracao_grafico(acao_selecionada):
+    """Configurações da barra de ferramentas do gráfico principal"""
+    return {
+        'modeBarButtonsToAdd': [
+            'drawline',
+            'drawopenpath',
+            'drawclosedpath',
+            'drawcircle',
+            'drawrect',
+            'eraseshape'
+        ],
+        'modeBarButtons': [
+            ['zoom2d', 'pan2d', 'zoomIn2d', 'zoomOut2d', 'autoScale2d', 'resetScale2d'],
+            ['toImage'],
+            ['zoom3d', 'pan3d', 'resetCameraDefault3d', 'resetCameraLastSave3d'],
+            ['hoverClosestCartesian', 'hoverCompareCartesian']
+        ],
+        'scrollZoom': True,
+        'displaylogo': False,
+        'toImageButtonOptions': {
+            'format': 'png',
+            'filename': f'{acao_selecionada}_chart',
+            'height': 600,
+            'width': 1200,
+            'scale': 2
+        },
+        'displayModeBar': True,
+        'doubleClick': 'reset+autosize'
+    }
+
+@medir('grafico.rsi')
+def construir_grafico_rsi(dados, rsi_overbought, rsi_oversold):
+    """Gráfico do RSI com as faixas de sobrecompra e sobrevenda"""
+    fig_rsi = go.Figure()
+    fig_rsi.add_trace(go.Scatter(
+        x=dados.index,
+        y=dados['RSI'],
+        name='RSI',
+        line=dict(color='blue')
+    ))
+    fig_rsi.add_hline(y=rsi_overbought, line_dash="dash", line_color="red")
+    fig_rsi.add_hline(y=rsi_oversold, line_dash="dash", line_color="green")
+    fig_rsi.update_layout(
+        title='RSI',
+        height=300,
+        template='plotly_dark',
+        yaxis=dict(range=[0, 100])
+    )
+    return fig_rsi
+
+@medir('grafico.macd')
+def construir_grafico_macd(dados):
+    """Gráfico do MACD e da linha de sinal"""
+    fig_macd = go.Figure()
+    fig_macd.add_trace(go.Scatter(
+        x=dados.index,
+        y=dados['MACD'],
+        name='MACD',
+        line=dict(color='blue')
+    ))
+    fig_macd.add_trace(go.Scatter(
+        x=dados.index,
+        y=dados['MACD_Signal'],
+        name='Sinal',
+        line=dict(color='orange')
+    ))
+    fig_macd.update_layout(
+        title='MACD',
+        height=300,
+        template='plotly_dark'
+    )
+    return fig_macd
+
+@medir('grafico.volume')
+def construir_grafico_volume(dados):
+    """Gráfico de barras do volume negociado"""
+    fig_volume = go.Figure(data=[
+        go.Bar(
+            x=dados.index, 
+            y=dados['Volume'],
+            name='Volume',
+            hovertemplate=
+            "<b>Data</b>: %{x}<br>" +
+            "<b>Volume</b>: %{y:,.0f}<br>" +
+            "<extra></extra>"
+        )
+    ])
+    
+    fig_volume.update_layout(
+        template='plotly_dark',
+        height=250,
+        xaxis_rangeslider_visible=False,
+        yaxis=dict(title="Volume"),
+        xaxis_gridcolor='rgba(128, 128, 128, 0.1)',
+        yaxis_gridcolor='rgba(128, 128, 128, 0.1)',
+        plot_bgcolor='rgba(0, 0, 0, 0)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        margin=dict(l=50, r=50, t=50, b=50),
+    )
+    return fig_volume
+
+@medir('grafico.tendencias')
+def construir_grafico_tendencias(dados, colunas_medias):
+    """Fechamento com as médias móveis (colunas_medias: nomes das colunas, da mais curta à mais longa)"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=dados.index,
+        y=dados['Close'],
+        name='Fechamento',
+        line=dict(color='white', width=1)
+    ))
+    for coluna, cor in zip(colunas_medias, ['orange', 'deepskyblue', 'violet']):
+        fig.add_trace(go.Scatter(
+            x=dados.index,
+            y=dados[coluna],
+            name=coluna,
+            line=dict(color=cor, width=1)
+        ))
+    fig.update_layout(
+        title='Médias Móveis',
+        height=400,
+        template='plotly_dark',
+        yaxis=dict(tickformat='.2f', tickprefix='R$ ')
+    )
+    return fig
+
+@medir('grafico.atr')
+def construir_grafico_atr(dados):
+    """Gráfico do ATR (volatilidade média em R$)"""
+    fig_atr = go.Figure()
+    fig_atr.add_trace(go.Scatter(
+        x=dados.index,
+        y=dados['ATR'],
+        name='ATR',
+        line=dict(color='orange')
+    ))
+    fig_atr.update_layout(
+        title='ATR',
+        height=300,
+        template='plotly_dark'
+    )
+    return fig_atr
+
+@medir('grafico.correlacao')
+def construir_mapa_correlacao(matriz):
+    """Mapa de calor da matriz de correlação (DataFrame tickers x tickers)"""
+    fig = go.Figure(go.Heatmap(
+        z=matriz.to_numpy(),
+        x=list(matriz.columns),
+        y=list(matriz.index),
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        reversescale=True,
+        hovertemplate="%{y} x %{x}: %{z:.2f}<extra></extra>"
+    ))
+    fig.update_layout(
+        title='Correlação dos retornos diários',
+        height=700,
+        template='plotly_dark',
+        yaxis=dict(autorange='reversed')
+    )
+    return fig
+
+@medir('grafico.par')
+def construir_grafico_par(correlacao, zscore, titulo):
+    """Correlação móvel e z-score do spread de um par, em dois painéis"""
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        subplot_titles=('Correlação móvel', 'Z-score do spread'))
+    fig.add_trace(go.Scatter(x=correlacao.index, y=correlacao, name='Correlação',
+                             line=dict(color='deepskyblue')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=zscore.index, y=zscore, name='Z-score',
+                             line=dict(color='orange')), row=2, col=1)
+    for nivel, cor in [(2, 'red'), (-2, 'green'), (0, 'gray')]:
+        fig.add_hline(y=nivel, line_dash="dash", line_color=cor, row=2, col=1)
+    fig.update_layout(
+        title=titulo,
+        height=550,
+        template='plotly_dark',
+        showlegend=False
+    )
+    return fig
+
+@medir('grafico.forca_relativa')
+def construir_grafico_forca_relativa(linhas, percentil, beta, titulo):
+    """
+    Linhas de força relativa (dicionário referência -> série), percentil no ranking do
+    universo e beta móvel de uma ação, em três painéis
+    """
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.06,
+                        row_heights=[0.5, 0.25, 0.25],
+                        subplot_titles=('Força relativa', 'Percentil no universo', 'Beta móvel'))
+    for (nome, linha), cor in zip(linhas.items(), ['deepskyblue', 'violet']):
+        fig.add_trace(go.Scatter(x=linha.index, y=linha, name=f"vs {nome}",
+                                 line=dict(color=cor)), row=1, col=1)
+    fig.add_hline(y=1, line_dash="dash", line_color="gray", row=1, col=1)
+    fig.add_trace(go.Scatter(x=percentil.index, y=percentil, name='Percentil',
+                             line=dict(color='orange')), row=2, col=1)
+    fig.add_trace(go.Scatter(x=beta.index, y=beta, name='Beta',
+                             line=dict(color='lightgreen')), row=3, col=1)
+    fig.add_hline(y=1, line_dash="dash", line_color="gray", row=3, col=1)
+    fig.update_yaxes(range=[0, 100], row=2, col=1)
+    fig.update_layout(
+        title=titulo,
+        height=700,
+        template='plotly_dark'
+    )
+    return fig
+
+@medir('grafico.pareto')
+def construir_grafico_pareto(avaliacoes, fronteira, rotulos):
+    """
+    Retorno x drawdown de todas as combinações avaliadas, com a cor e o tamanho pelo número de
+    operações e a fronteira de Pareto destacada; os parâmetros aparecem ao passar o mouse
+    """
+    def dispersao(resultados, nome, marcador):
+        return go.Scatter(
+            x=[r['metricas']['max_drawdown'] for r in resultados],
+            y=[r['metricas']['retorno_total'] for r in resultados],
+            mode='markers',
+            name=nome,
+            marker=marcador,
+            text=['<br>'.join(f"{chave}: {valor}" for chave, valor in r['params'].items())
+                  for r in resultados],
+            customdata=[r['metricas']['num_operacoes'] for r in resultados],
+            hovertemplate="Drawdown: %{x:.2f}%<br>Retorno: %{y:.2f}%<br>"
+                          "Operações: %{customdata}<br>%{text}<extra></extra>"
+        )
+
+    operacoes = [r['metricas']['num_operacoes'] or 0 for r in avaliacoes]
+    maximo = max(operacoes, default=0) or 1
+    fig = go.Figure()
+    fig.add_trace(dispersao(avaliacoes, 'Avaliadas', dict(
+        color=operacoes, colorscale='Viridis', showscale=True, opacity=0.5,
+        size=[6 + 14 * n / maximo for n in operacoes],
+        colorbar=dict(title=rotulos['num_operacoes'])
+    )))
+    fig.add_trace(dispersao(fronteira, 'Fronteira de Pareto', dict(
+        color='rgba(0,0,0,0)', size=14, line=dict(color='red', width=2)
+    )))
+    fig.update_layout(
+        xaxis_title=rotulos['max_drawdown'],
+        yaxis_title=rotulos['retorno_total'],
+        height=550,
+        template='plotly_dark'
+    )
+    return fig
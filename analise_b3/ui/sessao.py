@@ -0,0 +1,9 @@
+import streamlit as st
+
+
+def figura_da_sessao(nome, chave, construir):
+    """Reaproveita a figura montada nesta sessão enquanto a chave não mudar"""
+    figuras = st.session_state.setdefault('figuras', {})
+    if nome not in figuras or figuras[nome][0] != chave:
+        figuras[nome] = (chave, construir())
+    return figuras[nome][1]
@@ -0,0 +1,34 @@
+import streamlit as st
+from api.provider import obter_provedor
+from core.alertas import LimitadorTaxa, buscar_historicos
+from core.cache import cache_compartilhado
+
+
+def provedor_do_universo():
+    """O Yahoo Finance busca as ações em lotes (ou o provedor de ANALISE_B3_PROVEDOR)"""
+    return obter_provedor('yfinance')
+
+def tickers_do_universo():
+    """Todas as ações da lista local, com o sufixo .SA da B3"""
+    return [ticker if ticker.endswith('.SA') else f"{ticker}.SA"
+            for ticker in provedor_do_universo().get_available_stocks()]
+
+@st.cache_resource
+def limitador_de_requisicoes():
+    """Um limitador por processo, compartilhado pelas sessões; a rajada cobre um universo sem lote nativo"""
+    return LimitadorTaxa(requisicoes_por_minuto=60, rajada=60)
+
+# Compartilhado pelas páginas do universo: a mesma seleção é buscada uma vez só
+@st.cache_data
+@cache_compartilhado(nome='universo.carregar_precos', ttl=1800)
+def carregar_precos(tickers, periodo):
+    """Fechamentos de todas as ações (datas x tickers) e as ações que não puderam ser carregadas"""
+    from core.correlacao import matriz_precos
+
+    historicos = buscar_historicos(provedor_do_universo(), list(tickers), periodo, lote=50,
+                                   limitador=limitador_de_requisicoes())
+    falhas = {ticker: str(resultado) for ticker, resultado in historicos.items() if isinstance(resultado, Exception)}
+    validos = {ticker: dados for ticker, dados in historicos.items() if ticker not in falhas}
+    if not validos:
+        raise Exception("Nenhuma ação do universo pôde ser carregada.")
+    return matriz_precos(validos), falhas